@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Lookup latency of the crash signature index at scale.
+
+Fills a CrashIndex with synthetic dumps spread over a number of buckets and
+times the lookups used by the bucket_windbg_dump tool: by path, by content
+hash, by faulting instruction and the sibling listing.
+
+Usage:
+    python benchmarks/bench_crash_index.py [--dumps 100000] [--buckets 500] [--lookups 2000]
+"""
+
+import argparse
+import hashlib
+import os
+import random
+import tempfile
+import time
+
+from mcp_server_windbg.crash_buckets import CrashIndex, bucket_id
+
+
+def populate(index, dumps, buckets):
+    """Insert synthetic rows directly; CrashIndex.add() would stat and hash real files"""
+    now = time.time()
+    signatures = [f"c0000005\napp!function{b}\napp!caller{b}" for b in range(buckets)]
+    with index._conn:
+        index._conn.executemany(
+            "INSERT INTO buckets (bucket_id, signature, dump_count, first_seen, last_seen) VALUES (?, ?, 0, ?, ?)",
+            [(bucket_id(s), s, now, now) for s in signatures]
+        )
+        rows = []
+        for n in range(dumps):
+            b = n % buckets
+            rows.append((
+                f"C:\\dumps\\crash{n}.dmp", hashlib.sha256(str(n).encode()).hexdigest(), 1024, n,
+                bucket_id(signatures[b]), f"c0000005|app.exe+0x{b:x}", now + n
+            ))
+        index._conn.executemany(
+            "INSERT INTO dumps (dump_path, dump_hash, size, mtime_ns, bucket_id, quick_key, indexed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+        index._conn.execute(
+            "UPDATE buckets SET dump_count = (SELECT COUNT(*) FROM dumps WHERE dumps.bucket_id = buckets.bucket_id)"
+        )
+    return signatures
+
+
+def time_lookups(name, lookups, fn):
+    samples = []
+    for arg in lookups:
+        start = time.perf_counter()
+        fn(arg)
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    print(f"{name:<20} p50 {samples[len(samples) // 2] * 1000:7.3f} ms   "
+          f"p99 {samples[int(len(samples) * 0.99)] * 1000:7.3f} ms   max {samples[-1] * 1000:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark crash index lookups")
+    parser.add_argument("--dumps", type=int, default=100000, help="Number of indexed dumps")
+    parser.add_argument("--buckets", type=int, default=500, help="Number of distinct signatures")
+    parser.add_argument("--lookups", type=int, default=2000, help="Lookups per operation")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = CrashIndex(directory)
+        start = time.perf_counter()
+        signatures = populate(index, args.dumps, args.buckets)
+        print(f"Indexed {args.dumps} dumps in {args.buckets} buckets in {time.perf_counter() - start:.1f}s")
+
+        dump = os.path.join(directory, "new.dmp")
+        with open(dump, "wb") as f:
+            f.write(b"MDMP")
+        index.add(dump, signatures[0])
+
+        rng = random.Random(0)
+        time_lookups("lookup_path", [dump] * args.lookups, index.lookup_path)
+        time_lookups(
+            "lookup_hash",
+            [hashlib.sha256(str(rng.randrange(args.dumps)).encode()).hexdigest() for _ in range(args.lookups)],
+            index.lookup_hash
+        )
+        time_lookups(
+            "lookup_quick_key",
+            [f"c0000005|app.exe+0x{rng.randrange(args.buckets):x}" for _ in range(args.lookups)],
+            index.lookup_quick_key
+        )
+        time_lookups(
+            "siblings",
+            [bucket_id(signatures[rng.randrange(args.buckets)]) for _ in range(args.lookups)],
+            index.siblings
+        )
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Directory listing cost: glob + getsize versus the cached dump index.
+
+Creates a directory of empty *.dmp files and times the previous
+list_windbg_dumps implementation (glob.glob, sort and os.path.getsize per
+file) against DumpDirectoryIndex.list() on its first and repeated calls.
+
+Usage:
+    python benchmarks/bench_dump_index.py [--files 50000] [--repeat 5] [--dir PATH]
+"""
+
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from mcp_server_windbg.dump_index import DumpDirectoryIndex
+
+
+def legacy_listing(directory):
+    dump_files = glob.glob(os.path.join(directory, "*.*dmp"))
+    dump_files.sort()
+    return [(path, os.path.getsize(path)) for path in dump_files]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def run(directory, files, repeat):
+    legacy = min(timed(lambda: legacy_listing(directory))[0] for _ in range(repeat))
+    index = DumpDirectoryIndex()
+    first, listing = timed(lambda: index.list(directory))
+    assert listing.total == files, (listing.total, files)
+    repeated = min(timed(lambda: index.list(directory))[0] for _ in range(repeat))
+    by_mtime = min(timed(lambda: index.list(directory, sort_by="mtime", descending=True))[0] for _ in range(repeat))
+
+    print(f"{files} files")
+    print(f"  glob + getsize:          {legacy * 1000:9.1f} ms")
+    print(f"  index, first call:       {first * 1000:9.1f} ms")
+    print(f"  index, repeated call:    {repeated * 1000:9.3f} ms")
+    print(f"  index, newest first:     {by_mtime * 1000:9.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dump directory listing")
+    parser.add_argument("--files", type=int, default=50000, help="Number of dump files to create")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is reported)")
+    parser.add_argument("--dir", help="Existing directory to create the files in (e.g. a network share)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        for n in range(args.files):
+            open(os.path.join(directory, f"app.exe.{n}.dmp"), "wb").close()
+        run(directory, args.files, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+run_windbg_cmd latency and response size with and without server-side filters.
+
+Runs multi-MB synthetic outputs through the scripted cdb stand-in used by the
+tests (`lines N` prints N numbered lines) and the same code path as the
+run_windbg_cmd tool. For each filter it reports the time until the tool
+result is ready, the number of lines kept in memory, the bytes streamed to
+the client as output chunks and the size of the tool result.
+
+Usage:
+    python benchmarks/bench_output_filter.py [--lines 500000] [--repeat 3]
+"""
+
+import argparse
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import time
+
+from mcp_server_windbg import server
+from mcp_server_windbg.output_filter import OutputFilter
+from mcp_server_windbg.output_stream import output_sink
+
+FAKE_CDB_SCRIPT = os.path.join(
+    os.path.dirname(__file__), "..", "src", "mcp_server_windbg", "tests", "fake_cdb.py"
+)
+
+FILTERS = [
+    ("none", {}),
+    ("grep", {"grep": r"7777"}),
+    ("grep + head 10", {"grep": r"7$", "head": 10}),
+    ("head 100", {"head": 100}),
+    ("tail 100", {"tail": 100}),
+    ("fields + max 64KB", {"fields": [2], "max_bytes": 64 * 1024}),
+]
+
+
+def make_fake_cdb(directory):
+    """Executable wrapper that launches the scripted cdb stand-in"""
+    script = os.path.abspath(FAKE_CDB_SCRIPT)
+    if os.name == "nt":
+        path = os.path.join(directory, "fake_cdb.cmd")
+        with open(path, "w") as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\r\n')
+    else:
+        path = os.path.join(directory, "fake_cdb")
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+async def run_once(session, dump_path, command, params):
+    streamed = 0
+
+    async def sink(lines):
+        nonlocal streamed
+        streamed += sum(len(line) + 1 for line in lines)
+
+    output_filter = OutputFilter(**params) if params else None
+    start = time.perf_counter()
+    with output_sink(sink):
+        output, _ = await server.run_streaming_command(session, command, output_filter)
+    text = server.format_command_output(dump_path, command, output, output_filter=output_filter)
+    elapsed = time.perf_counter() - start
+    return elapsed, len(output), streamed, len(text.encode("utf-8"))
+
+
+async def run(lines, repeat):
+    with tempfile.TemporaryDirectory() as directory:
+        cdb_path = make_fake_cdb(directory)
+        dump_path = os.path.join(directory, "fake.dmp")
+        with open(dump_path, "wb") as f:
+            f.write(b"MDMP")
+
+        session = await server.get_or_create_session(dump_path, cdb_path, timeout=120)
+        command = f"lines {lines}"
+        try:
+            print(f"{lines} lines of output, best of {repeat}")
+            print(f"{'filter':<20} {'time ms':>9} {'lines kept':>11} {'streamed KB':>12} {'result KB':>10}")
+            for name, params in FILTERS:
+                best = None
+                for _ in range(repeat):
+                    result = await run_once(session, dump_path, command, params)
+                    best = result if best is None or result[0] < best[0] else best
+                elapsed, kept, streamed, result_bytes = best
+                print(f"{name:<20} {elapsed * 1000:>9.1f} {kept:>11} "
+                      f"{streamed / 1024:>12.1f} {result_bytes / 1024:>10.1f}")
+            # Let cdb finish the output skipped by the last filter before quitting
+            await session.send_command(".echo done")
+        finally:
+            await server.shutdown_sessions()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark server-side output filters")
+    parser.add_argument("--lines", type=int, default=500000, help="Output lines per command")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per filter (best is reported)")
+    args = parser.parse_args()
+    asyncio.run(run(args.lines, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
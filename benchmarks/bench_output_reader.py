@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for the cdb output reader.
+
+Compares the previous line-by-line reader (text-mode pipe, lock and regex per
+line) with the chunked MarkerOutputSplitter used by CDBSession._read_output.
+Synthetic cdb-like output of several sizes is pushed through an OS pipe by a
+writer thread, exactly as cdb.exe would produce it.
+
+Usage:
+    python benchmarks/bench_output_reader.py [--sizes 1 8 32] [--repeat 3]
+"""
+
+import argparse
+import locale
+import os
+import re
+import threading
+import time
+
+from mcp_server_windbg.cdb_session import MarkerOutputSplitter, READ_CHUNK_SIZE
+
+COMMAND_MARKER_PATTERN = re.compile(r"COMMAND_COMPLETED_MARKER")
+
+LINE = b"00007ff8`1c2a0000 00007ff8`1c4b5000   ntdll      (pdb symbols)          c:\\symbols\\ntdll.pdb\\ABCDEF\\ntdll.pdb\n"
+
+
+def make_payload(size_mb):
+    """Synthetic output of roughly size_mb megabytes followed by a marker line"""
+    count = max(1, int(size_mb * 1024 * 1024 / len(LINE)))
+    return LINE * count + b"0:000> COMMAND_COMPLETED_MARKER\n", count
+
+
+def legacy_reader(fd):
+    """The reader CDBSession used before: per-line lock, append and regex"""
+    lock = threading.Lock()
+    output_lines = []
+    buffer = []
+    with open(fd, "r", encoding=locale.getpreferredencoding(False), buffering=1) as stream:
+        for line in stream:
+            line = line.rstrip()
+            with lock:
+                buffer.append(line)
+                if COMMAND_MARKER_PATTERN.search(line):
+                    if buffer and COMMAND_MARKER_PATTERN.search(buffer[-1]):
+                        buffer.pop()
+                    output_lines = buffer
+                    buffer = []
+    return output_lines
+
+
+def bulk_reader(fd):
+    """The chunked reader: os.read into a bytearray, decode once per command"""
+    lock = threading.Lock()
+    output_lines = []
+    splitter = MarkerOutputSplitter(locale.getpreferredencoding(False))
+    try:
+        while True:
+            chunk = os.read(fd, READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            for _, lines in splitter.feed(chunk):
+                with lock:
+                    output_lines = lines
+    finally:
+        os.close(fd)
+    return output_lines
+
+
+def time_reader(reader, payload):
+    read_fd, write_fd = os.pipe()
+
+    def writer():
+        with open(write_fd, "wb", buffering=0) as stream:
+            stream.write(payload)
+
+    thread = threading.Thread(target=writer)
+    start = time.perf_counter()
+    thread.start()
+    lines = reader(read_fd)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    return elapsed, lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cdb output reader")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 8, 32], help="Output sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per size (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{'size':>8} {'lines':>9} {'legacy MB/s':>12} {'bulk MB/s':>12} {'speedup':>8}")
+    for size_mb in args.sizes:
+        payload, count = make_payload(size_mb)
+        results = {}
+        for name, reader in (("legacy", legacy_reader), ("bulk", bulk_reader)):
+            best = None
+            for _ in range(args.repeat):
+                elapsed, lines = time_reader(reader, payload)
+                assert len(lines) == count, (name, len(lines), count)
+                best = elapsed if best is None else min(best, elapsed)
+            results[name] = best
+        mb = len(payload) / (1024 * 1024)
+        print(f"{size_mb:>6.1f}MB {count:>9} {mb / results['legacy']:>12.1f} "
+              f"{mb / results['bulk']:>12.1f} {results['legacy'] / results['bulk']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Throughput and memory of the structured output parsers.
+
+Generates large synthetic outputs of `lm`, `~`, `kb` and `!analyze -v` and
+feeds them to the parsers in pipe-sized chunks, as run_windbg_cmd does
+with structured=true. For each parser it reports MB/s and records/s of
+parsing, the time to serialize the records to JSON, the memory held by
+the records including their values, and the size of one record object
+compared with a dict holding the same fields.
+
+Usage:
+    python benchmarks/bench_parsers.py [--records 100000] [--repeat 3]
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+import tracemalloc
+
+from mcp_server_windbg.parsers import parser_for
+
+# Lines per chunk; about what one read of the cdb pipe delivers
+CHUNK_LINES = 2000
+
+
+def lm_output(count):
+    yield "start             end                 module name"
+    for i in range(count):
+        base = 0x7FF600000000 + i * 0x100000
+        yield (f"{base >> 32:08x}`{base & 0xFFFFFFFF:08x} {(base + 0x27000) >> 32:08x}`"
+               f"{(base + 0x27000) & 0xFFFFFFFF:08x}   module{i:<6} (pdb symbols)          "
+               f"c:\\symbols\\module{i}.pdb\\{i:032X}1\\module{i}.pdb")
+
+
+def thread_output(count):
+    for i in range(count):
+        marker = "." if i == 0 else " "
+        yield f"{marker} {i:3d}  Id: 1b90.{0x1000 + i:x} Suspend: 1 Teb: 000000c4`{0x5E6F2000 + i * 0x2000:08x} Unfrozen"
+
+
+def stack_output(count):
+    yield " # Child-SP          RetAddr               : Args to Child                                                           : Call Site"
+    for i in range(count):
+        sp = 0xC45E8FF000 + i * 0x40
+        yield (f"{i & 0xFF:02x} {sp >> 32:08x}`{sp & 0xFFFFFFFF:08x} 00007ff6`a000{i & 0xFFFF:04x}     : "
+               f"00000000`00000001 00000000`00000000 00000000`00000000 00000000`00000000 : "
+               f"DemoCrash{i % 7}!Namespace::Class{i % 13}::Method{i % 31}+0x{i & 0xFFF:x}")
+
+
+def analyze_output(count):
+    yield "*" * 79
+    for i in range(count):
+        yield f"KEY_{i}:  value {i}"
+        if i % 10 == 0:
+            yield f"    continued line of entry {i}"
+        yield ""
+
+
+OUTPUTS = [
+    ("lm", lm_output),
+    ("~", thread_output),
+    ("kb", stack_output),
+    ("!analyze -v", analyze_output),
+]
+
+
+def parse_chunked(command, lines):
+    parser = parser_for(command)
+    records = []
+    for start in range(0, len(lines), CHUNK_LINES):
+        records.extend(parser.feed(lines[start:start + CHUNK_LINES]))
+    records.extend(parser.finish())
+    return records
+
+
+def held_bytes(build):
+    """Memory still allocated after build() returns, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the structured output parsers")
+    parser.add_argument("--records", type=int, default=100000, help="Records per synthetic output")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per output (best is reported)")
+    args = parser.parse_args()
+
+    print(f"{args.records} records per output, best of {args.repeat}")
+    print(f"{'command':<12} {'MB':>6} {'MB/s':>8} {'records/s':>11} {'json ms':>8} "
+          f"{'B/record':>9} {'object':>7} {'dict':>5}")
+    for command, generate in OUTPUTS:
+        lines = list(generate(args.records))
+        size_mb = sum(len(line) + 1 for line in lines) / (1024 * 1024)
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            records = parse_chunked(command, lines)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None or elapsed < best else best
+
+        start = time.perf_counter()
+        dicts = [record.to_dict() for record in records]
+        json.dumps(dicts)
+        serialize = time.perf_counter() - start
+
+        del records, dicts
+        record_bytes, records = held_bytes(lambda: parse_chunked(command, lines))
+        sample = records[0]
+        as_dict = {name: getattr(sample, name) for name in sample.__slots__}
+        print(f"{command:<12} {size_mb:>6.1f} {size_mb / best:>8.1f} {len(records) / best:>11.0f} "
+              f"{serialize * 1000:>8.1f} {record_bytes / len(records):>9.0f} "
+              f"{sys.getsizeof(sample):>7} {sys.getsizeof(as_dict):>5}")
+        del records
+
+
+if __name__ == "__main__":
+    main()
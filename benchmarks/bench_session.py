@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Session layer benchmarks that run anywhere, without the Windows debugging tools.
+
+Drives AsyncCDBSession against the scripted cdb stand-in used by the tests
+(src/mcp_server_windbg/tests/fake_cdb.py). Its environment variables give
+it the dump load time and per-command latency of a real debugger. Measures:
+
+- startup: time from spawning cdb to the first prompt
+- round trip: latency of a small command (`version`)
+- throughput: MB/s reading large outputs (`bytes N`)
+- scaling: commands per second with several sessions running at once
+- replicas: read-only commands per second on one dump with read replicas
+
+Results can be saved as JSON and compared against an earlier run; metrics
+that got worse by more than --threshold make the script exit with status 1.
+
+Usage:
+    python benchmarks/bench_session.py [--output results.json] [--baseline old.json]
+    python benchmarks/bench_session.py --startup-delay 2 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import stat
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession
+from mcp_server_windbg.result_cache import CachedSession
+from mcp_server_windbg.session_pool import SessionPool
+
+FAKE_CDB_SCRIPT = os.path.join(
+    os.path.dirname(__file__), "..", "src", "mcp_server_windbg", "tests", "fake_cdb.py"
+)
+
+MB = 1024 * 1024
+
+
+def make_fake_cdb(directory):
+    """Executable wrapper that launches the scripted cdb stand-in"""
+    script = os.path.abspath(FAKE_CDB_SCRIPT)
+    if os.name == "nt":
+        path = os.path.join(directory, "fake_cdb.cmd")
+        with open(path, "w") as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\r\n')
+    else:
+        path = os.path.join(directory, "fake_cdb")
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def metric(name, value, unit, better="lower"):
+    return {"name": name, "value": round(value, 3), "unit": unit, "better": better}
+
+
+async def bench_startup(open_session, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        session = await open_session()
+        times.append(time.perf_counter() - start)
+        await session.shutdown()
+    return [
+        metric("startup_median", statistics.median(times) * 1000, "ms"),
+        metric("startup_max", max(times) * 1000, "ms"),
+    ]
+
+
+async def bench_round_trip(session, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await session.send_command("version")
+        times.append(time.perf_counter() - start)
+    return [
+        metric("round_trip_p50", percentile(times, 0.5) * 1000, "ms"),
+        metric("round_trip_p95", percentile(times, 0.95) * 1000, "ms"),
+        metric("round_trip_p99", percentile(times, 0.99) * 1000, "ms"),
+    ]
+
+
+async def bench_throughput(session, sizes_mb, repeat):
+    results = []
+    for size in sizes_mb:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            output = await session.send_command(f"bytes {int(size * MB)}")
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        assert len(output) > 0
+        results.append(metric(f"throughput_{size:g}mb", size / best, "MB/s", "higher"))
+    return results
+
+
+async def bench_scaling(open_session, session_counts, commands, command):
+    results = []
+    for count in session_counts:
+        sessions = await asyncio.gather(*(open_session() for _ in range(count)))
+        try:
+            async def drive(session):
+                for _ in range(commands):
+                    await session.send_command(command)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(drive(session) for session in sessions))
+            elapsed = time.perf_counter() - start
+        finally:
+            await asyncio.gather(*(session.shutdown() for session in sessions))
+        results.append(metric(f"scaling_{count}_sessions", count * commands / elapsed, "commands/s", "higher"))
+    return results
+
+
+async def bench_replicas(open_session, replica_counts, clients, commands, size):
+    results = []
+    for count in replica_counts:
+        pool = SessionPool(max_sessions=count + 1, max_replicas=count)
+        session = CachedSession("fake.dmp", pool.track_starts("fake.dmp", open_session),
+                                replicas=pool.replica_set(open_session))
+        pool.add("fake.dmp", session)
+        try:
+            await session.send_command("version")
+            # Replicas start while the session's cdb is busy; wait until all are up
+            while session.replicas is not None and len(session.replicas) < count:
+                busy = asyncio.create_task(session.send_command("version"))
+                session.replicas.grow()
+                await asyncio.sleep(0.05)
+                await busy
+
+            async def drive(client):
+                for n in range(commands):
+                    # Distinct sizes, so identical commands in flight are not collapsed
+                    await session.send_command(f"bytes {size + client * commands + n}")
+
+            start = time.perf_counter()
+            await asyncio.gather(*(drive(client) for client in range(clients)))
+            elapsed = time.perf_counter() - start
+        finally:
+            await pool.close()
+        results.append(metric(f"replicas_{count}", clients * commands / elapsed, "commands/s", "higher"))
+    return results
+
+
+async def run(args):
+    # The stand-in reads its emulated timings from the environment it inherits
+    os.environ["FAKE_CDB_STARTUP_DELAY"] = str(args.startup_delay)
+    os.environ["FAKE_CDB_LATENCY"] = str(args.latency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cdb_path = make_fake_cdb(directory)
+        dump_path = os.path.join(directory, "fake.dmp")
+        with open(dump_path, "wb") as f:
+            f.write(b"MDMP")
+
+        def open_session():
+            return AsyncCDBSession.create(dump_path=dump_path, cdb_path=cdb_path, timeout=args.timeout)
+
+        results = await bench_startup(open_session, args.startup_runs)
+        async with await open_session() as session:
+            results += await bench_round_trip(session, args.round_trips)
+            results += await bench_throughput(session, args.sizes, args.repeat)
+        results += await bench_scaling(
+            open_session, args.sessions, args.scale_commands, f"bytes {args.scale_bytes}"
+        )
+        results += await bench_replicas(
+            open_session, args.replicas, args.replica_clients, args.scale_commands, args.scale_bytes
+        )
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print the change of each metric against a baseline; returns the regressed names"""
+    previous = {entry["name"]: entry for entry in baseline["results"]}
+    regressed = []
+    print(f"\n{'metric':<24} {'baseline':>12} {'current':>12} {'change':>8}")
+    for entry in results:
+        old = previous.get(entry["name"])
+        if old is None or not old["value"]:
+            continue
+        change = (entry["value"] - old["value"]) / old["value"]
+        worse = -change if entry["better"] == "higher" else change
+        flag = "  REGRESSION" if worse > threshold else ""
+        if flag:
+            regressed.append(entry["name"])
+        print(f"{entry['name']:<24} {old['value']:>12.3f} {entry['value']:>12.3f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the cdb session layer with the scripted cdb stand-in")
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="Emulated dump load time in seconds")
+    parser.add_argument("--latency", type=float, default=0.0, help="Emulated seconds per command")
+    parser.add_argument("--startup-runs", type=int, default=5, help="Sessions started for the startup measurement")
+    parser.add_argument("--round-trips", type=int, default=200, help="Commands for the round-trip measurement")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 8, 32], help="Output sizes in MB")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per output size (best is reported)")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8], help="Concurrent session counts")
+    parser.add_argument("--scale-commands", type=int, default=50, help="Commands per session when scaling")
+    parser.add_argument("--scale-bytes", type=int, default=64 * 1024, help="Output bytes per command when scaling")
+    parser.add_argument("--replicas", type=int, nargs="+", default=[0, 1, 3], help="Read replica counts")
+    parser.add_argument("--replica-clients", type=int, default=4, help="Concurrent clients of the replicated dump")
+    parser.add_argument("--timeout", type=int, default=120, help="Command timeout in seconds")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against results saved earlier with --output")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Relative change counted as a regression")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    print(f"{'metric':<24} {'value':>12} unit")
+    for entry in results:
+        print(f"{entry['name']:<24} {entry['value']:>12.3f} {entry['unit']}")
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {key: value for key, value in vars(args).items() if key not in ("output", "baseline")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressed = compare(results, json.load(f), args.threshold)
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+SSE broadcast latency for fast clients with and without slow clients attached.
+
+Starts an SSEServer on a local port, connects --fast clients that read every
+event and --slow clients that connect and never read, then broadcasts
+--events timestamped events of --size bytes. Reports the delivery latency
+seen by the fast clients and the per-client queue statistics.
+
+Usage:
+    python benchmarks/bench_sse_backpressure.py [--fast 20] [--slow 5] [--events 500]
+        [--size 16384] [--overflow coalesce] [--max-queue 256]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+
+import aiohttp
+from aiohttp import web
+
+from mcp_server_windbg.sse_server import OVERFLOW_POLICIES, SSEServer
+
+
+async def read_events(session, url, count, latencies):
+    async with session.get(url) as response:
+        seen = 0
+        while seen < count:
+            line = await response.content.readline()
+            if not line.startswith(b"data: "):
+                continue
+            data = json.loads(line[6:])
+            if "sent" in data:
+                latencies.append(time.perf_counter() - data["sent"])
+                seen += 1
+
+
+async def run(fast, slow, events, size, overflow, max_queue):
+    app = web.Application()
+    sse = SSEServer(app, mcp_server=None, max_queue=max_queue, overflow=overflow)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    url = f"http://127.0.0.1:{port}/events"
+
+    latencies = []
+    async with aiohttp.ClientSession() as session:
+        slow_responses = [await session.get(url) for _ in range(slow)]
+        readers = [asyncio.create_task(read_events(session, url, events, latencies)) for _ in range(fast)]
+        while len(sse.clients) < fast + slow:
+            await asyncio.sleep(0.01)
+
+        blob = "x" * size
+        start = time.perf_counter()
+        for n in range(events):
+            await sse.broadcast_event({"n": n, "sent": time.perf_counter(), "blob": blob})
+            await asyncio.sleep(0)
+        await asyncio.gather(*readers)
+        elapsed = time.perf_counter() - start
+        stats = sse.stats()
+        for response in slow_responses:
+            response.close()
+
+    await sse.close(timeout=0.1)
+    await runner.cleanup()
+
+    latencies.sort()
+    print(f"{fast} fast + {slow} slow clients, {events} events of {size} bytes, overflow={overflow}")
+    print(f"  total time:          {elapsed * 1000:9.1f} ms")
+    print(f"  fast latency p50:    {statistics.median(latencies) * 1000:9.2f} ms")
+    print(f"  fast latency p99:    {latencies[int(len(latencies) * 0.99) - 1] * 1000:9.2f} ms")
+    print(f"  slow disconnects:    {stats['slow_disconnects']}")
+    depths = [c["queue_depth"] for c in stats["clients"].values()]
+    print(f"  max queue depth now: {max(depths, default=0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SSE broadcasts with slow consumers")
+    parser.add_argument("--fast", type=int, default=20, help="Clients that read every event")
+    parser.add_argument("--slow", type=int, default=5, help="Clients that never read")
+    parser.add_argument("--events", type=int, default=500, help="Number of broadcast events")
+    parser.add_argument("--size", type=int, default=16384, help="Payload size of each event in bytes")
+    parser.add_argument("--overflow", choices=OVERFLOW_POLICIES, default="coalesce", help="Overflow policy")
+    parser.add_argument("--max-queue", type=int, default=256, help="Per-client queue length")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    for slow in sorted({0, args.slow}):
+        asyncio.run(run(args.fast, slow, args.events, args.size, args.overflow, args.max_queue))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Unique-stack survey of a dump with many threads.
+
+Compares the two ways of collecting every thread's stack from the scripted
+cdb stand-in (src/mcp_server_windbg/tests/fake_cdb.py): switching to each
+thread and running `kb` (two commands per thread), and the single `~*kb`
+round trip used by unique_windbg_stacks. With a per-command latency like a
+real debugger's, the per-thread walk pays it once per command. Also reports
+the time to parse and group the `~*kb` output and the size of the summary
+against the raw output.
+
+Usage:
+    python benchmarks/bench_unique_stacks.py [--threads 500] [--latency 0.02]
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from bench_session import make_fake_cdb
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession
+from mcp_server_windbg.parsers import ThreadStacksParser
+from mcp_server_windbg.unique_stacks import StackGrouper, format_unique_stacks
+
+HEADER = " # Child-SP          RetAddr               : Args to Child                                                           : Call Site"
+# Stacks the synthetic threads are parked in, by share of threads
+STACKS = [
+    (0.80, ["ntdll!NtWaitForWorkViaWorkerFactory+0x14", "ntdll!TppWorkerThread+0x2f2",
+            "KERNEL32!BaseThreadInitThunk+0x1d", "ntdll!RtlUserThreadStart+0x28"]),
+    (0.15, ["ntdll!NtWaitForSingleObject+0x14", "KERNELBASE!WaitForSingleObjectEx+0x8e",
+            "DemoCrash1!Queue::Pop+0x61", "DemoCrash1!Worker::Run+0x40",
+            "KERNEL32!BaseThreadInitThunk+0x1d", "ntdll!RtlUserThreadStart+0x28"]),
+    (0.05, ["ntdll!NtWaitForAlertByThreadId+0x14", "ntdll!RtlpWaitOnCriticalSection+0x14c",
+            "DemoCrash1!Cache::Lookup+0x33", "DemoCrash1!Worker::Run+0x7a",
+            "KERNEL32!BaseThreadInitThunk+0x1d", "ntdll!RtlUserThreadStart+0x28"]),
+]
+
+
+def stack_for(number, threads):
+    position = number / threads
+    for share, frames in STACKS:
+        if position < share:
+            return frames
+        position -= share
+    return STACKS[-1][1]
+
+
+def frame_lines(frames):
+    return [
+        f"{i:02x} 000000c4`{0x5E8FF000 + i * 0x40:08x} 00007ffb`{0x1A2B3C00 + i:08x}     : "
+        f"00000000`00000000 00000000`00000000 00000000`00000000 00000000`00000000 : {call_site}"
+        for i, call_site in enumerate(frames)
+    ]
+
+
+def thread_stacks_output(threads):
+    lines = []
+    for number in range(threads):
+        marker = "." if number == 0 else " "
+        lines.append("")
+        lines.append(f"{marker}{number:3d}  Id: 1b90.{0x1000 + number:x} Suspend: 1 Teb: 000000c4`5e6f2000 Unfrozen")
+        lines.append(HEADER)
+        lines.extend(frame_lines(stack_for(number, threads)))
+    return lines
+
+
+async def per_thread(open_session, threads):
+    session = await open_session()
+    try:
+        start = time.perf_counter()
+        for number in range(threads):
+            await session.send_command(f"~{number}s")
+            await session.send_command("kb")
+        return time.perf_counter() - start, threads * 2
+    finally:
+        await session.shutdown()
+
+
+async def single_round_trip(open_session):
+    session = await open_session()
+    parser, grouper = ThreadStacksParser(), StackGrouper()
+
+    async def on_output(lines):
+        for stack in parser.feed(lines):
+            grouper.add(stack)
+    try:
+        start = time.perf_counter()
+        output = await session.send_command("~*kb", on_output=on_output)
+        for stack in parser.finish():
+            grouper.add(stack)
+        return time.perf_counter() - start, output, grouper
+    finally:
+        await session.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark unique-stack collection over many threads")
+    parser.add_argument("--threads", type=int, default=500, help="Threads in the synthetic dump")
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds cdb takes to answer each command")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["FAKE_CDB_LATENCY"] = str(args.latency)
+        cdb_path = make_fake_cdb(directory)
+        dump_path = os.path.join(directory, "threads.dmp")
+        open(dump_path, "wb").close()
+        lines = thread_stacks_output(args.threads)
+        with open(dump_path + ".threads", "w") as f:
+            f.write("\n".join(lines) + "\n")
+        with open(dump_path + ".stack", "w") as f:
+            f.write("\n".join([HEADER] + frame_lines(STACKS[0][1])) + "\n")
+
+        async def open_session():
+            return await AsyncCDBSession.create(dump_path=dump_path, cdb_path=cdb_path, timeout=600)
+
+        walk, commands = asyncio.run(per_thread(open_session, args.threads))
+        single, output, grouper = asyncio.run(single_round_trip(open_session))
+
+    start = time.perf_counter()
+    grouper = StackGrouper()
+    stacks = ThreadStacksParser()
+    for stack in stacks.parse(lines):
+        grouper.add(stack)
+    parse = time.perf_counter() - start
+    summary = format_unique_stacks("~*kb", grouper)
+    raw_bytes = sum(len(line) + 1 for line in output)
+
+    print(f"{args.threads} threads, {args.latency * 1000:.0f} ms per command")
+    print(f"per-thread ~Ns + kb:   {commands:>5} round trips {walk * 1000:>9.1f} ms")
+    print(f"single ~*kb:           {1:>5} round trip  {single * 1000:>9.1f} ms")
+    print(f"parse and group:       {parse * 1000:>9.1f} ms ({len(grouper.groups())} unique stacks)")
+    print(f"summary:               {len(summary):>9} bytes (raw output {raw_bytes} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+"""
+Load generator for the remote (WebSocket / SSE / upload) servers.
+
+Starts `mcp-server-windbg --mode remote` with the scripted cdb stand-in from
+the tests as its debugger, then runs N concurrent virtual analysts against
+it. Each analyst uploads a dump and opens it. After that it picks operations
+at random by the weights of a profile, pausing for the think time between
+two operations:
+
+    upload        POST a synthetic dump to the upload server
+    open          open_windbg_dump on one of its uploaded dumps
+    command       run_windbg_cmd with one of the profile's commands
+    list_dumps    list_windbg_dumps on the upload directory
+    list_tools    list the server's tools
+
+Transports are measured one after the other, each against its own server
+process. For each transport and operation the script reports p50/p95/p99
+latency, the error rate and the throughput. Tool results starting with
+"Error:" count as errors. Use --ws-url/--sse-url and --upload-url to load
+an already running server instead.
+
+The client side follows examples/websocket_client.py. WebSocket messages are
+{"id", "type": "call_tool", "name", "arguments"}; SSE requests are JSON-RPC
+posts to /request whose responses arrive on the client's /events stream.
+
+Usage:
+    python benchmarks/load_remote.py --clients 20 --duration 30
+    python benchmarks/load_remote.py --transports sse --mix command=20,upload=1 --latency 0.05
+    python benchmarks/load_remote.py --profile profile.json --output load.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import stat
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import aiohttp
+import websockets
+
+SOURCE_DIR = os.path.join(os.path.dirname(__file__), "..", "src")
+FAKE_CDB_SCRIPT = os.path.join(SOURCE_DIR, "mcp_server_windbg", "tests", "fake_cdb.py")
+
+OPERATIONS = ("upload", "open", "command", "list_dumps", "list_tools")
+
+# Weights of the operations and the commands picked for "command"
+DEFAULT_PROFILE = {
+    "mix": {"upload": 1, "open": 2, "command": 12, "list_dumps": 1, "list_tools": 1},
+    "commands": ["version", "kb", "lines 200", "bytes 262144", "sleep 0.05"],
+    "upload_bytes": 256 * 1024,
+}
+
+
+def make_fake_cdb(directory):
+    """Executable wrapper that launches the scripted cdb stand-in"""
+    script = os.path.abspath(FAKE_CDB_SCRIPT)
+    if os.name == "nt":
+        path = os.path.join(directory, "fake_cdb.cmd")
+        with open(path, "w") as f:
+            f.write(f'@"{sys.executable}" "{script}" %*\r\n')
+    else:
+        path = os.path.join(directory, "fake_cdb")
+        with open(path, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{script}" "$@"\n')
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+    return path
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+def tool_error(content):
+    """Error message of a tool result, or None"""
+    for item in content or []:
+        text = item.get("text", "")
+        if text.startswith("Error:") or text.startswith("Unknown tool:"):
+            return text.splitlines()[0]
+    return None
+
+
+class WebSocketClient:
+    """One analyst's WebSocket connection"""
+
+    def __init__(self, url):
+        self.url = url
+        self.websocket = None
+        self.ids = itertools.count(1)
+
+    async def connect(self):
+        self.websocket = await websockets.connect(self.url, max_size=None)
+
+    async def close(self):
+        if self.websocket:
+            await self.websocket.close()
+
+    async def request(self, message):
+        request_id = next(self.ids)
+        await self.websocket.send(json.dumps(dict(message, id=request_id)))
+        while True:
+            response = json.loads(await self.websocket.recv())
+            # Output chunks of the running command precede its result
+            if response.get("id") == request_id and response.get("type") != "chunk":
+                return response
+
+    async def list_tools(self):
+        response = await self.request({"type": "list_tools"})
+        if response.get("type") != "tools":
+            raise RuntimeError(response.get("error", "unexpected response"))
+
+    async def call_tool(self, name, arguments):
+        response = await self.request({"type": "call_tool", "name": name, "arguments": arguments})
+        if response.get("type") != "result":
+            raise RuntimeError(response.get("error", "unexpected response"))
+        return tool_error(response["result"])
+
+
+class SSEClient:
+    """One analyst's SSE event stream and request posts"""
+
+    def __init__(self, url, http):
+        self.url = url.rstrip("/")
+        self.http = http
+        self.client_id = None
+        self.ids = itertools.count(1)
+        self.pending = {}
+        self.reader = None
+        self.stream = None
+
+    async def connect(self):
+        self.stream = await self.http.get(f"{self.url}/events", timeout=aiohttp.ClientTimeout(total=None))
+        connected = asyncio.get_running_loop().create_future()
+        self.reader = asyncio.create_task(self._read(connected))
+        self.client_id = await asyncio.wait_for(connected, 10)
+
+    async def _read(self, connected):
+        try:
+            async for line in self.stream.content:
+                if not line.startswith(b"data: "):
+                    continue
+                event = json.loads(line[len(b"data: "):])
+                if event.get("type") == "connection":
+                    connected.set_result(event["client_id"])
+                elif "id" in event and "method" not in event:
+                    future = self.pending.pop(event["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(event)
+        finally:
+            for future in self.pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("event stream closed"))
+
+    async def close(self):
+        if self.reader:
+            self.reader.cancel()
+        if self.stream:
+            self.stream.close()
+
+    async def request(self, method, params):
+        request_id = next(self.ids)
+        future = self.pending[request_id] = asyncio.get_running_loop().create_future()
+        body = {"jsonrpc": "2.0", "method": method, "params": params, "id": request_id}
+        async with self.http.post(f"{self.url}/request", json=body, headers={"X-Client-Id": self.client_id}) as response:
+            if response.status != 200:
+                self.pending.pop(request_id, None)
+                raise RuntimeError(f"HTTP {response.status}")
+        response = await future
+        if "error" in response:
+            raise RuntimeError(response["error"].get("message", "error"))
+        return response["result"]
+
+    async def list_tools(self):
+        await self.request("list_tools", {})
+
+    async def call_tool(self, name, arguments):
+        result = await self.request("call_tool", {"name": name, "arguments": arguments})
+        return tool_error(result.get("content"))
+
+
+class Analyst:
+    """A virtual client running operations picked from the profile"""
+
+    def __init__(self, number, client, http, upload_url, upload_dir, profile, stats, rng):
+        self.number = number
+        self.client = client
+        self.http = http
+        self.upload_url = upload_url
+        self.upload_dir = upload_dir
+        self.profile = profile
+        self.stats = stats
+        self.rng = rng
+        self.dumps = []
+        self.uploads = 0
+
+    async def upload(self):
+        self.uploads += 1
+        # Distinct content, so dumps are not answered from the result cache of another analyst
+        header = f"MDMP analyst {self.number} upload {self.uploads}\n".encode()
+        data = aiohttp.FormData()
+        data.add_field("file", header + b"\0" * self.profile["upload_bytes"], filename=f"load-{self.number}.dmp")
+        async with self.http.post(self.upload_url, data=data) as response:
+            result = await response.json()
+        if not result.get("success"):
+            return result.get("error", f"HTTP {response.status}")
+        self.dumps.append(result["file_path"])
+        return None
+
+    async def open(self):
+        return await self.client.call_tool("open_windbg_dump", {
+            "dump_path": self.rng.choice(self.dumps),
+            "include_stack_trace": True,
+            "include_modules": False,
+            "include_threads": False,
+        })
+
+    async def command(self):
+        command = self.rng.choice(self.profile["commands"])
+        return await self.client.call_tool("run_windbg_cmd", {"dump_path": self.rng.choice(self.dumps), "command": command})
+
+    async def list_dumps(self):
+        return await self.client.call_tool("list_windbg_dumps", {"directory_path": self.upload_dir})
+
+    async def list_tools(self):
+        await self.client.list_tools()
+
+    async def timed(self, operation):
+        start = time.perf_counter()
+        try:
+            error = await getattr(self, operation)()
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        self.stats.record(operation, time.perf_counter() - start, error)
+        return error
+
+    async def run(self, deadline, think):
+        # Every analyst starts with a dump of its own
+        if await self.timed("upload") is None:
+            await self.timed("open")
+        operations = [name for name in OPERATIONS if self.profile["mix"].get(name)]
+        weights = [self.profile["mix"][name] for name in operations]
+        while time.monotonic() < deadline:
+            operation = self.rng.choices(operations, weights)[0]
+            if operation in ("open", "command") and not self.dumps:
+                operation = "upload"
+            await self.timed(operation)
+            if think:
+                await asyncio.sleep(self.rng.uniform(0, 2 * think))
+
+
+class Stats:
+    """Latencies and errors per operation"""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.samples = {}
+
+    def record(self, operation, elapsed, error):
+        self.latencies[operation].append(elapsed)
+        if error is not None:
+            self.errors[operation] += 1
+            self.samples.setdefault(operation, error)
+
+    def summary(self, elapsed):
+        rows = {}
+        for operation in OPERATIONS + ("total",):
+            if operation == "total":
+                latencies = sum(self.latencies.values(), [])
+                errors = sum(self.errors.values())
+            else:
+                latencies = self.latencies.get(operation, [])
+                errors = self.errors.get(operation, 0)
+            if not latencies:
+                continue
+            rows[operation] = {
+                "requests": len(latencies),
+                "errors": errors,
+                "error_rate": round(errors / len(latencies), 4),
+                "throughput": round(len(latencies) / elapsed, 2),
+                "p50_ms": round(percentile(latencies, 0.5) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            }
+        return rows
+
+
+async def wait_for_server(http, health_url, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}")
+        try:
+            async with http.get(health_url) as response:
+                if response.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server did not answer {health_url} within {timeout}s")
+
+
+def start_server(transport, directory, args):
+    """Start a remote server with the fake cdb; returns the process and its URLs"""
+    ports = {name: free_port() for name in ("ws", "upload", "sse")}
+    upload_dir = os.path.join(directory, f"uploads-{transport}")
+    command = [
+        sys.executable, "-m", "mcp_server_windbg", "--mode", "remote",
+        "--host", "127.0.0.1", "--port", str(ports["ws"]), "--upload-port", str(ports["upload"]),
+        "--upload-dir", upload_dir, "--cdb-path", make_fake_cdb(directory),
+        "--cache-dir", os.path.join(directory, f"cache-{transport}"),
+        "--max-sessions", str(args.max_sessions), "--replicas", str(args.replicas), "--timeout", str(args.timeout),
+    ]
+    if transport == "sse":
+        command += ["--use-sse", "--sse-port", str(ports["sse"])]
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [os.path.abspath(SOURCE_DIR), env.get("PYTHONPATH")]))
+    env["FAKE_CDB_STARTUP_DELAY"] = str(args.startup_delay)
+    env["FAKE_CDB_LATENCY"] = str(args.latency)
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    urls = {
+        "websocket": f"ws://127.0.0.1:{ports['ws']}",
+        "sse": f"http://127.0.0.1:{ports['sse']}",
+        "upload": f"http://127.0.0.1:{ports['upload']}/upload",
+    }
+    return process, urls, upload_dir
+
+
+async def run_transport(transport, urls, upload_dir, process, args, profile):
+    stats = Stats()
+    limits = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=limits) as http:
+        await wait_for_server(http, urls["upload"].rsplit("/", 1)[0] + "/health", process)
+        clients = []
+        for _ in range(args.clients):
+            client = WebSocketClient(urls["websocket"]) if transport == "websocket" else SSEClient(urls["sse"], http)
+            for attempt in range(50):
+                try:
+                    await client.connect()
+                    break
+                except (OSError, aiohttp.ClientError, asyncio.TimeoutError):
+                    # The WebSocket/SSE port may open shortly after the upload server
+                    await asyncio.sleep(0.2)
+            else:
+                raise RuntimeError(f"Could not connect to the {transport} server")
+            clients.append(client)
+
+        analysts = [
+            Analyst(n, client, http, urls["upload"], upload_dir, profile, stats, random.Random(args.seed + n))
+            for n, client in enumerate(clients)
+        ]
+        start = time.monotonic()
+        try:
+            await asyncio.gather(*(analyst.run(start + args.duration, args.think) for analyst in analysts))
+        finally:
+            elapsed = time.monotonic() - start
+            await asyncio.gather(*(client.close() for client in clients), return_exceptions=True)
+    return stats, elapsed
+
+
+def print_report(transport, stats, elapsed, clients):
+    rows = stats.summary(elapsed)
+    print(f"\n{transport}: {clients} clients for {elapsed:.1f}s")
+    print(f"{'operation':<12} {'requests':>9} {'errors':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for operation, row in rows.items():
+        print(f"{operation:<12} {row['requests']:>9} {row['error_rate']:>8.1%} {row['throughput']:>8.1f} "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+    for operation, sample in stats.samples.items():
+        print(f"  first {operation} error: {sample[:160]}")
+    return rows
+
+
+def load_profile(args):
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    if args.profile:
+        with open(args.profile, encoding="utf-8") as f:
+            custom = json.load(f)
+        profile.update({key: value for key, value in custom.items() if key != "mix"})
+        if "mix" in custom:
+            profile["mix"] = custom["mix"]
+    if args.mix:
+        profile["mix"] = {}
+        for item in args.mix.split(","):
+            name, _, weight = item.partition("=")
+            profile["mix"][name.strip()] = float(weight or 1)
+    if args.commands:
+        profile["commands"] = args.commands
+    unknown = set(profile["mix"]) - set(OPERATIONS)
+    if unknown:
+        raise SystemExit(f"Unknown operations in mix: {', '.join(sorted(unknown))} (known: {', '.join(OPERATIONS)})")
+    return profile
+
+
+async def run(args, profile):
+    report = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for transport in args.transports:
+            external = args.upload_url and (args.ws_url if transport == "websocket" else args.sse_url)
+            if external:
+                process = None
+                urls = {"websocket": args.ws_url, "sse": args.sse_url, "upload": args.upload_url}
+                upload_dir = args.upload_dir
+            else:
+                process, urls, upload_dir = start_server(transport, directory, args)
+            try:
+                stats, elapsed = await run_transport(transport, urls, upload_dir, process, args, profile)
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(10)
+            report[transport] = print_report(transport, stats, elapsed, args.clients)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the remote WebSocket/SSE/upload servers")
+    parser.add_argument("--transports", nargs="+", choices=["websocket", "sse"], default=["websocket", "sse"],
+                        help="Transports to measure, one after the other")
+    parser.add_argument("--clients", type=int, default=10, help="Concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=20, help="Seconds of load per transport")
+    parser.add_argument("--think", type=float, default=0.0, help="Mean pause between a client's operations in seconds")
+    parser.add_argument("--profile", help="JSON file with mix, commands and upload_bytes")
+    parser.add_argument("--mix", help="Operation weights, e.g. upload=1,open=2,command=12,list_dumps=1,list_tools=1")
+    parser.add_argument("--commands", nargs="+", help="Commands picked for run_windbg_cmd")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed of the first client")
+    parser.add_argument("--startup-delay", type=float, default=0.0, help="Emulated dump load time of the fake cdb")
+    parser.add_argument("--latency", type=float, default=0.0, help="Emulated seconds per fake cdb command")
+    parser.add_argument("--max-sessions", type=int, default=4, help="--max-sessions of the started server")
+    parser.add_argument("--replicas", type=int, default=0, help="--replicas of the started server")
+    parser.add_argument("--timeout", type=int, default=30, help="--timeout of the started server")
+    parser.add_argument("--ws-url", help="WebSocket URL of a running server instead of starting one")
+    parser.add_argument("--sse-url", help="SSE base URL of a running server instead of starting one")
+    parser.add_argument("--upload-url", help="Upload URL of the running server")
+    parser.add_argument("--upload-dir", help="Upload directory of the running server (for list_dumps)")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    args = parser.parse_args()
+
+    profile = load_profile(args)
+    report = asyncio.run(run(args, profile))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"parameters": vars(args), "profile": profile, "results": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,24 @@ def main():
     import argparse
     import asyncio
     import os
+    import sys
+
+    from .crash_buckets import DEFAULT_BUCKET_DEPTH
+    from .output_store import DEFAULT_STORE_SIZE_MB
+    from .result_cache import DEFAULT_CACHE_SIZE_MB
+    from .session_pool import (
+        DEFAULT_IDLE_TIMEOUT, DEFAULT_MAX_REPLICAS, DEFAULT_MAX_SESSIONS, DEFAULT_REPLICA_IDLE_TIMEOUT
+    )
+    from .sse_server import (
+        DEFAULT_CLIENT_QUEUE_SIZE, DEFAULT_DISCONNECT_AFTER, DEFAULT_OVERFLOW_POLICY, DEFAULT_SSE_WORKERS,
+        OVERFLOW_POLICIES
+    )
+    from .websocket_server import DEFAULT_MAX_CONCURRENT_REQUESTS
+
+    if sys.argv[1:2] == ["triage"]:
+        # Batch triage of a dump directory lives in the CLI module
+        from .cli import triage_main
+        sys.exit(triage_main(sys.argv[2:]))
 
     parser = argparse.ArgumentParser(
         description="Give a model the ability to analyze Windows crash dumps with WinDBG/CDB"
@@ -15,6 +33,18 @@ def main():
     parser.add_argument("--symbols-path", type=str, help="Custom symbols path")
     parser.add_argument("--timeout", type=int, default=30, help="Command timeout in seconds")
     parser.add_argument("--verbose", action="store_true", help="Enable verbose output")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the persistent command result cache")
+    parser.add_argument("--cache-dir", type=str, help="Custom directory for the command result cache")
+    parser.add_argument("--cache-size-mb", type=int, default=DEFAULT_CACHE_SIZE_MB, help="Maximum size of the command result cache in MB")
+    parser.add_argument("--max-sessions", type=int, default=DEFAULT_MAX_SESSIONS, help="Maximum number of concurrently running cdb processes")
+    parser.add_argument("--session-idle-timeout", type=float, default=DEFAULT_IDLE_TIMEOUT, help="Seconds after which an unused cdb process is stopped (0 disables)")
+    parser.add_argument("--session-memory-limit-mb", type=int, help="Memory above which an idle cdb process is restarted")
+    parser.add_argument("--replicas", type=int, default=DEFAULT_MAX_REPLICAS, help="Maximum number of read replicas per dump for parallel read-only commands (0 disables)")
+    parser.add_argument("--replica-idle-timeout", type=float, default=DEFAULT_REPLICA_IDLE_TIMEOUT, help="Seconds after which an unused read replica is stopped")
+    parser.add_argument("--bucket-depth", type=int, default=DEFAULT_BUCKET_DEPTH, help="Number of stack frames in a crash signature")
+    parser.add_argument("--output-store-mb", type=int, default=DEFAULT_STORE_SIZE_MB, help="Memory for large command outputs read page by page")
+    parser.add_argument("--trace-file", type=str, help="Write per-request trace spans (Chrome trace format) to this file")
+    parser.add_argument("--trace-profile", action="store_true", help="Also sample Python stacks during each traced request")
     
     # 新增参数
     parser.add_argument("--mode", choices=["local", "remote"], default="local",
@@ -25,6 +55,13 @@ def main():
     parser.add_argument("--upload-dir", default="./uploads", help="Directory for uploaded files")
     parser.add_argument("--use-sse", action="store_true", help="Enable SSE server for browser-based client")
     parser.add_argument("--sse-port", type=int, default=8767, help="Port for SSE server")
+    parser.add_argument("--sse-workers", type=int, default=DEFAULT_SSE_WORKERS, help="Number of worker tasks processing SSE requests")
+    parser.add_argument("--sse-client-queue", type=int, default=DEFAULT_CLIENT_QUEUE_SIZE, help="Outbound queue length per SSE client")
+    parser.add_argument("--sse-overflow", choices=OVERFLOW_POLICIES, default=DEFAULT_OVERFLOW_POLICY,
+                        help="What to do when an SSE client's queue is full")
+    parser.add_argument("--sse-disconnect-after", type=float, default=DEFAULT_DISCONNECT_AFTER,
+                        help="Disconnect SSE clients whose oldest queued event is older than this many seconds")
+    parser.add_argument("--max-concurrent-requests", type=int, default=DEFAULT_MAX_CONCURRENT_REQUESTS, help="Maximum number of in-flight requests per WebSocket connection")
 
     args = parser.parse_args()
     
@@ -34,7 +71,19 @@ def main():
             cdb_path=args.cdb_path,
             symbols_path=args.symbols_path,
             timeout=args.timeout,
-            verbose=args.verbose
+            verbose=args.verbose,
+            use_cache=not args.no_cache,
+            cache_dir=args.cache_dir,
+            cache_size_mb=args.cache_size_mb,
+            max_sessions=args.max_sessions,
+            session_idle_timeout=args.session_idle_timeout,
+            session_memory_limit_mb=args.session_memory_limit_mb,
+            max_replicas=args.replicas,
+            replica_idle_timeout=args.replica_idle_timeout,
+            bucket_depth=args.bucket_depth,
+            output_store_mb=args.output_store_mb,
+            trace_file=args.trace_file,
+            trace_profile=args.trace_profile
         ))
     else:
         # 远程模式，启动WebSocket服务器和文件上传服务器
@@ -51,7 +100,24 @@ def main():
             timeout=args.timeout,
             verbose=args.verbose,
             use_sse=args.use_sse,
-            sse_port=args.sse_port
+            sse_port=args.sse_port,
+            sse_workers=args.sse_workers,
+            sse_client_queue=args.sse_client_queue,
+            sse_overflow=args.sse_overflow,
+            sse_disconnect_after=args.sse_disconnect_after,
+            max_concurrent_requests=args.max_concurrent_requests,
+            use_cache=not args.no_cache,
+            cache_dir=args.cache_dir,
+            cache_size_mb=args.cache_size_mb,
+            max_sessions=args.max_sessions,
+            session_idle_timeout=args.session_idle_timeout,
+            session_memory_limit_mb=args.session_memory_limit_mb,
+            max_replicas=args.replicas,
+            replica_idle_timeout=args.replica_idle_timeout,
+            bucket_depth=args.bucket_depth,
+            output_store_mb=args.output_store_mb,
+            trace_file=args.trace_file,
+            trace_profile=args.trace_profile
         ))
 
 
@@ -1,9 +1,22 @@
+import asyncio
+import collections
+import contextlib
+import locale
 import subprocess
 import threading
 import re
 import os
 import platform
-from typing import List, Optional
+import signal
+import time
+import uuid
+from typing import AsyncIterator, Awaitable, Callable, Deque, List, Optional, Set, Tuple
+
+from . import metrics
+from .command_classifier import (
+    CONTEXT_MUTATING, INITIAL_CONTEXT, STATE_MUTATING, DebuggerContext, apply_command, classify
+)
+from .tracing import span, traced
 
 # Regular expression to detect CDB prompts
 PROMPT_REGEX = re.compile(r"^\d+:\d+>\s*$")
@@ -11,6 +24,7 @@ PROMPT_REGEX = re.compile(r"^\d+:\d+>\s*$")
 # Command marker to reliably detect command completion
 COMMAND_MARKER = ".echo COMMAND_COMPLETED_MARKER"
 COMMAND_MARKER_PATTERN = re.compile(r"COMMAND_COMPLETED_MARKER")
+COMMAND_MARKER_BYTES = b"COMMAND_COMPLETED_MARKER"
 
 # Default paths where cdb.exe might be located
 DEFAULT_CDB_PATHS = [
@@ -20,11 +34,207 @@ DEFAULT_CDB_PATHS = [
     r"C:\Program Files\Debugging Tools for Windows (x86)\cdb.exe",
 ]
 
+# Buffer limit for asyncio pipes; cdb can emit very long lines (e.g. dt -r, db)
+ASYNC_STREAM_LIMIT = 1024 * 1024
+
+# Number of bytes requested from the cdb output pipe per read
+READ_CHUNK_SIZE = 256 * 1024
+
+# Seconds allowed for cdb to accept commands again after a timed-out command
+# is interrupted, and between two marker probes while waiting for it
+RESYNC_TIMEOUT = 5.0
+PROBE_INTERVAL = 0.25
+
+# cdb gets its own process group so that Ctrl+Break can be sent to it alone
+CREATION_FLAGS = getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+
 class CDBError(Exception):
     """Custom exception for CDB-related errors"""
     pass
 
+class CDBTimeoutError(CDBError):
+    """
+    A command did not complete in time; carries the output received so far.
+    
+    partial_output is the output of the command that timed out; for a
+    batch, partial_results holds the outputs of the commands that
+    completed before it, in order.
+    """
+    
+    def __init__(
+        self,
+        message: str,
+        partial_output: Optional[List[str]] = None,
+        partial_results: Optional[List[List[str]]] = None
+    ):
+        super().__init__(message)
+        self.partial_output = partial_output or []
+        self.partial_results = partial_results or []
+
+class MarkerOutputSplitter:
+    """
+    Splits raw cdb output into per-command results at completion-marker lines.
+    
+    Output is accumulated as bytes; each feed() only scans the newly arrived
+    bytes for the marker, and a command's output is decoded once, when its
+    marker line is complete. The marker line itself is dropped; whatever
+    follows the marker on that line (see make_marker_command) is reported
+    as the result's token.
+    """
+    
+    def __init__(self, encoding: str, marker: bytes = COMMAND_MARKER_BYTES):
+        self.encoding = encoding
+        self.marker = marker
+        self.buffer = bytearray()
+        # Offset up to which the buffer is known not to contain the marker
+        self._scan_pos = 0
+    
+    def feed(self, data: bytes) -> List[Tuple[str, List[str]]]:
+        """
+        Add a chunk of raw output.
+        
+        Returns:
+            (token, lines) for every command completed by this chunk
+        """
+        self.buffer += data
+        completed = []
+        while True:
+            # Start a little early so a marker split across chunks is still found
+            index = self.buffer.find(self.marker, max(0, self._scan_pos - len(self.marker) + 1))
+            if index < 0:
+                self._scan_pos = len(self.buffer)
+                break
+            line_end = self.buffer.find(b"\n", index + len(self.marker))
+            if line_end < 0:
+                # Marker line not terminated yet; rescan from the marker next time
+                self._scan_pos = index
+                break
+            line_start = self.buffer.rfind(b"\n", 0, index) + 1
+            token = self.buffer[index + len(self.marker):line_end].decode("ascii", errors="replace")
+            completed.append((token.strip().lstrip("_"), self._decode_lines(self.buffer[:line_start])))
+            del self.buffer[:line_end + 1]
+            self._scan_pos = 0
+        return completed
+    
+    def take_partial(self) -> List[str]:
+        """
+        Remove and return the complete output lines of the command still
+        running. They are not repeated in the command's result when its
+        marker arrives, so a streamed command is never held in full.
+        """
+        # Everything before the last newline is a complete line without a
+        # marker: feed() has already consumed every terminated marker line
+        end = self.buffer.rfind(b"\n") + 1
+        if end == 0:
+            return []
+        lines = self._decode_lines(self.buffer[:end])
+        del self.buffer[:end]
+        self._scan_pos = max(0, self._scan_pos - end)
+        return lines
+    
+    def _decode_lines(self, data: bytes) -> List[str]:
+        if not data:
+            return []
+        text = data.decode(self.encoding, errors="replace")
+        # data always ends with a newline, so the last split element is empty
+        return [line.rstrip() for line in text.split("\n")[:-1]]
+
+
+def make_marker_command(token: str = "") -> str:
+    """Marker command whose output line carries the given token"""
+    return f"{COMMAND_MARKER}_{token}" if token else COMMAND_MARKER
+
+
+def new_batch_tokens(count: int) -> List[str]:
+    """Unique per-command marker tokens for one batch"""
+    nonce = uuid.uuid4().hex[:12]
+    return [f"{nonce}_{i}" for i in range(count)]
+
+
+def format_batch(commands: List[str], tokens: List[str]) -> str:
+    """Stdin payload that runs each command followed by its own marker"""
+    return "".join(
+        f"{command}\n{make_marker_command(token)}\n"
+        for command, token in zip(commands, tokens)
+    )
+
+
+def send_break(pid: int) -> bool:
+    """
+    Interrupt the command cdb is running, as Ctrl+Break in its console would.
+    
+    Returns:
+        Whether the break could be delivered
+    """
+    try:
+        if os.name == "nt":
+            os.kill(pid, signal.CTRL_BREAK_EVENT)
+        else:
+            os.kill(pid, signal.SIGINT)
+        return True
+    except (OSError, AttributeError, ValueError):
+        return False
+
+
+def track_context(
+    context: Optional[DebuggerContext], commands: List[str], interrupted: bool = False
+) -> Optional[DebuggerContext]:
+    """
+    Debugger context after commands were sent to cdb.
+
+    Args:
+        context: Context before the commands, or None if it is unknown
+        commands: The commands sent
+        interrupted: Whether they were interrupted after a timeout; commands
+            changing context or state may then have run only partly, which
+            makes the context unknown
+
+    Returns:
+        The context after the commands, or None if it is unknown
+    """
+    if interrupted:
+        if any(classify(command) in (CONTEXT_MUTATING, STATE_MUTATING) for command in commands):
+            return None
+        return context
+    for command in commands:
+        context = apply_command(context, command)[0]
+    return context
+
+
+def find_cdb_executable(custom_path: Optional[str] = None) -> Optional[str]:
+    """Find the cdb.exe executable"""
+    if custom_path and os.path.isfile(custom_path):
+        return custom_path
+        
+    # If we're on Windows, try the default paths
+    if platform.system() == "Windows":
+        for path in DEFAULT_CDB_PATHS:
+            if os.path.isfile(path):
+                return path
+                
+    return None
+
+def build_cdb_args(
+    cdb_path: str,
+    dump_path: str,
+    symbols_path: Optional[str] = None,
+    additional_args: Optional[List[str]] = None
+) -> List[str]:
+    """Build the cdb.exe command line for opening a dump"""
+    cmd_args = [cdb_path, "-z", dump_path]
+    
+    # Add symbols path if provided
+    if symbols_path:
+        cmd_args.extend(["-y", symbols_path])
+        
+    # Add any additional arguments
+    if additional_args:
+        cmd_args.extend(additional_args)
+        
+    return cmd_args
+
 class CDBSession:
+    @traced("CDBSession.__init__")
     def __init__(
         self, 
         dump_path: str, 
@@ -65,15 +275,7 @@ class CDBSession:
             raise CDBError("Could not find cdb.exe. Please provide a valid path.")
         
         # Prepare command args
-        cmd_args = [self.cdb_path, "-z", dump_path]
-        
-        # Add symbols path if provided
-        if symbols_path:
-            cmd_args.extend(["-y", symbols_path])
-            
-        # Add any additional arguments
-        if additional_args:
-            cmd_args.extend(additional_args)
+        cmd_args = build_cdb_args(self.cdb_path, dump_path, symbols_path, additional_args)
             
         try:
             self.process = subprocess.Popen(
@@ -81,13 +283,17 @@ class CDBSession:
                 stdin=subprocess.PIPE,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1
+                bufsize=0,
+                creationflags=CREATION_FLAGS
             )
         except Exception as e:
             raise CDBError(f"Failed to start CDB process: {str(e)}")
             
-        self.output_lines = []
+        # Same decoding as a text-mode pipe would use
+        self.encoding = locale.getpreferredencoding(False)
+        self._context: Optional[DebuggerContext] = INITIAL_CONTEXT
+        # (token, lines) results completed by the reader thread
+        self.completed: Deque[Tuple[str, List[str]]] = collections.deque()
         self.lock = threading.Lock()
         self.ready_event = threading.Event()
         self.reader_thread = threading.Thread(target=self._read_output)
@@ -105,57 +311,121 @@ class CDBSession:
         if initial_commands:
             for cmd in initial_commands:
                 self.send_command(cmd)
+            # Every process runs them, so they are part of the initial context
+            self._context = INITIAL_CONTEXT
     
+    @property
+    def context(self) -> Optional[DebuggerContext]:
+        """
+        Tracked debugger context (process, thread, frame, exception context,
+        state digest) that the next command runs in; None once it is unknown
+        """
+        return self._context
+
     def _find_cdb_executable(self, custom_path: Optional[str] = None) -> Optional[str]:
         """Find the cdb.exe executable"""
-        if custom_path and os.path.isfile(custom_path):
-            return custom_path
-            
-        # If we're on Windows, try the default paths
-        if platform.system() == "Windows":
-            for path in DEFAULT_CDB_PATHS:
-                if os.path.isfile(path):
-                    return path
-                    
-        return None
+        return find_cdb_executable(custom_path)
 
     def _read_output(self):
         """Thread function to continuously read CDB output"""
         if not self.process or not self.process.stdout:
             return
             
-        buffer = []
+        fd = self.process.stdout.fileno()
+        splitter = MarkerOutputSplitter(self.encoding)
         try:
-            for line in self.process.stdout:
-                line = line.rstrip()
+            while True:
+                chunk = os.read(fd, READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                metrics.CDB_BYTES_READ.inc(len(chunk))
                 if self.verbose:
-                    print(f"CDB > {line}")
-                    
-                with self.lock:
-                    buffer.append(line)
-                    # Check if the marker is in this line
-                    if COMMAND_MARKER_PATTERN.search(line):
-                        # Remove the marker line itself
-                        if buffer and COMMAND_MARKER_PATTERN.search(buffer[-1]):
-                            buffer.pop()
-                        self.output_lines = buffer
-                        buffer = []
+                    for line in chunk.decode(self.encoding, errors="replace").splitlines():
+                        print(f"CDB > {line}")
+                        
+                results = splitter.feed(chunk)
+                if results:
+                    with self.lock:
+                        self.completed.extend(results)
                         self.ready_event.set()
         except (IOError, ValueError) as e:
             if self.verbose:
                 print(f"CDB output reader error: {e}")
+    
+    def _write(self, text: str):
+        data = text.encode(self.encoding, errors="replace")
+        self.process.stdin.write(data)
+        self.process.stdin.flush()
+        metrics.CDB_BYTES_WRITTEN.inc(len(data))
                 
+    def _wait_for_results(self, tokens: List[str], timeout: float) -> Optional[List[List[str]]]:
+        """
+        Wait for the results carrying the given marker tokens, in order.
+        Results with any other token are discarded.
+        
+        Returns:
+            One list of output lines per token, or None on timeout
+        """
+        deadline = time.monotonic() + timeout
+        results = []
+        while True:
+            with self.lock:
+                while self.completed and len(results) < len(tokens):
+                    token, lines = self.completed.popleft()
+                    if token == tokens[len(results)]:
+                        results.append(lines)
+                if len(results) == len(tokens):
+                    return results
+                self.ready_event.clear()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.ready_event.wait(timeout=remaining):
+                return None
+    
+    @traced("wait_for_prompt")
     def _wait_for_prompt(self, timeout=None):
         """Wait for CDB to be ready for commands by sending a marker"""
+        token = new_batch_tokens(1)[0]
         try:
-            self.ready_event.clear()
-            self.process.stdin.write(f"{COMMAND_MARKER}\n")
-            self.process.stdin.flush()
+            self._write(make_marker_command(token) + "\n")
             
-            if not self.ready_event.wait(timeout=timeout or self.timeout):
+            if self._wait_for_results([token], timeout or self.timeout) is None:
                 raise CDBError(f"Timed out waiting for CDB prompt")
         except IOError as e:
             raise CDBError(f"Failed to communicate with CDB: {str(e)}")
+    
+    @traced("resync")
+    def _recover(self) -> bool:
+        """
+        Interrupt the command cdb is still running after a timeout and wait
+        until it answers a fresh marker probe. Output of the interrupted
+        command arrives before the probe's marker and is discarded with it.
+        
+        Returns:
+            Whether cdb accepts commands again
+        """
+        send_break(self.process.pid)
+        deadline = time.monotonic() + RESYNC_TIMEOUT
+        probes: List[str] = []
+        try:
+            while time.monotonic() < deadline:
+                # The break may abort a probe instead of the command, so keep probing
+                probes.append(new_batch_tokens(1)[0])
+                self._write(make_marker_command(probes[-1]) + "\n")
+                wait_until = min(time.monotonic() + PROBE_INTERVAL, deadline)
+                while True:
+                    with self.lock:
+                        while self.completed:
+                            if self.completed.popleft()[0] in probes:
+                                metrics.COMMAND_RECOVERIES.inc(labels=("resynced",))
+                                return True
+                        self.ready_event.clear()
+                    remaining = wait_until - time.monotonic()
+                    if remaining <= 0 or not self.ready_event.wait(timeout=remaining):
+                        break
+        except IOError:
+            pass
+        metrics.COMMAND_RECOVERIES.inc(labels=("failed",))
+        return False
 
     def send_command(self, command: str, timeout: Optional[int] = None) -> List[str]:
         """
@@ -174,33 +444,87 @@ class CDBSession:
         if not self.process:
             raise CDBError("CDB process is not running")
             
-        self.ready_event.clear()
+        token = new_batch_tokens(1)[0]
         with self.lock:
-            self.output_lines = []
+            self.completed.clear()
             
         try:
-            # Send the command followed by our marker to detect completion
-            self.process.stdin.write(f"{command}\n{COMMAND_MARKER}\n")
-            self.process.stdin.flush()
+            # Send the command followed by its own marker to detect completion;
+            # late output of an earlier, timed-out command carries another token
+            self._write(format_batch([command], [token]))
         except IOError as e:
             raise CDBError(f"Failed to send command: {str(e)}")
+        self._context = track_context(self._context, [command])
             
         cmd_timeout = timeout or self.timeout
-        if not self.ready_event.wait(timeout=cmd_timeout):
-            raise CDBError(f"Command timed out after {cmd_timeout} seconds: {command}")
+        started = time.monotonic()
+        with span("send_command", command=command):
+            results = self._wait_for_results([token], cmd_timeout)
+        if results is None:
+            metrics.COMMAND_TIMEOUTS.inc(labels=metrics.verb_label(command))
+            self._context = track_context(self._context, [command], interrupted=True)
+            self._recover()
+            raise CDBTimeoutError(f"Command timed out after {cmd_timeout} seconds: {command}")
+        metrics.COMMAND_SECONDS.observe(time.monotonic() - started, metrics.verb_label(command))
+        return results[0]
+
+    @traced("send_batch")
+    def send_batch(self, commands: List[str], timeout: Optional[int] = None) -> List[List[str]]:
+        """
+        Send several commands to CDB in one write and return each command's output
+        
+        Every command is followed by its own uniquely tagged marker, so the
+        output stream can be split back into per-command results without a
+        round-trip per command.
+        
+        Args:
+            commands: The commands to send, in execution order
+            timeout: Custom timeout for each command (overrides instance timeout);
+                a command's time starts when the previous one completes
             
+        Returns:
+            One list of output lines per command
+            
+        Raises:
+            CDBTimeoutError: If a command times out; carries the outputs of
+                the commands completed before it
+            CDBError: If CDB is not responsive
+        """
+        if not self.process:
+            raise CDBError("CDB process is not running")
+        if not commands:
+            return []
+            
+        tokens = new_batch_tokens(len(commands))
         with self.lock:
-            result = self.output_lines.copy()
-            self.output_lines = []
-        return result
+            self.completed.clear()
+            
+        try:
+            self._write(format_batch(commands, tokens))
+        except IOError as e:
+            raise CDBError(f"Failed to send commands: {str(e)}")
+        self._context = track_context(self._context, commands)
+            
+        cmd_timeout = timeout or self.timeout
+        results: List[List[str]] = []
+        for command, token in zip(commands, tokens):
+            result = self._wait_for_results([token], cmd_timeout)
+            if result is None:
+                metrics.COMMAND_TIMEOUTS.inc(labels=metrics.verb_label(command))
+                self._context = track_context(self._context, commands[len(results):], interrupted=True)
+                self._recover()
+                raise CDBTimeoutError(
+                    f"Command timed out after {cmd_timeout} seconds: {command}", partial_results=results
+                )
+            results.extend(result)
+        return results
 
     def shutdown(self):
         """Clean up and terminate the CDB process"""
         try:
             if self.process and self.process.poll() is None:
                 try:
-                    self.process.stdin.write("q\n")
-                    self.process.stdin.flush()
+                    self._write("q\n")
                     self.process.wait(timeout=1)
                 except Exception:
                     pass
@@ -220,4 +544,425 @@ class CDBSession:
         
     def __exit__(self, exc_type, exc_val, exc_tb):
         """Clean up when exiting context manager"""
-        self.shutdown()
\ No newline at end of file
+        self.shutdown()
+
+
+class AsyncCDBSession:
+    """
+    Asyncio-native CDB debugging session.
+    
+    Mirrors CDBSession, but drives cdb.exe through asyncio pipes so that
+    awaiting a command never blocks the event loop. Commands on one session
+    are serialized; commands on different sessions run concurrently.
+    
+    Use ``await AsyncCDBSession.create(...)`` (or construct and ``await start()``)
+    before sending commands.
+    """
+    
+    def __init__(
+        self, 
+        dump_path: str, 
+        cdb_path: Optional[str] = None, 
+        symbols_path: Optional[str] = None,
+        initial_commands: Optional[List[str]] = None,
+        timeout: int = 10,
+        verbose: bool = False,
+        additional_args: Optional[List[str]] = None
+    ):
+        """
+        Prepare a new asynchronous CDB debugging session. The process is
+        started by start().
+        
+        Args:
+            dump_path: Path to the crash dump file
+            cdb_path: Custom path to cdb.exe. If None, will try to find it automatically
+            symbols_path: Custom symbols path. If None, uses default Windows symbols
+            initial_commands: List of commands to run when CDB starts
+            timeout: Timeout in seconds for waiting for CDB responses
+            verbose: Whether to print additional debug information
+            additional_args: Additional arguments to pass to cdb.exe
+        
+        Raises:
+            CDBError: If cdb.exe cannot be found
+            FileNotFoundError: If the dump file cannot be found
+        """
+        if not dump_path or not os.path.isfile(dump_path):
+            raise FileNotFoundError(f"Dump file not found: {dump_path}")
+            
+        self.dump_path = dump_path
+        self.timeout = timeout
+        self.verbose = verbose
+        self.initial_commands = initial_commands
+        
+        self.cdb_path = find_cdb_executable(cdb_path)
+        if not self.cdb_path:
+            raise CDBError("Could not find cdb.exe. Please provide a valid path.")
+        
+        self.cmd_args = build_cdb_args(self.cdb_path, dump_path, symbols_path, additional_args)
+        # Same decoding as the text-mode pipe used by CDBSession
+        self.encoding = locale.getpreferredencoding(False)
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self.lock = asyncio.Lock()
+        self._splitter = MarkerOutputSplitter(self.encoding)
+        self._completed: Deque[Tuple[str, List[str]]] = collections.deque()
+        # Markers of streamed commands given up before completion; their
+        # remaining output is still in the pipe and must not be streamed
+        self._abandoned: Set[str] = set()
+        self._context: Optional[DebuggerContext] = INITIAL_CONTEXT
+    
+    @property
+    def context(self) -> Optional[DebuggerContext]:
+        """
+        Tracked debugger context (process, thread, frame, exception context,
+        state digest) that the next command runs in; None once it is unknown
+        """
+        return self._context
+    
+    @classmethod
+    async def create(cls, *args, **kwargs) -> "AsyncCDBSession":
+        """Create and start a session. Accepts the same arguments as __init__."""
+        session = cls(*args, **kwargs)
+        await session.start()
+        return session
+    
+    @traced("cdb_start")
+    async def start(self):
+        """
+        Start cdb.exe and wait until it accepts commands.
+        
+        Raises:
+            CDBError: If cdb.exe cannot be started or does not become ready
+        """
+        try:
+            self.process = await asyncio.create_subprocess_exec(
+                *self.cmd_args,
+                stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.STDOUT,
+                limit=ASYNC_STREAM_LIMIT,
+                creationflags=CREATION_FLAGS
+            )
+        except Exception as e:
+            raise CDBError(f"Failed to start CDB process: {str(e)}")
+        
+        try:
+            await self._wait_for_prompt(timeout=self.timeout)
+        except CDBError:
+            await self.shutdown()
+            raise CDBError("CDB initialization timed out")
+            
+        if self.initial_commands:
+            for cmd in self.initial_commands:
+                await self.send_command(cmd)
+            # Every process runs them, so they are part of the initial context
+            self._context = INITIAL_CONTEXT
+    
+    async def _read_until_marker(self, token: str = "") -> List[str]:
+        """
+        Read output until the marker carrying the given token, excluding the
+        marker line. Results for any other token are discarded.
+        """
+        return (await self._read_until_any({token}))[1]
+    
+    async def _read_until_any(self, tokens: Set[str]) -> Tuple[str, List[str]]:
+        """Read output until a marker carrying one of the tokens; returns (token, lines)"""
+        while True:
+            while self._completed:
+                result_token, lines = self._completed.popleft()
+                if result_token in tokens:
+                    return result_token, lines
+                self._abandoned.discard(result_token)
+            chunk = await self.process.stdout.read(READ_CHUNK_SIZE)
+            if not chunk:
+                raise CDBError("CDB process exited unexpectedly")
+            metrics.CDB_BYTES_READ.inc(len(chunk))
+            if self.verbose:
+                for line in chunk.decode(self.encoding, errors="replace").splitlines():
+                    print(f"CDB > {line}")
+            self._completed.extend(self._splitter.feed(chunk))
+    
+    def _discard_completed(self):
+        while self._completed:
+            self._abandoned.discard(self._completed.popleft()[0])
+    
+    async def _write(self, text: str):
+        data = text.encode(self.encoding, errors="replace")
+        self.process.stdin.write(data)
+        await self.process.stdin.drain()
+        metrics.CDB_BYTES_WRITTEN.inc(len(data))
+    
+    @traced("wait_for_prompt")
+    async def _wait_for_prompt(self, timeout=None):
+        """Wait for CDB to be ready for commands by sending a marker"""
+        token = new_batch_tokens(1)[0]
+        async with self.lock:
+            try:
+                await self._write(make_marker_command(token) + "\n")
+                await asyncio.wait_for(self._read_until_marker(token), timeout=timeout or self.timeout)
+            except asyncio.TimeoutError:
+                raise CDBError(f"Timed out waiting for CDB prompt")
+            except (IOError, ConnectionError) as e:
+                raise CDBError(f"Failed to communicate with CDB: {str(e)}")
+    
+    @traced("resync")
+    async def _recover(self) -> bool:
+        """
+        Interrupt the command cdb is still running after a timeout and wait
+        until it answers a fresh marker probe; the caller holds the lock.
+        Output of the interrupted command and the markers of earlier commands
+        arrive before the probe's marker and are discarded with it.
+        
+        Returns:
+            Whether cdb accepts commands again. If not, the pending markers
+            stay abandoned and are skipped whenever they arrive.
+        """
+        send_break(self.process.pid)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + RESYNC_TIMEOUT
+        probes: List[str] = []
+        try:
+            while loop.time() < deadline:
+                # The break may abort a probe instead of the command, so keep probing
+                probes.append(new_batch_tokens(1)[0])
+                await self._write(make_marker_command(probes[-1]) + "\n")
+                try:
+                    answered, _ = await asyncio.wait_for(
+                        self._read_until_any(set(probes)),
+                        timeout=min(PROBE_INTERVAL, deadline - loop.time())
+                    )
+                except asyncio.TimeoutError:
+                    continue
+                # cdb runs its input in order: everything sent before the
+                # answered probe is done, the probes sent after it are pending
+                self._abandoned = set(probes[probes.index(answered) + 1:])
+                metrics.COMMAND_RECOVERIES.inc(labels=("resynced",))
+                return True
+        except (IOError, ConnectionError, CDBError):
+            pass
+        except BaseException:
+            self._abandoned.update(probes)
+            raise
+        self._abandoned.update(probes)
+        metrics.COMMAND_RECOVERIES.inc(labels=("failed",))
+        return False
+    
+    async def send_command(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        on_output: Optional[Callable[[List[str]], Awaitable[Optional[bool]]]] = None,
+        collect: bool = True
+    ) -> List[str]:
+        """
+        Send a command to CDB and return the output
+        
+        Args:
+            command: The command to send
+            timeout: Custom timeout for this command (overrides instance timeout)
+            on_output: Coroutine function called with each chunk of output lines
+                as it arrives. If it returns True, the rest of the output is
+                not needed and is discarded without waiting for it.
+            collect: Whether to collect and return the output; with False
+                the output only goes to on_output
+            
+        Returns:
+            List of output lines from CDB (empty if collect is False)
+            
+        Raises:
+            CDBTimeoutError: If the command times out; carries the partial output
+            CDBError: If CDB is not responsive
+        """
+        output: List[str] = []
+        with span("send_command", command=command):
+            try:
+                async with contextlib.aclosing(self.stream_command(command, timeout)) as chunks:
+                    async for lines in chunks:
+                        if collect:
+                            output.extend(lines)
+                        if on_output is not None and await on_output(lines):
+                            break
+            except CDBTimeoutError as e:
+                e.partial_output = output
+                raise
+        return output
+    
+    async def stream_command(self, command: str, timeout: Optional[int] = None) -> AsyncIterator[List[str]]:
+        """
+        Send a command to CDB and yield its output lines in chunks as cdb
+        produces them. Every complete line is yielded exactly once; while the
+        markers of abandoned commands are still pending, output is held back
+        and yielded when the command completes. If the generator is closed
+        before the command completes, the rest of its output is skipped by
+        the following commands.
+        
+        Args:
+            command: The command to send
+            timeout: Custom timeout for this command (overrides instance timeout)
+            
+        Yields:
+            Lists of output lines
+            
+        Raises:
+            CDBTimeoutError: If the command times out
+            CDBError: If CDB is not responsive
+        """
+        if not self.process:
+            raise CDBError("CDB process is not running")
+            
+        token = new_batch_tokens(1)[0]
+        cmd_timeout = timeout or self.timeout
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            self._discard_completed()
+            try:
+                # Send the command followed by its own marker to detect completion
+                await self._write(format_batch([command], [token]))
+            except (IOError, ConnectionError) as e:
+                raise CDBError(f"Failed to send command: {str(e)}")
+            # A command given up before completion still runs to its end
+            self._context = track_context(self._context, [command])
+            
+            started = loop.time()
+            deadline = started + cmd_timeout
+            settled = False
+            try:
+                while True:
+                    while self._completed:
+                        result_token, lines = self._completed.popleft()
+                        if result_token == token:
+                            settled = True
+                            metrics.COMMAND_SECONDS.observe(loop.time() - started, metrics.verb_label(command))
+                            if lines:
+                                yield lines
+                            return
+                        self._abandoned.discard(result_token)
+                    # Until every abandoned command has finished, the output
+                    # in the pipe may belong to them; it stays in the splitter
+                    # and whatever is this command's comes with its marker
+                    if not self._abandoned:
+                        lines = self._splitter.take_partial()
+                        if lines:
+                            yield lines
+                    
+                    remaining = deadline - loop.time()
+                    try:
+                        if remaining <= 0:
+                            raise asyncio.TimeoutError()
+                        chunk = await asyncio.wait_for(self.process.stdout.read(READ_CHUNK_SIZE), timeout=remaining)
+                    except asyncio.TimeoutError:
+                        metrics.COMMAND_TIMEOUTS.inc(labels=metrics.verb_label(command))
+                        self._context = track_context(self._context, [command], interrupted=True)
+                        self._abandoned.add(token)
+                        # A resync consumes the marker, so it need not stay abandoned
+                        settled = await self._recover()
+                        raise CDBTimeoutError(f"Command timed out after {cmd_timeout} seconds: {command}")
+                    if not chunk:
+                        raise CDBError("CDB process exited unexpectedly")
+                    metrics.CDB_BYTES_READ.inc(len(chunk))
+                    if self.verbose:
+                        for line in chunk.decode(self.encoding, errors="replace").splitlines():
+                            print(f"CDB > {line}")
+                    self._completed.extend(self._splitter.feed(chunk))
+            finally:
+                if not settled:
+                    self._abandoned.add(token)
+    
+    @traced("send_batch")
+    async def send_batch(self, commands: List[str], timeout: Optional[int] = None) -> List[List[str]]:
+        """
+        Send several commands to CDB in one write and return each command's output
+        
+        Args:
+            commands: The commands to send, in execution order
+            timeout: Custom timeout for each command (overrides instance timeout);
+                a command's time starts when the previous one completes
+            
+        Returns:
+            One list of output lines per command
+            
+        Raises:
+            CDBTimeoutError: If a command times out; carries the outputs of
+                the commands completed before it
+            CDBError: If CDB is not responsive
+        """
+        if not self.process:
+            raise CDBError("CDB process is not running")
+        if not commands:
+            return []
+            
+        tokens = new_batch_tokens(len(commands))
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            self._discard_completed()
+            try:
+                await self._write(format_batch(commands, tokens))
+            except (IOError, ConnectionError) as e:
+                raise CDBError(f"Failed to send commands: {str(e)}")
+            self._context = track_context(self._context, commands)
+                
+            cmd_timeout = timeout or self.timeout
+            results: List[List[str]] = []
+            started = loop.time()
+            for command, token in zip(commands, tokens):
+                # cdb runs the commands one after the other, so each one's
+                # time starts when the previous marker arrives
+                try:
+                    results.append(await asyncio.wait_for(self._read_until_marker(token), timeout=cmd_timeout))
+                except asyncio.TimeoutError:
+                    metrics.COMMAND_TIMEOUTS.inc(labels=metrics.verb_label(command))
+                    self._context = track_context(self._context, commands[len(results):], interrupted=True)
+                    # Lines read so far belong to this command unless an earlier one is still pending
+                    partial = [] if self._abandoned else self._splitter.take_partial()
+                    self._abandoned.update(tokens[len(results):])
+                    await self._recover()
+                    raise CDBTimeoutError(
+                        f"Command timed out after {cmd_timeout} seconds: {command}",
+                        partial_output=partial,
+                        partial_results=results
+                    )
+                finished = loop.time()
+                metrics.COMMAND_SECONDS.observe(finished - started, metrics.verb_label(command))
+                started = finished
+            return results
+    
+    async def shutdown(self):
+        """Clean up and terminate the CDB process"""
+        process = self.process
+        self.process = None
+        if process is None or process.returncode is not None:
+            return
+        try:
+            try:
+                process.stdin.write(b"q\n")
+                await process.stdin.drain()
+                await asyncio.wait_for(process.wait(), timeout=1)
+            except Exception:
+                pass
+            
+            if process.returncode is None:
+                process.terminate()
+                await asyncio.wait_for(process.wait(), timeout=3)
+        except Exception as e:
+            if self.verbose:
+                print(f"Error during shutdown: {e}")
+    
+    def terminate(self):
+        """Terminate the CDB process without awaiting it (for use outside the event loop)"""
+        process = self.process
+        self.process = None
+        try:
+            if process is not None and process.returncode is None:
+                process.terminate()
+        except Exception as e:
+            if self.verbose:
+                print(f"Error during terminate: {e}")
+    
+    async def __aenter__(self):
+        """Support for async context manager protocol"""
+        if self.process is None:
+            await self.start()
+        return self
+        
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        """Clean up when exiting context manager"""
+        await self.shutdown()
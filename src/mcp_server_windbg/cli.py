@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
 """
 命令行界面模块，用于启动 MCP WinDBG 服务器。
-提供本地模式（标准输入/输出）和远程模式（WebSocket）。
+提供本地模式（标准输入/输出）和远程模式（WebSocket），
+以及批量分级分析子命令 triage。
 """
 
 import argparse
@@ -9,10 +10,36 @@ import asyncio
 import logging
 import os
 import sys
-from typing import Optional
+from typing import List, Optional
 
+from .crash_buckets import DEFAULT_BUCKET_DEPTH
+from .output_store import DEFAULT_STORE_SIZE_MB
+from .result_cache import DEFAULT_CACHE_SIZE_MB
 from .server import serve
 from .server_factory import ServerFactory
+from .session_pool import (
+    DEFAULT_IDLE_TIMEOUT,
+    DEFAULT_MAX_REPLICAS,
+    DEFAULT_MAX_SESSIONS,
+    DEFAULT_REPLICA_IDLE_TIMEOUT,
+)
+from .sse_server import (
+    DEFAULT_CLIENT_QUEUE_SIZE,
+    DEFAULT_DISCONNECT_AFTER,
+    DEFAULT_OVERFLOW_POLICY,
+    DEFAULT_SSE_WORKERS,
+    OVERFLOW_POLICIES,
+)
+from .triage import (
+    ANALYSIS_PROFILES,
+    DEFAULT_PROFILE,
+    MANIFEST_NAME,
+    TriageManifest,
+    find_dumps,
+    format_summary,
+    run_triage,
+)
+from .websocket_server import DEFAULT_MAX_CONCURRENT_REQUESTS
 
 
 def setup_logging(verbose: bool = False) -> None:
@@ -60,6 +87,79 @@ def parse_args() -> argparse.Namespace:
         help="启用详细输出"
     )
     
+    # 结果缓存选项
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="禁用命令结果的持久化缓存"
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="命令结果缓存目录（默认：%%LOCALAPPDATA%%\\mcp-windbg 或 ~/.cache/mcp-windbg）"
+    )
+    parser.add_argument(
+        "--cache-size-mb",
+        type=int,
+        default=DEFAULT_CACHE_SIZE_MB,
+        help="命令结果缓存的最大大小（MB）（默认：%(default)s）"
+    )
+    
+    # 会话池选项
+    parser.add_argument(
+        "--max-sessions",
+        type=int,
+        default=DEFAULT_MAX_SESSIONS,
+        help="同时运行的 cdb 进程的最大数量（默认：%(default)s）"
+    )
+    parser.add_argument(
+        "--session-idle-timeout",
+        type=float,
+        default=DEFAULT_IDLE_TIMEOUT,
+        help="空闲 cdb 进程被停止前的秒数，0 表示不限制（默认：%(default)s）"
+    )
+    parser.add_argument(
+        "--session-memory-limit-mb",
+        type=int,
+        help="空闲 cdb 进程的内存上限（MB），超过后在下次使用时重启"
+    )
+    parser.add_argument(
+        "--replicas",
+        type=int,
+        default=DEFAULT_MAX_REPLICAS,
+        help="每个转储文件的只读副本 cdb 进程数上限，用于并行执行只读命令，0 表示禁用（默认：%(default)s）"
+    )
+    parser.add_argument(
+        "--replica-idle-timeout",
+        type=float,
+        default=DEFAULT_REPLICA_IDLE_TIMEOUT,
+        help="只读副本空闲多少秒后停止（默认：%(default)s）"
+    )
+    
+    # 崩溃分桶选项
+    parser.add_argument(
+        "--bucket-depth",
+        type=int,
+        default=DEFAULT_BUCKET_DEPTH,
+        help="崩溃签名包含的栈帧数（默认：%(default)s）"
+    )
+    
+    # 输出分页选项
+    parser.add_argument(
+        "--output-store-mb",
+        type=int,
+        default=DEFAULT_STORE_SIZE_MB,
+        help="保存大命令输出以供分页读取的内存上限（MB）（默认：%(default)s）"
+    )
+    parser.add_argument(
+        "--trace-file",
+        help="将每个请求的追踪区间写入该文件（Chrome trace 格式）"
+    )
+    parser.add_argument(
+        "--trace-profile",
+        action="store_true",
+        help="追踪时同时对每个请求期间的 Python 调用栈采样"
+    )
+    
     # 服务器模式选项
     parser.add_argument(
         "--mode",
@@ -80,6 +180,30 @@ def parse_args() -> argparse.Namespace:
         default=8767,
         help="SSE服务器端口（默认：8767）"
     )
+    parser.add_argument(
+        "--sse-workers",
+        type=int,
+        default=DEFAULT_SSE_WORKERS,
+        help="SSE服务器并发处理请求的工作任务数（默认：%(default)s）"
+    )
+    parser.add_argument(
+        "--sse-client-queue",
+        type=int,
+        default=DEFAULT_CLIENT_QUEUE_SIZE,
+        help="每个SSE客户端发送队列的长度（默认：%(default)s）"
+    )
+    parser.add_argument(
+        "--sse-overflow",
+        choices=OVERFLOW_POLICIES,
+        default=DEFAULT_OVERFLOW_POLICY,
+        help="SSE客户端发送队列已满时的策略（默认：%(default)s）"
+    )
+    parser.add_argument(
+        "--sse-disconnect-after",
+        type=float,
+        default=DEFAULT_DISCONNECT_AFTER,
+        help="SSE客户端积压事件等待超过该秒数时断开连接（默认：%(default)s）"
+    )
     
     # 远程模式选项
     parser.add_argument(
@@ -93,6 +217,12 @@ def parse_args() -> argparse.Namespace:
         default=8765,
         help="WebSocket 服务器端口（默认：8765）"
     )
+    parser.add_argument(
+        "--max-concurrent-requests",
+        type=int,
+        default=DEFAULT_MAX_CONCURRENT_REQUESTS,
+        help="每个 WebSocket 连接同时处理的最大请求数（默认：%(default)s）"
+    )
     parser.add_argument(
         "--upload-port",
         type=int,
@@ -125,7 +255,19 @@ async def main_async() -> None:
             cdb_path=args.cdb_path,
             symbols_path=symbols_path,
             timeout=args.timeout,
-            verbose=args.verbose
+            verbose=args.verbose,
+            use_cache=not args.no_cache,
+            cache_dir=args.cache_dir,
+            cache_size_mb=args.cache_size_mb,
+            max_sessions=args.max_sessions,
+            session_idle_timeout=args.session_idle_timeout,
+            session_memory_limit_mb=args.session_memory_limit_mb,
+            max_replicas=args.replicas,
+            replica_idle_timeout=args.replica_idle_timeout,
+            bucket_depth=args.bucket_depth,
+            output_store_mb=args.output_store_mb,
+            trace_file=args.trace_file,
+            trace_profile=args.trace_profile
         )
     else:
         # 远程模式（WebSocket）
@@ -145,12 +287,153 @@ async def main_async() -> None:
             timeout=args.timeout,
             verbose=args.verbose,
             use_sse=args.use_sse,
-            sse_port=args.sse_port
+            sse_port=args.sse_port,
+            sse_workers=args.sse_workers,
+            sse_client_queue=args.sse_client_queue,
+            sse_overflow=args.sse_overflow,
+            sse_disconnect_after=args.sse_disconnect_after,
+            max_concurrent_requests=args.max_concurrent_requests,
+            use_cache=not args.no_cache,
+            cache_dir=args.cache_dir,
+            cache_size_mb=args.cache_size_mb,
+            max_sessions=args.max_sessions,
+            session_idle_timeout=args.session_idle_timeout,
+            session_memory_limit_mb=args.session_memory_limit_mb,
+            max_replicas=args.replicas,
+            replica_idle_timeout=args.replica_idle_timeout,
+            bucket_depth=args.bucket_depth,
+            output_store_mb=args.output_store_mb,
+            trace_file=args.trace_file,
+            trace_profile=args.trace_profile
         )
 
 
+def parse_triage_args(argv: List[str]) -> argparse.Namespace:
+    """解析 triage 子命令的参数。
+    
+    Args:
+        argv: triage 之后的命令行参数
+    
+    Returns:
+        解析后的参数命名空间
+    """
+    parser = argparse.ArgumentParser(
+        prog="mcp-server-windbg triage",
+        description="并行分析目录中的所有崩溃转储，每个转储输出一条 JSON 记录"
+    )
+    parser.add_argument(
+        "directory",
+        help="包含崩溃转储文件（*.*dmp）的目录"
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=int,
+        default=os.cpu_count() or 4,
+        help="同时运行的 cdb 进程数（默认：CPU 核心数）"
+    )
+    parser.add_argument(
+        "--profile",
+        choices=sorted(ANALYSIS_PROFILES),
+        default=DEFAULT_PROFILE,
+        help=f"分析配置（默认：{DEFAULT_PROFILE}）"
+    )
+    parser.add_argument(
+        "--command", "-c",
+        action="append",
+        dest="commands",
+        help="要执行的 WinDBG 命令，可重复指定；指定后替代 --profile"
+    )
+    parser.add_argument(
+        "--output", "-o",
+        help="JSONL 输出文件（追加写入）；默认输出到标准输出"
+    )
+    parser.add_argument(
+        "--manifest",
+        help=f"记录已分析转储的清单文件（默认：<directory>/{MANIFEST_NAME}）"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="忽略清单，重新分析所有转储"
+    )
+    parser.add_argument(
+        "--recursive",
+        action="store_true",
+        help="递归搜索子目录"
+    )
+    parser.add_argument(
+        "--cdb-path",
+        help="cdb.exe 的自定义路径"
+    )
+    parser.add_argument(
+        "--symbols-path",
+        help="自定义符号路径"
+    )
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=300,
+        help="每条命令的超时时间（秒）（默认：300）"
+    )
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="启用详细输出"
+    )
+    return parser.parse_args(argv)
+
+
+def triage_main(argv: List[str]) -> int:
+    """triage 子命令入口。
+    
+    Args:
+        argv: triage 之后的命令行参数
+    
+    Returns:
+        进程退出码：全部成功为 0，有失败为 1
+    """
+    args = parse_triage_args(argv)
+    setup_logging(args.verbose)
+    
+    if not os.path.isdir(args.directory):
+        logging.error(f"目录不存在: {args.directory}")
+        return 2
+    
+    symbols_path = args.symbols_path or os.environ.get("_NT_SYMBOL_PATH")
+    commands = args.commands or ANALYSIS_PROFILES[args.profile]
+    manifest = None if args.force else TriageManifest(
+        args.manifest or os.path.join(args.directory, MANIFEST_NAME)
+    )
+    
+    dumps = find_dumps(args.directory, recursive=args.recursive)
+    logging.info(f"在 {args.directory} 中找到 {len(dumps)} 个转储文件，使用 {args.jobs} 个并发任务")
+    
+    output = open(args.output, "a", encoding="utf-8") if args.output else sys.stdout
+    try:
+        summary = run_triage(
+            dumps,
+            commands,
+            output,
+            manifest=manifest,
+            jobs=args.jobs,
+            cdb_path=args.cdb_path,
+            symbols_path=symbols_path,
+            timeout=args.timeout
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    
+    # 汇总信息输出到标准错误，避免混入 JSONL 输出
+    print(format_summary(summary), file=sys.stderr)
+    return 1 if summary["failed"] else 0
+
+
 def main() -> None:
     """主入口点，启动异步事件循环。"""
+    if sys.argv[1:2] == ["triage"]:
+        sys.exit(triage_main(sys.argv[2:]))
+    
     try:
         asyncio.run(main_async())
     except KeyboardInterrupt:
@@ -0,0 +1,230 @@
+"""
+Side-effect classification of debugger commands and debugger-context tracking.
+
+The output of many cdb commands depends on where the debugger is looking:
+``k``, ``r`` and ``dv`` show a different thread after ``~3s``, a different
+frame after ``.frame 2`` and the exception record's registers after
+``.ecxr``. Caching, collapsing identical commands and routing commands to
+read replicas are only correct if that context is known, so every command
+line is classified here, part by part for ``;``-separated compound lines:
+
+- pure: output depends only on the dump, the command and the context
+- uncacheable: side effects outside the debugger or time-dependent output
+  (``.logopen``, ``.shell``, ``.echotime`` ...)
+- state: changes debugger state seen by later commands (``.reload``,
+  ``.sympath``, memory edits, aliases ...)
+- context: switches process, thread, frame or exception context
+
+A compound line gets the strongest effect of its parts. The tracked context
+is a tuple (process, thread, frame, exception context, state digest);
+state changes are folded into the digest, so two contexts are equal only if
+later commands see the same debugger state.
+"""
+
+import hashlib
+import itertools
+import re
+from typing import List, Optional, Tuple
+
+PURE = "pure"
+UNCACHEABLE = "uncacheable"
+STATE_MUTATING = "state"
+CONTEXT_MUTATING = "context"
+
+# Weakest to strongest
+_EFFECT_ORDER = (PURE, UNCACHEABLE, STATE_MUTATING, CONTEXT_MUTATING)
+
+# Tracked debugger context: (process, thread, frame, exception context, state digest).
+# Empty strings mean "as loaded from the dump".
+DebuggerContext = Tuple[str, str, str, str, str]
+INITIAL_CONTEXT: DebuggerContext = ("", "", "0", "", "")
+
+_PROCESS_SWITCH = re.compile(r"^\|\s*(\d+|#|\.)\s*s$", re.IGNORECASE)
+_THREAD_SWITCH = re.compile(r"^~\s*(\d+|~\[[^\]]+\]|#|\.)\s*s$", re.IGNORECASE)
+_FRAME = re.compile(r"^\.frame\s+(?:/\w+\s+)*(\S+)$", re.IGNORECASE)
+_FRAME_STEP = re.compile(r"^\.f[+-]$", re.IGNORECASE)
+_CXR = re.compile(r"^\.cxr(?:\s+(\S+))?$", re.IGNORECASE)
+_ECXR = re.compile(r"^\.ecxr$", re.IGNORECASE)
+
+# `.f+` and `.f-` move to a frame whose number is not known (they stop at the
+# ends of the stack); each step gets a frame id of its own so nothing run
+# after it shares results with another context
+_unknown_frames = itertools.count(1)
+
+# Commands with side effects or time-dependent output; never cached
+_UNCACHEABLE = re.compile(
+    r"^(q|qq|qd|\.shell|\.logopen|\.logappend|\.logclose|\.dump|\.writemem|\.echotime"
+    r"|\.restart|\.kill|\.detach|\.opendump|\.create|\.attach|\.cls|\.sleep|\.wake)\b",
+    re.IGNORECASE,
+)
+
+# Commands that change debugger state seen by later commands; case-insensitive like cdb
+_STATE_MUTATING = re.compile(
+    r"^((?:\.sympath|\.symfix|\.srcpath|\.srcfix|\.exepath|\.extpath)\+?|\.reload|\.load|\.loadby"
+    r"|\.unload|\.unloadall|\.symopt|\.effmach|\.prefer_dml|\.lines|\.enable_unicode"
+    r"|\.enable_long_status|\.settings|\.apply_dbp|\.scriptload|\.scriptrun|\.scriptunload"
+    r"|\.kframes|\.expr|\.ignore_missing_pages|\.thread|\.process|\.trap|\.foreach|\.for"
+    r"|\.if|\.while|\.do|\.block|\$\$[<>]|as|aS|ad|!sym"
+    r"|e|ea|eb|ed|eD|ef|ep|eq|eu|ew|eza|ezu|f|fp|bp|bu|bm|ba|bc|bd|be|g|gu|p|pa|pc|t|ta|tc)(?=\s|$)",
+    re.IGNORECASE,
+)
+_REGISTER_WRITE = re.compile(r"^r\b.*=", re.IGNORECASE)
+
+# Commands whose output does not depend on the current thread, frame or exception context
+_CONTEXT_FREE = re.compile(
+    r"^(lm\w*|!lmi|!dh|!peb|!address|!heap|!handle|!locks|!runaway|!cs|!dlls|!vadump"
+    r"|\.lastevent|\.exr|\.time|vertarget|version)(?=\s|$)",
+    re.IGNORECASE,
+)
+# Memory, type and disassembly commands; context-free when every operand is absolute
+_ADDRESSED = re.compile(
+    r"^(d|da|db|dc|dd|dD|df|dp|dq|du|dw|dW|dyb|dyd|dds|dps|dqs|dt|u|ub|uf|ln|x)(?=\s|$)"
+)
+_ABSOLUTE_OPERAND = re.compile(
+    r"^(?:(?:0x)?[0-9a-f`]+|[\w.*?]+![\w.*?:<>]*(?:\+(?:0x)?[0-9a-f`]+)?|l\??(?:0x)?[0-9a-f`]+)$",
+    re.IGNORECASE,
+)
+
+
+def split_compound_command(command: str) -> List[str]:
+    """Split a ';'-separated command line into its parts"""
+    return [part.strip() for part in command.split(";") if part.strip()]
+
+
+def _classify_part(part: str) -> str:
+    if (
+        _PROCESS_SWITCH.match(part) or _THREAD_SWITCH.match(part) or _FRAME.match(part)
+        or _FRAME_STEP.match(part) or _ECXR.match(part) or _CXR.match(part)
+    ):
+        return CONTEXT_MUTATING
+    if _UNCACHEABLE.match(part):
+        return UNCACHEABLE
+    if _STATE_MUTATING.match(part) or _REGISTER_WRITE.match(part):
+        return STATE_MUTATING
+    return PURE
+
+
+def classify(command: str) -> str:
+    """
+    Side effect of a command line.
+
+    Args:
+        command: The command line, possibly ';'-separated
+
+    Returns:
+        PURE, UNCACHEABLE, STATE_MUTATING or CONTEXT_MUTATING, the strongest
+        effect of its parts
+    """
+    effects = [_classify_part(part) for part in split_compound_command(command)]
+    return max(effects, key=_EFFECT_ORDER.index, default=PURE)
+
+
+def apply_command(context: Optional[DebuggerContext], command: str) -> Tuple[Optional[DebuggerContext], bool]:
+    """
+    Compute the debugger context after running a command.
+
+    Args:
+        context: Context the command runs in, or None if it is unknown
+        command: The command line
+
+    Returns:
+        (context after the command, whether the command's output may be cached)
+    """
+    if context is None:
+        return None, False
+
+    process, thread, frame, exception_context, state = context
+    cacheable = True
+    for part in split_compound_command(command):
+        effect = _classify_part(part)
+        if effect != PURE:
+            cacheable = False
+        if effect == STATE_MUTATING:
+            state = hashlib.sha1(f"{state}\0{part}".encode("utf-8")).hexdigest()[:16]
+        if effect != CONTEXT_MUTATING:
+            continue
+
+        match = _PROCESS_SWITCH.match(part)
+        if match:
+            if match.group(1) != ".":
+                process, thread, frame, exception_context = match.group(1), "", "0", ""
+            continue
+        match = _THREAD_SWITCH.match(part)
+        if match:
+            if match.group(1) != ".":
+                thread, frame, exception_context = match.group(1), "0", ""
+            continue
+        match = _FRAME.match(part)
+        if match:
+            frame = match.group(1)
+        elif _FRAME_STEP.match(part):
+            frame = f"?{next(_unknown_frames)}"
+        elif _ECXR.match(part):
+            frame, exception_context = "0", "ecxr"
+        else:
+            frame, exception_context = "0", _CXR.match(part).group(1) or ""
+
+    return (process, thread, frame, exception_context, state), cacheable
+
+
+def switch_commands(context: DebuggerContext, target: DebuggerContext) -> List[str]:
+    """
+    Commands that move the debugger from one context to another, as far as
+    that is possible: a frame reached with ``.f+``/``.f-`` has no known
+    number and stays at 0. The state digest is not touched; state changes
+    have to be repeated by the caller.
+
+    A switch back to the process or thread the dump was loaded in uses the
+    event process or thread (``|#s``, ``~#s``), which is the same one but is
+    tracked under its own name.
+
+    Args:
+        context: Context the commands run in
+        target: Context to reach
+
+    Returns:
+        The switch commands, in order
+    """
+    commands = []
+
+    def switch(command: str):
+        nonlocal context
+        commands.append(command)
+        context = apply_command(context, command)[0]
+
+    if context[0] != target[0]:
+        switch(f"|{target[0] or '#'}s")
+    if context[1] != target[1]:
+        switch(f"~{target[1] or '#'}s")
+    if context[3] != target[3]:
+        switch(".ecxr" if target[3] == "ecxr" else f".cxr {target[3]}".rstrip())
+    if context[2] != target[2] and not target[2].startswith("?"):
+        switch(f".frame {target[2]}")
+    return commands
+
+
+def is_context_free(command: str) -> bool:
+    """
+    Whether a command's output is the same in every thread, frame and
+    exception context of the current process.
+
+    Memory, type and disassembly commands qualify only when they name
+    everything they read: absolute addresses, ``module!symbol`` or lengths,
+    no registers or pseudo-registers. Without operands they continue from
+    the previous address or use the current instruction pointer or scope.
+    """
+    parts = split_compound_command(command)
+    if not parts:
+        return False
+    for part in parts:
+        if _CONTEXT_FREE.match(part):
+            continue
+        match = _ADDRESSED.match(part)
+        if not match or "@" in part or "$" in part:
+            return False
+        operands = [token for token in part.split()[1:] if not token.startswith(("-", "/"))]
+        if not operands or (match.group(1) == "x" and "!" not in part):
+            return False
+        if not all(_ABSOLUTE_OPERAND.match(token) for token in operands):
+            return False
+    return True
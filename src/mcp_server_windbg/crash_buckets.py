@@ -0,0 +1,313 @@
+"""
+Crash signature bucketing.
+
+Stack traces from `kb` or the STACK_TEXT section of `!analyze -v` are
+parsed into normalized frames (module!function+offset). The top frames,
+after skipping exception dispatch and raise helpers, together with the
+exception code form the crash signature; dumps with the same signature
+fall into the same bucket. Buckets and the dumps in them are kept in a
+local SQLite index so duplicates can be recognised without re-analysis.
+"""
+
+import fnmatch
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .minidump import MinidumpError, MinidumpFile
+from .parsers import StackParser
+from .result_cache import default_cache_dir, hash_file
+
+DEFAULT_BUCKET_DEPTH = 5
+DEFAULT_MAX_SIBLINGS = 20
+
+# Leading frames that only describe how the exception was raised or reported
+NOISE_FRAMES = (
+    "ntdll!kiuserexceptiondispatch*",
+    "ntdll!rtldispatchexception",
+    "ntdll!rtlraiseexception",
+    "ntdll!rtlpexecutehandlerforexception",
+    "ntdll!rtlpexecutehandlerforunwind",
+    "ntdll!executehandler*",
+    "ntdll!nt*waitfor*",
+    "ntdll!zw*waitfor*",
+    "kernelbase!raiseexception",
+    "kernelbase!raisefailfastexception",
+    "kernelbase!unhandledexceptionfilter",
+    "kernelbase!waitfor*",
+    "kernel32!waitfor*",
+    "vcruntime*!_cxxthrowexception",
+    "msvcr*!_cxxthrowexception",
+    "ucrtbase*!abort",
+    "ucrtbase*!_invoke_watson",
+    "ucrtbase*!_invalid_parameter*",
+    "msvcr*!abort",
+)
+
+_STACK_TEXT = re.compile(r"^STACK_TEXT:\s*$", re.MULTILINE)
+_LASTEVENT_CODE = re.compile(r"code ([0-9a-fA-F]{8})")
+
+
+class Frame(NamedTuple):
+    module: str
+    function: Optional[str]
+    offset: int
+
+    def key(self, include_offset: bool = False) -> str:
+        """Normalized frame text; frames without a symbol always keep their offset"""
+        if self.function is None:
+            return f"{self.module}+0x{self.offset:x}"
+        if include_offset:
+            return f"{self.module}!{self.function}+0x{self.offset:x}"
+        return f"{self.module}!{self.function}"
+
+
+class Bucket(NamedTuple):
+    bucket_id: str
+    signature: str
+    dump_count: int
+    first_seen: float
+    last_seen: float
+
+
+def parse_frames(output: str) -> List[Frame]:
+    """
+    Extract frames from `kb`-style output or from the STACK_TEXT section of
+    `!analyze -v`. Frames without a module (bare addresses) are dropped.
+    """
+    stack_text = _STACK_TEXT.search(output)
+    if stack_text:
+        # The section ends at the first blank line
+        output = output[stack_text.end():].lstrip("\r\n").split("\n\n", 1)[0]
+
+    return [
+        Frame(
+            frame.module.lower(),
+            " ".join(frame.function.split()) if frame.function else None,
+            frame.offset,
+        )
+        for frame in StackParser().parse(output.splitlines())
+        if frame.module is not None
+    ]
+
+
+def parse_exception_code(lastevent_output: str) -> Optional[int]:
+    """Exception code from `.lastevent` output"""
+    match = _LASTEVENT_CODE.search(lastevent_output)
+    return int(match.group(1), 16) if match else None
+
+
+def is_noise_frame(frame: Frame) -> bool:
+    key = frame.key().lower()
+    return any(fnmatch.fnmatchcase(key, pattern) for pattern in NOISE_FRAMES)
+
+
+def compute_signature(
+    frames: List[Frame],
+    exception_code: Optional[int] = None,
+    depth: int = DEFAULT_BUCKET_DEPTH,
+    include_offsets: bool = False
+) -> str:
+    """
+    Stable crash signature: the exception code followed by the top `depth`
+    frames after leading noise frames, one per line.
+    """
+    start = 0
+    while start < len(frames) - 1 and is_noise_frame(frames[start]):
+        start += 1
+    lines = [f"{exception_code:08x}" if exception_code is not None else "unknown"]
+    lines.extend(frame.key(include_offsets) for frame in frames[start:start + depth])
+    return "\n".join(lines)
+
+
+def bucket_id(signature: str) -> str:
+    """Short identifier of a signature"""
+    return hashlib.sha1(signature.encode("utf-8")).hexdigest()[:16]
+
+
+class CrashIndex:
+    """SQLite index of crash buckets and the dumps that fall into them."""
+
+    def __init__(self, index_dir: Optional[str] = None, depth: int = DEFAULT_BUCKET_DEPTH):
+        """
+        Open (or create) the index.
+
+        Args:
+            index_dir: Directory for the index database. Defaults to default_cache_dir()
+            depth: Number of frames that make up a signature
+        """
+        self.index_dir = index_dir or default_cache_dir()
+        os.makedirs(self.index_dir, exist_ok=True)
+        self.path = os.path.join(self.index_dir, "crash_index.sqlite3")
+        self.depth = depth
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS buckets (
+                bucket_id TEXT PRIMARY KEY,
+                signature TEXT NOT NULL,
+                dump_count INTEGER NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS dumps (
+                dump_path TEXT PRIMARY KEY,
+                dump_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                bucket_id TEXT NOT NULL,
+                quick_key TEXT,
+                indexed_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS dumps_bucket ON dumps(bucket_id, indexed_at);
+            CREATE INDEX IF NOT EXISTS dumps_hash ON dumps(dump_hash);
+            CREATE INDEX IF NOT EXISTS dumps_quick_key ON dumps(quick_key, bucket_id);
+        """)
+
+    def _bucket(self, bucket: str) -> Optional[Bucket]:
+        row = self._conn.execute(
+            "SELECT bucket_id, signature, dump_count, first_seen, last_seen FROM buckets WHERE bucket_id = ?",
+            (bucket,)
+        ).fetchone()
+        return Bucket(*row) if row else None
+
+    def lookup_path(self, dump_path: str) -> Optional[Bucket]:
+        """Bucket of an already indexed, unchanged dump file (no hashing)"""
+        path = os.path.abspath(dump_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT bucket_id FROM dumps WHERE dump_path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+            return self._bucket(row[0]) if row else None
+
+    def lookup_hash(self, dump_hash: str) -> Optional[Bucket]:
+        """Bucket of a dump with identical content indexed under any path"""
+        with self._lock:
+            row = self._conn.execute("SELECT bucket_id FROM dumps WHERE dump_hash = ? LIMIT 1", (dump_hash,)).fetchone()
+            return self._bucket(row[0]) if row else None
+
+    def lookup_quick_key(self, quick_key: str) -> Optional[Bucket]:
+        """The bucket of dumps that crashed at the same instruction, if there is exactly one"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT bucket_id FROM dumps WHERE quick_key = ? LIMIT 2", (quick_key,)
+            ).fetchall()
+            return self._bucket(rows[0][0]) if len(rows) == 1 else None
+
+    def add(
+        self,
+        dump_path: str,
+        signature: str,
+        dump_hash: Optional[str] = None,
+        quick_key: Optional[str] = None
+    ) -> Bucket:
+        """
+        Index a dump under a signature.
+
+        Args:
+            dump_path: Path to the dump file
+            signature: Output of compute_signature()
+            dump_hash: SHA-256 of the dump; computed when not given
+            quick_key: Faulting-instruction key from quick_key()
+
+        Returns:
+            The (updated) bucket
+        """
+        path = os.path.abspath(dump_path)
+        stat = os.stat(path)
+        dump_hash = dump_hash or hash_file(path)
+        bucket = bucket_id(signature)
+        now = time.time()
+        with self._lock, self._conn:
+            previous = self._conn.execute("SELECT bucket_id FROM dumps WHERE dump_path = ?", (path,)).fetchone()
+            if previous is not None:
+                self._conn.execute("UPDATE buckets SET dump_count = dump_count - 1 WHERE bucket_id = ?", previous)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dumps (dump_path, dump_hash, size, mtime_ns, bucket_id, quick_key, indexed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (path, dump_hash, stat.st_size, stat.st_mtime_ns, bucket, quick_key, now)
+            )
+            self._conn.execute(
+                "INSERT INTO buckets (bucket_id, signature, dump_count, first_seen, last_seen) VALUES (?, ?, 1, ?, ?) "
+                "ON CONFLICT(bucket_id) DO UPDATE SET dump_count = dump_count + 1, last_seen = excluded.last_seen",
+                (bucket, signature, now, now)
+            )
+            return self._bucket(bucket)
+
+    def siblings(self, bucket: str, exclude: Optional[str] = None, limit: int = DEFAULT_MAX_SIBLINGS) -> List[Tuple[str, float]]:
+        """Most recently indexed dumps in a bucket as (path, indexed_at)"""
+        exclude = os.path.abspath(exclude) if exclude else ""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT dump_path, indexed_at FROM dumps WHERE bucket_id = ? AND dump_path != ? "
+                "ORDER BY indexed_at DESC LIMIT ?",
+                (bucket, exclude, limit)
+            ).fetchall()
+
+    def stats(self) -> Dict[str, int]:
+        """Number of buckets and indexed dumps"""
+        with self._lock:
+            return {
+                "buckets": self._conn.execute("SELECT COUNT(*) FROM buckets WHERE dump_count > 0").fetchone()[0],
+                "dumps": self._conn.execute("SELECT COUNT(*) FROM dumps").fetchone()[0],
+            }
+
+    def close(self):
+        """Close the index database"""
+        with self._lock:
+            self._conn.close()
+
+
+def quick_key(exception_code: int, module: Optional[str], offset: int) -> str:
+    """Key identifying the faulting instruction: exception code and module-relative address"""
+    return f"{exception_code:08x}|{(module or '').lower()}+0x{offset:x}"
+
+
+def format_bucket(bucket: Bucket, siblings: List[Tuple[str, float]], matched_by: str) -> str:
+    """Text report of a bucket and its sibling dumps"""
+    code, *frames = bucket.signature.split("\n")
+    lines = [
+        f"Bucket: {bucket.bucket_id} ({bucket.dump_count} dump(s), "
+        f"first seen {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(bucket.first_seen))}, "
+        f"last seen {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(bucket.last_seen))})",
+        f"Matched by: {matched_by}",
+        f"Exception code: {code}",
+        "Signature:",
+    ]
+    lines.extend(f"  {frame}" for frame in frames)
+    if siblings:
+        lines.append("")
+        lines.append(f"Sibling dumps ({len(siblings)} most recent):")
+        for i, (path, indexed_at) in enumerate(siblings):
+            lines.append(f"{i+1}. {path} (indexed {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(indexed_at))})")
+    else:
+        lines.append("")
+        lines.append("No other dumps in this bucket yet.")
+    return "\n".join(lines)
+
+
+def read_quick_key(dump_path: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Exception code and faulting-instruction key of a dump, read from the
+    minidump streams without cdb. Either may be None.
+    """
+    try:
+        with MinidumpFile(dump_path) as dump:
+            exception = dump.exception
+            if exception is None:
+                return None, None
+            module = dump.faulting_module
+            if module is None:
+                return exception.code, quick_key(exception.code, None, exception.address)
+            return exception.code, quick_key(exception.code, module.basename, exception.address - module.base)
+    except (MinidumpError, OSError):
+        return None, None
@@ -0,0 +1,280 @@
+"""
+Cached index of crash dump files in directories.
+
+Directories are read with os.scandir, whose entries carry the file size and
+modification time on Windows without extra system calls. The result of each
+scan is kept together with the directory's own modification time; a later
+listing only rescans directories whose modification time changed (a file was
+added, removed or renamed) or whose last scan is older than the rescan
+interval (to notice dumps that were still being written). Sorted listings
+are cached as well, so repeated calls over an unchanged tree only cost one
+stat per directory.
+
+Pagination uses opaque keyset cursors: a cursor holds the sort key of the
+last entry returned, so pages stay consistent when files are added.
+"""
+
+import base64
+import bisect
+import fnmatch
+import json
+import os
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .minidump import read_exception_summary
+
+DEFAULT_RESCAN_INTERVAL = 60
+DEFAULT_PAGE_SIZE = 100
+SORT_KEYS = ("name", "mtime", "size")
+
+
+def is_dump_file(name: str) -> bool:
+    """Whether a file name matches the *.*dmp pattern used for crash dumps"""
+    return "." in name[:-3] and name.lower().endswith("dmp")
+
+
+class DumpEntry(NamedTuple):
+    path: str
+    name: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def mtime(self) -> float:
+        return self.mtime_ns / 1e9
+
+
+class DumpListing(NamedTuple):
+    entries: List[DumpEntry]
+    total: int
+    next_cursor: Optional[str]
+
+
+class _DirectoryState:
+    __slots__ = ("mtime_ns", "scanned_at", "files", "subdirs", "summaries")
+
+    def __init__(self, mtime_ns: int, scanned_at: float, files: List[DumpEntry], subdirs: List[str]):
+        self.mtime_ns = mtime_ns
+        self.scanned_at = scanned_at
+        self.files = files
+        self.subdirs = subdirs
+        # Exception summaries of the files, by file version; dropped with the state
+        self.summaries: Dict[DumpEntry, Optional[str]] = {}
+
+
+def _sort_key(entry: DumpEntry, sort_by: str) -> Tuple:
+    if sort_by == "mtime":
+        return (entry.mtime_ns, entry.path)
+    if sort_by == "size":
+        return (entry.size, entry.path)
+    return (entry.name.lower(), entry.path)
+
+
+def encode_cursor(sort_by: str, key: Tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps([sort_by, *key]).encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str, sort_by: str) -> Tuple:
+    """
+    Raises:
+        ValueError: If the cursor is malformed or was issued for another sort order
+    """
+    try:
+        cursor_sort_by, *key = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if cursor_sort_by != sort_by or len(key) != 2:
+        raise ValueError(f"Cursor was issued for a different sort order: {cursor}")
+    return tuple(key)
+
+
+class DumpDirectoryIndex:
+    """Incrementally refreshed, thread-safe index of dump files below directories."""
+
+    def __init__(self, rescan_interval: float = DEFAULT_RESCAN_INTERVAL):
+        """
+        Args:
+            rescan_interval: Seconds after which a directory is rescanned even if
+                its modification time did not change
+        """
+        self.rescan_interval = rescan_interval
+        self._dirs: Dict[str, _DirectoryState] = {}
+        self._listings: Dict[Tuple[str, bool, str], Tuple[int, List[DumpEntry], List[Tuple]]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+        self.directory_scans = 0
+        self.directory_reuses = 0
+
+    def _refresh_directory(self, path: str, now: float) -> Optional[_DirectoryState]:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            if self._dirs.pop(path, None) is not None:
+                self._generation += 1
+            return None
+
+        state = self._dirs.get(path)
+        if state is not None and state.mtime_ns == mtime_ns and now - state.scanned_at < self.rescan_interval:
+            self.directory_reuses += 1
+            return state
+
+        files = []
+        subdirs = []
+        try:
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif is_dump_file(entry.name) and entry.is_file():
+                            stat = entry.stat()
+                            files.append(DumpEntry(entry.path, entry.name, stat.st_size, stat.st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError:
+            return state
+
+        self.directory_scans += 1
+        if state is None or state.files != files or state.subdirs != subdirs:
+            self._generation += 1
+        previous, state = state, _DirectoryState(mtime_ns, now, files, subdirs)
+        if previous is not None and previous.summaries:
+            # Keep the summaries of unchanged files only
+            present = set(files)
+            state.summaries = {entry: summary for entry, summary in previous.summaries.items() if entry in present}
+        self._dirs[path] = state
+        return state
+
+    def _sorted_entries(self, directory: str, recursive: bool, sort_by: str) -> Tuple[List[DumpEntry], List[Tuple]]:
+        now = time.monotonic()
+        files = []
+        pending = [directory]
+        while pending:
+            state = self._refresh_directory(pending.pop(), now)
+            if state is not None:
+                files.extend(state.files)
+                if recursive:
+                    pending.extend(state.subdirs)
+
+        cache_key = (directory, recursive, sort_by)
+        cached = self._listings.get(cache_key)
+        if cached is not None and cached[0] == self._generation:
+            return cached[1], cached[2]
+
+        files.sort(key=lambda entry: _sort_key(entry, sort_by))
+        keys = [_sort_key(entry, sort_by) for entry in files]
+        self._listings[cache_key] = (self._generation, files, keys)
+        return files, keys
+
+    def list(
+        self,
+        directory: str,
+        recursive: bool = False,
+        sort_by: str = "name",
+        descending: bool = False,
+        pattern: Optional[str] = None,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        modified_after: Optional[float] = None,
+        cursor: Optional[str] = None,
+        limit: int = DEFAULT_PAGE_SIZE
+    ) -> DumpListing:
+        """
+        List dump files below a directory.
+
+        Args:
+            directory: Directory to list
+            recursive: Whether to include subdirectories
+            sort_by: "name", "mtime" or "size"
+            descending: Reverse the sort order
+            pattern: Case-insensitive glob pattern the file name must match
+            min_size: Minimum file size in bytes
+            max_size: Maximum file size in bytes
+            modified_after: Only files modified after this POSIX timestamp
+            cursor: next_cursor of the previous page
+            limit: Maximum number of entries to return
+
+        Returns:
+            The page of entries, the number of matching files and the cursor of
+            the next page (None on the last page)
+
+        Raises:
+            ValueError: For an unknown sort key or an invalid cursor
+        """
+        if sort_by not in SORT_KEYS:
+            raise ValueError(f"Unknown sort key: {sort_by} (expected one of {', '.join(SORT_KEYS)})")
+        directory = os.path.abspath(directory)
+        with self._lock:
+            entries, keys = self._sorted_entries(directory, recursive, sort_by)
+
+        if pattern or min_size is not None or max_size is not None or modified_after is not None:
+            pattern = pattern.lower() if pattern else None
+            after_ns = int(modified_after * 1e9) if modified_after is not None else None
+            selected = [
+                i for i, entry in enumerate(entries)
+                if (pattern is None or fnmatch.fnmatchcase(entry.name.lower(), pattern))
+                and (min_size is None or entry.size >= min_size)
+                and (max_size is None or entry.size <= max_size)
+                and (after_ns is None or entry.mtime_ns > after_ns)
+            ]
+            entries = [entries[i] for i in selected]
+            keys = [keys[i] for i in selected]
+
+        limit = max(1, limit)
+        position = decode_cursor(cursor, sort_by) if cursor else None
+        if not descending:
+            start = bisect.bisect_right(keys, position) if position is not None else 0
+            end = min(start + limit, len(entries))
+            page = entries[start:end]
+            has_more = end < len(entries)
+        else:
+            end = bisect.bisect_left(keys, position) if position is not None else len(entries)
+            start = max(0, end - limit)
+            page = entries[start:end][::-1]
+            has_more = start > 0
+
+        next_cursor = encode_cursor(sort_by, _sort_key(page[-1], sort_by)) if page and has_more else None
+        return DumpListing(page, len(entries), next_cursor)
+
+    def exception_summary(self, entry: DumpEntry) -> Optional[str]:
+        """
+        Exception summary from the minidump streams, memoized per file
+        version while the file's directory stays in the index
+        """
+        directory = os.path.dirname(entry.path)
+        with self._lock:
+            state = self._dirs.get(directory)
+            if state is not None and entry in state.summaries:
+                return state.summaries[entry]
+        summary = read_exception_summary(entry.path)
+        with self._lock:
+            state = self._dirs.get(directory)
+            if state is not None:
+                state.summaries[entry] = summary
+        return summary
+
+    def invalidate(self, directory: Optional[str] = None):
+        """Forget cached scans for a directory tree, or for everything"""
+        with self._lock:
+            if directory is None:
+                self._dirs.clear()
+            else:
+                directory = os.path.abspath(directory)
+                prefix = directory.rstrip(os.sep) + os.sep
+                for path in [p for p in self._dirs if p == directory or p.startswith(prefix)]:
+                    del self._dirs[path]
+            self._generation += 1
+
+    def stats(self) -> Dict[str, int]:
+        """Number of cached directories, files and summaries, and scan counters"""
+        with self._lock:
+            return {
+                "directories": len(self._dirs),
+                "files": sum(len(state.files) for state in self._dirs.values()),
+                "summaries": sum(len(state.summaries) for state in self._dirs.values()),
+                "directory_scans": self.directory_scans,
+                "directory_reuses": self.directory_reuses,
+            }
@@ -1,15 +1,21 @@
 from aiohttp import web
 import os
+import time
 import uuid
 import traceback
 
+from . import metrics
+from . import server
+
 async def handle_upload(request):
     """Handle file upload requests."""
+    started = time.monotonic()
     try:
         reader = await request.multipart()
         field = await reader.next()
         
         if field is None or field.name != "file":
+            metrics.UPLOADS.inc(labels=("rejected",))
             return web.Response(status=400, text="Expected field 'file'")
         
         # 生成唯一文件名，保留原始扩展名
@@ -29,7 +35,10 @@ async def handle_upload(request):
                 if not chunk:
                     break
                 f.write(chunk)
+                metrics.UPLOAD_BYTES.inc(len(chunk))
         
+        metrics.UPLOADS.inc(labels=("ok",))
+        metrics.UPLOAD_SECONDS.observe(time.monotonic() - started)
         return web.json_response({
             "success": True,
             "file_path": file_path,
@@ -37,6 +46,7 @@ async def handle_upload(request):
             "saved_filename": filename
         })
     except Exception as e:
+        metrics.UPLOADS.inc(labels=("error",))
         return web.json_response({
             "success": False,
             "error": str(e),
@@ -64,10 +74,22 @@ async def start_upload_server(host="0.0.0.0", port=8766, upload_dir="./uploads")
     
     # 添加一个简单的状态检查端点
     async def health_check(request):
-        return web.json_response({"status": "ok"})
+        status = {"status": "ok", "session_pool": server.session_pool.stats()}
+        if server.result_cache is not None:
+            status["result_cache"] = server.result_cache.stats()
+        return web.json_response(status)
     
     app.router.add_get("/health", health_check)
     
+    # Prometheus 文本格式的指标
+    async def metrics_handler(request):
+        return web.Response(
+            body=metrics.render().encode("utf-8"),
+            headers={"Content-Type": metrics.CONTENT_TYPE}
+        )
+    
+    app.router.add_get("/metrics", metrics_handler)
+    
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, host, port)
@@ -75,4 +97,5 @@ async def start_upload_server(host="0.0.0.0", port=8766, upload_dir="./uploads")
     
     print(f"File upload server started at http://{host}:{port}/upload")
     print(f"Health check available at http://{host}:{port}/health")
+    print(f"Metrics available at http://{host}:{port}/metrics")
     return runner
\ No newline at end of file
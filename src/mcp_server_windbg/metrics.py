@@ -0,0 +1,304 @@
+"""
+Process-wide metrics in the Prometheus text exposition format.
+
+Instrumented code updates module-level counters, gauges and histograms; an
+update is a dictionary lookup and an addition under an uncontended lock, so
+the hot path (every cdb command and every pipe read) pays next to nothing.
+Values that already live elsewhere (session pool, caches, SSE client queues,
+cdb process memory and CPU) are not mirrored into metrics. They are read by
+collectors when /metrics is scraped.
+
+No client library is needed; the format is plain text:
+https://prometheus.io/docs/instrumenting/exposition_formats/
+"""
+
+import bisect
+import math
+import re
+import threading
+from typing import Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Latency buckets in seconds, from a cached result to a full !analyze -v
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+# Bound on distinct command verbs; further verbs are counted as "other"
+MAX_VERBS = 200
+
+_VERB_PATTERN = re.compile(r"\s*([!.~]?[^\s;]*)")
+_DIGITS = re.compile(r"\d+")
+
+Labels = Tuple[str, ...]
+
+
+class MetricFamily(NamedTuple):
+    """Samples of one metric, as produced by a collector"""
+    name: str
+    type: str
+    documentation: str
+    samples: List[Tuple[Dict[str, str], float]]
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {_escape_help(self.documentation)}", f"# TYPE {self.name} {self.type}"]
+
+    def _labels(self, values: Labels, extra: str = "") -> str:
+        pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter(_Metric):
+    """Monotonically increasing value per label combination"""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1.0, labels: Labels = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, labels: Labels = ()) -> float:
+        return self._values.get(labels, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{self._labels(labels)} {_format(value)}" for labels, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down per label combination"""
+
+    type = "gauge"
+
+    def dec(self, amount: float = 1.0, labels: Labels = ()):
+        self.inc(-amount, labels)
+
+    def set(self, value: float, labels: Labels = ()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in fixed buckets per label combination"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per labels: non-cumulative bucket counts (last one is +Inf), sum
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            state[0][index] += 1
+            state[1][0] += value
+
+    def count(self, labels: Labels = ()) -> int:
+        state = self._values.get(labels)
+        return sum(state[0]) if state else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        lines = self._header()
+        for labels, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = 'le="' + _format(bound) + '"'
+                lines.append(f"{self.name}_bucket{self._labels(labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(labels)} {_format(total)}")
+            lines.append(f"{self.name}_count{self._labels(labels)} {cumulative}")
+        return lines
+
+
+Collector = Callable[[], Iterable[MetricFamily]]
+
+
+class Registry:
+    """Metrics and collectors rendered together by /metrics"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def register_collector(self, collector: Collector):
+        """Add a function called on every scrape to report current values"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def unregister_collector(self, collector: Collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self) -> str:
+        """All metrics in the text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        families: Dict[str, MetricFamily] = {}
+        for collector in collectors:
+            for family in collector():
+                # Several collectors (e.g. two SSE servers) may report the same metric
+                if family.name in families:
+                    families[family.name].samples.extend(family.samples)
+                else:
+                    families[family.name] = family._replace(samples=list(family.samples))
+        for family in families.values():
+            lines.append(f"# HELP {family.name} {_escape_help(family.documentation)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for labels, value in family.samples:
+                pairs = ",".join(f'{key}="{_escape_label(str(val))}"' for key, val in labels.items())
+                lines.append(f"{family.name}{{{pairs}}} {_format(value)}" if pairs else f"{family.name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def command_verb(command: str) -> str:
+    """
+    Label for a cdb command: its first word with numbers replaced, so that
+    `~3s`, `.frame 2` and `dd 0x1000` do not create a label per argument.
+    """
+    match = _VERB_PATTERN.match(command)
+    verb = _DIGITS.sub("N", (match.group(1) if match else "").lower())[:32]
+    return verb or "(empty)"
+
+
+_known_verbs: Dict[str, str] = {}
+
+
+def verb_label(command: str) -> Labels:
+    """command_verb() as a label tuple, bounded to MAX_VERBS distinct values"""
+    verb = command_verb(command)
+    label = _known_verbs.get(verb)
+    if label is None:
+        label = verb if len(_known_verbs) < MAX_VERBS else "other"
+        _known_verbs[verb] = label
+    return (label,)
+
+
+def _format(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+REGISTRY = Registry()
+
+COMMAND_SECONDS = REGISTRY.histogram(
+    "windbg_command_duration_seconds", "Time cdb took to complete a command", ["verb"]
+)
+COMMAND_TIMEOUTS = REGISTRY.counter(
+    "windbg_command_timeouts_total", "Commands or batches that timed out", ["verb"]
+)
+COMMAND_RECOVERIES = REGISTRY.counter(
+    "windbg_command_recoveries_total", "Timed-out commands interrupted, by whether cdb was resynchronized", ["result"]
+)
+COMMANDS_COLLAPSED = REGISTRY.counter(
+    "windbg_commands_collapsed_total", "Commands answered by an identical command already in flight", ["verb"]
+)
+REPLICA_COMMANDS = REGISTRY.counter(
+    "windbg_replica_commands_total", "Commands run on a read replica while the session's cdb was busy"
+)
+CDB_BYTES_READ = REGISTRY.counter(
+    "windbg_cdb_read_bytes_total", "Bytes read from cdb output pipes"
+)
+CDB_BYTES_WRITTEN = REGISTRY.counter(
+    "windbg_cdb_written_bytes_total", "Bytes written to cdb input pipes"
+)
+SESSION_SPAWN_SECONDS = REGISTRY.histogram(
+    "windbg_session_spawn_seconds", "Time to start cdb and load a dump"
+)
+SESSION_LOOKUPS = REGISTRY.counter(
+    "windbg_session_lookups_total", "Session lookups by tool calls, by whether the dump was already open",
+    ["result"]
+)
+UPLOADS = REGISTRY.counter(
+    "windbg_uploads_total", "File uploads by outcome", ["status"]
+)
+UPLOAD_BYTES = REGISTRY.counter(
+    "windbg_upload_bytes_total", "Bytes received by the upload server"
+)
+UPLOAD_SECONDS = REGISTRY.histogram(
+    "windbg_upload_duration_seconds", "Time to receive and store an upload"
+)
+TRANSPORT_MESSAGES = REGISTRY.counter(
+    "windbg_transport_messages_total", "Messages by remote transport and direction", ["transport", "direction"]
+)
+TRANSPORT_BYTES = REGISTRY.counter(
+    "windbg_transport_bytes_total", "Payload bytes by remote transport and direction", ["transport", "direction"]
+)
+TRANSPORT_CONNECTIONS = REGISTRY.gauge(
+    "windbg_transport_connections", "Open client connections by remote transport", ["transport"]
+)
+TRANSPORT_IN_FLIGHT = REGISTRY.gauge(
+    "windbg_transport_requests_in_flight", "Requests being processed by remote transport", ["transport"]
+)
+
+
+def render() -> str:
+    """The metrics of the default registry in the text exposition format"""
+    return REGISTRY.render()
@@ -0,0 +1,360 @@
+"""
+Minimal reader for Windows minidump files.
+
+Parses the MINIDUMP header, the stream directory and the exception, module
+list, thread list, system info and misc info streams straight from a
+memory-mapped file, without starting cdb. This answers "what crashed and
+where" for a dump in milliseconds; everything else still needs the debugger.
+
+Structure layouts follow minidumpapiset.h.
+"""
+
+import mmap
+import os
+import struct
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+MINIDUMP_SIGNATURE = 0x504D444D  # "MDMP"
+
+THREAD_LIST_STREAM = 3
+MODULE_LIST_STREAM = 4
+EXCEPTION_STREAM = 6
+SYSTEM_INFO_STREAM = 7
+MISC_INFO_STREAM = 15
+
+_HEADER = struct.Struct("<IIIIIIQ")
+_DIRECTORY_ENTRY = struct.Struct("<III")
+_THREAD = struct.Struct("<IIIIQQII II")
+_MODULE = struct.Struct("<QIIII52xIIIIQQ")
+_VERSION = struct.Struct("<IIII")
+_EXCEPTION_STREAM = struct.Struct("<IIIIQQII")
+_SYSTEM_INFO = struct.Struct("<HHHBBIIIIIHH")
+_MISC_INFO = struct.Struct("<IIIIII")
+
+MISC1_PROCESS_ID = 0x1
+MISC1_PROCESS_TIMES = 0x2
+
+PROCESSOR_ARCHITECTURES = {
+    0: "x86",
+    5: "ARM",
+    6: "IA64",
+    9: "x64",
+    12: "ARM64",
+}
+
+EXCEPTION_NAMES = {
+    0x80000003: "BREAKPOINT",
+    0x80000004: "SINGLE_STEP",
+    0xC0000005: "ACCESS_VIOLATION",
+    0xC0000008: "INVALID_HANDLE",
+    0xC000001D: "ILLEGAL_INSTRUCTION",
+    0xC0000025: "NONCONTINUABLE_EXCEPTION",
+    0xC000008C: "ARRAY_BOUNDS_EXCEEDED",
+    0xC0000094: "INTEGER_DIVIDE_BY_ZERO",
+    0xC0000095: "INTEGER_OVERFLOW",
+    0xC0000096: "PRIVILEGED_INSTRUCTION",
+    0xC00000FD: "STACK_OVERFLOW",
+    0xC0000374: "HEAP_CORRUPTION",
+    0xC0000409: "STACK_BUFFER_OVERRUN",
+    0xC0000420: "ASSERTION_FAILURE",
+    0xC0000602: "FAIL_FAST_EXCEPTION",
+    0xE06D7363: "CPP_EH_EXCEPTION",
+}
+
+
+class MinidumpError(ValueError):
+    """Raised when a file is not a valid minidump"""
+    pass
+
+
+class MinidumpModule(NamedTuple):
+    base: int
+    size: int
+    checksum: int
+    timestamp: int
+    name: str
+    file_version: Optional[Tuple[int, int, int, int]]
+
+    @property
+    def basename(self) -> str:
+        return self.name.replace("/", "\\").rsplit("\\", 1)[-1]
+
+    def contains(self, address: int) -> bool:
+        return self.base <= address < self.base + self.size
+
+
+class MinidumpThread(NamedTuple):
+    thread_id: int
+    suspend_count: int
+    priority_class: int
+    priority: int
+    teb: int
+    stack_start: int
+    stack_size: int
+
+
+class MinidumpException(NamedTuple):
+    thread_id: int
+    code: int
+    flags: int
+    address: int
+    parameters: Tuple[int, ...]
+
+    @property
+    def name(self) -> str:
+        return EXCEPTION_NAMES.get(self.code, "UNKNOWN_EXCEPTION")
+
+
+class MinidumpSystemInfo(NamedTuple):
+    processor_architecture: int
+    number_of_processors: int
+    product_type: int
+    major_version: int
+    minor_version: int
+    build_number: int
+    platform_id: int
+
+    @property
+    def architecture(self) -> str:
+        return PROCESSOR_ARCHITECTURES.get(self.processor_architecture, f"unknown ({self.processor_architecture})")
+
+
+class MinidumpMiscInfo(NamedTuple):
+    process_id: Optional[int]
+    process_create_time: Optional[int]
+
+
+class MinidumpFile:
+    """
+    Memory-mapped minidump. Streams are parsed lazily on first access and
+    read directly from the mapping through a memoryview.
+
+    Use as a context manager, or call close() when done.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Path to the minidump file
+
+        Raises:
+            MinidumpError: If the file is not a valid minidump
+            OSError: If the file cannot be opened
+        """
+        self.path = path
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size < _HEADER.size:
+                raise MinidumpError(f"File too small to be a minidump: {path}")
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+        self._cache: Dict[str, object] = {}
+
+        try:
+            signature, version, stream_count, directory_rva, _, timestamp, flags = _HEADER.unpack_from(self._view, 0)
+            if signature != MINIDUMP_SIGNATURE:
+                raise MinidumpError(f"Not a minidump (bad signature): {path}")
+            self.version = version & 0xFFFF
+            self.timestamp = timestamp
+            self.flags = flags
+
+            # Stream type -> (rva, size); the first stream of each type wins
+            self.streams: Dict[int, Tuple[int, int]] = {}
+            for i in range(stream_count):
+                stream_type, size, rva = _DIRECTORY_ENTRY.unpack_from(
+                    self._view, directory_rva + i * _DIRECTORY_ENTRY.size
+                )
+                self.streams.setdefault(stream_type, (rva, size))
+        except struct.error:
+            self.close()
+            raise MinidumpError(f"Truncated minidump header or directory: {path}")
+        except MinidumpError:
+            self.close()
+            raise
+
+    def close(self):
+        """Release the memory mapping"""
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _stream(self, stream_type: int) -> Optional[Tuple[int, int]]:
+        location = self.streams.get(stream_type)
+        if location is None or location[0] + location[1] > len(self._view):
+            return None
+        return location
+
+    def _read_string(self, rva: int) -> str:
+        """Read a MINIDUMP_STRING (length-prefixed UTF-16LE)"""
+        if rva == 0 or rva + 4 > len(self._view):
+            return ""
+        (length,) = struct.unpack_from("<I", self._view, rva)
+        return str(self._view[rva + 4:rva + 4 + length], "utf-16-le", "replace")
+
+    def _lazy(self, name: str, parse):
+        if name not in self._cache:
+            try:
+                self._cache[name] = parse()
+            except struct.error:
+                raise MinidumpError(f"Corrupt {name} stream in {self.path}")
+        return self._cache[name]
+
+    @property
+    def exception(self) -> Optional[MinidumpException]:
+        """The exception record, if the dump has one"""
+        def parse():
+            location = self._stream(EXCEPTION_STREAM)
+            if location is None:
+                return None
+            rva = location[0]
+            thread_id, _, code, flags, _, address, parameter_count, _ = _EXCEPTION_STREAM.unpack_from(self._view, rva)
+            parameter_count = min(parameter_count, 15)
+            parameters = struct.unpack_from(f"<{parameter_count}Q", self._view, rva + _EXCEPTION_STREAM.size)
+            return MinidumpException(thread_id, code, flags, address, parameters)
+        return self._lazy("exception", parse)
+
+    @property
+    def modules(self) -> List[MinidumpModule]:
+        """Loaded modules, in dump order"""
+        def parse():
+            location = self._stream(MODULE_LIST_STREAM)
+            if location is None:
+                return []
+            rva = location[0]
+            (count,) = struct.unpack_from("<I", self._view, rva)
+            modules = []
+            for i in range(count):
+                offset = rva + 4 + i * _MODULE.size
+                base, size, checksum, timestamp, name_rva, *_ = _MODULE.unpack_from(self._view, offset)
+                signature, _, version_ms, version_ls = _VERSION.unpack_from(self._view, offset + 24)
+                file_version = None
+                if signature == 0xFEEF04BD:
+                    file_version = (version_ms >> 16, version_ms & 0xFFFF, version_ls >> 16, version_ls & 0xFFFF)
+                modules.append(MinidumpModule(base, size, checksum, timestamp, self._read_string(name_rva), file_version))
+            return modules
+        return self._lazy("modules", parse)
+
+    @property
+    def threads(self) -> List[MinidumpThread]:
+        """Threads, in dump order"""
+        def parse():
+            location = self._stream(THREAD_LIST_STREAM)
+            if location is None:
+                return []
+            rva = location[0]
+            (count,) = struct.unpack_from("<I", self._view, rva)
+            threads = []
+            for i in range(count):
+                thread_id, suspend, priority_class, priority, teb, stack_start, stack_size, _, _, _ = _THREAD.unpack_from(
+                    self._view, rva + 4 + i * _THREAD.size
+                )
+                threads.append(MinidumpThread(thread_id, suspend, priority_class, priority, teb, stack_start, stack_size))
+            return threads
+        return self._lazy("threads", parse)
+
+    @property
+    def thread_count(self) -> int:
+        """Number of threads, read without parsing the thread records"""
+        location = self._stream(THREAD_LIST_STREAM)
+        if location is None:
+            return 0
+        return struct.unpack_from("<I", self._view, location[0])[0]
+
+    @property
+    def system_info(self) -> Optional[MinidumpSystemInfo]:
+        """Operating system and processor information"""
+        def parse():
+            location = self._stream(SYSTEM_INFO_STREAM)
+            if location is None:
+                return None
+            arch, _, _, processors, product_type, major, minor, build, platform_id, _, _, _ = _SYSTEM_INFO.unpack_from(
+                self._view, location[0]
+            )
+            return MinidumpSystemInfo(arch, processors, product_type, major, minor, build, platform_id)
+        return self._lazy("system_info", parse)
+
+    @property
+    def misc_info(self) -> Optional[MinidumpMiscInfo]:
+        """Process id and creation time, when recorded"""
+        def parse():
+            location = self._stream(MISC_INFO_STREAM)
+            if location is None or location[1] < _MISC_INFO.size:
+                return None
+            _, flags, process_id, create_time, _, _ = _MISC_INFO.unpack_from(self._view, location[0])
+            return MinidumpMiscInfo(
+                process_id if flags & MISC1_PROCESS_ID else None,
+                create_time if flags & MISC1_PROCESS_TIMES else None,
+            )
+        return self._lazy("misc_info", parse)
+
+    def module_for_address(self, address: int) -> Optional[MinidumpModule]:
+        """The module whose image contains an address"""
+        for module in self.modules:
+            if module.contains(address):
+                return module
+        return None
+
+    @property
+    def faulting_module(self) -> Optional[MinidumpModule]:
+        """The module containing the exception address"""
+        exception = self.exception
+        return self.module_for_address(exception.address) if exception else None
+
+
+def format_exception_summary(dump: MinidumpFile) -> Optional[str]:
+    """One-line description of the crash, e.g. 'ACCESS_VIOLATION (0xc0000005) in app.exe+0x1234'"""
+    exception = dump.exception
+    if exception is None:
+        return None
+    module = dump.faulting_module
+    location = f"{module.basename}+0x{exception.address - module.base:x}" if module else f"0x{exception.address:x}"
+    return f"{exception.name} (0x{exception.code:08x}) in {location}"
+
+
+def format_crash_information(dump: MinidumpFile) -> List[str]:
+    """Crash overview lines equivalent to the essentials of .lastevent"""
+    lines = []
+    misc = dump.misc_info
+    exception = dump.exception
+    if exception is not None:
+        pid = f"{misc.process_id:x}" if misc and misc.process_id is not None else "?"
+        lines.append(f"Last event: {pid}.{exception.thread_id:x}: {format_exception_summary(dump)}")
+        lines.append(f"  Exception address: 0x{exception.address:x}")
+        if exception.parameters:
+            lines.append("  Parameters: " + ", ".join(f"0x{value:x}" for value in exception.parameters))
+    else:
+        lines.append("No exception record in dump")
+    system = dump.system_info
+    if system is not None:
+        lines.append(
+            f"System: Windows {system.major_version}.{system.minor_version}.{system.build_number} "
+            f"{system.architecture}, {system.number_of_processors} processor(s)"
+        )
+    lines.append(f"Threads: {dump.thread_count}, Modules: {len(dump.modules)}")
+    return lines
+
+
+def read_exception_summary(path: str) -> Optional[str]:
+    """format_exception_summary() for a file, or None if it cannot be parsed"""
+    try:
+        with MinidumpFile(path) as dump:
+            return format_exception_summary(dump)
+    except (MinidumpError, OSError, ValueError):
+        return None
+
+
+def read_crash_information(path: str) -> Optional[List[str]]:
+    """format_crash_information() for a file, or None if it cannot be parsed"""
+    try:
+        with MinidumpFile(path) as dump:
+            return format_crash_information(dump)
+    except (MinidumpError, OSError, ValueError):
+        return None
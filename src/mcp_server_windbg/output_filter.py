@@ -0,0 +1,185 @@
+"""
+Server-side filtering of command output (grep, head/tail, column selection).
+
+A filter is fed the output of a running command chunk by chunk and keeps
+only the lines that make it into the filtered view, so the full output of a
+command like `lm v` or `!heap -stat` is never held when only a few lines of
+it are wanted. Once the view is complete (head or byte limit reached), the
+filter reports done and the rest of the command's output can be skipped.
+
+Stages are applied in this order: grep/invert, fields, head, tail, max_bytes.
+"""
+
+import collections
+import re
+from typing import Deque, List, Optional
+
+
+class OutputFilter:
+    """Streaming filter over the output lines of one command"""
+
+    def __init__(
+        self,
+        grep: Optional[str] = None,
+        invert: bool = False,
+        head: Optional[int] = None,
+        tail: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        fields: Optional[List[int]] = None,
+    ):
+        """
+        Args:
+            grep: Regular expression; only lines matching it are kept
+            invert: Keep the lines not matching grep instead
+            head: Keep only the first N lines
+            tail: Keep only the last N lines
+            max_bytes: Stop once the filtered output reaches this size in UTF-8
+            fields: 1-based whitespace-separated columns to keep (negative
+                numbers count from the end of the line); lines without any of
+                them are dropped
+
+        Raises:
+            ValueError: If the regular expression or a limit is invalid
+        """
+        try:
+            self.pattern = re.compile(grep) if grep else None
+        except re.error as e:
+            raise ValueError(f"Invalid grep pattern {grep!r}: {e}")
+        for name, value in (("head", head), ("tail", tail), ("max_bytes", max_bytes)):
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must not be negative")
+        if fields is not None and 0 in fields:
+            raise ValueError("fields are numbered from 1")
+        self.invert = invert
+        self.head = head
+        self.tail = tail
+        self.max_bytes = max_bytes
+        self.fields = fields or None
+
+        self.lines_seen = 0
+        self.lines_matched = 0
+        self.truncated = False
+        self.done = head == 0 and tail is None
+        self._kept: List[str] = []
+        self._tail: Optional[Deque[str]] = collections.deque(maxlen=tail) if tail is not None else None
+        self._bytes = 0
+
+    @property
+    def active(self) -> bool:
+        """Whether the filter changes the output at all"""
+        return any((
+            self.pattern is not None, self.head is not None, self.tail is not None,
+            self.max_bytes is not None, self.fields is not None,
+        ))
+
+    def feed(self, lines: List[str]) -> List[str]:
+        """
+        Filter the next chunk of output.
+
+        Returns:
+            The lines of the chunk that are part of the filtered output. With
+            tail, lines are only known at the end and none are returned here.
+        """
+        if self.done:
+            return []
+        start = len(self._kept)
+        for line in lines:
+            self.lines_seen += 1
+            if self.pattern is not None and (self.pattern.search(line) is None) != self.invert:
+                continue
+            if self.fields is not None:
+                line = self._select_fields(line)
+                if line is None:
+                    continue
+            self.lines_matched += 1
+            if self.head is not None and self.lines_matched > self.head:
+                self.truncated = True
+                self.done = True
+                break
+            if self._tail is not None:
+                if len(self._tail) == self._tail.maxlen:
+                    self.truncated = True
+                self._tail.append(line)
+            elif not self._keep(line):
+                break
+            if self.head is not None and self.lines_matched == self.head and self._tail is None:
+                # Stop reading as soon as the view is complete, whatever follows
+                self.done = True
+                break
+        return self._kept[start:]
+
+    def finish(self) -> List[str]:
+        """
+        End of output: move the lines held back for tail into the result.
+
+        Returns:
+            The lines added to the filtered output
+        """
+        if self._tail is None:
+            return []
+        lines = list(self._tail)
+        self._tail = None
+        if self.max_bytes is not None:
+            # Keep the end of the output, which is what tail asked for
+            first = len(lines)
+            size = 0
+            while first > 0:
+                size += self._line_size(lines[first - 1])
+                if size > self.max_bytes:
+                    self.truncated = True
+                    break
+                first -= 1
+            lines = lines[first:]
+        self._kept.extend(lines)
+        return lines
+
+    def result(self) -> List[str]:
+        """The filtered output"""
+        self.finish()
+        return self._kept
+
+    def describe(self) -> str:
+        """One-line summary of the filter and what it kept"""
+        parts = []
+        if self.pattern is not None:
+            parts.append(f"grep{' -v' if self.invert else ''} {self.pattern.pattern!r}")
+        if self.fields is not None:
+            parts.append(f"fields {','.join(map(str, self.fields))}")
+        if self.head is not None:
+            parts.append(f"head {self.head}")
+        if self.tail is not None:
+            parts.append(f"tail {self.tail}")
+        if self.max_bytes is not None:
+            parts.append(f"max {self.max_bytes} bytes")
+        summary = f"Filter: {' | '.join(parts)}; kept {len(self._kept)} of {self.lines_seen} lines"
+        if self.done:
+            summary += " (stopped reading early)"
+        elif self.truncated:
+            summary += " (truncated)"
+        return summary
+
+    def _keep(self, line: str) -> bool:
+        if self.max_bytes is not None:
+            size = self._line_size(line)
+            if self._bytes + size > self.max_bytes:
+                self.truncated = True
+                self.done = True
+                return False
+            self._bytes += size
+        self._kept.append(line)
+        return True
+
+    def _select_fields(self, line: str) -> Optional[str]:
+        columns = line.split()
+        count = len(columns)
+        selected = [
+            columns[field - 1 if field > 0 else field]
+            for field in self.fields
+            if -count <= field <= count
+        ]
+        return " ".join(selected) if selected else None
+
+    @staticmethod
+    def _line_size(line: str) -> int:
+        # Size including the newline, as returned to the client
+        return len(line.encode("utf-8", errors="replace")) + 1
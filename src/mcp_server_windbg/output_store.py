@@ -0,0 +1,158 @@
+"""
+Server-side store for large command outputs, read back page by page.
+
+An output is kept as a single UTF-8 buffer plus an array of line start
+offsets, so a page of lines is one slice of the buffer located by binary
+search over the offsets. Clients get the first page of a large result and a
+cursor; further pages are read with read_windbg_output. The store holds the
+most recently used outputs up to a total size and evicts the oldest first.
+"""
+
+import bisect
+import threading
+import uuid
+from array import array
+from collections import OrderedDict
+from itertools import accumulate
+from typing import List, NamedTuple, Optional, Tuple
+
+# Page size in bytes of UTF-8 output
+DEFAULT_PAGE_BYTES = 64 * 1024
+
+# Total size of the outputs kept for paging
+DEFAULT_STORE_SIZE_MB = 64
+
+
+class StoredOutput:
+    """Output lines of one command as a UTF-8 buffer with line offsets"""
+
+    __slots__ = ("command", "dump_path", "data", "offsets")
+
+    def __init__(self, command: str, dump_path: str, lines: List[str]):
+        encoded = [line.encode("utf-8", errors="replace") for line in lines]
+        self.command = command
+        self.dump_path = dump_path
+        self.data = b"\n".join(encoded) + b"\n" if encoded else b""
+        # offsets[i] is where line i starts; offsets[-1] is the end of the buffer
+        self.offsets = array("Q", accumulate((len(line) + 1 for line in encoded), initial=0))
+
+    @property
+    def line_count(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    def page(self, start_line: int, max_bytes: int = DEFAULT_PAGE_BYTES) -> Tuple[str, int]:
+        """
+        Read the lines from start_line that fit into max_bytes (at least one line).
+
+        Returns:
+            The lines as text (without a trailing newline) and the index of
+            the first line not returned, which is line_count at the end
+        """
+        start_line = max(0, min(start_line, self.line_count))
+        start = self.offsets[start_line]
+        end_line = bisect.bisect_right(self.offsets, start + max_bytes, lo=start_line) - 1
+        end_line = min(max(end_line, start_line + 1), self.line_count)
+        # Decode straight from a view of the buffer, leaving out the last newline
+        stop = max(start, self.offsets[end_line] - 1)
+        return str(memoryview(self.data)[start:stop], "utf-8"), end_line
+
+
+class OutputPage(NamedTuple):
+    output: StoredOutput
+    text: str
+    start_line: int
+    end_line: int
+    next_cursor: Optional[str]
+
+
+def encode_cursor(output_id: str, line: int) -> str:
+    return f"{output_id}:{line}"
+
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    """
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    output_id, _, line = cursor.strip().partition(":")
+    if not output_id or not line.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return output_id, int(line)
+
+
+class OutputStore:
+    """Thread-safe, size-bounded LRU store of command outputs"""
+
+    def __init__(self, max_size_mb: int = DEFAULT_STORE_SIZE_MB):
+        """
+        Args:
+            max_size_mb: Total size of the stored outputs; the least recently
+                read outputs are evicted beyond it
+        """
+        self.max_bytes = max_size_mb * 1024 * 1024
+        self._outputs: "OrderedDict[str, StoredOutput]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def put(self, output: StoredOutput) -> str:
+        """Store an output and return its id"""
+        output_id = uuid.uuid4().hex[:16]
+        with self._lock:
+            self._outputs[output_id] = output
+            self._size += output.size
+            # Never evict the output just added, even if it alone exceeds the limit
+            while self._size > self.max_bytes and len(self._outputs) > 1:
+                _, evicted = self._outputs.popitem(last=False)
+                self._size -= evicted.size
+        return output_id
+
+    def get(self, output_id: str) -> Optional[StoredOutput]:
+        with self._lock:
+            output = self._outputs.get(output_id)
+            if output is not None:
+                self._outputs.move_to_end(output_id)
+            return output
+
+    def first_page(self, command: str, dump_path: str, lines: List[str],
+                   max_bytes: int = DEFAULT_PAGE_BYTES) -> Optional[OutputPage]:
+        """
+        Page a command's output if it is larger than one page.
+
+        Returns:
+            The first page, or None if the output fits into a single page
+            (it is then not stored)
+        """
+        # Character count is a lower bound of the UTF-8 size
+        if sum(map(len, lines)) + len(lines) <= max_bytes:
+            return None
+        output = StoredOutput(command, dump_path, lines)
+        if output.size <= max_bytes:
+            return None
+        return self._page(self.put(output), output, 0, max_bytes)
+
+    def read(self, cursor: str, max_bytes: int = DEFAULT_PAGE_BYTES) -> OutputPage:
+        """
+        Read the page a cursor points to.
+
+        Raises:
+            ValueError: If the cursor is malformed
+            KeyError: If the output is no longer stored
+        """
+        output_id, line = decode_cursor(cursor)
+        output = self.get(output_id)
+        if output is None:
+            raise KeyError(output_id)
+        return self._page(output_id, output, line, max_bytes)
+
+    def _page(self, output_id: str, output: StoredOutput, start_line: int, max_bytes: int) -> OutputPage:
+        text, end_line = output.page(start_line, max_bytes)
+        next_cursor = encode_cursor(output_id, end_line) if end_line < output.line_count else None
+        return OutputPage(output, text, min(start_line, end_line), end_line, next_cursor)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"outputs": len(self._outputs), "bytes": self._size, "max_bytes": self.max_bytes}
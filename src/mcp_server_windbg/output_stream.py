@@ -0,0 +1,60 @@
+"""
+Incremental delivery of command output to the client that asked for it.
+
+The transport serving a request (stdio, SSE or WebSocket) installs an output
+sink for the duration of the tool call; run_windbg_cmd passes every chunk of
+cdb output to it while the command is still running. The sink lives in a
+context variable, so tool handlers need no transport-specific arguments and
+concurrent requests each see their own sink.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Iterator, List, Optional
+
+OutputSink = Callable[[List[str]], Awaitable[None]]
+
+_current_sink: ContextVar[Optional[OutputSink]] = ContextVar("output_sink", default=None)
+
+
+def current_output_sink() -> Optional[OutputSink]:
+    """The sink of the request being handled, or None when nobody is listening"""
+    return _current_sink.get()
+
+
+@contextmanager
+def output_sink(sink: Optional[OutputSink]) -> Iterator[None]:
+    """Install a sink for the commands run inside the with-block"""
+    token = _current_sink.set(sink)
+    try:
+        yield
+    finally:
+        _current_sink.reset(token)
+
+
+def progress_output_sink(request_context: Any) -> Optional[OutputSink]:
+    """
+    Sink sending output chunks as MCP progress notifications.
+
+    Args:
+        request_context: The MCP request context of the current tool call
+
+    Returns:
+        A sink, or None if the client did not ask for progress (no progressToken)
+    """
+    meta = getattr(request_context, "meta", None)
+    progress_token = getattr(meta, "progressToken", None) if meta is not None else None
+    if progress_token is None:
+        return None
+
+    lines_sent = 0
+
+    async def send(lines: List[str]) -> None:
+        nonlocal lines_sent
+        lines_sent += len(lines)
+        # Progress counts output lines; the chunk itself travels as the message
+        await request_context.session.send_progress_notification(
+            progress_token, lines_sent, message="\n".join(lines)
+        )
+
+    return send
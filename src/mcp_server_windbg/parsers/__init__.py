@@ -0,0 +1,67 @@
+"""
+Structured parsers for common cdb command outputs.
+
+Each parser turns the raw output lines of one command into compact typed
+records: modules (`lm`), threads (`~`), stack frames (`k`, `kb`, `kn` ...),
+the stacks of all threads (`~*kb` ...), the last event (`.lastevent`) and
+the key/value entries of `!analyze -v`.
+Parsers are streaming: they can be fed the output chunk by chunk as cdb
+produces it, or iterate lazily over the lines with parse().
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from .analyze import AnalysisEntry, AnalyzeParser
+from .base import OutputParser, Record
+from .lastevent import LastEvent, LastEventParser
+from .modules import Module, ModuleParser
+from .stack import StackFrame, StackParser, parse_frame_line, split_call_site
+from .thread_stacks import ThreadStack, ThreadStacksParser
+from .threads import Thread, ThreadParser
+
+__all__ = [
+    "AnalysisEntry", "AnalyzeParser", "LastEvent", "LastEventParser", "Module", "ModuleParser",
+    "OutputParser", "Record", "StackFrame", "StackParser", "Thread", "ThreadParser",
+    "ThreadStack", "ThreadStacksParser",
+    "STRUCTURED_COMMANDS", "parse_frame_line", "parse_output", "parser_for", "split_call_site",
+]
+
+# Commands with a parser; verbose module lists (`lmv`, `lm v`) have a different layout
+_PARSERS: List[Tuple["re.Pattern[str]", Type[OutputParser]]] = [
+    (re.compile(r"^lm(?![a-z]*v)[a-z]*(?:\s+(?!v(?:\s|$))\S+)*$", re.IGNORECASE), ModuleParser),
+    (re.compile(r"^~\*?$"), ThreadParser),
+    (re.compile(r"^k[bnpvfL]*(?:\s+\S+)*$"), StackParser),
+    (re.compile(r"^~\*\s*k[bnpvfL]*(?:\s+\S+)*$"), ThreadStacksParser),
+    (re.compile(r"^\.lastevent$", re.IGNORECASE), LastEventParser),
+    (re.compile(r"^!analyze(?:\s+\S+)*$", re.IGNORECASE), AnalyzeParser),
+]
+
+STRUCTURED_COMMANDS = "lm, ~, k/kb/kn/kp/kv, ~*k/~*kb/~*kn, .lastevent, !analyze"
+
+
+def parser_for(command: str) -> Optional[OutputParser]:
+    """A new parser for the output of a command, or None if it has none"""
+    command = " ".join(command.split())
+    for pattern, parser_class in _PARSERS:
+        if pattern.match(command):
+            return parser_class()
+    return None
+
+
+def parse_output(command: str, lines: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse the complete output of a command.
+
+    Returns:
+        {"command", "kind", "records"} with the records as dicts, or None if
+        the command has no parser
+    """
+    parser = parser_for(command)
+    if parser is None:
+        return None
+    return {
+        "command": command,
+        "kind": parser.kind,
+        "records": [record.to_dict() for record in parser.parse(lines)],
+    }
@@ -0,0 +1,71 @@
+"""
+Parser for `!analyze -v` output.
+
+The analysis is a sequence of `KEY: value` entries starting in the first
+column, each value possibly continuing over the following lines (e.g. the
+EXCEPTION_RECORD or STACK_TEXT sections). Text before the first key (the
+banner) is skipped. The frames of STACK_TEXT are parsed as well.
+"""
+
+import re
+from typing import List, Optional
+
+from .base import OutputParser, Record
+from .stack import StackFrame, parse_frame_line
+
+_KEY = re.compile(r"^(?P<key>[A-Z][A-Z0-9_]*):(?:\s+(?P<value>.*?))?\s*$")
+
+
+class AnalysisEntry(Record):
+    """One `KEY: value` entry of the analysis; frames only for STACK_TEXT"""
+
+    __slots__ = ("key", "value", "frames")
+
+    def __init__(self, key: str, value: str, frames: Optional[List[StackFrame]] = None):
+        self.key = key
+        self.value = value
+        self.frames = frames
+
+
+class AnalyzeParser(OutputParser):
+    """
+    Streaming parser for `!analyze -v` output. An entry is returned when the
+    next key starts, the last one by finish().
+    """
+
+    kind = "analysis"
+
+    def __init__(self):
+        super().__init__()
+        self._key: Optional[str] = None
+        self._lines: List[str] = []
+
+    def parse_line(self, line: str) -> Optional[AnalysisEntry]:
+        match = _KEY.match(line)
+        if match is None:
+            if self._key is not None:
+                self._lines.append(line)
+            return None
+        entry = self._complete()
+        self._key = match.group("key")
+        self._lines = [match.group("value")] if match.group("value") else []
+        return entry
+
+    def finish(self) -> List[AnalysisEntry]:
+        entry = self._complete()
+        return [entry] if entry is not None else []
+
+    def _complete(self) -> Optional[AnalysisEntry]:
+        if self._key is None:
+            return None
+        lines = self._lines
+        while lines and not lines[-1].strip():
+            lines.pop()
+        while lines and not lines[0].strip():
+            lines.pop(0)
+        frames = None
+        if self._key == "STACK_TEXT":
+            frames = [frame for frame in map(parse_frame_line, lines) if frame is not None]
+        entry = AnalysisEntry(self._key, "\n".join(lines), frames)
+        self._key, self._lines = None, []
+        return entry
@@ -0,0 +1,110 @@
+"""
+Common parts of the output parsers: compact records and the streaming parser interface.
+"""
+
+import re
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Prompt that precedes the first line of a command's output
+_PROMPT_PREFIX = re.compile(r"^\d+:\d+(?::[\w]+)?> ")
+_HEX = re.compile(r"^(?:0x)?[0-9a-fA-F`]+$")
+
+
+def parse_hex(text: str) -> int:
+    """Parse a cdb hex number, with or without 0x prefix and ` separator"""
+    return int(text.replace("`", ""), 16)
+
+
+def is_hex(text: str) -> bool:
+    return _HEX.match(text) is not None
+
+
+class Record:
+    """
+    Base of parsed records. Records keep their fields in __slots__ rather
+    than a per-instance dict, so thousands of modules or threads stay small.
+    Addresses are stored as ints and shown as hex strings by to_dict().
+    """
+
+    __slots__ = ()
+    # Fields shown as hex strings
+    _hex_fields: Tuple[str, ...] = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-serializable representation"""
+        result = {}
+        for name in self.__slots__:
+            value = getattr(self, name)
+            if value is not None and name in self._hex_fields:
+                value = f"0x{value:x}"
+            elif isinstance(value, tuple):
+                value = [f"0x{item:x}" if isinstance(item, int) else item for item in value]
+            elif isinstance(value, Record):
+                value = value.to_dict()
+            elif isinstance(value, list):
+                value = [item.to_dict() if isinstance(item, Record) else item for item in value]
+            result[name] = value
+        return result
+
+    def _values(self) -> Tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and other._values() == self._values()
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class OutputParser:
+    """
+    Streaming parser for the output of one command.
+
+    Like OutputFilter, a parser is fed the output chunk by chunk as it comes
+    off the cdb pipe and returns the records completed by each chunk, so
+    the raw output never has to be held in full. parse() does the same
+    lazily over any iterable of lines.
+    """
+
+    # Name of the record type, used in structured results
+    kind = ""
+
+    def __init__(self):
+        self._first = True
+
+    def feed(self, lines: List[str]) -> List[Record]:
+        """
+        Parse the next chunk of output.
+
+        Returns:
+            The records completed by the chunk
+        """
+        records = []
+        for line in lines:
+            if self._first:
+                self._first = False
+                line = _PROMPT_PREFIX.sub("", line, count=1)
+            record = self.parse_line(line)
+            if record is not None:
+                records.append(record)
+        return records
+
+    def finish(self) -> List[Record]:
+        """
+        End of output.
+
+        Returns:
+            The records that were still incomplete
+        """
+        return []
+
+    def parse(self, lines: Iterable[str]) -> Iterator[Record]:
+        """Parse lines lazily, yielding each record as soon as it is complete"""
+        for line in lines:
+            yield from self.feed([line])
+        yield from self.finish()
+
+    def parse_line(self, line: str) -> Optional[Record]:
+        """Parse one line; returns the record it completes, if any"""
+        raise NotImplementedError
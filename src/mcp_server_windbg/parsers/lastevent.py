@@ -0,0 +1,74 @@
+"""
+Parser for `.lastevent` output.
+"""
+
+import re
+from typing import List, Optional
+
+from .base import OutputParser, Record, parse_hex
+
+_LAST_EVENT = re.compile(
+    r"^\s*Last event:\s*(?:(?P<pid>[0-9a-fA-F]+)\.(?P<tid>[0-9a-fA-F]+):\s*)?(?P<description>.*?)"
+    r"(?:\s+-\s+code\s+(?P<code>[0-9a-fA-F]{8}))?(?:\s+\((?P<chance>[^)]*)\))?\s*$"
+)
+_DEBUGGER_TIME = re.compile(r"^\s*debugger time:\s*(?P<time>.+?)\s*$")
+
+
+class LastEvent(Record):
+    """The event that stopped the target, e.g. the exception of a crash dump"""
+
+    __slots__ = ("process_id", "thread_id", "description", "code", "chance", "debugger_time")
+    _hex_fields = ("process_id", "thread_id", "code")
+
+    def __init__(
+        self,
+        description: str,
+        process_id: Optional[int] = None,
+        thread_id: Optional[int] = None,
+        code: Optional[int] = None,
+        chance: Optional[str] = None,
+        debugger_time: Optional[str] = None,
+    ):
+        self.process_id = process_id
+        self.thread_id = thread_id
+        self.description = description
+        self.code = code
+        self.chance = chance
+        self.debugger_time = debugger_time
+
+
+class LastEventParser(OutputParser):
+    """
+    Streaming parser for `.lastevent` output. The event is complete only
+    with the debugger time on the following line, so it is returned by
+    finish() unless the output ends first.
+    """
+
+    kind = "last_event"
+
+    def __init__(self):
+        super().__init__()
+        self._event: Optional[LastEvent] = None
+
+    def parse_line(self, line: str) -> Optional[LastEvent]:
+        match = _LAST_EVENT.match(line)
+        if match:
+            pid, tid, code = match.group("pid"), match.group("tid"), match.group("code")
+            self._event = LastEvent(
+                match.group("description"),
+                process_id=parse_hex(pid) if pid else None,
+                thread_id=parse_hex(tid) if tid else None,
+                code=parse_hex(code) if code else None,
+                chance=match.group("chance"),
+            )
+            return None
+        match = _DEBUGGER_TIME.match(line)
+        if match and self._event is not None:
+            event, self._event = self._event, None
+            event.debugger_time = match.group("time")
+            return event
+        return None
+
+    def finish(self) -> List[LastEvent]:
+        event, self._event = self._event, None
+        return [event] if event is not None else []
@@ -0,0 +1,65 @@
+"""
+Parser for the module list printed by `lm` (and `lm m pattern`, `lm o` ...;
+not the verbose `lmv` format).
+"""
+
+import re
+from typing import Optional
+
+from .base import OutputParser, Record, parse_hex
+
+_MODULE_LINE = re.compile(
+    r"^(?P<start>[0-9a-fA-F`]{8,})\s+(?P<end>[0-9a-fA-F`]{8,})\s+(?P<name>\S+)"
+    r"(?:\s+[A-Z#]{1,2}(?=\s+\())?"
+    r"(?:\s+\((?P<symbols>[^)]*)\))?"
+    r"(?:\s+(?P<symbol_file>\S.*?))?\s*$"
+)
+_UNLOADED = re.compile(r"^\s*Unloaded modules:", re.IGNORECASE)
+
+
+class Module(Record):
+    """A loaded or unloaded module"""
+
+    __slots__ = ("start", "end", "name", "symbols", "symbol_file", "unloaded")
+    _hex_fields = ("start", "end")
+
+    def __init__(
+        self,
+        start: int,
+        end: int,
+        name: str,
+        symbols: Optional[str] = None,
+        symbol_file: Optional[str] = None,
+        unloaded: bool = False,
+    ):
+        self.start = start
+        self.end = end
+        self.name = name
+        self.symbols = symbols
+        self.symbol_file = symbol_file
+        self.unloaded = unloaded
+
+
+class ModuleParser(OutputParser):
+    """Streaming parser for `lm` output"""
+
+    kind = "modules"
+
+    def __init__(self):
+        super().__init__()
+        self._unloaded = False
+
+    def parse_line(self, line: str) -> Optional[Module]:
+        match = _MODULE_LINE.match(line)
+        if match is None:
+            if _UNLOADED.match(line):
+                self._unloaded = True
+            return None
+        return Module(
+            parse_hex(match.group("start")),
+            parse_hex(match.group("end")),
+            match.group("name"),
+            symbols=match.group("symbols"),
+            symbol_file=match.group("symbol_file"),
+            unloaded=self._unloaded,
+        )
@@ -0,0 +1,127 @@
+"""
+Parser for stack traces: `k`, `kb`, `kn`, `kp`, `kv` and the STACK_TEXT
+section of `!analyze -v`, on x64 (`Child-SP RetAddr : Args : Call Site`) and
+x86 (`ChildEBP RetAddr Args to Child`) targets.
+"""
+
+import re
+from typing import Optional, Tuple
+
+from .base import OutputParser, Record, is_hex, parse_hex
+
+# Frame number (two hex digits) or a stack address at the start of the line
+_FRAME_LINE = re.compile(r"^\s*(?:[0-9a-fA-F]{2}\s|[0-9a-fA-F`]{8,}\s)")
+_SOURCE_INFO = re.compile(r"\s*\[(?P<file>[^\]]*?)\s*@\s*(?P<line>\d+)\]\s*$")
+_SYMBOL_START = re.compile(r"[\w.\-]+!")
+_CALL_SITE = re.compile(
+    r"^(?P<module>[\w.\-]+)(?:!(?P<function>.+?))?(?:\+(?P<offset>0x[0-9a-fA-F`]+|[0-9a-fA-F`]+))?$"
+)
+
+
+class StackFrame(Record):
+    """One frame of a stack trace. Fields cdb did not print are None."""
+
+    __slots__ = (
+        "number", "child_sp", "return_address", "args", "call_site",
+        "module", "function", "offset", "source_file", "source_line",
+    )
+    _hex_fields = ("child_sp", "return_address", "offset")
+
+    def __init__(
+        self,
+        call_site: str,
+        number: Optional[int] = None,
+        child_sp: Optional[int] = None,
+        return_address: Optional[int] = None,
+        args: Optional[Tuple[int, ...]] = None,
+        module: Optional[str] = None,
+        function: Optional[str] = None,
+        offset: Optional[int] = None,
+        source_file: Optional[str] = None,
+        source_line: Optional[int] = None,
+    ):
+        self.number = number
+        self.child_sp = child_sp
+        self.return_address = return_address
+        self.args = args
+        self.call_site = call_site
+        self.module = module
+        self.function = function
+        self.offset = offset
+        self.source_file = source_file
+        self.source_line = source_line
+
+
+def split_call_site(call_site: str) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+    """
+    Split `module!function+offset` into its parts.
+
+    Returns:
+        (module, function, offset); all None for a bare address or module name
+    """
+    match = _CALL_SITE.match(call_site)
+    if not match or (match.group("function") is None and match.group("offset") is None):
+        return None, None, None
+    offset = match.group("offset")
+    return match.group("module"), match.group("function"), parse_hex(offset) if offset else 0
+
+
+def parse_frame_line(line: str) -> Optional[StackFrame]:
+    """Parse one line of a stack trace; None if it is not a frame"""
+    if not _FRAME_LINE.match(line):
+        return None
+    source_file = source_line = None
+    source = _SOURCE_INFO.search(line)
+    if source:
+        source_file, source_line = source.group("file"), int(source.group("line"))
+        line = line[:source.start()]
+
+    args_text = ""
+    if " : " in line:
+        parts = line.split(" : ")
+        head, call_site = parts[0], parts[-1]
+        if len(parts) > 2:
+            args_text = parts[1]
+    else:
+        symbol = _SYMBOL_START.search(line)
+        if symbol:
+            head, call_site = line[:symbol.start()], line[symbol.start():]
+        else:
+            head, _, call_site = line.rstrip().rpartition(" ")
+    call_site = call_site.strip()
+    if not call_site:
+        return None
+
+    tokens = head.split()
+    number = None
+    if tokens and len(tokens[0]) == 2 and is_hex(tokens[0]):
+        number = int(tokens.pop(0), 16)
+    # Inline frames show dashes instead of addresses
+    addresses = [parse_hex(token) if is_hex(token) else None for token in tokens]
+    addresses += [None] * (2 - len(addresses))
+    args = [parse_hex(token) for token in args_text.split() if is_hex(token)] or [
+        address for address in addresses[2:] if address is not None
+    ]
+
+    module, function, offset = split_call_site(call_site)
+    return StackFrame(
+        call_site,
+        number=number,
+        child_sp=addresses[0],
+        return_address=addresses[1],
+        args=tuple(args) or None,
+        module=module,
+        function=function,
+        offset=offset,
+        source_file=source_file,
+        source_line=source_line,
+    )
+
+
+class StackParser(OutputParser):
+    """Streaming parser for stack trace output"""
+
+    kind = "frames"
+
+    def parse_line(self, line: str) -> Optional[StackFrame]:
+        return parse_frame_line(line)
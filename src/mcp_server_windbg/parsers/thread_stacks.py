@@ -0,0 +1,52 @@
+"""
+Parser for the stacks of all threads printed by `~*k` (`~*kb`, `~*kn` ...).
+
+cdb prints each thread as its `~` line followed by the stack trace of that
+thread, so the output combines the layouts of ThreadParser and StackParser.
+"""
+
+from typing import List, Optional
+
+from .base import OutputParser, Record
+from .stack import StackFrame, parse_frame_line
+from .threads import Thread, ThreadParser
+
+
+class ThreadStack(Record):
+    """A thread and its stack trace"""
+
+    __slots__ = ("thread", "frames")
+
+    def __init__(self, thread: Thread, frames: List[StackFrame]):
+        self.thread = thread
+        self.frames = frames
+
+
+class ThreadStacksParser(OutputParser):
+    """
+    Streaming parser for `~*k` output. A thread's stack is returned when the
+    next thread starts, the last one by finish().
+    """
+
+    kind = "thread_stacks"
+
+    def __init__(self):
+        super().__init__()
+        self._threads = ThreadParser()
+        self._current: Optional[ThreadStack] = None
+
+    def parse_line(self, line: str) -> Optional[ThreadStack]:
+        # Thread lines first: "  10  Id: ..." would also pass for frame 0x10
+        thread = self._threads.parse_line(line)
+        if thread is not None:
+            stack, self._current = self._current, ThreadStack(thread, [])
+            return stack
+        if self._current is not None:
+            frame = parse_frame_line(line)
+            if frame is not None:
+                self._current.frames.append(frame)
+        return None
+
+    def finish(self) -> List[ThreadStack]:
+        stack, self._current = self._current, None
+        return [stack] if stack is not None else []
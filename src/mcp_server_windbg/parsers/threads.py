@@ -0,0 +1,69 @@
+"""
+Parser for the thread list printed by `~`.
+"""
+
+import re
+from typing import Optional
+
+from .base import OutputParser, Record, parse_hex
+
+_THREAD_LINE = re.compile(
+    r"^(?P<marker>[.#])?\s*(?P<number>\d+)\s+Id:\s*(?P<pid>[0-9a-fA-F]+)\.(?P<tid>[0-9a-fA-F]+)"
+    r"\s+Suspend:\s*(?P<suspend>-?\d+)\s+Teb:\s*(?P<teb>[0-9a-fA-F`]+)\s+(?P<state>\w+)"
+    r'(?:\s+"(?P<name>.*)")?\s*$'
+)
+
+
+class Thread(Record):
+    """
+    A thread of the target. `current` marks the thread commands run in,
+    `event` the thread that raised the last event.
+    """
+
+    __slots__ = ("number", "process_id", "thread_id", "suspend_count", "teb", "frozen", "current", "event", "name")
+    _hex_fields = ("process_id", "thread_id", "teb")
+
+    def __init__(
+        self,
+        number: int,
+        process_id: int,
+        thread_id: int,
+        suspend_count: int,
+        teb: int,
+        frozen: bool = False,
+        current: bool = False,
+        event: bool = False,
+        name: Optional[str] = None,
+    ):
+        self.number = number
+        self.process_id = process_id
+        self.thread_id = thread_id
+        self.suspend_count = suspend_count
+        self.teb = teb
+        self.frozen = frozen
+        self.current = current
+        self.event = event
+        self.name = name
+
+
+class ThreadParser(OutputParser):
+    """Streaming parser for `~` output"""
+
+    kind = "threads"
+
+    def parse_line(self, line: str) -> Optional[Thread]:
+        match = _THREAD_LINE.match(line)
+        if match is None:
+            return None
+        marker = match.group("marker")
+        return Thread(
+            int(match.group("number")),
+            parse_hex(match.group("pid")),
+            parse_hex(match.group("tid")),
+            int(match.group("suspend")),
+            parse_hex(match.group("teb")),
+            frozen=match.group("state").lower() == "frozen",
+            current=marker == ".",
+            event=marker == "#",
+            name=match.group("name"),
+        )
@@ -0,0 +1,660 @@
+"""
+Persistent cache for debugger command results.
+
+Crash dumps never change, so the output of a command is fully determined by
+the dump content, the command text, the debugger context it runs in and the
+debugger environment (cdb binary and symbol path). Results are stored
+zlib-compressed in a SQLite database whose size is bounded by
+least-recently-used eviction.
+
+Invalidation rule: commands that change the debugger context (``~Ns``,
+``.frame N``, ``.ecxr``, ``.cxr`` ...) or other debugger state (``.reload``,
+``.sympath``, memory edits, aliases ...) are never cached. The context
+tracked by command_classifier, including a digest of state changes, is
+part of every key, so results computed before such a command are never
+returned after it.
+
+Identical deterministic commands issued concurrently on one session (e.g.
+several analysts opening the same dump) are executed once: callers arriving
+while the command is in flight attach to it and share its result.
+
+With read replicas (see session_pool.ReplicaSet), commands whose output does
+not depend on the current thread, frame or exception context (``lm``,
+``!peb``, ``dt`` on absolute addresses ...) run on a replica while the
+session's own cdb is busy.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import TYPE_CHECKING, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from . import metrics
+from .cdb_session import AsyncCDBSession, CDBTimeoutError
+from .command_classifier import DebuggerContext, INITIAL_CONTEXT, apply_command, is_context_free, switch_commands
+
+if TYPE_CHECKING:
+    from .session_pool import ReplicaSet
+
+DEFAULT_CACHE_SIZE_MB = 512
+
+# Bytes read per step while hashing a dump file
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+def hash_file(path: str) -> str:
+    """SHA-256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_cache_dir() -> str:
+    """Default location of the result cache"""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "mcp-windbg")
+
+
+class ResultCache:
+    """SQLite-backed, compressed, size-bounded store of command results."""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_mb: int = DEFAULT_CACHE_SIZE_MB):
+        """
+        Open (or create) the cache.
+
+        Args:
+            cache_dir: Directory for the cache database. Defaults to default_cache_dir()
+            max_size_mb: Upper bound for the compressed size of all cached results
+        """
+        self.cache_dir = cache_dir or default_cache_dir()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.path = os.path.join(self.cache_dir, "results.sqlite3")
+        self.max_bytes = max_size_mb * 1024 * 1024
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS results_last_access ON results(last_access);
+            CREATE TABLE IF NOT EXISTS dump_hashes (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                digest TEXT NOT NULL
+            );
+        """)
+        # Kept up to date by put_many() and _evict() so stats() needs neither SQLite nor the lock
+        self._entries, self._total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+
+    @staticmethod
+    def make_key(dump_hash: str, context: DebuggerContext, command: str, environment: Tuple[str, ...] = ()) -> str:
+        """Cache key for a command run in a given context on a given dump"""
+        parts = [dump_hash, *environment, *context, command.strip()]
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[str]]:
+        """Return the cached output lines for a key, or None"""
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: List[Optional[str]]) -> List[Optional[List[str]]]:
+        """
+        Look up several keys with a single commit for their access times.
+        Blocking (SQLite and decompression); call it from a worker thread.
+
+        Returns:
+            The cached output lines for each key, None for misses and None keys
+        """
+        blobs: List[Optional[bytes]] = [None] * len(keys)
+        with self._lock:
+            now = time.time()
+            for i, key in enumerate(keys):
+                if key is None:
+                    continue
+                row = self._conn.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self.misses += 1
+                    continue
+                self.hits += 1
+                blobs[i] = row[0]
+                self._conn.execute("UPDATE results SET last_access = ? WHERE key = ?", (now, key))
+            if any(blob is not None for blob in blobs):
+                self._conn.commit()
+        # Every line is newline-terminated, so the last split element is empty
+        return [zlib.decompress(blob).decode("utf-8").split("\n")[:-1] if blob is not None else None for blob in blobs]
+
+    def put(self, key: str, lines: List[str]):
+        """Store output lines under a key, evicting least recently used entries if needed"""
+        self.put_many([(key, lines)])
+
+    def put_many(self, items: List[Tuple[str, List[str]]]):
+        """
+        Store several results with a single commit. Blocking (compression
+        and SQLite); call it from a worker thread.
+        """
+        compressed = [
+            (key, zlib.compress("".join(f"{line}\n" for line in lines).encode("utf-8"))) for key, lines in items
+        ]
+        compressed = [(key, data) for key, data in compressed if len(data) <= self.max_bytes]
+        if not compressed:
+            return
+        with self._lock:
+            now = time.time()
+            for key, data in compressed:
+                old = self._conn.execute("SELECT size FROM results WHERE key = ?", (key,)).fetchone()
+                if old is not None:
+                    self._total_bytes -= old[0]
+                else:
+                    self._entries += 1
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO results (key, data, size, last_access) VALUES (?, ?, ?, ?)",
+                    (key, data, len(data), now)
+                )
+                self._total_bytes += len(data)
+                self.stores += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM results ORDER BY last_access LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._entries = self._total_bytes = 0
+                break
+            for key, size in rows:
+                if self._total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self._entries -= 1
+                self.evictions += 1
+
+    def dump_hash(self, dump_path: str) -> str:
+        """
+        SHA-256 of the dump file content. The digest is remembered per
+        path, size and modification time, so each dump is hashed only once.
+        """
+        path = os.path.abspath(dump_path)
+        stat = os.stat(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT digest FROM dump_hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (path, stat.st_size, stat.st_mtime_ns)
+            ).fetchone()
+        if row is not None:
+            return row[0]
+
+        digest = hash_file(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO dump_hashes (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                (path, stat.st_size, stat.st_mtime_ns, digest)
+            )
+            self._conn.commit()
+        return digest
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters and current size; never blocks, so it is safe on the event loop"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": self._entries,
+            "size_bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+    def clear(self):
+        """Remove all cached results"""
+        with self._lock:
+            self._conn.execute("DELETE FROM results")
+            self._conn.commit()
+            self._entries = self._total_bytes = 0
+
+    def close(self):
+        """Close the cache database"""
+        with self._lock:
+            self._conn.close()
+
+
+def completed_results(
+    results: List[Optional[List[str]]],
+    pending: List[int],
+    outputs: List[List[str]]
+) -> List[List[str]]:
+    """
+    Results of the commands that completed before one timed out: the
+    cached results merged with the outputs cdb returned for the pending
+    commands, up to the first command without a result.
+    """
+    results = list(results)
+    for i, output in zip(pending, outputs):
+        results[i] = output
+    completed = []
+    for result in results:
+        if result is None:
+            break
+        completed.append(result)
+    return completed
+
+
+class CachedSession:
+    """
+    Front-end for an AsyncCDBSession that answers deterministic commands from
+    a ResultCache. The cdb process is started on the first cache miss, so a
+    dump whose results are all cached never launches cdb.
+
+    The debugger context is the one the cdb session tracks
+    (AsyncCDBSession.context); if it becomes unknown, caching stops until
+    cdb is restarted. When cdb has to be restarted after shutdown(), the
+    state changes made so far are repeated, each in the context it ran in,
+    followed by the switches to the context the process was stopped in;
+    while cdb is stopped, the context is the one that replay restores.
+
+    Cacheable commands are single-flight: a command issued while the same
+    command, in the same debugger context, is already queued or running
+    waits for that execution and gets its output instead of running again.
+    Attached callers receive the output as one chunk when it is complete and
+    share the leader's timeout and errors. If the leader stops reading early
+    or is cancelled, they run the command themselves.
+
+    With read replicas, cacheable commands arriving while cdb is busy run on
+    an idle replica instead of waiting, provided no context or state change
+    is queued and the command's output is the same in the replica, which
+    stays in the context the dump was loaded in: either the session is in
+    that context as well, or the command is context-free.
+    """
+
+    def __init__(
+        self,
+        dump_path: str,
+        session_factory: Callable[[], Awaitable[AsyncCDBSession]],
+        cache: Optional[ResultCache] = None,
+        environment: Tuple[str, ...] = (),
+        replicas: Optional["ReplicaSet"] = None
+    ):
+        """
+        Args:
+            dump_path: Absolute path to the crash dump file
+            session_factory: Coroutine function starting the cdb session for the dump
+            cache: Result cache to consult, or None to always run commands
+            environment: Debugger settings that influence output (cdb path, symbols path)
+            replicas: Read replicas of the dump, or None to run everything on one cdb
+        """
+        self.dump_path = dump_path
+        self.session_factory = session_factory
+        self.cache = cache
+        self.environment = environment
+        self.replicas = replicas
+        self.session: Optional[AsyncCDBSession] = None
+        # Context restored by the replay on restart
+        self._stopped_context: Optional[DebuggerContext] = INITIAL_CONTEXT
+        self.last_used = time.monotonic()
+        # State-changing commands and the contexts they ran in (None if unknown)
+        self._state_changes: List[Tuple[Optional[DebuggerContext], str]] = []
+        self._replay: List[str] = []
+        self._dump_hash: Optional[str] = None
+        self._lock = asyncio.Lock()
+        # (context, command) -> output of the identical command in flight
+        self._flights: Dict[Tuple[DebuggerContext, str], "asyncio.Future[List[str]]"] = {}
+        # Calls queued or running on the session's cdb, and those among them
+        # with a context or state change
+        self._queued = 0
+        self._mutations_pending = 0
+
+    @property
+    def is_live(self) -> bool:
+        """Whether a cdb process is currently running for this session"""
+        return self.session is not None
+
+    @property
+    def context(self) -> Optional[DebuggerContext]:
+        """Debugger context commands run in, or None if it is unknown"""
+        if self.session is not None:
+            return self.session.context
+        return self._stopped_context
+
+    @property
+    def busy(self) -> bool:
+        """Whether a command is currently in progress"""
+        return self._lock.locked() or (self.replicas is not None and self.replicas.busy)
+
+    @property
+    def dump_hash(self) -> Optional[str]:
+        """SHA-256 of the dump, once the cache has computed it"""
+        return self._dump_hash
+
+    @property
+    def pid(self) -> Optional[int]:
+        """Process id of the running cdb process, if any"""
+        if self.session is None or self.session.process is None:
+            return None
+        return self.session.process.pid
+
+    async def _get_session(self) -> AsyncCDBSession:
+        if self.session is None:
+            session = await self.session_factory()
+            if self._replay:
+                # Restore the debugger context of the previous process
+                await session.send_batch(self._replay)
+            self.session = session
+        return self.session
+
+    async def send_command(
+        self,
+        command: str,
+        timeout: Optional[int] = None,
+        on_output: Optional[Callable[[List[str]], Awaitable[Optional[bool]]]] = None,
+        collect: bool = True
+    ) -> List[str]:
+        """
+        Run one command, answering from the cache when possible. When cdb runs
+        the command, on_output is called with each chunk of output as it arrives.
+        With collect=False the output only goes to on_output (a cached result
+        as a single chunk), is not cached and an empty list is returned; see
+        AsyncCDBSession.send_command.
+        """
+        return (await self._execute([command], timeout, on_output, collect))[0]
+
+    async def send_batch(self, commands: List[str], timeout: Optional[int] = None) -> List[List[str]]:
+        """Run several commands; cache misses are sent to cdb in one batch"""
+        if not commands:
+            return []
+        return await self._execute(commands, timeout)
+
+    async def _execute(
+        self,
+        commands: List[str],
+        timeout: Optional[int],
+        on_output: Optional[Callable[[List[str]], Awaitable[Optional[bool]]]] = None,
+        collect: bool = True
+    ) -> List[List[str]]:
+        # Attach to identical commands in flight, or lead them for later callers.
+        # Keys use the context seen on arrival, before waiting for the lock.
+        shared: Dict[int, "asyncio.Future[List[str]]"] = {}
+        led: Dict[int, Tuple[DebuggerContext, str]] = {}
+        context = self.context
+        if context is not None:
+            for i, command in enumerate(commands):
+                next_context, cacheable = apply_command(context, command)
+                if cacheable:
+                    key = (context, command.strip())
+                    flight = self._flights.get(key)
+                    if flight is not None:
+                        shared[i] = flight
+                    elif collect:
+                        led[i] = key
+                        self._flights[key] = asyncio.get_running_loop().create_future()
+                context = next_context
+
+        results: List[Optional[List[str]]] = [None] * len(commands)
+        own = [i for i in range(len(commands)) if i not in shared]
+        stopped = False
+        if own:
+            own_output = on_output if len(commands) == 1 else None
+            if own_output is not None and led:
+                # Partial output of a stopped command must not be shared
+                async def own_output(lines: List[str], forward=on_output) -> Optional[bool]:
+                    nonlocal stopped
+                    stop = await forward(lines)
+                    stopped = stopped or bool(stop)
+                    return stop
+
+            try:
+                outputs = await self._run([commands[i] for i in own], timeout, own_output, collect)
+            except BaseException as e:
+                self._land(led, None if stopped or not isinstance(e, Exception) else e)
+                raise
+            for i, output in zip(own, outputs):
+                results[i] = output
+            self._land(led, None if stopped else {key: results[i] for i, key in led.items()})
+
+        for i, flight in shared.items():
+            await asyncio.wait([flight])
+            if flight.cancelled():
+                # The leader gave up; run the command ourselves
+                results[i] = (await self._execute([commands[i]], timeout))[0]
+                continue
+            results[i] = list(flight.result())
+            metrics.COMMANDS_COLLAPSED.inc(labels=metrics.verb_label(commands[i]))
+            if len(commands) == 1 and on_output is not None:
+                await on_output(results[i])
+                if not collect:
+                    results[i] = []
+        return results
+
+    def _land(self, led: Dict[int, Tuple[DebuggerContext, str]], outcome):
+        """
+        Complete the flights of a leader and stop accepting followers for them.
+
+        outcome is a dict of key -> output, an exception shared with the
+        followers, or None to let them run the command themselves.
+        """
+        for key in led.values():
+            flight = self._flights.pop(key, None)
+            if flight is None or flight.done():
+                continue
+            if outcome is None:
+                flight.cancel()
+            elif isinstance(outcome, BaseException):
+                flight.set_exception(outcome)
+                # Retrieved here so that an unshared failure is not reported as unhandled
+                flight.exception()
+            else:
+                flight.set_result(outcome[key])
+
+    async def _run(
+        self,
+        commands: List[str],
+        timeout: Optional[int],
+        on_output: Optional[Callable[[List[str]], Awaitable[Optional[bool]]]] = None,
+        collect: bool = True
+    ) -> List[List[str]]:
+        if self._replica_eligible(commands):
+            results = await self._execute_on_replica(commands, timeout, on_output, collect)
+            if results is not None:
+                return results
+
+        mutating = self.context is None
+        context = self.context
+        for command in commands:
+            context, cacheable = apply_command(context, command)
+            mutating = mutating or not cacheable
+        self._queued += 1
+        self._mutations_pending += mutating
+        try:
+            return await self._execute_locked(commands, timeout, on_output, collect)
+        finally:
+            self._queued -= 1
+            self._mutations_pending -= mutating
+
+    def _replica_eligible(self, commands: List[str]) -> bool:
+        """Whether commands may run on a replica instead of waiting for the busy cdb"""
+        context = self.context
+        if (
+            self.replicas is None or not self._queued or self._mutations_pending
+            or context is None or context[0] != INITIAL_CONTEXT[0] or context[4] != INITIAL_CONTEXT[4]
+        ):
+            return False
+        for command in commands:
+            next_context, cacheable = apply_command(context, command)
+            if not cacheable or (context[1:4] != INITIAL_CONTEXT[1:4] and not is_context_free(command)):
+                return False
+            context = next_context
+        return True
+
+    async def _lookup(
+        self, commands: List[str], context: Optional[DebuggerContext]
+    ) -> Tuple[List[Optional[List[str]]], List[Optional[str]], List[int], Optional[DebuggerContext]]:
+        """
+        Answer commands from the cache.
+
+        Returns:
+            (results with None for misses, cache keys, indices of the misses, context after the commands)
+        """
+        if self.cache is not None and self._dump_hash is None:
+            self._dump_hash = await asyncio.to_thread(self.cache.dump_hash, self.dump_path)
+
+        results: List[Optional[List[str]]] = [None] * len(commands)
+        keys: List[Optional[str]] = [None] * len(commands)
+        for i, command in enumerate(commands):
+            next_context, cacheable = apply_command(context, command)
+            if cacheable and self.cache is not None:
+                keys[i] = self.cache.make_key(self._dump_hash, context, command, self.environment)
+            context = next_context
+        if any(key is not None for key in keys):
+            # SQLite and decompression stay off the event loop
+            results = await asyncio.to_thread(self.cache.get_many, keys)
+        pending = [i for i, result in enumerate(results) if result is None]
+        return results, keys, pending, context
+
+    async def _store(self, keys: List[Optional[str]], pending: List[int], outputs: List[List[str]]):
+        """Cache the outputs of the pending commands that have a key, in a worker thread"""
+        items = [(keys[i], output) for i, output in zip(pending, outputs) if keys[i] is not None]
+        if items:
+            await asyncio.to_thread(self.cache.put_many, items)
+
+    async def _execute_on_replica(
+        self,
+        commands: List[str],
+        timeout: Optional[int],
+        on_output: Optional[Callable[[List[str]], Awaitable[Optional[bool]]]] = None,
+        collect: bool = True
+    ) -> Optional[List[List[str]]]:
+        """Run read-only commands on an idle replica; None if every replica is busy"""
+        self.last_used = time.monotonic()
+        results, keys, pending, _ = await self._lookup(commands, self.context)
+        if pending:
+            replica = self.replicas.acquire()
+            if replica is None:
+                return None
+            try:
+                if len(pending) == 1:
+                    outputs = [await replica.send_command(commands[pending[0]], timeout, on_output, collect)]
+                else:
+                    outputs = await replica.send_batch([commands[i] for i in pending], timeout)
+            except CDBTimeoutError as e:
+                e.partial_results = completed_results(results, pending, e.partial_results)
+                raise
+            finally:
+                self.replicas.release(replica)
+            for i, output in zip(pending, outputs):
+                results[i] = output
+            if collect:
+                await self._store(keys, pending, outputs)
+            metrics.REPLICA_COMMANDS.inc(len(pending))
+        elif not collect and on_output is not None:
+            await on_output(results[0])
+            results[0] = []
+        self.last_used = time.monotonic()
+        return results
+
+    async def _execute_locked(
+        self,
+        commands: List[str],
+        timeout: Optional[int],
+        on_output: Optional[Callable[[List[str]], Awaitable[Optional[bool]]]] = None,
+        collect: bool = True
+    ) -> List[List[str]]:
+        async with self._lock:
+            self.last_used = time.monotonic()
+            results, keys, pending, _ = await self._lookup(commands, self.context)
+
+            if pending:
+                session = await self._get_session()
+                context = session.context
+                try:
+                    if len(pending) == 1:
+                        outputs = [await session.send_command(commands[pending[0]], timeout, on_output, collect)]
+                    else:
+                        outputs = await session.send_batch([commands[i] for i in pending], timeout)
+                except CDBTimeoutError as e:
+                    self._record_state_changes(context, [commands[i] for i in pending[:len(e.partial_results)]])
+                    e.partial_results = completed_results(results, pending, e.partial_results)
+                    raise
+                self._record_state_changes(context, [commands[i] for i in pending])
+                for i, output in zip(pending, outputs):
+                    results[i] = output
+                if collect:
+                    await self._store(keys, pending, outputs)
+
+            elif not collect and on_output is not None:
+                await on_output(results[0])
+                results[0] = []
+
+            self.last_used = time.monotonic()
+            return results
+
+    def _record_state_changes(self, context: Optional[DebuggerContext], commands: List[str]):
+        """Remember the state-changing commands among those cdb completed, starting in context"""
+        for command in commands:
+            if apply_command(INITIAL_CONTEXT, command)[0][4] != INITIAL_CONTEXT[4]:
+                self._state_changes.append((context, command))
+            context = apply_command(context, command)[0]
+
+    async def shutdown(self):
+        """
+        Shut down the underlying cdb session and any replicas. The session
+        remains usable; cdb is restarted on the next cache miss.
+        """
+        if self.replicas is not None:
+            await self.replicas.shutdown()
+        session, self.session = self.session, None
+        if session is not None:
+            self._plan_replay(session.context)
+            await session.shutdown()
+
+    def terminate(self):
+        """Terminate the underlying cdb process and any replicas without awaiting them"""
+        if self.replicas is not None:
+            self.replicas.terminate()
+        session, self.session = self.session, None
+        if session is not None:
+            self._plan_replay(session.context)
+            session.terminate()
+
+    def _plan_replay(self, context: Optional[DebuggerContext]):
+        """
+        Build the replay that brings the next cdb process into the context
+        the stopped one was in, and record the context it restores.
+        """
+        replay: List[str] = []
+        restored: DebuggerContext = INITIAL_CONTEXT
+
+        def run(command: str):
+            nonlocal restored
+            replay.append(command)
+            restored = apply_command(restored, command)[0]
+
+        for ran_in, command in self._state_changes:
+            if ran_in is not None:
+                for switch in switch_commands(restored, ran_in):
+                    run(switch)
+            run(command)
+        if context is not None:
+            for switch in switch_commands(restored, context):
+                run(switch)
+        self._replay = replay
+        self._stopped_context = restored
@@ -1,10 +1,40 @@
+import asyncio
+import json
 import os
 import traceback
-import glob
-import winreg
-from typing import Dict, Optional
+from datetime import datetime
+from typing import List, Literal, Optional, Tuple
 
-from .cdb_session import CDBSession, CDBError
+try:
+    import winreg
+except ImportError:
+    # Not on Windows: registry lookups are skipped
+    winreg = None
+
+from . import metrics
+from .cdb_session import AsyncCDBSession, CDBError, CDBTimeoutError
+from .crash_buckets import (
+    CrashIndex,
+    DEFAULT_BUCKET_DEPTH,
+    DEFAULT_MAX_SIBLINGS,
+    compute_signature,
+    format_bucket,
+    parse_exception_code,
+    parse_frames,
+    read_quick_key,
+)
+from .dump_index import DumpDirectoryIndex, DEFAULT_PAGE_SIZE
+from .minidump import read_crash_information
+from .output_filter import OutputFilter
+from .output_store import OutputPage, OutputStore, DEFAULT_PAGE_BYTES, DEFAULT_STORE_SIZE_MB
+from .output_stream import current_output_sink, output_sink, progress_output_sink
+from .parsers import OutputParser, Record, STRUCTURED_COMMANDS, ThreadStacksParser, parser_for
+from .result_cache import CachedSession, ResultCache, DEFAULT_CACHE_SIZE_MB, hash_file
+from .session_pool import (
+    SessionPool, DEFAULT_MAX_SESSIONS, DEFAULT_IDLE_TIMEOUT, DEFAULT_MAX_REPLICAS, DEFAULT_REPLICA_IDLE_TIMEOUT
+)
+from .tracing import configure_tracing, span, traced
+from .unique_stacks import DEFAULT_MAX_THREADS_LISTED, DEFAULT_STACK_DEPTH, StackGrouper, format_unique_stacks
 
 from mcp.shared.exceptions import McpError
 from mcp.server import Server
@@ -18,22 +48,111 @@ from mcp.types import (
 )
 from pydantic import BaseModel, Field
 
-# Dictionary to store CDB sessions keyed by dump file path
-active_sessions: Dict[str, CDBSession] = {}
+# Pool of CDB sessions keyed by dump file path
+session_pool = SessionPool()
+
+# Cached scans of dump directories for list_windbg_dumps
+dump_index = DumpDirectoryIndex()
+
+# Persistent command result cache shared by all sessions (None disables caching)
+result_cache: Optional[ResultCache] = None
+
+
+def configure_result_cache(
+    use_cache: bool = True,
+    cache_dir: Optional[str] = None,
+    cache_size_mb: int = DEFAULT_CACHE_SIZE_MB
+) -> Optional[ResultCache]:
+    """Open (or disable) the persistent command result cache used by new sessions."""
+    global result_cache
+    if result_cache is not None:
+        result_cache.close()
+    result_cache = ResultCache(cache_dir, cache_size_mb) if use_cache else None
+    return result_cache
+
+
+# Large command outputs kept for read_windbg_output
+output_store = OutputStore()
+
+
+def configure_output_store(max_size_mb: int = DEFAULT_STORE_SIZE_MB) -> OutputStore:
+    """Replace the store of paged command outputs."""
+    global output_store
+    output_store = OutputStore(max_size_mb)
+    return output_store
+
+
+# Crash signature index used for bucketing duplicate dumps
+crash_index: Optional[CrashIndex] = None
+
+
+def configure_crash_index(
+    index_dir: Optional[str] = None,
+    depth: int = DEFAULT_BUCKET_DEPTH
+) -> CrashIndex:
+    """Open the crash signature index (stored next to the result cache by default)."""
+    global crash_index
+    if crash_index is not None:
+        crash_index.close()
+    crash_index = CrashIndex(index_dir, depth)
+    return crash_index
+
+
+def collect_metrics() -> List[metrics.MetricFamily]:
+    """Session pool, result cache and output store figures for /metrics"""
+    families = session_pool.collect_metrics()
+    store = output_store.stats()
+    families.append(metrics.MetricFamily(
+        "windbg_output_store_bytes", "gauge", "Size of the paged command outputs kept", [({}, store["bytes"])]
+    ))
+    if result_cache is not None:
+        cache = result_cache.stats()
+        families.extend([
+            metrics.MetricFamily("windbg_result_cache_requests_total", "counter", "Result cache lookups", [
+                ({"result": "hit"}, cache["hits"]),
+                ({"result": "miss"}, cache["misses"]),
+            ]),
+            metrics.MetricFamily("windbg_result_cache_bytes", "gauge", "Size of the result cache",
+                                 [({}, cache["size_bytes"])]),
+        ])
+    return families
+
+
+metrics.REGISTRY.register_collector(collect_metrics)
+
+
+def configure_session_pool(
+    max_sessions: int = DEFAULT_MAX_SESSIONS,
+    idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    max_session_memory_mb: Optional[int] = None,
+    max_replicas: int = DEFAULT_MAX_REPLICAS,
+    replica_idle_timeout: float = DEFAULT_REPLICA_IDLE_TIMEOUT
+) -> SessionPool:
+    """Apply session pool limits and start its idle reaper (requires a running event loop)."""
+    session_pool.max_sessions = max(1, max_sessions)
+    session_pool.idle_timeout = idle_timeout
+    session_pool.max_session_memory_bytes = (
+        max_session_memory_mb * 1024 * 1024 if max_session_memory_mb else None
+    )
+    session_pool.max_replicas = max(0, max_replicas)
+    session_pool.replica_idle_timeout = replica_idle_timeout
+    session_pool.start()
+    return session_pool
 
 def get_local_dumps_path() -> Optional[str]:
     """Get the local dumps path from the Windows registry."""
-    try:
-        with winreg.OpenKey(
-            winreg.HKEY_LOCAL_MACHINE,
-            r"SOFTWARE\Microsoft\Windows\Windows Error Reporting\LocalDumps"
-        ) as key:
-            dump_folder, _ = winreg.QueryValueEx(key, "DumpFolder")
-            if os.path.exists(dump_folder) and os.path.isdir(dump_folder):
-                return dump_folder
-    except (OSError, WindowsError):
-        # Registry key might not exist or other issues
-        pass
+    if winreg is not None:
+        try:
+            with winreg.OpenKey(
+                winreg.HKEY_LOCAL_MACHINE,
+                r"SOFTWARE\Microsoft\Windows\Windows Error Reporting\LocalDumps"
+            ) as key:
+                dump_folder, _ = winreg.QueryValueEx(key, "DumpFolder")
+                if os.path.exists(dump_folder) and os.path.isdir(dump_folder):
+                    return dump_folder
+        except OSError:
+            # Registry key might not exist or other issues
+            pass
     
     # Default Windows dump location
     default_path = os.path.join(os.environ.get("LOCALAPPDATA", ""), "CrashDumps")
@@ -42,7 +161,15 @@ def get_local_dumps_path() -> Optional[str]:
         
     return None
 
-class OpenWindbgDump(BaseModel):
+class ToolParams(BaseModel):
+    """Base of the tool parameter models; validation is traced as its own span."""
+
+    def __init__(self, **data):
+        with span("validate", model=type(self).__name__):
+            super().__init__(**data)
+
+
+class OpenWindbgDump(ToolParams):
     """Parameters for analyzing a crash dump."""
     dump_path: str = Field(description="Path to the Windows crash dump file")
     include_stack_trace: bool = Field(description="Whether to include stack traces in the analysis")
@@ -50,18 +177,89 @@ class OpenWindbgDump(BaseModel):
     include_threads: bool = Field(description="Whether to include thread information")
 
 
-class RunWindbgCmdParams(BaseModel):
+class RunWindbgCmdParams(ToolParams):
     """Parameters for executing a WinDBG command."""
     dump_path: str = Field(description="Path to the Windows crash dump file")
     command: str = Field(description="WinDBG command to execute")
+    grep: Optional[str] = Field(
+        default=None,
+        description="Only return output lines matching this regular expression"
+    )
+    invert: bool = Field(
+        default=False,
+        description="Return the lines not matching grep instead"
+    )
+    head: Optional[int] = Field(
+        default=None,
+        description="Only return the first N (matching) lines; cdb output after them is skipped"
+    )
+    tail: Optional[int] = Field(
+        default=None,
+        description="Only return the last N (matching) lines"
+    )
+    max_bytes: Optional[int] = Field(
+        default=None,
+        description="Stop once the returned output reaches this many bytes"
+    )
+    fields: Optional[List[int]] = Field(
+        default=None,
+        description="Only return these whitespace-separated columns of each line, numbered from 1 (negative numbers count from the end)"
+    )
+    structured: bool = Field(
+        default=False,
+        description=f"Return the output parsed into JSON records; supported for {STRUCTURED_COMMANDS}"
+    )
+
 
+class ReadWindbgOutputParams(ToolParams):
+    """Parameters for reading further pages of a large command output."""
+    cursor: str = Field(description="Cursor returned with the previous page of the output")
+    max_bytes: int = Field(
+        default=DEFAULT_PAGE_BYTES,
+        description="Maximum size of the page in bytes (at least one line is returned)"
+    )
+
+
+class RunWindbgBatchParams(ToolParams):
+    """Parameters for executing several WinDBG commands in one round-trip."""
+    dump_path: str = Field(description="Path to the Windows crash dump file")
+    commands: List[str] = Field(description="WinDBG commands to execute, in order")
 
-class CloseWindbgDumpParams(BaseModel):
+
+class BucketWindbgDumpParams(ToolParams):
+    """Parameters for finding the crash bucket of a dump."""
+    dump_path: str = Field(description="Path to the Windows crash dump file")
+    fast: bool = Field(
+        default=True,
+        description="Match on the faulting instruction recorded in the dump when it identifies a single known bucket, without starting the debugger"
+    )
+    max_siblings: int = Field(
+        default=DEFAULT_MAX_SIBLINGS,
+        description="Maximum number of other dumps from the same bucket to list"
+    )
+
+
+class UniqueWindbgStacksParams(ToolParams):
+    """Parameters for grouping the identical stacks of all threads."""
+    dump_path: str = Field(description="Path to the Windows crash dump file")
+    depth: int = Field(
+        default=DEFAULT_STACK_DEPTH,
+        ge=1,
+        description="Maximum number of frames per thread stack"
+    )
+    max_threads_listed: int = Field(
+        default=DEFAULT_MAX_THREADS_LISTED,
+        ge=1,
+        description="Maximum number of representative threads listed per unique stack"
+    )
+
+
+class CloseWindbgDumpParams(ToolParams):
     """Parameters for unloading a crash dump."""
     dump_path: str = Field(description="Path to the Windows crash dump file to unload")
 
 
-class ListWindbgDumpsParams(BaseModel):
+class ListWindbgDumpsParams(ToolParams):
     """Parameters for listing crash dumps in a directory."""
     directory_path: Optional[str] = Field(
         default=None,
@@ -71,46 +269,99 @@ class ListWindbgDumpsParams(BaseModel):
         default=False,
         description="Whether to search recursively in subdirectories"
     )
+    sort_by: Literal["name", "mtime", "size"] = Field(
+        default="name",
+        description="Sort order: file name, modification time or size"
+    )
+    descending: bool = Field(
+        default=False,
+        description="Whether to reverse the sort order (e.g. newest or largest first)"
+    )
+    pattern: Optional[str] = Field(
+        default=None,
+        description="Only list dumps whose file name matches this glob pattern (case-insensitive), e.g. 'MyApp*'"
+    )
+    min_size_mb: Optional[float] = Field(
+        default=None,
+        description="Only list dumps of at least this size in MB"
+    )
+    max_size_mb: Optional[float] = Field(
+        default=None,
+        description="Only list dumps of at most this size in MB"
+    )
+    modified_after: Optional[datetime] = Field(
+        default=None,
+        description="Only list dumps modified after this ISO 8601 date/time"
+    )
+    cursor: Optional[str] = Field(
+        default=None,
+        description="Cursor returned by a previous call, to fetch the next page"
+    )
+    limit: int = Field(
+        default=DEFAULT_PAGE_SIZE,
+        description="Maximum number of dumps to return"
+    )
 
 
-def get_or_create_session(
+@traced("get_or_create_session")
+async def get_or_create_session(
     dump_path: str,
     cdb_path: Optional[str] = None,
     symbols_path: Optional[str] = None,
     timeout: int = 300,
     verbose: bool = False
-) -> CDBSession:
-    """Get an existing CDB session or create a new one."""
+) -> CachedSession:
+    """Get an existing CDB session or create a new one.
+    
+    The returned session consults the result cache first; cdb.exe is only
+    started when a command is not cached.
+    """
     abs_dump_path = os.path.abspath(dump_path)
     
-    if abs_dump_path not in active_sessions or active_sessions[abs_dump_path] is None:
-        try:
-            session = CDBSession(
-                dump_path=abs_dump_path,
-                cdb_path=cdb_path,
-                symbols_path=symbols_path,
-                timeout=timeout,
-                verbose=verbose
-            )
-            active_sessions[abs_dump_path] = session
-            return session
-        except Exception as e:
+    session = session_pool.get(abs_dump_path)
+    metrics.SESSION_LOOKUPS.inc(labels=("open" if session is not None else "new",))
+    if session is None:
+        if not os.path.isfile(abs_dump_path):
             raise McpError(ErrorData(
                 code=INTERNAL_ERROR,
-                message=f"Failed to create CDB session: {str(e)}"
+                message=f"Failed to create CDB session: Dump file not found: {abs_dump_path}"
             ))
+        
+        async def start_cdb() -> AsyncCDBSession:
+            try:
+                return await AsyncCDBSession.create(
+                    dump_path=abs_dump_path,
+                    cdb_path=cdb_path,
+                    symbols_path=symbols_path,
+                    timeout=timeout,
+                    verbose=verbose
+                )
+            except Exception as e:
+                raise McpError(ErrorData(
+                    code=INTERNAL_ERROR,
+                    message=f"Failed to create CDB session: {str(e)}"
+                ))
+        
+        session = CachedSession(
+            abs_dump_path,
+            session_pool.track_starts(abs_dump_path, start_cdb),
+            cache=result_cache,
+            environment=(cdb_path or "", symbols_path or ""),
+            replicas=session_pool.replica_set(start_cdb)
+        )
+        session_pool.add(abs_dump_path, session)
     
-    return active_sessions[abs_dump_path]
+    return session
 
 
-def unload_session(dump_path: str) -> bool:
+async def unload_session(dump_path: str) -> bool:
     """Unload and clean up a CDB session."""
     abs_dump_path = os.path.abspath(dump_path)
     
-    if abs_dump_path in active_sessions and active_sessions[abs_dump_path] is not None:
+    if abs_dump_path in session_pool:
         try:
-            active_sessions[abs_dump_path].shutdown()
-            del active_sessions[abs_dump_path]
+            session = session_pool.remove(abs_dump_path)
+            await session.shutdown()
             return True
         except Exception:
             return False
@@ -118,7 +369,416 @@ def unload_session(dump_path: str) -> bool:
     return False
 
 
-def execute_common_analysis_commands(session: CDBSession) -> dict:
+def format_dump_listing(args: ListWindbgDumpsParams, directory: str) -> str:
+    """
+    List dumps through the cached directory index and format the page.
+    
+    Raises:
+        ValueError: For an invalid cursor
+    """
+    listing = dump_index.list(
+        directory,
+        recursive=args.recursive,
+        sort_by=args.sort_by,
+        descending=args.descending,
+        pattern=args.pattern,
+        min_size=int(args.min_size_mb * 1024 * 1024) if args.min_size_mb is not None else None,
+        max_size=int(args.max_size_mb * 1024 * 1024) if args.max_size_mb is not None else None,
+        modified_after=args.modified_after.timestamp() if args.modified_after is not None else None,
+        cursor=args.cursor,
+        limit=args.limit
+    )
+    
+    if listing.total == 0:
+        return f"No crash dump files (*.*dmp) found in {directory}"
+    
+    result_text = f"Found {listing.total} crash dump file(s) in {directory}:\n\n"
+    for i, entry in enumerate(listing.entries):
+        size_mb = round(entry.size / (1024 * 1024), 2)
+        modified_str = datetime.fromtimestamp(entry.mtime).strftime('%Y-%m-%d %H:%M:%S')
+        result_text += f"{i+1}. {entry.path} ({size_mb} MB, modified: {modified_str})\n"
+        
+        # Exception and faulting module from the minidump streams, no cdb needed
+        summary = dump_index.exception_summary(entry)
+        if summary:
+            result_text += f"   {summary}\n"
+    
+    if listing.next_cursor:
+        result_text += (
+            f"\nShowing {len(listing.entries)} of {listing.total}. "
+            f"To see more, call list_windbg_dumps again with cursor=\"{listing.next_cursor}\"\n"
+        )
+    return result_text
+
+
+async def list_dumps(args: ListWindbgDumpsParams, directory: str) -> str:
+    """Run format_dump_listing() off the event loop; directory scans may hit a network share."""
+    if not os.path.isdir(directory):
+        raise McpError(ErrorData(
+            code=INVALID_PARAMS,
+            message=f"Directory not found: {directory}"
+        ))
+    try:
+        return await asyncio.to_thread(format_dump_listing, args, directory)
+    except ValueError as e:
+        raise McpError(ErrorData(
+            code=INVALID_PARAMS,
+            message=str(e)
+        ))
+
+
+def recent_dumps_hint(directory: Optional[str], count: int = 10) -> str:
+    """Most recent dumps in a directory, for prompting the user to pick one"""
+    if not directory or not os.path.isdir(directory):
+        return ""
+    listing = dump_index.list(directory, sort_by="mtime", descending=True, limit=count)
+    if not listing.entries:
+        return ""
+    text = f"\n\nI found {listing.total} crash dump(s) in {directory}"
+    text += f", the {len(listing.entries)} most recent:\n\n" if listing.total > count else ":\n\n"
+    for i, entry in enumerate(listing.entries):
+        text += f"{i+1}. {entry.path} ({round(entry.size / (1024 * 1024), 2)} MB)\n"
+    if listing.total > count:
+        text += f"\n... and {listing.total - count} more dump files.\n"
+    text += "\nYou can analyze one of these dumps by specifying its path."
+    return text
+
+
+async def index_analysis(
+    dump_path: str,
+    analysis_output: List[str],
+    dump_hash: Optional[str] = None
+) -> Optional[str]:
+    """
+    Add a dump to the crash index using `!analyze -v` output that was already
+    produced, and describe its bucket. Returns None if there is no index or
+    no stack could be parsed.
+    
+    The minidump header read, hashing (only when dump_hash is not given and
+    the result cache has not hashed the dump yet) and index writes run in a
+    worker thread.
+    """
+    index = crash_index
+    if index is None:
+        return None
+    frames = parse_frames("\n".join(analysis_output))
+    if not frames:
+        return None
+    
+    def add_to_index() -> str:
+        code, quick = read_quick_key(dump_path)
+        digest = dump_hash or (result_cache.dump_hash(dump_path) if result_cache is not None else None)
+        bucket = index.add(dump_path, compute_signature(frames, code, index.depth), dump_hash=digest, quick_key=quick)
+        siblings = index.siblings(bucket.bucket_id, exclude=dump_path, limit=DEFAULT_MAX_SIBLINGS)
+        return format_bucket(bucket, siblings, matched_by="stack signature")
+    
+    return await asyncio.to_thread(add_to_index)
+
+
+async def find_crash_bucket(
+    args: BucketWindbgDumpParams,
+    cdb_path: Optional[str] = None,
+    symbols_path: Optional[str] = None,
+    timeout: int = 300,
+    verbose: bool = False
+) -> str:
+    """
+    Find (and record) the crash bucket of a dump, doing as little work as possible:
+    an unchanged indexed file or identical content is answered from the index,
+    a known faulting instruction from the minidump header, and only otherwise
+    is the faulting stack taken from cdb.
+    """
+    index = crash_index or configure_crash_index()
+    dump_path = os.path.abspath(args.dump_path)
+    if not os.path.isfile(dump_path):
+        raise McpError(ErrorData(
+            code=INVALID_PARAMS,
+            message=f"Dump file not found: {dump_path}"
+        ))
+    
+    # Hashing, the minidump header and the index run in worker threads;
+    # hashing a multi-GB dump would otherwise stall every other request
+    bucket = await asyncio.to_thread(index.lookup_path, dump_path)
+    if bucket is not None:
+        matched_by = "already indexed"
+    else:
+        dump_hash = await asyncio.to_thread(
+            result_cache.dump_hash if result_cache is not None else hash_file, dump_path
+        )
+        code, quick = await asyncio.to_thread(read_quick_key, dump_path)
+        bucket = await asyncio.to_thread(index.lookup_hash, dump_hash)
+        matched_by = "identical dump content"
+        if bucket is None and args.fast and quick is not None:
+            bucket = await asyncio.to_thread(index.lookup_quick_key, quick)
+            matched_by = "faulting instruction"
+        if bucket is not None:
+            signature = bucket.signature
+        else:
+            session = await get_or_create_session(dump_path, cdb_path, symbols_path, timeout, verbose)
+            # Take the stack in the exception context, then return to the default context
+            lastevent, _, stack, _ = await session.send_batch([".lastevent", ".ecxr", "kb", ".cxr"])
+            if code is None:
+                code = parse_exception_code("\n".join(lastevent))
+            signature = compute_signature(parse_frames("\n".join(stack)), code, index.depth)
+            matched_by = "stack signature"
+        bucket = await asyncio.to_thread(index.add, dump_path, signature, dump_hash, quick)
+    
+    siblings = await asyncio.to_thread(index.siblings, bucket.bucket_id, dump_path, args.max_siblings)
+    return format_bucket(bucket, siblings, matched_by)
+
+
+def make_output_filter(args: RunWindbgCmdParams) -> Optional[OutputFilter]:
+    """
+    Build the output filter requested with run_windbg_cmd.
+    
+    Returns:
+        The filter, or None if no filtering was requested
+    
+    Raises:
+        McpError: If a filter parameter is invalid
+    """
+    try:
+        output_filter = OutputFilter(
+            grep=args.grep,
+            invert=args.invert,
+            head=args.head,
+            tail=args.tail,
+            max_bytes=args.max_bytes,
+            fields=args.fields,
+        )
+    except ValueError as e:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
+    return output_filter if output_filter.active else None
+
+
+def make_output_parser(args: RunWindbgCmdParams) -> Optional[OutputParser]:
+    """
+    Build the parser for a structured run_windbg_cmd result.
+    
+    Returns:
+        The parser, or None if structured output was not requested
+    
+    Raises:
+        McpError: If the command has no parser or output filters were requested too
+    """
+    if not args.structured:
+        return None
+    if make_output_filter(args) is not None:
+        raise McpError(ErrorData(
+            code=INVALID_PARAMS,
+            message="structured cannot be combined with grep, head, tail, max_bytes or fields"
+        ))
+    parser = parser_for(args.command)
+    if parser is None:
+        raise McpError(ErrorData(
+            code=INVALID_PARAMS,
+            message=f"No structured output for {args.command!r}; supported commands: {STRUCTURED_COMMANDS}"
+        ))
+    return parser
+
+
+async def run_structured_command(session: CachedSession, command: str, parser: OutputParser) -> str:
+    """
+    Run a command and return its output parsed into records, as JSON.
+    
+    The parser is fed each chunk of output as it comes off the pipe, so
+    records are built while cdb is still producing output.
+    
+    Returns:
+        JSON object with the command, the kind of records and the records;
+        "incomplete" carries the timeout message if the command timed out
+    """
+    records: List[Record] = []
+    streamed = False
+    
+    async def on_output(lines: List[str]):
+        nonlocal streamed
+        streamed = True
+        records.extend(parser.feed(lines))
+    
+    result = {"command": command, "kind": parser.kind}
+    try:
+        output = await session.send_command(command, on_output=on_output)
+        if not streamed:
+            # Answered from the cache in one piece
+            records.extend(parser.feed(output))
+    except CDBTimeoutError as e:
+        result["incomplete"] = str(e)
+    records.extend(parser.finish())
+    with span("serialize_records", count=len(records)):
+        result["records"] = [record.to_dict() for record in records]
+        return json.dumps(result)
+
+
+async def find_unique_stacks(session: CachedSession, args: UniqueWindbgStacksParams) -> str:
+    """
+    Group the threads of a dump by identical stack, like !uniqstack.
+    
+    The stacks of all threads come from a single `~*kb`. Each thread's
+    stack is parsed and grouped as soon as the next thread's output
+    arrives, so only one stack per group is kept however many threads
+    the dump has.
+    
+    Returns:
+        Text summary of the unique stacks, with thread counts and
+        representative threads
+    """
+    command = f"~*kb {args.depth}"
+    parser = ThreadStacksParser()
+    grouper = StackGrouper()
+    streamed = False
+    
+    async def on_output(lines: List[str]):
+        nonlocal streamed
+        streamed = True
+        for stack in parser.feed(lines):
+            grouper.add(stack)
+    
+    timeout_message = None
+    try:
+        output = await session.send_command(command, on_output=on_output)
+        if not streamed:
+            # Answered from the cache in one piece
+            for stack in parser.feed(output):
+                grouper.add(stack)
+    except CDBTimeoutError as e:
+        timeout_message = str(e)
+    for stack in parser.finish():
+        grouper.add(stack)
+    text = format_unique_stacks(command, grouper, args.max_threads_listed)
+    if timeout_message:
+        text += f"\n\nIncomplete: {timeout_message}"
+    return text
+
+
+async def run_batch(session: CachedSession, commands: List[str]) -> Tuple[List[List[str]], Optional[str]]:
+    """
+    Run a batch of commands, keeping what completed if one times out.
+    
+    Returns:
+        (outputs, timeout message). After a timeout there are outputs only
+        up to the command that timed out, whose output is the part received
+        before the timeout; the commands after it were not run.
+    """
+    try:
+        return await session.send_batch(commands), None
+    except CDBTimeoutError as e:
+        return [*e.partial_results, e.partial_output], str(e)
+
+
+async def run_streaming_command(
+    session: CachedSession,
+    command: str,
+    output_filter: Optional[OutputFilter] = None
+) -> Tuple[List[str], Optional[str]]:
+    """
+    Run a command, passing its output to the current output sink as it arrives.
+    
+    With a filter, the output is filtered chunk by chunk as it comes off the
+    pipe and only the filtered lines are kept and streamed. Once the filter
+    has all it needs, the rest of the output is skipped.
+    
+    Args:
+        session: Session of the dump to run the command on
+        command: The WinDBG command
+        output_filter: Filter to apply to the output
+    
+    Returns:
+        The output lines and, if the command timed out, the timeout message;
+        the output is then what cdb had produced until the timeout
+    """
+    sink = current_output_sink()
+    if output_filter is None:
+        try:
+            return await session.send_command(command, on_output=sink), None
+        except CDBTimeoutError as e:
+            return e.partial_output, str(e)
+    
+    async def on_output(lines: List[str]) -> bool:
+        kept = output_filter.feed(lines)
+        if kept and sink is not None:
+            await sink(kept)
+        return output_filter.done
+    
+    timeout_message = None
+    try:
+        await session.send_command(command, on_output=on_output, collect=False)
+    except CDBTimeoutError as e:
+        timeout_message = str(e)
+    # Lines held back for tail are only known now
+    kept = output_filter.finish()
+    if kept and sink is not None:
+        await sink(kept)
+    return output_filter.result(), timeout_message
+
+
+def format_page_footer(page: OutputPage) -> str:
+    """Position of a page in its output and how to read the next one"""
+    footer = (
+        f"Showing lines {page.start_line + 1}-{page.end_line} of {page.output.line_count} "
+        f"({page.output.size / 1024:.1f} KB in total)."
+    )
+    if page.next_cursor:
+        footer += f' To see more, call read_windbg_output with cursor="{page.next_cursor}".'
+    return footer
+
+
+def page_command_output(dump_path: str, command: str, output: List[str]) -> Tuple[str, Optional[str]]:
+    """
+    Keep large outputs in the output store and return only their first page.
+    
+    Returns:
+        The output text to return and, for a paged output, the page footer
+    """
+    page = output_store.first_page(command, dump_path, output)
+    if page is None:
+        return "\n".join(output), None
+    return page.text, format_page_footer(page)
+
+
+@traced("format_output")
+def format_command_output(
+    dump_path: str,
+    command: str,
+    output: List[str],
+    timeout_message: Optional[str] = None,
+    output_filter: Optional[OutputFilter] = None
+) -> str:
+    """Format the result of run_windbg_cmd"""
+    text, footer = page_command_output(dump_path, command, output)
+    text = f"Command: {command}\n\nOutput:\n```\n{text}\n```"
+    if footer:
+        text += f"\n\n{footer}"
+    if output_filter is not None:
+        text += f"\n\n{output_filter.describe()}"
+    if timeout_message:
+        text += f"\n\nOutput is incomplete. {timeout_message}"
+    return text
+
+
+def read_output_page(args: ReadWindbgOutputParams) -> str:
+    """
+    Format the page of a stored output that a cursor points to.
+    
+    Raises:
+        McpError: If the cursor is invalid or the output is no longer stored
+    """
+    try:
+        page = output_store.read(args.cursor, args.max_bytes)
+    except ValueError as e:
+        raise McpError(ErrorData(code=INVALID_PARAMS, message=str(e)))
+    except KeyError:
+        raise McpError(ErrorData(
+            code=INVALID_PARAMS,
+            message="This output is no longer available; run the command again."
+        ))
+    return (
+        f"Command: {page.output.command}\n\nOutput:\n```\n{page.text}\n```\n\n"
+        + format_page_footer(page)
+    )
+
+
+async def execute_common_analysis_commands(session: CachedSession) -> dict:
     """
     Execute common analysis commands and return the results.
     
@@ -127,10 +787,10 @@ def execute_common_analysis_commands(session: CDBSession) -> dict:
     results = {}
     
     try:
-        results["info"] = session.send_command(".lastevent")
-        results["exception"] = session.send_command("!analyze -v")
-        results["modules"] = session.send_command("lm")
-        results["threads"] = session.send_command("~")
+        outputs, timeout_message = await run_batch(session, [".lastevent", "!analyze -v", "lm", "~"])
+        results.update(zip(("info", "exception", "modules", "threads"), outputs))
+        if timeout_message:
+            results["error"] = timeout_message
     except CDBError as e:
         results["error"] = str(e)
     
@@ -142,6 +802,18 @@ async def serve(
     symbols_path: Optional[str] = None,
     timeout: int = 300,
     verbose: bool = False,
+    use_cache: bool = True,
+    cache_dir: Optional[str] = None,
+    cache_size_mb: int = DEFAULT_CACHE_SIZE_MB,
+    max_sessions: int = DEFAULT_MAX_SESSIONS,
+    session_idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+    session_memory_limit_mb: Optional[int] = None,
+    max_replicas: int = DEFAULT_MAX_REPLICAS,
+    replica_idle_timeout: float = DEFAULT_REPLICA_IDLE_TIMEOUT,
+    bucket_depth: int = DEFAULT_BUCKET_DEPTH,
+    output_store_mb: int = DEFAULT_STORE_SIZE_MB,
+    trace_file: Optional[str] = None,
+    trace_profile: bool = False,
 ) -> None:
     """Run the WinDBG MCP server.
 
@@ -150,7 +822,26 @@ async def serve(
         symbols_path: Optional custom symbols path
         timeout: Command timeout in seconds
         verbose: Whether to enable verbose output
+        use_cache: Whether to cache deterministic command results on disk
+        cache_dir: Optional custom directory for the result cache
+        cache_size_mb: Maximum size of the result cache in MB
+        max_sessions: Maximum number of concurrently running cdb processes
+        session_idle_timeout: Seconds after which an unused cdb process is stopped
+        session_memory_limit_mb: Memory above which an idle cdb process is restarted
+        max_replicas: Maximum number of read replicas per dump (0 disables them)
+        replica_idle_timeout: Seconds after which an unused read replica is stopped
+        bucket_depth: Number of stack frames in a crash signature
+        output_store_mb: Memory for large command outputs read page by page
+        trace_file: Optional file to write per-request trace spans to
+        trace_profile: Whether to sample stacks during each traced request
     """
+    configure_result_cache(use_cache, cache_dir, cache_size_mb)
+    configure_crash_index(cache_dir, bucket_depth)
+    configure_output_store(output_store_mb)
+    configure_tracing(trace_file, trace_profile)
+    configure_session_pool(
+        max_sessions, session_idle_timeout, session_memory_limit_mb, max_replicas, replica_idle_timeout
+    )
     server = Server("mcp-windbg")
     
     @server.list_tools()
@@ -169,9 +860,49 @@ async def serve(
                 description="""
                 Execute a specific WinDBG command on a loaded crash dump.
                 This tool allows you to run any WinDBG command on the crash dump and get the output.
+                Large outputs are returned one page at a time; use read_windbg_output for the rest.
+                To get only part of a large output, filter it on the server with grep/invert,
+                head/tail, fields (columns) and max_bytes.
+                With structured=true, the output of lm, ~, k/kb/kn, ~*kb, .lastevent and !analyze
+                is returned as JSON records instead of text.
                 """,
                 inputSchema=RunWindbgCmdParams.model_json_schema(),
             ),
+            Tool(
+                name="read_windbg_output",
+                description="""
+                Read the next page of a large command output.
+                Pass the cursor returned by run_windbg_cmd or by a previous read_windbg_output call.
+                """,
+                inputSchema=ReadWindbgOutputParams.model_json_schema(),
+            ),
+            Tool(
+                name="run_windbg_batch",
+                description="""
+                Execute several WinDBG commands on a loaded crash dump in one round-trip.
+                The commands run in order and the output of each command is returned separately.
+                """,
+                inputSchema=RunWindbgBatchParams.model_json_schema(),
+            ),
+            Tool(
+                name="bucket_windbg_dump",
+                description="""
+                Find the crash bucket of a dump: dumps with the same exception code and top stack frames.
+                Returns the crash signature and other dumps already seen with it, so duplicates
+                of a known crash can be recognized without a full analysis.
+                """,
+                inputSchema=BucketWindbgDumpParams.model_json_schema(),
+            ),
+            Tool(
+                name="unique_windbg_stacks",
+                description="""
+                Group the threads of a crash dump by identical call stack, like !uniqstack.
+                Runs a single ~*kb and returns each unique stack once, with the number of threads
+                sharing it and a few representative thread numbers and ids. Use this to survey
+                dumps with many threads (deadlocks, hangs, thread pool exhaustion).
+                """,
+                inputSchema=UniqueWindbgStacksParams.model_json_schema(),
+            ),
             Tool(
                 name="close_windbg_dump",
                 description="""
@@ -192,32 +923,15 @@ async def serve(
 
     @server.call_tool()
     async def call_tool(name, arguments: dict) -> list[TextContent]:
+        with span("call_tool", tool=name):
+            return await handle_tool_call(name, arguments)
+
+    async def handle_tool_call(name, arguments: dict) -> list[TextContent]:
         try:
             if name == "open_windbg_dump":
                 # Check if dump_path is missing or empty
                 if "dump_path" not in arguments or not arguments.get("dump_path"):
-                    local_dumps_path = get_local_dumps_path()
-                    dumps_found_text = ""
-                    
-                    if local_dumps_path:
-                        # Find dump files in the local dumps directory
-                        search_pattern = os.path.join(local_dumps_path, "*.*dmp")
-                        dump_files = glob.glob(search_pattern)
-                        
-                        if dump_files:
-                            dumps_found_text = f"\n\nI found {len(dump_files)} crash dump(s) in {local_dumps_path}:\n\n"
-                            for i, dump_file in enumerate(dump_files[:10]):  # Limit to 10 dumps to avoid clutter
-                                try:
-                                    size_mb = round(os.path.getsize(dump_file) / (1024 * 1024), 2)
-                                except (OSError, IOError):
-                                    size_mb = "unknown"
-                                
-                                dumps_found_text += f"{i+1}. {dump_file} ({size_mb} MB)\n"
-                                
-                            if len(dump_files) > 10:
-                                dumps_found_text += f"\n... and {len(dump_files) - 10} more dump files.\n"
-                                
-                            dumps_found_text += "\nYou can analyze one of these dumps by specifying its path."
+                    dumps_found_text = await asyncio.to_thread(recent_dumps_hint, get_local_dumps_path())
                     
                     return [TextContent(
                         type="text",
@@ -226,31 +940,45 @@ async def serve(
                     )]
                 
                 args = OpenWindbgDump(**arguments)
-                session = get_or_create_session(
+                session = await get_or_create_session(
                     args.dump_path, cdb_path, symbols_path, timeout, verbose
                 )
                 
-                results = []
-                
-                crash_info = session.send_command(".lastevent")
-                results.append("### Crash Information\n```\n" + "\n".join(crash_info) + "\n```\n\n")
-                
-                # Run !analyze -v
-                analysis = session.send_command("!analyze -v")
-                results.append("### Crash Analysis\n```\n" + "\n".join(analysis) + "\n```\n\n")
+                # Read the crash overview straight from the dump file when possible
+                crash_information = read_crash_information(args.dump_path)
+                sections = [] if crash_information is not None else [("Crash Information", ".lastevent")]
+                sections.append(("Crash Analysis", "!analyze -v"))
                 
                 # Optional
                 if args.include_stack_trace:
-                    stack = session.send_command("kb")
-                    results.append("### Stack Trace\n```\n" + "\n".join(stack) + "\n```\n\n")
+                    sections.append(("Stack Trace", "kb"))
                 
                 if args.include_modules:
-                    modules = session.send_command("lm")
-                    results.append("### Loaded Modules\n```\n" + "\n".join(modules) + "\n```\n\n")
+                    sections.append(("Loaded Modules", "lm"))
                 
                 if args.include_threads:
-                    threads = session.send_command("~")
-                    results.append("### Threads\n```\n" + "\n".join(threads) + "\n```\n\n")
+                    sections.append(("Threads", "~"))
+                
+                # Run the whole command set in a single round-trip
+                outputs, timeout_message = await run_batch(session, [command for _, command in sections])
+                completed = len(outputs) - 1 if timeout_message else len(outputs)
+                
+                results = []
+                if crash_information is not None:
+                    results.append("### Crash Information\n```\n" + "\n".join(crash_information) + "\n```\n\n")
+                for i, ((title, _), output) in enumerate(zip(sections, outputs)):
+                    if i == completed:
+                        title += " (incomplete)"
+                    results.append(f"### {title}\n```\n" + "\n".join(output) + "\n```\n\n")
+                if timeout_message:
+                    results.append(f"### Timed Out\n{timeout_message}. The sections after it were not run.\n\n")
+                
+                # Bucket the dump from the analysis we already have
+                analysis_index = [command for _, command in sections].index("!analyze -v")
+                if analysis_index < completed:
+                    bucket_text = await index_analysis(args.dump_path, outputs[analysis_index], session.dump_hash)
+                    if bucket_text:
+                        results.append(f"### Crash Bucket\n```\n{bucket_text}\n```\n\n")
                 
                 return [TextContent(
                     type="text",
@@ -259,19 +987,72 @@ async def serve(
                 
             elif name == "run_windbg_cmd":
                 args = RunWindbgCmdParams(**arguments)
-                session = get_or_create_session(
+                output_filter = make_output_filter(args)
+                parser = make_output_parser(args)
+                session = await get_or_create_session(
                     args.dump_path, cdb_path, symbols_path, timeout, verbose
                 )
-                output = session.send_command(args.command)
+                if parser is not None:
+                    return [TextContent(
+                        type="text",
+                        text=await run_structured_command(session, args.command, parser)
+                    )]
+                # Stream output as progress notifications if the client asked for progress
+                with output_sink(progress_output_sink(server.request_context)):
+                    output, timeout_message = await run_streaming_command(session, args.command, output_filter)
                 
                 return [TextContent(
                     type="text",
-                    text=f"Command: {args.command}\n\nOutput:\n```\n" + "\n".join(output) + "\n```"
+                    text=format_command_output(
+                        args.dump_path, args.command, output, timeout_message, output_filter
+                    )
+                )]
+                
+            elif name == "read_windbg_output":
+                args = ReadWindbgOutputParams(**arguments)
+                return [TextContent(
+                    type="text",
+                    text=read_output_page(args)
+                )]
+                
+            elif name == "run_windbg_batch":
+                args = RunWindbgBatchParams(**arguments)
+                session = await get_or_create_session(
+                    args.dump_path, cdb_path, symbols_path, timeout, verbose
+                )
+                outputs, timeout_message = await run_batch(session, args.commands)
+                text = "\n\n".join(
+                    f"Command: {command}\n\nOutput:\n```\n" + "\n".join(output) + "\n```"
+                    for command, output in zip(args.commands, outputs)
+                )
+                if timeout_message:
+                    text += f"\n\nOutput is incomplete. {timeout_message}. The commands after it were not run."
+                
+                return [TextContent(
+                    type="text",
+                    text=text
+                )]
+                
+            elif name == "bucket_windbg_dump":
+                args = BucketWindbgDumpParams(**arguments)
+                return [TextContent(
+                    type="text",
+                    text=await find_crash_bucket(args, cdb_path, symbols_path, timeout, verbose)
+                )]
+                
+            elif name == "unique_windbg_stacks":
+                args = UniqueWindbgStacksParams(**arguments)
+                session = await get_or_create_session(
+                    args.dump_path, cdb_path, symbols_path, timeout, verbose
+                )
+                return [TextContent(
+                    type="text",
+                    text=await find_unique_stacks(session, args)
                 )]
                 
             elif name == "close_windbg_dump":
                 args = CloseWindbgDumpParams(**arguments)
-                success = unload_session(args.dump_path)
+                success = await unload_session(args.dump_path)
                 if success:
                     return [TextContent(
                         type="text",
@@ -294,41 +1075,9 @@ async def serve(
                             message="No directory path specified and no default dump path found in registry."
                         ))
                 
-                if not os.path.exists(args.directory_path) or not os.path.isdir(args.directory_path):
-                    raise McpError(ErrorData(
-                        code=INVALID_PARAMS,
-                        message=f"Directory not found: {args.directory_path}"
-                    ))
-                
-                # Determine search pattern based on recursion flag
-                search_pattern = os.path.join(args.directory_path, "**", "*.*dmp") if args.recursive else os.path.join(args.directory_path, "*.*dmp")
-                
-                # Find all dump files
-                dump_files = glob.glob(search_pattern, recursive=args.recursive)
-                
-                # Sort alphabetically for consistent results
-                dump_files.sort()
-                
-                if not dump_files:
-                    return [TextContent(
-                        type="text",
-                        text=f"No crash dump files (*.*dmp) found in {args.directory_path}"
-                    )]
-                
-                # Format the results
-                result_text = f"Found {len(dump_files)} crash dump file(s) in {args.directory_path}:\n\n"
-                for i, dump_file in enumerate(dump_files):
-                    # Get file size in MB
-                    try:
-                        size_mb = round(os.path.getsize(dump_file) / (1024 * 1024), 2)
-                    except (OSError, IOError):
-                        size_mb = "unknown"
-                    
-                    result_text += f"{i+1}. {dump_file} ({size_mb} MB)\n"
-                
                 return [TextContent(
                     type="text",
-                    text=result_text
+                    text=await list_dumps(args, args.directory_path)
                 )]
             
             raise McpError(ErrorData(
@@ -346,19 +1095,21 @@ async def serve(
             ))
             
     options = server.create_initialization_options()
-    async with stdio_server() as (read_stream, write_stream):
-        await server.run(read_stream, write_stream, options, raise_exceptions=True)
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await server.run(read_stream, write_stream, options, raise_exceptions=True)
+    finally:
+        await shutdown_sessions()
+
+
+async def shutdown_sessions():
+    """Shut down all active CDB sessions from within the event loop."""
+    await session_pool.close()
 
 # Clean up function to ensure all sessions are closed when the server exits
 def cleanup_sessions():
     """Close all active CDB sessions."""
-    for dump_path, session in active_sessions.items():
-        try:
-            if session is not None:
-                session.shutdown()
-        except Exception:
-            pass
-    active_sessions.clear()
+    session_pool.terminate_all()
 
 # Register cleanup on module exit
 import atexit
@@ -1,8 +1,6 @@
 import asyncio
 import os
 import traceback
-import glob
-from datetime import datetime
 from typing import Optional, Dict, Any, Tuple, List
 from mcp.server import Server
 from mcp.server.stdio import stdio_server
@@ -15,14 +13,46 @@ from .server import (
     get_or_create_session, 
     unload_session, 
     get_local_dumps_path,
+    configure_result_cache,
+    configure_session_pool,
+    configure_crash_index,
+    configure_output_store,
+    find_crash_bucket,
+    find_unique_stacks,
+    index_analysis,
+    list_dumps,
+    recent_dumps_hint,
+    run_batch,
+    run_streaming_command,
+    run_structured_command,
+    make_output_filter,
+    make_output_parser,
+    format_command_output,
+    read_output_page,
     OpenWindbgDump,
     RunWindbgCmdParams,
+    ReadWindbgOutputParams,
+    RunWindbgBatchParams,
+    BucketWindbgDumpParams,
+    UniqueWindbgStacksParams,
     CloseWindbgDumpParams,
     ListWindbgDumpsParams
 )
-from .websocket_server import start_websocket_server
-from .sse_server import SSEServer
+from .minidump import read_crash_information
+from .websocket_server import start_websocket_server, DEFAULT_MAX_CONCURRENT_REQUESTS
+from .sse_server import (
+    SSEServer,
+    DEFAULT_SSE_WORKERS,
+    DEFAULT_CLIENT_QUEUE_SIZE,
+    DEFAULT_OVERFLOW_POLICY,
+    DEFAULT_DISCONNECT_AFTER,
+)
 from .file_upload import start_upload_server
+from .crash_buckets import DEFAULT_BUCKET_DEPTH
+from .output_store import DEFAULT_STORE_SIZE_MB
+from .result_cache import DEFAULT_CACHE_SIZE_MB
+from .session_pool import DEFAULT_MAX_SESSIONS, DEFAULT_IDLE_TIMEOUT, DEFAULT_MAX_REPLICAS, DEFAULT_REPLICA_IDLE_TIMEOUT
+from .tracing import configure_tracing, span
 
 class ServerFactory:
     """Factory for creating MCP servers."""
@@ -32,7 +62,19 @@ class ServerFactory:
         cdb_path: Optional[str] = None,
         symbols_path: Optional[str] = None,
         timeout: int = 30,
-        verbose: bool = False
+        verbose: bool = False,
+        use_cache: bool = True,
+        cache_dir: Optional[str] = None,
+        cache_size_mb: int = DEFAULT_CACHE_SIZE_MB,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        session_idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        session_memory_limit_mb: Optional[int] = None,
+        max_replicas: int = DEFAULT_MAX_REPLICAS,
+        replica_idle_timeout: float = DEFAULT_REPLICA_IDLE_TIMEOUT,
+        bucket_depth: int = DEFAULT_BUCKET_DEPTH,
+        output_store_mb: int = DEFAULT_STORE_SIZE_MB,
+        trace_file: Optional[str] = None,
+        trace_profile: bool = False
     ) -> None:
         """Create a local stdio-based MCP server.
         
@@ -41,12 +83,36 @@ class ServerFactory:
             symbols_path: Optional custom symbols path
             timeout: Command timeout in seconds
             verbose: Whether to enable verbose output
+            use_cache: Whether to cache deterministic command results on disk
+            cache_dir: Optional custom directory for the result cache
+            cache_size_mb: Maximum size of the result cache in MB
+            max_sessions: Maximum number of concurrently running cdb processes
+            session_idle_timeout: Seconds after which an unused cdb process is stopped
+            session_memory_limit_mb: Memory above which an idle cdb process is restarted
+            max_replicas: Maximum number of read replicas per dump (0 disables them)
+            replica_idle_timeout: Seconds after which an unused read replica is stopped
+            bucket_depth: Number of stack frames in a crash signature
+            output_store_mb: Memory for large command outputs read page by page
+            trace_file: Optional file to write per-request trace spans to
+            trace_profile: Whether to sample stacks during each traced request
         """
         await serve_stdio(
             cdb_path=cdb_path,
             symbols_path=symbols_path,
             timeout=timeout,
-            verbose=verbose
+            verbose=verbose,
+            use_cache=use_cache,
+            cache_dir=cache_dir,
+            cache_size_mb=cache_size_mb,
+            max_sessions=max_sessions,
+            session_idle_timeout=session_idle_timeout,
+            session_memory_limit_mb=session_memory_limit_mb,
+            max_replicas=max_replicas,
+            replica_idle_timeout=replica_idle_timeout,
+            bucket_depth=bucket_depth,
+            output_store_mb=output_store_mb,
+            trace_file=trace_file,
+            trace_profile=trace_profile
         )
     
     @staticmethod
@@ -60,7 +126,24 @@ class ServerFactory:
         timeout: int = 30,
         verbose: bool = False,
         use_sse: bool = False,
-        sse_port: int = 8767
+        sse_port: int = 8767,
+        sse_workers: int = DEFAULT_SSE_WORKERS,
+        sse_client_queue: int = DEFAULT_CLIENT_QUEUE_SIZE,
+        sse_overflow: str = DEFAULT_OVERFLOW_POLICY,
+        sse_disconnect_after: Optional[float] = DEFAULT_DISCONNECT_AFTER,
+        max_concurrent_requests: int = DEFAULT_MAX_CONCURRENT_REQUESTS,
+        use_cache: bool = True,
+        cache_dir: Optional[str] = None,
+        cache_size_mb: int = DEFAULT_CACHE_SIZE_MB,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        session_idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        session_memory_limit_mb: Optional[int] = None,
+        max_replicas: int = DEFAULT_MAX_REPLICAS,
+        replica_idle_timeout: float = DEFAULT_REPLICA_IDLE_TIMEOUT,
+        bucket_depth: int = DEFAULT_BUCKET_DEPTH,
+        output_store_mb: int = DEFAULT_STORE_SIZE_MB,
+        trace_file: Optional[str] = None,
+        trace_profile: bool = False
     ) -> None:
         """Create a remote MCP server with file upload capability.
         
@@ -75,7 +158,32 @@ class ServerFactory:
             verbose: Whether to enable verbose output
             use_sse: Whether to use SSE instead of WebSocket
             sse_port: Port for the SSE server (if use_sse is True)
+            sse_workers: Number of worker tasks processing SSE requests
+            sse_client_queue: Outbound queue length per SSE client
+            sse_overflow: Policy when an SSE client's queue is full: drop, coalesce or disconnect
+            sse_disconnect_after: Disconnect SSE clients whose oldest queued event is older than this
+            max_concurrent_requests: Maximum number of in-flight requests per WebSocket connection
+            use_cache: Whether to cache deterministic command results on disk
+            cache_dir: Optional custom directory for the result cache
+            cache_size_mb: Maximum size of the result cache in MB
+            max_sessions: Maximum number of concurrently running cdb processes
+            session_idle_timeout: Seconds after which an unused cdb process is stopped
+            session_memory_limit_mb: Memory above which an idle cdb process is restarted
+            max_replicas: Maximum number of read replicas per dump (0 disables them)
+            replica_idle_timeout: Seconds after which an unused read replica is stopped
+            bucket_depth: Number of stack frames in a crash signature
+            output_store_mb: Memory for large command outputs read page by page
+            trace_file: Optional file to write per-request trace spans to
+            trace_profile: Whether to sample stacks during each traced request
         """
+        configure_result_cache(use_cache, cache_dir, cache_size_mb)
+        configure_session_pool(
+            max_sessions, session_idle_timeout, session_memory_limit_mb, max_replicas, replica_idle_timeout
+        )
+        configure_crash_index(cache_dir, bucket_depth)
+        configure_output_store(output_store_mb)
+        configure_tracing(trace_file, trace_profile)
+        
         # 创建MCP服务器实例
         server = Server("mcp-windbg")
         
@@ -95,9 +203,49 @@ class ServerFactory:
                     description="""
                     Execute a specific WinDBG command on a loaded crash dump.
                     This tool allows you to run any WinDBG command on the crash dump and get the output.
+                    Large outputs are returned one page at a time; use read_windbg_output for the rest.
+                    To get only part of a large output, filter it on the server with grep/invert,
+                    head/tail, fields (columns) and max_bytes.
+                    With structured=true, the output of lm, ~, k/kb/kn, ~*kb, .lastevent and !analyze
+                    is returned as JSON records instead of text.
                     """,
                     inputSchema=RunWindbgCmdParams.model_json_schema(),
                 ),
+                Tool(
+                    name="read_windbg_output",
+                    description="""
+                    Read the next page of a large command output.
+                    Pass the cursor returned by run_windbg_cmd or by a previous read_windbg_output call.
+                    """,
+                    inputSchema=ReadWindbgOutputParams.model_json_schema(),
+                ),
+                Tool(
+                    name="run_windbg_batch",
+                    description="""
+                    Execute several WinDBG commands on a loaded crash dump in one round-trip.
+                    The commands run in order and the output of each command is returned separately.
+                    """,
+                    inputSchema=RunWindbgBatchParams.model_json_schema(),
+                ),
+                Tool(
+                    name="bucket_windbg_dump",
+                    description="""
+                    Find the crash bucket of a dump: dumps with the same exception code and top stack frames.
+                    Returns the crash signature and other dumps already seen with it, so duplicates
+                    of a known crash can be recognized without a full analysis.
+                    """,
+                    inputSchema=BucketWindbgDumpParams.model_json_schema(),
+                ),
+                Tool(
+                    name="unique_windbg_stacks",
+                    description="""
+                    Group the threads of a crash dump by identical call stack, like !uniqstack.
+                    Runs a single ~*kb and returns each unique stack once, with the number of threads
+                    sharing it and a few representative thread numbers and ids. Use this to survey
+                    dumps with many threads (deadlocks, hangs, thread pool exhaustion).
+                    """,
+                    inputSchema=UniqueWindbgStacksParams.model_json_schema(),
+                ),
                 Tool(
                     name="close_windbg_dump",
                     description="""
@@ -118,32 +266,15 @@ class ServerFactory:
         
         # 实现call_tool处理函数
         async def call_tool_handler(name: str, arguments: dict) -> List[TextContent]:
+            with span("call_tool", tool=name):
+                return await handle_tool_call(name, arguments)
+        
+        async def handle_tool_call(name: str, arguments: dict) -> List[TextContent]:
             try:
                 if name == "open_windbg_dump":
                     # Check if dump_path is missing or empty
                     if "dump_path" not in arguments or not arguments.get("dump_path"):
-                        local_dumps_path = get_local_dumps_path()
-                        dumps_found_text = ""
-                        
-                        if local_dumps_path:
-                            # Find dump files in the local dumps directory
-                            search_pattern = os.path.join(local_dumps_path, "*.*dmp")
-                            dump_files = glob.glob(search_pattern)
-                            
-                            if dump_files:
-                                dumps_found_text = f"\n\nI found {len(dump_files)} crash dump(s) in {local_dumps_path}:\n\n"
-                                for i, dump_file in enumerate(dump_files[:10]):  # Limit to 10 dumps to avoid clutter
-                                    try:
-                                        size_mb = round(os.path.getsize(dump_file) / (1024 * 1024), 2)
-                                    except (OSError, IOError):
-                                        size_mb = "unknown"
-                                    
-                                    dumps_found_text += f"{i+1}. {dump_file} ({size_mb} MB)\n"
-                                    
-                                if len(dump_files) > 10:
-                                    dumps_found_text += f"\n... and {len(dump_files) - 10} more dump files.\n"
-                                    
-                                dumps_found_text += "\nYou can analyze one of these dumps by specifying its path."
+                        dumps_found_text = await asyncio.to_thread(recent_dumps_hint, get_local_dumps_path())
                         
                         return [TextContent(
                             type="text",
@@ -152,31 +283,45 @@ class ServerFactory:
                         )]
                     
                     args = OpenWindbgDump(**arguments)
-                    session = get_or_create_session(
+                    session = await get_or_create_session(
                         args.dump_path, cdb_path, symbols_path, timeout, verbose
                     )
                     
-                    results = []
-                    
-                    crash_info = session.send_command(".lastevent")
-                    results.append("### Crash Information\n```\n" + "\n".join(crash_info) + "\n```\n\n")
-                    
-                    # Run !analyze -v
-                    analysis = session.send_command("!analyze -v")
-                    results.append("### Crash Analysis\n```\n" + "\n".join(analysis) + "\n```\n\n")
+                    # Read the crash overview straight from the dump file when possible
+                    crash_information = read_crash_information(args.dump_path)
+                    sections = [] if crash_information is not None else [("Crash Information", ".lastevent")]
+                    sections.append(("Crash Analysis", "!analyze -v"))
                     
                     # Optional
                     if args.include_stack_trace:
-                        stack = session.send_command("kb")
-                        results.append("### Stack Trace\n```\n" + "\n".join(stack) + "\n```\n\n")
+                        sections.append(("Stack Trace", "kb"))
                     
                     if args.include_modules:
-                        modules = session.send_command("lm")
-                        results.append("### Loaded Modules\n```\n" + "\n".join(modules) + "\n```\n\n")
+                        sections.append(("Loaded Modules", "lm"))
                     
                     if args.include_threads:
-                        threads = session.send_command("~")
-                        results.append("### Threads\n```\n" + "\n".join(threads) + "\n```\n\n")
+                        sections.append(("Threads", "~"))
+                    
+                    # Run the whole command set in a single round-trip
+                    outputs, timeout_message = await run_batch(session, [command for _, command in sections])
+                    completed = len(outputs) - 1 if timeout_message else len(outputs)
+                    
+                    results = []
+                    if crash_information is not None:
+                        results.append("### Crash Information\n```\n" + "\n".join(crash_information) + "\n```\n\n")
+                    for i, ((title, _), output) in enumerate(zip(sections, outputs)):
+                        if i == completed:
+                            title += " (incomplete)"
+                        results.append(f"### {title}\n```\n" + "\n".join(output) + "\n```\n\n")
+                    if timeout_message:
+                        results.append(f"### Timed Out\n{timeout_message}. The sections after it were not run.\n\n")
+                    
+                    # Bucket the dump from the analysis we already have
+                    analysis_index = [command for _, command in sections].index("!analyze -v")
+                    if analysis_index < completed:
+                        bucket_text = await index_analysis(args.dump_path, outputs[analysis_index], session.dump_hash)
+                        if bucket_text:
+                            results.append(f"### Crash Bucket\n```\n{bucket_text}\n```\n\n")
                     
                     return [TextContent(
                         type="text",
@@ -185,20 +330,77 @@ class ServerFactory:
                     
                 elif name == "run_windbg_cmd":
                     args = RunWindbgCmdParams(**arguments)
-                    session = get_or_create_session(
+                    output_filter = make_output_filter(args)
+                    parser = make_output_parser(args)
+                    session = await get_or_create_session(
+                        args.dump_path, cdb_path, symbols_path, timeout, verbose
+                    )
+                    
+                    # 结构化输出：解析器在输出到达时逐块解析，返回 JSON 记录
+                    if parser is not None:
+                        return [TextContent(
+                            type="text",
+                            text=await run_structured_command(session, args.command, parser)
+                        )]
+                    
+                    # 输出块由 WebSocket/SSE 连接设置的输出接收器实时转发；
+                    # 有过滤条件时只保留和转发过滤后的行
+                    output, timeout_message = await run_streaming_command(session, args.command, output_filter)
+                    
+                    # 与 stdio 服务器相同的格式；大输出只返回第一页，其余保存在服务器端
+                    return [TextContent(
+                        type="text",
+                        text=format_command_output(
+                            args.dump_path, args.command, output, timeout_message, output_filter
+                        )
+                    )]
+                    
+                elif name == "read_windbg_output":
+                    args = ReadWindbgOutputParams(**arguments)
+                    return [TextContent(
+                        type="text",
+                        text=read_output_page(args)
+                    )]
+                    
+                elif name == "run_windbg_batch":
+                    args = RunWindbgBatchParams(**arguments)
+                    session = await get_or_create_session(
                         args.dump_path, cdb_path, symbols_path, timeout, verbose
                     )
                     
-                    output = session.send_command(args.command)
+                    outputs, timeout_message = await run_batch(session, args.commands)
+                    text = "\n\n".join(
+                        f"### Command: {command}\n```\n" + "\n".join(output) + "\n```"
+                        for command, output in zip(args.commands, outputs)
+                    )
+                    if timeout_message:
+                        text += f"\n\nOutput is incomplete. {timeout_message}. The commands after it were not run."
+                    
+                    return [TextContent(
+                        type="text",
+                        text=text
+                    )]
                     
+                elif name == "bucket_windbg_dump":
+                    args = BucketWindbgDumpParams(**arguments)
                     return [TextContent(
                         type="text",
-                        text=f"### Command: {args.command}\n```\n" + "\n".join(output) + "\n```"
+                        text=await find_crash_bucket(args, cdb_path, symbols_path, timeout, verbose)
+                    )]
+                    
+                elif name == "unique_windbg_stacks":
+                    args = UniqueWindbgStacksParams(**arguments)
+                    session = await get_or_create_session(
+                        args.dump_path, cdb_path, symbols_path, timeout, verbose
+                    )
+                    return [TextContent(
+                        type="text",
+                        text=await find_unique_stacks(session, args)
                     )]
                     
                 elif name == "close_windbg_dump":
                     args = CloseWindbgDumpParams(**arguments)
-                    unload_session(args.dump_path)
+                    await unload_session(args.dump_path)
                     
                     return [TextContent(
                         type="text",
@@ -209,7 +411,7 @@ class ServerFactory:
                     args = ListWindbgDumpsParams(**arguments)
                     
                     # Use provided directory or default
-                    search_dir = args.directory if args.directory else get_local_dumps_path()
+                    search_dir = args.directory_path if args.directory_path else get_local_dumps_path()
                     
                     if not search_dir:
                         return [TextContent(
@@ -217,33 +419,9 @@ class ServerFactory:
                             text="No directory specified and no default dumps directory found."
                         )]
                     
-                    # Find dump files
-                    search_pattern = os.path.join(search_dir, "*.*dmp")
-                    dump_files = glob.glob(search_pattern)
-                    
-                    if not dump_files:
-                        return [TextContent(
-                            type="text",
-                            text=f"No crash dump files found in {search_dir}"
-                        )]
-                    
-                    # Format results
-                    result_text = f"Found {len(dump_files)} crash dump(s) in {search_dir}:\n\n"
-                    
-                    for i, dump_file in enumerate(dump_files):
-                        try:
-                            size_mb = round(os.path.getsize(dump_file) / (1024 * 1024), 2)
-                            modified_time = os.path.getmtime(dump_file)
-                            modified_str = datetime.fromtimestamp(modified_time).strftime('%Y-%m-%d %H:%M:%S')
-                        except (OSError, IOError):
-                            size_mb = "unknown"
-                            modified_str = "unknown"
-                        
-                        result_text += f"{i+1}. {dump_file} ({size_mb} MB, modified: {modified_str})\n"
-                    
                     return [TextContent(
                         type="text",
-                        text=result_text
+                        text=await list_dumps(args, search_dir)
                     )]
                     
                 else:
@@ -271,12 +449,23 @@ class ServerFactory:
         
         # 启动WebSocket或SSE服务器
         if use_sse:
-            sse_server, runner = await SSEServer.create(server, host, sse_port)
+            sse_server, runner = await SSEServer.create(
+                server, host, sse_port, sse_workers,
+                sse_client_queue, sse_overflow, sse_disconnect_after
+            )
             print(f"SSE server started at http://{host}:{sse_port}")
+            try:
+                # SSE服务器在后台运行，保持运行直到被取消
+                await asyncio.Event().wait()
+            finally:
+                await sse_server.close()
+                await runner.cleanup()
+                await upload_runner.cleanup()
         else:
             await start_websocket_server(
                 server_instance=server,
                 host=host,
-                port=port
+                port=port,
+                max_concurrent=max_concurrent_requests
             )
             print(f"WebSocket server started at ws://{host}:{port}")
\ No newline at end of file
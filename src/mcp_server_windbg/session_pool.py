@@ -0,0 +1,536 @@
+"""
+Bounded pool of debugger sessions.
+
+Each open dump is represented by a CachedSession; the pool bounds how many
+of them may hold a live cdb process at the same time. When the limit is
+reached the least recently used idle session loses its process; cdb
+processes still starting count towards the limit, and a start that finds
+every process busy waits a while for one to become idle. A
+background task also stops processes that have been idle for too long or
+whose memory use exceeds the configured limit. A session that lost its
+process stays registered and transparently restarts cdb (restoring its
+debugger context) the next time a command is not answered from the cache.
+
+Optionally, a busy dump gets read replicas: extra cdb processes on the same
+dump that answer read-only commands while the session's own process is
+busy. Replicas are started when requests find every process of a dump busy,
+count towards max_sessions, never cause other sessions to be stopped, and
+are stopped again after being idle for a while.
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import sys
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from . import metrics
+from .cdb_session import AsyncCDBSession
+from .result_cache import CachedSession
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SESSIONS = 4
+DEFAULT_IDLE_TIMEOUT = 1800
+DEFAULT_REAP_INTERVAL = 30
+DEFAULT_MAX_REPLICAS = 0
+DEFAULT_REPLICA_IDLE_TIMEOUT = 300
+# Seconds a start waits for a busy or starting process before exceeding max_sessions
+DEFAULT_ROOM_WAIT = 30
+ROOM_POLL_INTERVAL = 0.05
+
+
+def process_rss_bytes(pid: int) -> Optional[int]:
+    """Resident memory of a process in bytes, or None if it cannot be determined"""
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            if not kernel32.K32GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return None
+            return counters.WorkingSetSize
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """User plus kernel CPU time of a process in seconds, or None if it cannot be determined"""
+    try:
+        import psutil
+        times = psutil.Process(pid).cpu_times()
+        return times.user + times.system
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        handle = kernel32.OpenProcess(PROCESS_QUERY_LIMITED_INFORMATION, False, pid)
+        if not handle:
+            return None
+        try:
+            creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+            if not kernel32.GetProcessTimes(
+                handle, ctypes.byref(creation), ctypes.byref(exit_), ctypes.byref(kernel), ctypes.byref(user)
+            ):
+                return None
+            # FILETIME counts 100 ns intervals
+            return sum(
+                (t.dwHighDateTime << 32 | t.dwLowDateTime) for t in (kernel, user)
+            ) / 10_000_000
+        finally:
+            kernel32.CloseHandle(handle)
+
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # Fields after the parenthesized command name; utime and stime are 14 and 15
+            fields = f.read().rpartition(")")[2].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ReplicaSet:
+    """
+    Extra cdb processes of one dump for read-only commands.
+
+    They only ever run commands that leave the debugger context alone, so
+    they stay in the context the dump was loaded in; CachedSession decides
+    which commands may go to them.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Awaitable[AsyncCDBSession]],
+        max_replicas: int,
+        can_grow: Callable[[], bool] = lambda: True
+    ):
+        """
+        Args:
+            factory: Coroutine function starting a cdb session for the dump
+            max_replicas: Maximum number of replicas
+            can_grow: Whether another cdb process may be started now
+        """
+        self.factory = factory
+        self.max_replicas = max_replicas
+        self.can_grow = can_grow
+        self.replicas: List[AsyncCDBSession] = []
+        self.spawns = 0
+        self.commands = 0
+        self._busy: Set[int] = set()
+        self._last_used: Dict[int, float] = {}
+        self._starting: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self.replicas)
+
+    @property
+    def busy(self) -> bool:
+        return bool(self._busy)
+
+    @property
+    def pids(self) -> List[int]:
+        return [replica.process.pid for replica in self.replicas if replica.process is not None]
+
+    def acquire(self) -> Optional[AsyncCDBSession]:
+        """
+        Reserve an idle replica for a command. When every replica is busy,
+        another one is started in the background and None is returned.
+        """
+        for replica in self.replicas:
+            if id(replica) not in self._busy:
+                self._busy.add(id(replica))
+                self.commands += 1
+                return replica
+        self.grow()
+        return None
+
+    def release(self, replica: AsyncCDBSession):
+        """Return a replica reserved by acquire(); one whose cdb died is dropped"""
+        self._busy.discard(id(replica))
+        self._last_used[id(replica)] = time.monotonic()
+        if replica.process is None or replica.process.returncode is not None:
+            self._drop(replica)
+            replica.terminate()
+
+    def grow(self):
+        """Start one more replica in the background, if the limits allow it"""
+        if self._starting is not None or len(self.replicas) >= self.max_replicas or not self.can_grow():
+            return
+        self._starting = asyncio.create_task(self._start())
+
+    async def _start(self):
+        try:
+            started = time.monotonic()
+            replica = await self.factory()
+            metrics.SESSION_SPAWN_SECONDS.observe(time.monotonic() - started)
+            self.spawns += 1
+            self.replicas.append(replica)
+            self._last_used[id(replica)] = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Could not start a cdb replica: {e}")
+        finally:
+            self._starting = None
+
+    def _drop(self, replica: AsyncCDBSession):
+        if replica in self.replicas:
+            self.replicas.remove(replica)
+        self._busy.discard(id(replica))
+        self._last_used.pop(id(replica), None)
+
+    async def shrink(self, idle_timeout: float, limit: Optional[int] = None) -> int:
+        """
+        Stop idle replicas.
+
+        Args:
+            idle_timeout: Seconds a replica must have been unused
+            limit: Maximum number of replicas to stop
+
+        Returns:
+            The number of replicas stopped
+        """
+        now = time.monotonic()
+        stopped = 0
+        for replica in list(self.replicas):
+            if limit is not None and stopped >= limit:
+                break
+            if id(replica) in self._busy or now - self._last_used.get(id(replica), now) < idle_timeout:
+                continue
+            self._drop(replica)
+            await replica.shutdown()
+            stopped += 1
+        return stopped
+
+    async def shutdown(self):
+        """Stop all replicas, including one being started"""
+        if self._starting is not None:
+            self._starting.cancel()
+            self._starting = None
+        replicas, self.replicas = self.replicas, []
+        self._busy.clear()
+        self._last_used.clear()
+        await asyncio.gather(*(replica.shutdown() for replica in replicas), return_exceptions=True)
+
+    def terminate(self):
+        """Terminate all replicas without awaiting them"""
+        if self._starting is not None:
+            self._starting.cancel()
+            self._starting = None
+        replicas, self.replicas = self.replicas, []
+        for replica in replicas:
+            replica.terminate()
+
+
+class SessionPool:
+    """LRU-ordered registry of sessions with a bound on live cdb processes."""
+
+    def __init__(
+        self,
+        max_sessions: int = DEFAULT_MAX_SESSIONS,
+        idle_timeout: float = DEFAULT_IDLE_TIMEOUT,
+        max_session_memory_mb: Optional[int] = None,
+        reap_interval: float = DEFAULT_REAP_INTERVAL,
+        max_replicas: int = DEFAULT_MAX_REPLICAS,
+        replica_idle_timeout: float = DEFAULT_REPLICA_IDLE_TIMEOUT,
+        room_wait: float = DEFAULT_ROOM_WAIT
+    ):
+        """
+        Args:
+            max_sessions: Maximum number of concurrently running cdb processes
+            idle_timeout: Seconds after which an unused cdb process is stopped (0 disables)
+            max_session_memory_mb: Resident memory above which an idle cdb process is
+                restarted on next use (None disables)
+            reap_interval: Seconds between background checks for idle and oversized sessions
+            max_replicas: Maximum number of read replicas per dump (0 disables them)
+            replica_idle_timeout: Seconds after which an unused replica is stopped
+            room_wait: Seconds a start waits for a busy or starting cdb process
+                before exceeding max_sessions
+        """
+        self.max_sessions = max(1, max_sessions)
+        self.idle_timeout = idle_timeout
+        self.max_session_memory_bytes = max_session_memory_mb * 1024 * 1024 if max_session_memory_mb else None
+        self.reap_interval = reap_interval
+        self.max_replicas = max_replicas
+        self.replica_idle_timeout = replica_idle_timeout
+        self.room_wait = room_wait
+
+        self.sessions: "collections.OrderedDict[str, CachedSession]" = collections.OrderedDict()
+        self._stopped: Dict[str, float] = {}
+        self._reaper_task: Optional[asyncio.Task] = None
+        # cdb processes being started; serialized room-making so that
+        # concurrent starts cannot all see the same free slot
+        self._starting = 0
+        self._room_lock = asyncio.Lock()
+
+        self.spawns = 0
+        self.spawn_seconds = 0.0
+        self.reopens = 0
+        self.reopen_seconds = 0.0
+        self.lru_evictions = 0
+        self.idle_reaps = 0
+        self.memory_recycles = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.sessions
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def get(self, key: str) -> Optional[CachedSession]:
+        """Return the session for a key and mark it most recently used"""
+        session = self.sessions.get(key)
+        if session is not None:
+            self.sessions.move_to_end(key)
+        return session
+
+    def add(self, key: str, session: CachedSession):
+        """Register a session as most recently used"""
+        self.sessions[key] = session
+        self.sessions.move_to_end(key)
+
+    def remove(self, key: str) -> Optional[CachedSession]:
+        """Unregister a session without shutting it down"""
+        self._stopped.pop(key, None)
+        return self.sessions.pop(key, None)
+
+    def live_count(self) -> int:
+        """Number of sessions with a running cdb process"""
+        return sum(1 for session in self.sessions.values() if session.is_live)
+
+    def replica_count(self) -> int:
+        """Number of running read replicas"""
+        return sum(len(session.replicas) for session in self.sessions.values() if session.replicas is not None)
+
+    def process_count(self) -> int:
+        """Number of running or starting cdb processes, including read replicas"""
+        return self.live_count() + self.replica_count() + self._starting
+
+    def replica_set(self, factory: Callable[[], Awaitable[AsyncCDBSession]]) -> Optional[ReplicaSet]:
+        """
+        Read replicas for a new session, or None if replicas are disabled.
+        Replicas are only started while the pool is below max_sessions.
+        """
+        if self.max_replicas <= 0:
+            return None
+        return ReplicaSet(factory, self.max_replicas, lambda: self.process_count() < self.max_sessions)
+
+    def track_starts(
+        self, key: str, factory: Callable[[], Awaitable[AsyncCDBSession]]
+    ) -> Callable[[], Awaitable[AsyncCDBSession]]:
+        """
+        Wrap a session factory so that starting cdb first makes room in the
+        pool and the start-up cost is recorded.
+        """
+        async def start() -> AsyncCDBSession:
+            async with self._room_lock:
+                await self._make_room(exclude=key)
+                self._starting += 1
+            try:
+                started = time.monotonic()
+                session = await factory()
+            finally:
+                self._starting -= 1
+            elapsed = time.monotonic() - started
+            metrics.SESSION_SPAWN_SECONDS.observe(elapsed)
+            self.spawns += 1
+            self.spawn_seconds += elapsed
+            if self._stopped.pop(key, None) is not None:
+                self.reopens += 1
+                self.reopen_seconds += elapsed
+            return session
+        return start
+
+    async def _stop(self, key: str, session: CachedSession, reason: str):
+        logger.info(f"Stopping cdb for {key} ({reason})")
+        self._stopped[key] = time.monotonic()
+        await session.shutdown()
+
+    async def _make_room(self, exclude: str):
+        deadline = time.monotonic() + self.room_wait
+        while self.process_count() >= self.max_sessions:
+            # Idle replicas go first; the dump stays open on its own process
+            if await self._stop_idle_replica():
+                continue
+            victim = next(
+                (
+                    (key, session) for key, session in self.sessions.items()
+                    if key != exclude and session.is_live and not session.busy
+                ),
+                None
+            )
+            if victim is None:
+                if time.monotonic() < deadline:
+                    # Wait for a start to finish or a command to complete
+                    await asyncio.sleep(ROOM_POLL_INTERVAL)
+                    continue
+                logger.warning(f"All {self.process_count()} cdb processes are busy; exceeding max_sessions")
+                return
+            self.lru_evictions += 1
+            await self._stop(*victim, reason="least recently used")
+
+    async def _stop_idle_replica(self) -> bool:
+        for session in list(self.sessions.values()):
+            if session.replicas is not None and await session.replicas.shrink(0, limit=1):
+                return True
+        return False
+
+    async def reap(self):
+        """Stop idle cdb processes and those exceeding the memory limit"""
+        now = time.monotonic()
+        for session in list(self.sessions.values()):
+            if session.replicas is not None:
+                await session.replicas.shrink(self.replica_idle_timeout)
+        for key, session in list(self.sessions.items()):
+            if not session.is_live or session.busy:
+                continue
+            if self.idle_timeout and now - session.last_used > self.idle_timeout:
+                self.idle_reaps += 1
+                await self._stop(key, session, reason="idle")
+            elif self.max_session_memory_bytes is not None:
+                rss = session.pid is not None and process_rss_bytes(session.pid)
+                if rss and rss > self.max_session_memory_bytes:
+                    self.memory_recycles += 1
+                    await self._stop(key, session, reason=f"using {rss // (1024 * 1024)} MB")
+
+    async def _reap_forever(self):
+        while True:
+            await asyncio.sleep(self.reap_interval)
+            try:
+                await self.reap()
+            except Exception as e:
+                logger.error(f"Session reaper error: {e}")
+
+    def start(self):
+        """Start the background reaper task (requires a running event loop)"""
+        if self._reaper_task is None or self._reaper_task.done():
+            self._reaper_task = asyncio.create_task(self._reap_forever())
+
+    async def close(self):
+        """Stop the reaper and shut down all sessions"""
+        if self._reaper_task is not None:
+            self._reaper_task.cancel()
+            try:
+                await self._reaper_task
+            except asyncio.CancelledError:
+                pass
+            self._reaper_task = None
+        sessions = list(self.sessions.values())
+        self.sessions.clear()
+        self._stopped.clear()
+        await asyncio.gather(*(session.shutdown() for session in sessions), return_exceptions=True)
+
+    def terminate_all(self):
+        """Terminate all cdb processes without awaiting them (for use outside the event loop)"""
+        for session in self.sessions.values():
+            try:
+                session.terminate()
+            except Exception:
+                pass
+        self.sessions.clear()
+
+    def stats(self) -> Dict[str, float]:
+        """Pool metrics: session counts, evictions and start-up/reopen cost"""
+        return {
+            "sessions": len(self.sessions),
+            "live_sessions": self.live_count(),
+            "replicas": self.replica_count(),
+            "max_sessions": self.max_sessions,
+            "spawns": self.spawns,
+            "spawn_seconds_total": round(self.spawn_seconds, 3),
+            "reopens": self.reopens,
+            "reopen_seconds_total": round(self.reopen_seconds, 3),
+            "lru_evictions": self.lru_evictions,
+            "idle_reaps": self.idle_reaps,
+            "memory_recycles": self.memory_recycles,
+        }
+
+    def collect_metrics(self) -> List[metrics.MetricFamily]:
+        """Session counts and memory/CPU use of each cdb process, for /metrics"""
+        live = busy = 0
+        rss_samples = []
+        cpu_samples = []
+        replica_samples = []
+        for key, session in list(self.sessions.items()):
+            processes = []
+            if session.replicas is not None:
+                processes = [(pid, "replica") for pid in session.replicas.pids]
+                replica_samples.append(({"dump": os.path.basename(key)}, len(processes)))
+            pid = session.pid
+            if pid is not None:
+                live += 1
+                busy += session.busy
+                processes.insert(0, (pid, "primary"))
+            for pid, role in processes:
+                labels = {"dump": os.path.basename(key), "pid": str(pid), "role": role}
+                rss = process_rss_bytes(pid)
+                if rss is not None:
+                    rss_samples.append((labels, rss))
+                cpu = process_cpu_seconds(pid)
+                if cpu is not None:
+                    cpu_samples.append((labels, cpu))
+        return [
+            metrics.MetricFamily("windbg_sessions", "gauge", "Open dumps by cdb process state", [
+                ({"state": "busy"}, busy),
+                ({"state": "idle"}, live - busy),
+                ({"state": "stopped"}, len(self.sessions) - live),
+            ]),
+            metrics.MetricFamily("windbg_sessions_max", "gauge", "Limit of concurrently running cdb processes",
+                                 [({}, self.max_sessions)]),
+            metrics.MetricFamily("windbg_session_stops_total", "counter", "cdb processes stopped by the pool", [
+                ({"reason": "lru"}, self.lru_evictions),
+                ({"reason": "idle"}, self.idle_reaps),
+                ({"reason": "memory"}, self.memory_recycles),
+            ]),
+            metrics.MetricFamily("windbg_cdb_resident_bytes", "gauge", "Resident memory of cdb processes",
+                                 rss_samples),
+            metrics.MetricFamily("windbg_cdb_cpu_seconds_total", "counter", "CPU time used by cdb processes",
+                                 cpu_samples),
+            metrics.MetricFamily("windbg_cdb_replicas", "gauge", "Running read replicas by dump",
+                                 replica_samples),
+        ]
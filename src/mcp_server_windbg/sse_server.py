@@ -5,7 +5,9 @@ SSE服务器模块，用于通过Server-Sent Events提供MCP服务器功能。
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Tuple, Optional, List, Set
+import time
+from collections import deque
+from typing import Deque, Dict, Any, Tuple, Optional, List, Set
 import uuid
 import os
 import pathlib
@@ -14,57 +16,335 @@ from aiohttp import web
 from aiohttp.web import Request, Response, Application, AppRunner, TCPSite
 
 from mcp.server import Server
-from mcp.types import (
-    JSONRPCRequest, JSONRPCResponse, JSONRPCError,
-    INVALID_PARAMS, INTERNAL_ERROR
-)
+from mcp.types import INVALID_PARAMS, INTERNAL_ERROR
+
+from . import metrics
+from .output_stream import output_sink
+from .tracing import span
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 默认的请求处理工作任务数
+DEFAULT_SSE_WORKERS = 4
+
+# 每个客户端发送队列的默认长度（事件数）
+DEFAULT_CLIENT_QUEUE_SIZE = 256
+
+# 每个客户端发送队列的默认字节上限；合并的事件同样计入
+DEFAULT_CLIENT_QUEUE_BYTES = 16 * 1024 * 1024
+
+# 发送队列已满时的处理策略：
+#   drop       丢弃新事件
+#   coalesce   把新事件合并到队尾，下次一次性写出；超过字节上限时断开该客户端
+#   disconnect 断开该客户端
+OVERFLOW_POLICIES = ("drop", "coalesce", "disconnect")
+DEFAULT_OVERFLOW_POLICY = "coalesce"
+
+# 队首事件等待超过该秒数时断开客户端（任何策略下都生效）
+DEFAULT_DISCONNECT_AFTER = 60.0
+
+# 心跳间隔（秒）
+HEARTBEAT_INTERVAL = 30
+
+# 指标标签
+_TRANSPORT = ("sse",)
+_INBOUND = ("sse", "in")
+_OUTBOUND = ("sse", "out")
+
+
+def encode_event(data: Dict[str, Any]) -> bytes:
+    """将数据编码为一条SSE事件。
+    
+    Args:
+        data: 要发送的数据
+        
+    Returns:
+        编码后的事件字节串
+    """
+    return f"data: {json.dumps(data)}\n\n".encode('utf-8')
+
+
+class SSEClient:
+    """一个SSE客户端连接，拥有独立的有界发送队列和写入任务。
+    
+    入队操作从不等待网络，慢客户端只会让自己的队列变长，
+    不会阻塞其他客户端。
+    """
+    
+    def __init__(
+        self,
+        client_id: str,
+        request: Request,
+        response: web.StreamResponse,
+        max_queue: int = DEFAULT_CLIENT_QUEUE_SIZE,
+        overflow: str = DEFAULT_OVERFLOW_POLICY,
+        disconnect_after: Optional[float] = DEFAULT_DISCONNECT_AFTER,
+        max_queue_bytes: int = DEFAULT_CLIENT_QUEUE_BYTES
+    ):
+        """初始化客户端并启动写入任务。
+        
+        Args:
+            client_id: 客户端ID
+            request: 建立事件流的HTTP请求
+            response: 已准备好的流响应对象
+            max_queue: 发送队列最多容纳的事件数
+            overflow: 队列已满时的策略，见 OVERFLOW_POLICIES
+            disconnect_after: 队首事件等待超过该秒数时断开客户端，None 表示不限制
+            max_queue_bytes: 发送队列最多容纳的字节数（含合并的事件）；
+                超过时按队列已满处理，合并策略下断开客户端
+        """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的溢出策略: {overflow}")
+        self.client_id = client_id
+        self.request = request
+        self.response = response
+        self.max_queue = max(1, max_queue)
+        self.overflow = overflow
+        self.disconnect_after = disconnect_after
+        self.max_queue_bytes = max_queue_bytes
+        # 队列元素为一组待写出的 (入队时间, 事件)；合并时向该组追加，
+        # 队首的等待时间总是按其中最早的事件计算
+        self.queue: Deque[List[Tuple[float, bytes]]] = deque()
+        self.queued_bytes = 0
+        self.wakeup = asyncio.Event()
+        self.idle = asyncio.Event()
+        self.closed = asyncio.Event()
+        self.disconnect_reason: Optional[str] = None
+        
+        # 统计信息
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.heartbeats_skipped = 0
+        self.max_queue_depth = 0
+        self.last_write_lag = 0.0
+        
+        self.writer_task = asyncio.create_task(self._writer())
+    
+    def enqueue(self, payload: bytes, heartbeat: bool = False) -> bool:
+        """把已编码的事件放入发送队列，不等待网络。
+        
+        Args:
+            payload: encode_event() 编码后的事件
+            heartbeat: 是否为心跳；队列中已有数据时心跳没有意义，直接丢弃
+            
+        Returns:
+            事件是否被接受（入队或合并）
+        """
+        if self.closed.is_set():
+            return False
+        now = time.monotonic()
+        if (self.disconnect_after is not None and self.queue
+                and now - self.queue[0][0][0] > self.disconnect_after):
+            self.disconnect("lagging")
+            return False
+        if heartbeat and self.queue:
+            self.heartbeats_skipped += 1
+            return False
+        
+        # 队列为空时总是接受，单个超过字节上限的事件也能写出
+        over_bytes = bool(self.queue) and self.queued_bytes + len(payload) > self.max_queue_bytes
+        if len(self.queue) >= self.max_queue or over_bytes:
+            if self.overflow == "drop":
+                self.dropped += 1
+                return False
+            if self.overflow == "disconnect" or over_bytes:
+                self.disconnect("queue_full")
+                return False
+            # coalesce：并入队尾，写入任务下次一次性写出
+            self.queue[-1].append((now, payload))
+            self.queued_bytes += len(payload)
+            self.coalesced += 1
+            return True
+        
+        self.queue.append([(now, payload)])
+        self.queued_bytes += len(payload)
+        self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+        self.idle.clear()
+        self.wakeup.set()
+        return True
+    
+    async def _writer(self) -> None:
+        """写入任务：按顺序把队列中的事件写到客户端。"""
+        try:
+            while True:
+                while not self.queue:
+                    self.idle.set()
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                payloads = self.queue[0]
+                count = len(payloads)
+                enqueued = payloads[0][0]
+                data = payloads[0][1] if count == 1 else b"".join(payload for _, payload in payloads[:count])
+                # write() 会等待底层缓冲区排空，慢客户端只阻塞自己的写入任务
+                await self.response.write(data)
+                metrics.TRANSPORT_MESSAGES.inc(count, _OUTBOUND)
+                metrics.TRANSPORT_BYTES.inc(len(data), _OUTBOUND)
+                # 写完后再出队，写入期间合并进来的事件留到下一轮
+                del payloads[:count]
+                self.queued_bytes -= len(data)
+                if not payloads and self.queue and self.queue[0] is payloads:
+                    self.queue.popleft()
+                self.sent += count
+                self.last_write_lag = time.monotonic() - enqueued
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            if self.disconnect_reason is None:
+                self.disconnect_reason = "connection_lost"
+            logger.info(f"客户端 {self.client_id} 写入失败: {str(e)}")
+        finally:
+            self.closed.set()
+    
+    def disconnect(self, reason: str) -> None:
+        """断开客户端，丢弃尚未写出的事件。
+        
+        Args:
+            reason: 断开原因，记录在统计信息中
+        """
+        if self.closed.is_set():
+            return
+        self.disconnect_reason = reason
+        logger.warning(f"断开慢客户端 {self.client_id}（{reason}），丢弃 {len(self.queue)} 个事件")
+        self.queue.clear()
+        self.queued_bytes = 0
+        self.writer_task.cancel()
+        transport = self.request.transport
+        if transport is not None:
+            # close() 会先等缓冲区写完，慢客户端需要直接中止
+            transport.abort()
+        self.closed.set()
+    
+    async def close(self, payload: Optional[bytes] = None, timeout: float = 5.0) -> None:
+        """正常关闭：写出剩余事件和可选的结束事件后结束流。
+        
+        Args:
+            payload: 最后写出的事件
+            timeout: 等待队列写空的最长秒数
+        """
+        if payload is not None:
+            self.enqueue(payload)
+        if not self.closed.is_set():
+            try:
+                await asyncio.wait_for(self.idle.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self.writer_task.cancel()
+        await asyncio.gather(self.writer_task, return_exceptions=True)
+        try:
+            await self.response.write_eof()
+        except Exception:
+            pass
+    
+    def stats(self) -> Dict[str, Any]:
+        """返回发送队列的统计信息。
+        
+        Returns:
+            包含队列深度、延迟和计数的字典
+        """
+        lag = time.monotonic() - self.queue[0][0][0] if self.queue else 0.0
+        return {
+            "queue_depth": len(self.queue),
+            "queued_bytes": self.queued_bytes,
+            "max_queue_depth": self.max_queue_depth,
+            "lag_seconds": round(lag, 3),
+            "last_write_lag_seconds": round(self.last_write_lag, 3),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "heartbeats_skipped": self.heartbeats_skipped,
+        }
+
+
 class SSEServer:
     """SSE服务器类，用于通过Server-Sent Events提供MCP服务器功能。"""
     
-    def __init__(self, app: Application, mcp_server: Server):
+    def __init__(
+        self,
+        app: Application,
+        mcp_server: Server,
+        workers: int = DEFAULT_SSE_WORKERS,
+        max_queue: int = DEFAULT_CLIENT_QUEUE_SIZE,
+        overflow: str = DEFAULT_OVERFLOW_POLICY,
+        disconnect_after: Optional[float] = DEFAULT_DISCONNECT_AFTER,
+        max_queue_bytes: int = DEFAULT_CLIENT_QUEUE_BYTES
+    ):
         """初始化SSE服务器。
         
         Args:
             app: aiohttp应用实例
             mcp_server: MCP服务器实例
+            workers: 并发处理请求的工作任务数
+            max_queue: 每个客户端发送队列的长度
+            overflow: 发送队列已满时的策略，见 OVERFLOW_POLICIES
+            disconnect_after: 队首事件等待超过该秒数时断开客户端，None 表示不限制
+            max_queue_bytes: 每个客户端发送队列的字节上限
         """
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"未知的溢出策略: {overflow}")
         self.app = app
         self.mcp_server = mcp_server
-        self.clients: Dict[str, web.StreamResponse] = {}
+        self.max_queue = max_queue
+        self.overflow = overflow
+        self.disconnect_after = disconnect_after
+        self.max_queue_bytes = max_queue_bytes
+        self.clients: Dict[str, SSEClient] = {}
+        self.slow_disconnects = 0
+        # 已断开客户端的丢弃/合并事件数，使计数器在客户端离开后不会减少
+        self.departed_dropped = 0
+        self.departed_coalesced = 0
+        # 队列元素为 (client_id, 请求数据)，client_id 为 None 时响应广播给所有客户端
         self.request_queue: asyncio.Queue = asyncio.Queue()
-        self.response_tasks: Dict[str, asyncio.Task] = {}
         
         # 设置路由
         self.app.router.add_get('/events', self.events_handler)
         self.app.router.add_post('/request', self.request_handler)
+        self.app.router.add_get('/stats', self.stats_handler)
         self.app.router.add_get('/', self.index_handler)
         
         # 设置静态文件路由
         static_path = pathlib.Path(__file__).parent / "static"
         self.app.router.add_static('/static', static_path)
         
-        # 启动请求处理任务
-        self.request_processor_task = asyncio.create_task(self.process_requests())
+        # 启动请求处理工作任务
+        self.worker_tasks: List[asyncio.Task] = [
+            asyncio.create_task(self.process_requests()) for _ in range(max(1, workers))
+        ]
+        
+        # 抓取 /metrics 时报告发送队列状态
+        metrics.REGISTRY.register_collector(self.collect_metrics)
     
     @classmethod
-    async def create(cls, server_instance: Server, host: str = "0.0.0.0", port: int = 8767) -> Tuple['SSEServer', AppRunner]:
+    async def create(
+        cls,
+        server_instance: Server,
+        host: str = "0.0.0.0",
+        port: int = 8767,
+        workers: int = DEFAULT_SSE_WORKERS,
+        max_queue: int = DEFAULT_CLIENT_QUEUE_SIZE,
+        overflow: str = DEFAULT_OVERFLOW_POLICY,
+        disconnect_after: Optional[float] = DEFAULT_DISCONNECT_AFTER,
+        max_queue_bytes: int = DEFAULT_CLIENT_QUEUE_BYTES
+    ) -> Tuple['SSEServer', AppRunner]:
         """创建并启动SSE服务器。
         
         Args:
             server_instance: MCP服务器实例
             host: 主机地址
             port: 端口号
+            workers: 并发处理请求的工作任务数
+            max_queue: 每个客户端发送队列的长度
+            overflow: 发送队列已满时的策略
+            disconnect_after: 队首事件等待超过该秒数时断开客户端
+            max_queue_bytes: 每个客户端发送队列的字节上限
             
         Returns:
             SSE服务器实例和aiohttp运行器
         """
         app = web.Application()
-        server = cls(app, server_instance)
+        server = cls(app, server_instance, workers, max_queue, overflow, disconnect_after, max_queue_bytes)
         
         # 启动服务器
         runner = web.AppRunner(app)
@@ -106,29 +386,42 @@ class SSEServer:
         response.headers['Access-Control-Allow-Origin'] = '*'
         await response.prepare(request)
         
-        # 生成客户端ID并存储响应对象
+        # 生成客户端ID，为客户端创建独立的发送队列和写入任务
         client_id = str(uuid.uuid4())
-        self.clients[client_id] = response
+        client = SSEClient(
+            client_id, request, response,
+            self.max_queue, self.overflow, self.disconnect_after, self.max_queue_bytes
+        )
+        self.clients[client_id] = client
+        metrics.TRANSPORT_CONNECTIONS.inc(labels=_TRANSPORT)
         
         # 发送连接成功消息
-        await self.send_event(response, {
+        client.enqueue(encode_event({
             "type": "connection",
             "status": "connected",
             "client_id": client_id
-        })
+        }))
         
+        heartbeat = encode_event({"type": "heartbeat"})
         try:
             # 保持连接直到客户端断开
-            while True:
-                await asyncio.sleep(30)
-                # 发送心跳消息
-                await self.send_event(response, {"type": "heartbeat"})
-        except ConnectionResetError:
-            logger.info(f"客户端 {client_id} 断开连接")
+            while not client.closed.is_set():
+                try:
+                    await asyncio.wait_for(client.closed.wait(), HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    # 发送心跳消息（队列中有数据时跳过）
+                    client.enqueue(heartbeat, heartbeat=True)
         finally:
             # 清理客户端连接
-            if client_id in self.clients:
+            if client.disconnect_reason in ("lagging", "queue_full"):
+                self.slow_disconnects += 1
+            logger.info(f"客户端 {client_id} 断开连接")
+            if self.clients.get(client_id) is client:
                 del self.clients[client_id]
+            self.departed_dropped += client.dropped
+            self.departed_coalesced += client.coalesced
+            client.writer_task.cancel()
+            metrics.TRANSPORT_CONNECTIONS.dec(labels=_TRANSPORT)
         
         return response
     
@@ -143,14 +436,22 @@ class SSEServer:
         """
         try:
             # 解析请求体
-            data = await request.json()
+            body = await request.read()
+            metrics.TRANSPORT_MESSAGES.inc(labels=_INBOUND)
+            metrics.TRANSPORT_BYTES.inc(len(body), _INBOUND)
+            data = json.loads(body)
             
             # 验证JSON-RPC请求
             if not isinstance(data, dict) or 'jsonrpc' not in data or data['jsonrpc'] != '2.0':
                 return web.json_response({"error": "Invalid JSON-RPC request"}, status=400)
             
+            # 响应只发送给发起请求的客户端（请求体中的 client_id 或 X-Client-Id 头）
+            client_id = data.pop('client_id', None) or request.headers.get('X-Client-Id')
+            if client_id is not None and client_id not in self.clients:
+                return web.json_response({"error": f"Unknown client_id: {client_id}"}, status=404)
+            
             # 将请求放入队列
-            await self.request_queue.put(data)
+            await self.request_queue.put((client_id, data))
             
             # 返回成功响应
             return web.json_response({"status": "request_accepted"})
@@ -161,21 +462,59 @@ class SSEServer:
             logger.error(f"处理请求时出错: {str(e)}")
             return web.json_response({"error": str(e)}, status=500)
     
-    async def send_event(self, response: web.StreamResponse, data: Dict[str, Any]) -> None:
-        """向客户端发送SSE事件。
+    async def stats_handler(self, request: Request) -> Response:
+        """返回每个客户端发送队列的统计信息。
         
         Args:
-            response: 流响应对象
-            data: 要发送的数据
+            request: HTTP请求
+            
+        Returns:
+            JSON响应
         """
-        try:
-            await response.write(f"data: {json.dumps(data)}\n\n".encode('utf-8'))
-            await response.drain()
-        except ConnectionResetError:
-            # 客户端已断开连接
-            pass
-        except Exception as e:
-            logger.error(f"发送事件时出错: {str(e)}")
+        return web.json_response(self.stats())
+    
+    def stats(self) -> Dict[str, Any]:
+        """汇总发送队列的统计信息。
+        
+        Returns:
+            包含配置、慢客户端断开次数和每个客户端统计的字典
+        """
+        clients = {client_id: client.stats() for client_id, client in list(self.clients.items())}
+        return {
+            "overflow_policy": self.overflow,
+            "max_queue": self.max_queue,
+            "max_queue_bytes": self.max_queue_bytes,
+            "clients_connected": len(clients),
+            "slow_disconnects": self.slow_disconnects,
+            "max_lag_seconds": max((c["lag_seconds"] for c in clients.values()), default=0.0),
+            "clients": clients,
+        }
+    
+    def collect_metrics(self) -> List[metrics.MetricFamily]:
+        """汇总发送队列状态，供 /metrics 使用。
+        
+        Returns:
+            指标列表
+        """
+        clients = list(self.clients.values())
+        now = time.monotonic()
+        return [
+            metrics.MetricFamily("windbg_sse_request_queue_depth", "gauge", "Requests waiting for an SSE worker",
+                                 [({}, self.request_queue.qsize())]),
+            metrics.MetricFamily("windbg_sse_client_queue_depth", "gauge", "Events queued for SSE clients, summed",
+                                 [({}, sum(len(c.queue) for c in clients))]),
+            metrics.MetricFamily("windbg_sse_client_queue_bytes", "gauge", "Bytes queued for SSE clients, summed",
+                                 [({}, sum(c.queued_bytes for c in clients))]),
+            metrics.MetricFamily("windbg_sse_client_max_lag_seconds", "gauge", "Age of the oldest queued SSE event",
+                                 [({}, max((now - c.queue[0][0][0] for c in clients if c.queue), default=0.0))]),
+            metrics.MetricFamily("windbg_sse_events_discarded_total", "counter",
+                                 "Events of SSE clients dropped or merged by the overflow policy", [
+                ({"policy": "drop"}, self.departed_dropped + sum(c.dropped for c in clients)),
+                ({"policy": "coalesce"}, self.departed_coalesced + sum(c.coalesced for c in clients)),
+            ]),
+            metrics.MetricFamily("windbg_sse_slow_disconnects_total", "counter", "SSE clients disconnected for lagging",
+                                 [({}, self.slow_disconnects)]),
+        ]
     
     async def broadcast_event(self, data: Dict[str, Any]) -> None:
         """向所有连接的客户端广播事件。
@@ -183,39 +522,71 @@ class SSEServer:
         Args:
             data: 要广播的数据
         """
-        disconnected_clients = []
+        # 只编码一次，所有客户端共享同一份数据；入队不等待网络
+        payload = encode_event(data)
+        for client in list(self.clients.values()):
+            client.enqueue(payload)
+    
+    async def send_to_client(self, client_id: Optional[str], data: Dict[str, Any]) -> None:
+        """将响应发送给指定客户端；client_id 为 None 时广播。
         
-        for client_id, response in self.clients.items():
-            try:
-                await self.send_event(response, data)
-            except Exception:
-                # 标记断开连接的客户端
-                disconnected_clients.append(client_id)
-        
-        # 清理断开连接的客户端
-        for client_id in disconnected_clients:
-            if client_id in self.clients:
-                del self.clients[client_id]
+        Args:
+            client_id: 目标客户端ID
+            data: 要发送的数据
+        """
+        if client_id is None:
+            await self.broadcast_event(data)
+            return
+        client = self.clients.get(client_id)
+        if client is None:
+            logger.info(f"客户端 {client_id} 已断开，丢弃响应")
+            return
+        client.enqueue(encode_event(data))
+    
+    def chunk_sender(self, client_id: Optional[str], request_id: Any):
+        """创建把命令输出块作为 chunk 事件发送给客户端的输出接收器。
+        
+        Args:
+            client_id: 目标客户端ID
+            request_id: 输出所属请求的ID
+            
+        Returns:
+            输出接收器协程函数
+        """
+        async def send_chunk(lines: List[str]) -> None:
+            await self.send_to_client(client_id, {
+                "jsonrpc": "2.0",
+                "method": "chunk",
+                "params": {"id": request_id, "output": "\n".join(lines)}
+            })
+        return send_chunk
     
     async def process_requests(self) -> None:
-        """处理请求队列中的请求。"""
+        """工作任务：处理请求队列中的请求。多个工作任务并发运行。"""
         while True:
+            client_id = None
             try:
                 # 从队列中获取请求
-                request_data = await self.request_queue.get()
-                
-                # 处理请求
-                response_data = await self.handle_request(request_data)
+                client_id, request_data = await self.request_queue.get()
                 
-                # 广播响应
-                await self.broadcast_event(response_data)
+                # 处理请求；命令执行期间的输出以 chunk 事件先行发送
+                metrics.TRANSPORT_IN_FLIGHT.inc(labels=_TRANSPORT)
+                try:
+                    with span("sse_request", method=request_data.get('method')):
+                        with output_sink(self.chunk_sender(client_id, request_data.get('id'))):
+                            response_data = await self.handle_request(request_data)
+                        
+                        # 只向发起请求的客户端发送响应（编码后入队）
+                        with span("send_response"):
+                            await self.send_to_client(client_id, response_data)
+                finally:
+                    metrics.TRANSPORT_IN_FLIGHT.dec(labels=_TRANSPORT)
                 
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"处理请求队列时出错: {str(e)}")
-                # 广播错误
-                await self.broadcast_event({
+                await self.send_to_client(client_id, {
                     "jsonrpc": "2.0",
                     "error": {
                         "code": -32603,
@@ -238,36 +609,32 @@ class SSEServer:
         params = request_data.get('params', {})
         
         try:
-            # 创建JSON-RPC请求对象
-            request = JSONRPCRequest(
-                jsonrpc="2.0",
-                method=method,
-                params=params,
-                id=request_id
-            )
-            
-            # 处理请求
+            # 处理请求（工具处理函数是异步的，不会阻塞事件循环）
             if method == 'execute_command':
-                response = await self.mcp_server.handle_execute_command(request)
+                # 调试命令等同于 run_windbg_cmd 工具调用
+                content = await self.mcp_server.call_tool_handler("run_windbg_cmd", params)
+                result = {"content": [item.model_dump() for item in content]}
             elif method == 'call_tool':
-                response = await self.mcp_server.handle_call_tool(request)
+                content = await self.mcp_server.call_tool_handler(
+                    params.get('name'), params.get('arguments', {})
+                )
+                result = {"content": [item.model_dump() for item in content]}
             elif method == 'list_tools':
-                response = await self.mcp_server.handle_list_tools(request)
-            elif method == 'list_resources':
-                response = await self.mcp_server.handle_list_resources(request)
+                tools = await self.mcp_server.list_tools_handler()
+                result = {"tools": [tool.model_dump() for tool in tools]}
             else:
                 # 未知方法
-                response = JSONRPCResponse(
-                    jsonrpc="2.0",
-                    error=JSONRPCError(
-                        code=INVALID_PARAMS,
-                        message=f"未知方法: {method}"
-                    ),
-                    id=request_id
-                )
+                return {
+                    "jsonrpc": "2.0",
+                    "error": {
+                        "code": INVALID_PARAMS,
+                        "message": f"未知方法: {method}"
+                    },
+                    "id": request_id
+                }
             
             # 返回响应
-            return response.dict()
+            return {"jsonrpc": "2.0", "result": result, "id": request_id}
             
         except Exception as e:
             logger.error(f"处理请求时出错: {str(e)}")
@@ -281,22 +648,23 @@ class SSEServer:
                 "id": request_id
             }
     
-    async def close(self) -> None:
-        """关闭SSE服务器。"""
-        # 取消请求处理任务
-        if hasattr(self, 'request_processor_task'):
-            self.request_processor_task.cancel()
-            try:
-                await self.request_processor_task
-            except asyncio.CancelledError:
-                pass
+    async def close(self, timeout: float = 5.0) -> None:
+        """关闭SSE服务器。
         
-        # 关闭所有客户端连接
-        for client_id, response in list(self.clients.items()):
-            try:
-                await response.write(b"event: close\ndata: {\"reason\": \"server_shutdown\"}\n\n")
-                await response.write_eof()
-            except Exception:
-                pass
+        Args:
+            timeout: 等待每个客户端写完剩余事件的最长秒数
+        """
+        metrics.REGISTRY.unregister_collector(self.collect_metrics)
+        
+        # 取消请求处理工作任务
+        for task in self.worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self.worker_tasks, return_exceptions=True)
         
-        self.clients.clear()
\ No newline at end of file
+        # 关闭所有客户端连接
+        clients = list(self.clients.values())
+        self.clients.clear()
+        await asyncio.gather(*[
+            client.close(b"event: close\ndata: {\"reason\": \"server_shutdown\"}\n\n", timeout)
+            for client in clients
+        ], return_exceptions=True)
\ No newline at end of file
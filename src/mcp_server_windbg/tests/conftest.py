@@ -0,0 +1,92 @@
+import os
+import stat
+import struct
+import sys
+
+import pytest
+
+FAKE_CDB_SCRIPT = os.path.join(os.path.dirname(__file__), 'fake_cdb.py')
+
+
+@pytest.fixture
+def fake_cdb_path(tmp_path):
+    """Executable wrapper that launches the scripted cdb stand-in"""
+    if os.name == "nt":
+        wrapper = tmp_path / "fake_cdb.cmd"
+        wrapper.write_text(f'@"{sys.executable}" "{FAKE_CDB_SCRIPT}" %*\r\n')
+    else:
+        wrapper = tmp_path / "fake_cdb"
+        wrapper.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_CDB_SCRIPT}" "$@"\n')
+        wrapper.chmod(wrapper.stat().st_mode | stat.S_IXUSR)
+    return str(wrapper)
+
+
+@pytest.fixture
+def fake_dump_path(tmp_path):
+    """Placeholder dump file; the fake cdb never reads it"""
+    dump = tmp_path / "fake.dmp"
+    dump.write_bytes(b"MDMP")
+    return str(dump)
+
+
+def _build_minidump(path, exception=None, modules=(), threads=(), system_info=None, process_id=None):
+    """
+    Write a synthetic minidump with the given streams.
+
+    exception: (thread_id, code, address, parameters)
+    modules: [(base, size, name)]
+    threads: [thread_id]
+    system_info: (architecture, processors, major, minor, build)
+    """
+    streams = []
+    if threads:
+        data = struct.pack("<I", len(threads))
+        for thread_id in threads:
+            data += struct.pack("<IIIIQQIIII", thread_id, 0, 0x20, 0, 0x1000, 0x2000, 0x100, 0, 0, 0)
+        streams.append((3, data))
+    if exception:
+        thread_id, code, address, parameters = exception
+        data = struct.pack("<IIIIQQII", thread_id, 0, code, 0, 0, address, len(parameters), 0)
+        data += struct.pack("<15Q", *(list(parameters) + [0] * (15 - len(parameters))))
+        data += struct.pack("<II", 0, 0)
+        streams.append((6, data))
+    if system_info:
+        arch, processors, major, minor, build = system_info
+        streams.append((7, struct.pack("<HHHBBIIIIIHH", arch, 6, 0, processors, 1, major, minor, build, 2, 0, 0, 0)))
+    if process_id is not None:
+        streams.append((15, struct.pack("<IIIIII", 24, 0x1, process_id, 0, 0, 0)))
+
+    header_size = 32
+    directory_size = 12 * (len(streams) + (1 if modules else 0))
+    offset = header_size + directory_size
+    body = b""
+    directory = b""
+    for stream_type, data in streams:
+        directory += struct.pack("<III", stream_type, len(data), offset + len(body))
+        body += data
+
+    if modules:
+        # Module names are MINIDUMP_STRINGs stored after the module list
+        list_rva = offset + len(body)
+        names_rva = list_rva + 4 + 108 * len(modules)
+        records = struct.pack("<I", len(modules))
+        names = b""
+        for base, size, name in modules:
+            encoded = name.encode("utf-16-le")
+            version = struct.pack("<IIII", 0xFEEF04BD, 0x10000, (10 << 16) | 0, (19041 << 16) | 1)
+            records += struct.pack("<QIIII", base, size, 0, 0, names_rva + len(names))
+            records += version + b"\0" * (52 - len(version)) + b"\0" * 32
+            names += struct.pack("<I", len(encoded)) + encoded + b"\0\0"
+        directory += struct.pack("<III", 4, len(records), list_rva)
+        body += records + names
+
+    header = struct.pack("<IIIIIIQ", 0x504D444D, 0xA793, len(directory) // 12, header_size, 0, 0, 0)
+    with open(path, "wb") as f:
+        f.write(header + directory + body)
+    return str(path)
+
+
+@pytest.fixture
+def build_minidump():
+    """Writer for synthetic minidump files"""
+    return _build_minidump
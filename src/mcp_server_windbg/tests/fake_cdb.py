@@ -0,0 +1,121 @@
+"""
+Scripted stand-in for cdb.exe used by the test suite on machines without
+the Windows debugging tools.
+
+It understands the subset of cdb behaviour the session layer relies on:
+a prompt before each command (showing the current thread), ``.echo``,
+``~`` (four threads, the current one marked with ``.``), ``~Ns`` and ``q``. A few extra commands let tests control timing and
+output size:
+
+    sleep <seconds>   wait before answering
+    lines <count>     print <count> numbered lines
+    bytes <count>     print about <count> bytes in lines of FAKE_CDB_LINE_WIDTH
+    trickle <count> <seconds>
+                      print <count> numbered lines, pausing after each one
+
+``kb`` prints the content of ``<dump>.stack`` if that file exists, and
+``~*kb`` the content of ``<dump>.threads``.
+
+Like cdb, a break (SIGINT, or Ctrl+Break on Windows) aborts the running
+command and returns to the prompt.
+
+Environment variables emulate a slower debugger (used by the benchmarks):
+
+    FAKE_CDB_STARTUP_DELAY   seconds spent "loading the dump" before the
+                             first prompt
+    FAKE_CDB_LATENCY         seconds before each command other than .echo
+                             is answered
+    FAKE_CDB_LINE_WIDTH      characters per line of ``bytes`` (default 80)
+"""
+
+import os
+import re
+import signal
+import sys
+import time
+
+THREAD_SWITCH = re.compile(r"^~(\d+)s$")
+
+STARTUP_DELAY = float(os.environ.get("FAKE_CDB_STARTUP_DELAY") or 0)
+LATENCY = float(os.environ.get("FAKE_CDB_LATENCY") or 0)
+LINE_WIDTH = max(int(os.environ.get("FAKE_CDB_LINE_WIDTH") or 80), 12)
+
+current_thread = 0
+dump_path = "<none>"
+
+
+def write(text):
+    sys.stdout.write(text)
+    sys.stdout.flush()
+
+
+def run_command(command):
+    """Execute one command line. Returns False when cdb should exit."""
+    global current_thread
+    name, _, arg = command.strip().partition(" ")
+    switch = THREAD_SWITCH.match(name)
+    if name == "q":
+        return False
+    if LATENCY and name and name != ".echo":
+        time.sleep(LATENCY)
+    if switch:
+        current_thread = int(switch.group(1))
+    elif name == "~":
+        for number in range(4):
+            marker = "." if number == current_thread else " "
+            write(f"{marker}{number:3d}  Id: 1b90.{0x1000 + number:x} Suspend: 1 Teb: 000000c4`5e6f{number:04x} Unfrozen\n")
+    elif name == ".echo":
+        write(arg + "\n")
+    elif name == "version":
+        write("Microsoft (R) Windows Debugger Version 10.0.0.0 (fake)\n")
+    elif name == "sleep":
+        time.sleep(float(arg or 0))
+        write("slept\n")
+    elif name == "lines":
+        write("".join(f"line {i}\n" for i in range(int(arg or 0))))
+    elif name == "bytes":
+        # Numbered lines padded to LINE_WIDTH characters plus the newline
+        count = -(-int(arg or 0) // (LINE_WIDTH + 1))
+        write("".join(f"{i:08x}  ".ljust(LINE_WIDTH, "x") + "\n" for i in range(count)))
+    elif name == "trickle":
+        count, _, interval = arg.partition(" ")
+        for i in range(int(count)):
+            write(f"line {i}\n")
+            time.sleep(float(interval or 0))
+    elif name in ("kb", "~*kb"):
+        try:
+            with open(dump_path + (".stack" if name == "kb" else ".threads")) as f:
+                write(f.read())
+        except OSError:
+            write("No stack available\n")
+    elif name:
+        write(f"       ^ Syntax error in '{command.strip()}'\n")
+    return True
+
+
+def interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def main(argv):
+    global dump_path
+    dump_path = argv[argv.index("-z") + 1] if "-z" in argv else "<none>"
+    signal.signal(signal.SIGINT, interrupt)
+    if hasattr(signal, "SIGBREAK"):
+        signal.signal(signal.SIGBREAK, interrupt)
+    time.sleep(STARTUP_DELAY)
+    write("\nMicrosoft (R) Windows Debugger Version 10.0.0.0 (fake)\n")
+    write(f"Loading Dump File [{dump_path}]\n")
+    while True:
+        write(f"0:{current_thread:03d}> ")
+        try:
+            line = sys.stdin.readline()
+            if not line or not run_command(line):
+                break
+        except KeyboardInterrupt:
+            write("\n^C\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
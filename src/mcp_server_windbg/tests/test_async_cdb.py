@@ -0,0 +1,254 @@
+import asyncio
+import time
+
+import pytest
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession, CDBError, CDBTimeoutError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_async_basic_command(fake_cdb_path, fake_dump_path):
+    """Test that an awaited command returns the output lines"""
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            output = await session.send_command("version")
+            assert any("Microsoft (R) Windows Debugger" in line for line in output)
+            assert not any("COMMAND_COMPLETED_MARKER" in line for line in output)
+            assert len(await session.send_command("lines 5")) == 5
+    run(scenario())
+
+
+def test_async_sessions_run_concurrently(fake_cdb_path, fake_dump_path):
+    """Commands on independent sessions overlap instead of queueing"""
+    async def scenario():
+        sessions = await asyncio.gather(*(
+            AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+            for _ in range(3)
+        ))
+        try:
+            start = time.monotonic()
+            await asyncio.gather(*(session.send_command("sleep 0.5") for session in sessions))
+            return time.monotonic() - start
+        finally:
+            await asyncio.gather(*(session.shutdown() for session in sessions))
+    assert run(scenario()) < 1.2
+
+
+def test_async_event_loop_stays_responsive(fake_cdb_path, fake_dump_path):
+    """The event loop keeps running other tasks while a command is pending"""
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.05)
+                ticks += 1
+
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            task = asyncio.create_task(ticker())
+            await session.send_command("sleep 0.5")
+            task.cancel()
+        return ticks
+    assert run(scenario()) >= 5
+
+
+def test_async_command_timeout(fake_cdb_path, fake_dump_path):
+    """Test that a slow command raises CDBError on timeout"""
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            with pytest.raises(CDBError):
+                await session.send_command("sleep 2", timeout=0.2)
+    run(scenario())
+
+
+def test_get_or_create_session_shares_one_process(fake_cdb_path, fake_dump_path):
+    """Concurrent requests for the same dump reuse a single session"""
+    from mcp_server_windbg import server
+
+    async def scenario():
+        first, second = await asyncio.gather(
+            server.get_or_create_session(fake_dump_path, fake_cdb_path, timeout=10),
+            server.get_or_create_session(fake_dump_path, fake_cdb_path, timeout=10),
+        )
+        try:
+            assert first is second
+            assert await server.unload_session(fake_dump_path)
+        finally:
+            await server.shutdown_sessions()
+    run(scenario())
+
+
+def test_async_batch_discards_stale_output(fake_cdb_path, fake_dump_path):
+    """Batch results are matched by their markers, not by arrival order"""
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            with pytest.raises(CDBError):
+                await session.send_command("sleep 0.5", timeout=0.1)
+            await asyncio.sleep(0.6)
+            results = await session.send_batch(["lines 2", "version"])
+            assert [line[-6:] for line in results[0]] == ["line 0", "line 1"]
+            assert "Microsoft (R) Windows Debugger" in results[1][0]
+    run(scenario())
+
+
+def test_async_stream_command_yields_output_early(fake_cdb_path, fake_dump_path):
+    """Test that the first lines arrive long before the command completes"""
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            start = time.monotonic()
+            first_chunk_at = None
+            lines = []
+            async for chunk in session.stream_command("trickle 5 0.1"):
+                first_chunk_at = first_chunk_at or time.monotonic() - start
+                lines.extend(chunk)
+            total = time.monotonic() - start
+            assert [line[-6:] for line in lines] == [f"line {i}" for i in range(5)]
+            assert first_chunk_at < 0.2 < total
+
+            chunks = []
+
+            async def collect(chunk):
+                chunks.append(chunk)
+
+            output = await session.send_command("trickle 3 0.05", on_output=collect)
+            assert sum(chunks, []) == output and len(chunks) > 1
+    run(scenario())
+
+
+def test_async_timeout_keeps_partial_output(fake_cdb_path, fake_dump_path):
+    """Test that a timed-out command reports the output produced so far"""
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            with pytest.raises(CDBTimeoutError) as excinfo:
+                await session.send_command("trickle 20 0.1", timeout=0.35)
+            partial = [line[-6:] for line in excinfo.value.partial_output]
+            assert 2 <= len(partial) < 20
+            assert partial == [f"line {i}" for i in range(len(partial))]
+    run(scenario())
+
+
+def test_fake_cdb_emulated_timings(fake_cdb_path, fake_dump_path, monkeypatch):
+    """Test the stand-in's startup delay, command latency and sized output"""
+    monkeypatch.setenv("FAKE_CDB_STARTUP_DELAY", "0.3")
+    monkeypatch.setenv("FAKE_CDB_LATENCY", "0.2")
+    monkeypatch.setenv("FAKE_CDB_LINE_WIDTH", "100")
+
+    async def scenario():
+        start = time.monotonic()
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            started = time.monotonic() - start
+            start = time.monotonic()
+            output = await session.send_command("bytes 10100")
+            return started, time.monotonic() - start, output
+
+    started, elapsed, output = run(scenario())
+    assert started >= 0.3 and elapsed >= 0.2
+    assert len(output) == 100
+    assert all(len(line) == 100 for line in output[1:])
+
+
+def test_async_timeout_interrupts_and_resyncs(fake_cdb_path, fake_dump_path):
+    """Test that a timed-out command is interrupted and the next command gets its own output"""
+    from mcp_server_windbg import metrics
+
+    resynced = metrics.COMMAND_RECOVERIES.value(("resynced",))
+
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            start = time.monotonic()
+            with pytest.raises(CDBTimeoutError):
+                await session.send_command("sleep 30", timeout=0.3)
+            with pytest.raises(CDBTimeoutError):
+                await session.send_batch(["version", "sleep 30", "lines 3"], timeout=0.3)
+            output = await session.send_command("lines 3")
+            streamed = []
+
+            async def record(lines):
+                streamed.extend(lines)
+
+            await session.send_command("trickle 2 0.01", on_output=record)
+            return time.monotonic() - start, output, streamed
+
+    elapsed, output, streamed = run(scenario())
+    assert elapsed < 3
+    assert [line[-6:] for line in output] == ["line 0", "line 1", "line 2"]
+    assert [line[-6:] for line in streamed] == ["line 0", "line 1"]
+    assert metrics.COMMAND_RECOVERIES.value(("resynced",)) == resynced + 2
+
+
+def test_sync_timeout_does_not_shift_results(fake_cdb_path, fake_dump_path):
+    """Test that late output of a timed-out command is not returned for the next one"""
+    from mcp_server_windbg.cdb_session import CDBSession
+
+    with CDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+        start = time.monotonic()
+        with pytest.raises(CDBTimeoutError):
+            session.send_command("sleep 30", timeout=0.3)
+        assert session.send_command("version")[-1].endswith("Version 10.0.0.0 (fake)")
+        assert [line[-6:] for line in session.send_command("lines 2")] == ["line 0", "line 1"]
+        assert time.monotonic() - start < 3
+
+
+def test_batch_timeout_applies_per_command(fake_cdb_path, fake_dump_path):
+    """Test that each batch command gets the full timeout and a timeout keeps the completed outputs"""
+    from mcp_server_windbg.cdb_session import CDBSession
+
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            outputs = await session.send_batch(["sleep 0.2", "sleep 0.2", "sleep 0.2"], timeout=0.4)
+            assert [output[-1][-5:] for output in outputs] == ["slept"] * 3
+            with pytest.raises(CDBTimeoutError) as raised:
+                await session.send_batch(["lines 2", "trickle 100 0.01", "version"], timeout=0.3)
+            assert "trickle 100 0.01" in str(raised.value)
+            assert [line[-6:] for line in raised.value.partial_results[0]] == ["line 0", "line 1"]
+            assert len(raised.value.partial_results) == 1 and raised.value.partial_output
+            assert (await session.send_command("lines 1"))[-1].endswith("line 0")
+    run(scenario())
+
+    with CDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+        assert len(session.send_batch(["sleep 0.2", "sleep 0.2"], timeout=0.3)) == 2
+        with pytest.raises(CDBTimeoutError) as raised:
+            session.send_batch(["lines 1", "sleep 30", "version"], timeout=0.3)
+        assert "sleep 30" in str(raised.value)
+        assert [line[-6:] for line in raised.value.partial_results[0]] == ["line 0"]
+
+
+def test_sessions_track_debugger_context(fake_cdb_path, fake_dump_path):
+    """Test that sessions follow context switches and forget the context only when unsure"""
+    from mcp_server_windbg.cdb_session import CDBSession, track_context
+    from mcp_server_windbg.command_classifier import INITIAL_CONTEXT
+
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            assert session.context == INITIAL_CONTEXT
+            await session.send_command("~2s")
+            await session.send_batch(["kb", ".frame 1"])
+            assert session.context[1:4] == ("2", "1", "")
+            with pytest.raises(CDBTimeoutError):
+                await session.send_command("sleep 30", timeout=0.3)
+            assert session.context[1:4] == ("2", "1", "")
+    run(scenario())
+
+    with CDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+        session.send_command("~3s")
+        assert session.context[1] == "3"
+
+    assert track_context(INITIAL_CONTEXT, ["kb"], interrupted=True) == INITIAL_CONTEXT
+    assert track_context(INITIAL_CONTEXT, [".reload /f"], interrupted=True) is None
+
+
+def test_stream_keeps_output_while_markers_are_abandoned(fake_cdb_path, fake_dump_path):
+    """Output is held back, not lost, while an abandoned marker has not arrived"""
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10) as session:
+            # A probe aborted by the break never answers
+            session._abandoned.add("lost-probe")
+            chunks = [chunk async for chunk in session.stream_command("trickle 5 0.05")]
+            assert len(chunks) == 1
+            assert [line[-6:] for line in chunks[0]] == [f"line {i}" for i in range(5)]
+            assert (await session.send_command("lines 3"))[-1].endswith("line 2")
+    run(scenario())
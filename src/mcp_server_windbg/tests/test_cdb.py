@@ -2,6 +2,7 @@ import os
 import pytest
 
 from mcp_server_windbg.cdb_session import CDBSession, CDBError, DEFAULT_CDB_PATHS
+from mcp_server_windbg.parsers import ModuleParser, ThreadParser
 
 # Path to the test dump file
 TEST_DUMP_PATH = os.path.join(os.path.dirname(__file__), 'dumps', 'DemoCrash1.exe.7088.dmp')
@@ -59,20 +60,10 @@ def test_module_inspection():
         
         # Find a common Windows module
         target_modules = ['ntdll', 'kernel32']
-        module_name = None
-        
-        for target in target_modules:
-            for line in modules_output:
-                if target in line.lower():
-                    parts = line.split()
-                    for part in parts:
-                        if target in part.lower():
-                            module_name = part
-                            break
-                    if module_name:
-                        break
-            if module_name:
-                break
+        module_name = next(
+            (module.name for module in ModuleParser().parse(modules_output) if module.name.lower() in target_modules),
+            None
+        )
         
         assert module_name is not None
         
@@ -94,14 +85,11 @@ def test_thread_context():
         # Get thread list
         thread_list = session.send_command("~")
         
-        # Select first thread
-        thread_id = "0"
-        for line in thread_list:
-            if line.strip().startswith("#"):
-                parts = line.split()
-                if len(parts) > 1:
-                    thread_id = parts[1].strip(":")
-                    break
+        # Select the thread of the last event
+        thread_id = next(
+            (str(thread.number) for thread in ThreadParser().parse(thread_list) if thread.event),
+            "0"
+        )
         
         # Switch to thread and check registers
         session.send_command(f"~{thread_id}s")
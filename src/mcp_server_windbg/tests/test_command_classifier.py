@@ -0,0 +1,58 @@
+from mcp_server_windbg.command_classifier import (
+    CONTEXT_MUTATING, INITIAL_CONTEXT, PURE, STATE_MUTATING, UNCACHEABLE, apply_command, classify, is_context_free
+)
+
+
+def test_classify_compound_commands():
+    """A command line gets the strongest side effect of its parts"""
+    assert classify("kb") == PURE
+    assert classify("lm; !peb") == PURE
+    assert classify(".logopen c:\\log.txt; kb") == UNCACHEABLE
+    assert classify("kb; .reload /f; lm") == STATE_MUTATING
+    assert classify("r rax=0") == STATE_MUTATING
+    assert classify(".reload; ~3s; kb") == CONTEXT_MUTATING
+    for command in ("~3s", "|1s", ".frame 2", ".frame /c 2", ".f+", ".f-", ".ecxr", ".cxr 0x1234"):
+        assert classify(command) == CONTEXT_MUTATING, command
+    assert classify("") == PURE
+
+
+def test_classification_ignores_case():
+    """cdb commands are case-insensitive, and so is their classification"""
+    for command in (".RELOAD /f", ".Sympath+ C:\\symbols", ".sympath+ srv*", ".SRCPATH+ C:\\src", "ED 0x1000 1", "R rax=0"):
+        assert classify(command) == STATE_MUTATING, command
+    for command in ("~3S", "|1S", ".ECXR", ".Frame 2", ".F+"):
+        assert classify(command) == CONTEXT_MUTATING, command
+    assert apply_command(INITIAL_CONTEXT, "~3S")[0][1] == "3"
+    assert classify("LM") == PURE
+
+
+def test_context_tracking():
+    """Context and state changing commands are not cacheable and change later keys"""
+    context, cacheable = apply_command(INITIAL_CONTEXT, "kb")
+    assert cacheable and context == INITIAL_CONTEXT
+
+    context, cacheable = apply_command(INITIAL_CONTEXT, "~3s; .frame 2")
+    assert not cacheable
+    assert context[1:3] == ("3", "2")
+
+    reloaded, cacheable = apply_command(context, ".reload /f")
+    assert not cacheable
+    assert reloaded[:4] == context[:4] and reloaded[4] != context[4]
+
+    assert apply_command(INITIAL_CONTEXT, ".ecxr")[0][3] == "ecxr"
+    # Frame steps leave the frame unknown, and distinct from every other context
+    stepped, cacheable = apply_command(INITIAL_CONTEXT, ".f+")
+    assert not cacheable and stepped[2].startswith("?")
+    assert apply_command(stepped, "dv") == (stepped, True)
+    assert apply_command(INITIAL_CONTEXT, ".f-")[0][2] not in (stepped[2], "0")
+    assert apply_command(INITIAL_CONTEXT, ".logopen c:\\log.txt") == (INITIAL_CONTEXT, False)
+    assert apply_command(None, "lm") == (None, False)
+
+
+def test_context_free_commands():
+    """Only commands that name everything they read are independent of thread and frame"""
+    for command in ("lm", "lmvm ntdll", "!peb", "version; .lastevent", "dt ntdll!_PEB 7ffde000",
+                    "dq 0x7ffde000 L4", "u kernel32!CreateFileW+0x10", "x ntdll!Rtl*"):
+        assert is_context_free(command), command
+    for command in ("kb", "r", "dv", "dd", "dd @esp", "dt _PEB", "u", "x", "dps poi(@rsp)", "lm; kb", "~", "~*", "|", ""):
+        assert not is_context_free(command), command
@@ -0,0 +1,152 @@
+import asyncio
+
+from mcp_server_windbg.crash_buckets import CrashIndex, Frame, bucket_id, compute_signature, parse_frames
+
+KB_X64 = """\
+ # Child-SP          RetAddr               : Args to Child                                                           : Call Site
+00 000000c4`5e8ff5a8 00007ffb`1a2b3c4d     : 00000000`00000000 00000000`00000000 00000000`00000000 00000000`00000000 : ntdll!KiUserExceptionDispatch+0x2e
+01 000000c4`5e8ff6e0 00007ff6`a0001299     : 00000000`00000001 00000000`00000000 00000000`00000000 00000000`00000000 : DemoCrash1!Widget::Crash+0x1a [C:\\src\\widget.cpp @ 42]
+02 000000c4`5e8ff720 00007ff6`a00012f0     : 00000000`00000000 00000000`00000000 00000000`00000000 00000000`00000000 : DemoCrash1!std::vector<int,std::allocator<int> >::push_back+0x30
+03 000000c4`5e8ff760 00007ffb`19e77034     : 00000000`00000000 00000000`00000000 00000000`00000000 00000000`00000000 : DemoCrash1+0x12f0
+04 000000c4`5e8ff790 00000000`00000000     : 00000000`00000000 00000000`00000000 00000000`00000000 00000000`00000000 : 0x0
+"""
+
+KB_X86 = """\
+ChildEBP RetAddr  Args to Child
+0019fe8c 00401299 00000001 00000000 00000000 DemoCrash1!Widget::Crash+0x1a [C:\\src\\widget.cpp @ 42]
+0019fec4 77b5a6b4 00000000 00000000 00000000 KERNEL32!BaseThreadInitThunk+0x19
+"""
+
+ANALYZE = """\
+FAULTING_IP:
+DemoCrash1!Widget::Crash+1a
+
+STACK_TEXT:
+000000c4`5e8ff6e0 00007ff6`a0001299     : 00000000`00000001 00000000`00000000 : DemoCrash1!Widget::Crash+0x1a
+000000c4`5e8ff720 00007ff6`a00012f0     : 00000000`00000000 00000000`00000000 : DemoCrash1!std::vector<int,std::allocator<int> >::push_back+0x30
+
+SYMBOL_NAME:  DemoCrash1!Widget::Crash+1a
+"""
+
+
+def test_parse_frames():
+    """Test frame extraction from x64 and x86 kb output and from !analyze -v"""
+    assert parse_frames(KB_X64) == [
+        Frame("ntdll", "KiUserExceptionDispatch", 0x2e),
+        Frame("democrash1", "Widget::Crash", 0x1a),
+        Frame("democrash1", "std::vector<int,std::allocator<int> >::push_back", 0x30),
+        Frame("democrash1", None, 0x12f0),
+    ]
+    assert parse_frames(KB_X86) == [
+        Frame("democrash1", "Widget::Crash", 0x1a),
+        Frame("kernel32", "BaseThreadInitThunk", 0x19),
+    ]
+    assert [f.key() for f in parse_frames(ANALYZE)] == [
+        "democrash1!Widget::Crash",
+        "democrash1!std::vector<int,std::allocator<int> >::push_back",
+    ]
+
+
+def test_signature_skips_noise_and_respects_depth():
+    """Test that dispatch frames are skipped so kb and !analyze -v agree"""
+    from_kb = compute_signature(parse_frames(KB_X64), 0xC0000005, depth=2)
+    from_analyze = compute_signature(parse_frames(ANALYZE), 0xC0000005, depth=2)
+    assert from_kb == from_analyze
+    assert from_kb.split("\n") == [
+        "c0000005", "democrash1!Widget::Crash", "democrash1!std::vector<int,std::allocator<int> >::push_back"
+    ]
+    assert compute_signature(parse_frames(KB_X64), 0xC0000005, depth=3).endswith("democrash1+0x12f0")
+    assert bucket_id(from_kb) != bucket_id(compute_signature(parse_frames(KB_X64), 0xC0000409, depth=2))
+
+
+def test_crash_index_buckets_and_lookups(tmp_path):
+    """Test bucket counts, siblings, re-indexing and the lookup paths"""
+    index = CrashIndex(str(tmp_path / "index"))
+    dumps = []
+    for n in range(3):
+        path = tmp_path / f"crash{n}.dmp"
+        path.write_bytes(b"MDMP" + bytes([n]))
+        dumps.append(str(path))
+
+    signature = compute_signature(parse_frames(KB_X64), 0xC0000005)
+    index.add(dumps[0], signature, quick_key="q1")
+    bucket = index.add(dumps[1], signature, quick_key="q1")
+    assert bucket.dump_count == 2
+    assert [path for path, _ in index.siblings(bucket.bucket_id, exclude=dumps[1])] == [dumps[0]]
+
+    # Re-indexing a dump moves it between buckets
+    other = index.add(dumps[1], compute_signature(parse_frames(KB_X86), 0xC0000005), quick_key="q2")
+    assert index.lookup_path(dumps[0]).dump_count == 1
+    assert other.dump_count == 1
+
+    assert index.lookup_path(dumps[2]) is None
+    assert index.lookup_quick_key("q1").bucket_id == bucket.bucket_id
+    index.add(dumps[2], compute_signature(parse_frames(KB_X86), 0xC0000005), quick_key="q1")
+    assert index.lookup_quick_key("q1") is None  # ambiguous
+    assert index.stats() == {"buckets": 2, "dumps": 3}
+
+
+def test_find_crash_bucket(tmp_path, fake_cdb_path, build_minidump):
+    """Test the tool flow: stack via cdb first, then faulting instruction and identical content"""
+    from mcp_server_windbg import server
+
+    exception = (1, 0xC0000005, 0x7ff6a0001234, ())
+    modules = [(0x7ff6a0000000, 0x20000, "C:\\app\\DemoCrash1.exe")]
+    first = build_minidump(tmp_path / "first.dmp", exception=exception, modules=modules, threads=[1])
+    (tmp_path / "first.dmp.stack").write_text(KB_X64)
+    second = build_minidump(tmp_path / "second.dmp", exception=exception, modules=modules, threads=[1, 2])
+    copy = tmp_path / "copy.dmp"
+    copy.write_bytes(open(first, "rb").read())
+
+    async def scenario():
+        server.configure_crash_index(str(tmp_path / "index"))
+        saved_cache, server.result_cache = server.result_cache, None
+        try:
+            report = await server.find_crash_bucket(
+                server.BucketWindbgDumpParams(dump_path=first), fake_cdb_path, timeout=10
+            )
+            assert "Matched by: stack signature" in report
+            assert "democrash1!Widget::Crash" in report
+            assert "No other dumps" in report
+
+            report = await server.find_crash_bucket(server.BucketWindbgDumpParams(dump_path=second), fake_cdb_path)
+            assert "Matched by: faulting instruction" in report
+            assert first in report
+
+            report = await server.find_crash_bucket(server.BucketWindbgDumpParams(dump_path=str(copy)), fake_cdb_path)
+            assert "Matched by: identical dump content" in report
+            assert "(3 dump(s)" in report
+
+            report = await server.find_crash_bucket(server.BucketWindbgDumpParams(dump_path=first), fake_cdb_path)
+            assert "Matched by: already indexed" in report
+        finally:
+            server.result_cache = saved_cache
+            await server.shutdown_sessions()
+            server.crash_index.close()
+            server.crash_index = None
+    asyncio.run(scenario())
+
+
+def test_index_analysis_reuses_session_hash(tmp_path, monkeypatch):
+    """open_windbg_dump indexes with the hash the session already has instead of re-reading the dump"""
+    from mcp_server_windbg import crash_buckets, server
+
+    dump = tmp_path / "crash.dmp"
+    dump.write_bytes(b"MDMP")
+
+    def no_hashing(path):
+        raise AssertionError(f"{path} was hashed again")
+    monkeypatch.setattr(crash_buckets, "hash_file", no_hashing)
+
+    async def scenario():
+        server.configure_crash_index(str(tmp_path / "index"))
+        saved_cache, server.result_cache = server.result_cache, None
+        try:
+            report = await server.index_analysis(str(dump), KB_X64.splitlines(), dump_hash="ab" * 32)
+            assert "democrash1!Widget::Crash" in report
+            assert server.crash_index.lookup_hash("ab" * 32) is not None
+        finally:
+            server.result_cache = saved_cache
+            server.crash_index.close()
+            server.crash_index = None
+    asyncio.run(scenario())
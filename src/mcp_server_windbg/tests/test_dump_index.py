@@ -0,0 +1,128 @@
+import os
+
+import pytest
+
+from mcp_server_windbg.dump_index import DumpDirectoryIndex, is_dump_file
+
+
+def make_dump(path, size, mtime):
+    path.write_bytes(b"\0" * size)
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def bump_directory(path):
+    """Give a directory a new modification time, even on coarse-grained file systems"""
+    mtime = os.stat(path).st_mtime + 10
+    os.utime(path, (mtime, mtime))
+
+
+def test_is_dump_file():
+    """Test the *.*dmp name pattern"""
+    assert is_dump_file("app.dmp")
+    assert is_dump_file("app.exe.1234.DMP")
+    assert is_dump_file("kernel.mdmp")
+    assert not is_dump_file("dmp")
+    assert not is_dump_file("appdmp")
+    assert not is_dump_file("app.dmp.txt")
+
+
+def test_sorting_filtering_and_pagination(tmp_path):
+    """Test that every sort order pages through all matching dumps exactly once"""
+    for n, name in enumerate(["b.dmp", "a.dmp", "d.mdmp", "c.dmp", "e.dmp"]):
+        make_dump(tmp_path / name, size=(5 - n) * 100, mtime=1_700_000_000 + n)
+    (tmp_path / "notes.txt").write_text("x")
+    index = DumpDirectoryIndex()
+
+    def collect(**kwargs):
+        names, cursor = [], None
+        while True:
+            listing = index.list(str(tmp_path), cursor=cursor, limit=2, **kwargs)
+            names.extend(entry.name for entry in listing.entries)
+            cursor = listing.next_cursor
+            if cursor is None:
+                return names, listing.total
+
+    assert collect() == (["a.dmp", "b.dmp", "c.dmp", "d.mdmp", "e.dmp"], 5)
+    assert collect(sort_by="mtime", descending=True)[0] == ["e.dmp", "c.dmp", "d.mdmp", "a.dmp", "b.dmp"]
+    assert collect(sort_by="size")[0] == ["e.dmp", "c.dmp", "d.mdmp", "a.dmp", "b.dmp"]
+    assert collect(pattern="*.DMP", min_size=200) == (["a.dmp", "b.dmp", "c.dmp"], 3)
+    assert collect(modified_after=1_700_000_002.5)[0] == ["c.dmp", "e.dmp"]
+
+    # A cursor stays valid when dumps are added before it
+    first = index.list(str(tmp_path), limit=2)
+    make_dump(tmp_path / "0.dmp", size=1, mtime=1_700_000_100)
+    bump_directory(tmp_path)
+    second = index.list(str(tmp_path), cursor=first.next_cursor, limit=2)
+    assert [entry.name for entry in second.entries] == ["c.dmp", "d.mdmp"]
+    assert second.total == 6
+
+    with pytest.raises(ValueError):
+        index.list(str(tmp_path), sort_by="size", cursor=first.next_cursor)
+
+
+def test_incremental_refresh(tmp_path):
+    """Test that unchanged directories are not rescanned and changes are picked up"""
+    (tmp_path / "sub").mkdir()
+    make_dump(tmp_path / "top.dmp", size=10, mtime=1_700_000_000)
+    make_dump(tmp_path / "sub" / "nested.dmp", size=10, mtime=1_700_000_000)
+    index = DumpDirectoryIndex()
+
+    assert index.list(str(tmp_path)).total == 1
+    assert index.list(str(tmp_path), recursive=True).total == 2
+    scans = index.stats()["directory_scans"]
+    assert index.list(str(tmp_path), recursive=True).total == 2
+    assert index.stats()["directory_scans"] == scans
+
+    make_dump(tmp_path / "sub" / "new.dmp", size=10, mtime=1_700_000_000)
+    bump_directory(tmp_path / "sub")
+    assert index.list(str(tmp_path), recursive=True).total == 3
+    assert index.stats()["directory_scans"] == scans + 1
+
+    # Directories are rescanned after the rescan interval even without changes
+    index.rescan_interval = 0
+    index.list(str(tmp_path))
+    assert index.stats()["directory_scans"] == scans + 2
+
+
+def test_exception_summaries_are_memoized_and_pruned(tmp_path, monkeypatch):
+    """Test that summaries are read once per file version and forgotten with the files"""
+    from mcp_server_windbg import dump_index
+
+    reads = []
+    monkeypatch.setattr(dump_index, "read_exception_summary", lambda path: reads.append(path) or "summary")
+    make_dump(tmp_path / "a.dmp", size=10, mtime=1_700_000_000)
+    make_dump(tmp_path / "b.dmp", size=10, mtime=1_700_000_000)
+    index = DumpDirectoryIndex()
+    entries = index.list(str(tmp_path)).entries
+    for entry in entries + entries:
+        assert index.exception_summary(entry) == "summary"
+    assert len(reads) == 2 and index.stats()["summaries"] == 2
+
+    # A rewritten dump is a new version; the old one's summary is dropped on rescan
+    make_dump(tmp_path / "a.dmp", size=20, mtime=1_700_000_100)
+    bump_directory(tmp_path)
+    entries = index.list(str(tmp_path)).entries
+    assert index.stats()["summaries"] == 1
+    index.exception_summary(entries[0])
+    assert len(reads) == 3 and index.stats()["summaries"] == 2
+
+    index.invalidate(str(tmp_path))
+    assert index.stats()["summaries"] == 0
+
+
+def test_list_dumps_tool_output(tmp_path):
+    """Test the list_windbg_dumps formatting and cursor hint"""
+    from mcp_server_windbg import server
+
+    for n in range(3):
+        make_dump(tmp_path / f"crash{n}.dmp", size=1024 * 1024, mtime=1_700_000_000 + n)
+    args = server.ListWindbgDumpsParams(directory_path=str(tmp_path), sort_by="mtime", descending=True, limit=2)
+    text = server.format_dump_listing(args, str(tmp_path))
+    assert text.startswith(f"Found 3 crash dump file(s) in {tmp_path}:")
+    assert f"1. {tmp_path / 'crash2.dmp'} (1.0 MB, modified:" in text
+    assert "Showing 2 of 3" in text
+    cursor = text.rsplit('cursor="', 1)[1].split('"')[0]
+    text = server.format_dump_listing(args.model_copy(update={"cursor": cursor}), str(tmp_path))
+    assert f"1. {tmp_path / 'crash0.dmp'}" in text
+    assert "Showing" not in text
@@ -0,0 +1,100 @@
+import asyncio
+import os
+
+import aiohttp
+import pytest
+
+from mcp_server_windbg import metrics
+from mcp_server_windbg.cdb_session import AsyncCDBSession, CDBTimeoutError
+from mcp_server_windbg.file_upload import start_upload_server
+
+
+def test_exposition_format():
+    """Test counters, gauges and cumulative histogram buckets in text format"""
+    registry = metrics.Registry()
+    counter = registry.counter("test_total", "A counter", ["kind"])
+    gauge = registry.gauge("test_level", "A gauge")
+    histogram = registry.histogram("test_seconds", "A histogram", ["verb"], buckets=[0.1, 1.0])
+    counter.inc(labels=('say "hi"',))
+    counter.inc(2, ('say "hi"',))
+    gauge.set(5)
+    gauge.dec(2)
+    for value in (0.05, 0.5, 0.5, 3.0):
+        histogram.observe(value, ("lm",))
+    registry.register_collector(lambda: [metrics.MetricFamily("test_live", "gauge", "Collected", [({"a": "b"}, 1.5)])])
+
+    lines = registry.render().splitlines()
+    assert "# TYPE test_total counter" in lines
+    assert 'test_total{kind="say \\"hi\\""} 3' in lines
+    assert "test_level 3" in lines
+    assert 'test_seconds_bucket{verb="lm",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{verb="lm",le="1"} 3' in lines
+    assert 'test_seconds_bucket{verb="lm",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{verb="lm"} 4' in lines
+    assert 'test_seconds_sum{verb="lm"} 4.05' in lines
+    assert 'test_live{a="b"} 1.5' in lines
+    with pytest.raises(ValueError):
+        registry.counter("test_total", "Again")
+
+
+def test_command_verbs():
+    """Test that verb labels do not grow with command arguments"""
+    assert metrics.command_verb("!analyze -v") == "!analyze"
+    assert metrics.command_verb("~3s") == metrics.command_verb("~12s") == "~Ns"
+    assert metrics.command_verb("  dd 0x1000 L4") == "dd"
+    assert metrics.command_verb("kb; lm") == "kb"
+    assert metrics.command_verb("") == "(empty)"
+
+
+def test_cdb_commands_are_measured(fake_cdb_path, fake_dump_path):
+    """Test that command latency, pipe bytes and timeouts are recorded"""
+    labels = metrics.verb_label("lines 10")
+    count = metrics.COMMAND_SECONDS.count(labels)
+    read = metrics.CDB_BYTES_READ.value()
+    timeouts = metrics.COMMAND_TIMEOUTS.value(metrics.verb_label("sleep 1"))
+
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=20) as session:
+            await session.send_command("lines 1000")
+            await session.send_batch(["lines 10", "version"])
+            with pytest.raises(CDBTimeoutError):
+                await session.send_command("sleep 1", timeout=0.2)
+
+    asyncio.run(scenario())
+    assert metrics.COMMAND_SECONDS.count(labels) == count + 2
+    assert metrics.CDB_BYTES_READ.value() - read > 1000 * len("line 999\n") // 2
+    assert metrics.COMMAND_TIMEOUTS.value(metrics.verb_label("sleep 1")) == timeouts + 1
+
+
+def test_metrics_endpoint(tmp_path, fake_cdb_path, fake_dump_path):
+    """Test /metrics on the upload server, including uploads and cdb processes"""
+    from mcp_server_windbg import server
+
+    async def scenario():
+        runner = await start_upload_server("127.0.0.1", 0, str(tmp_path / "uploads"))
+        port = runner.addresses[0][1]
+        try:
+            session = await server.get_or_create_session(fake_dump_path, fake_cdb_path, timeout=20)
+            await session.send_command("version")
+            async with aiohttp.ClientSession() as client:
+                form = aiohttp.FormData()
+                form.add_field("file", b"MDMP" * 256, filename="crash.dmp")
+                async with client.post(f"http://127.0.0.1:{port}/upload", data=form) as response:
+                    assert (await response.json())["success"]
+                async with client.get(f"http://127.0.0.1:{port}/metrics") as response:
+                    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+                    return await response.text()
+        finally:
+            await server.shutdown_sessions()
+            await runner.cleanup()
+
+    text = asyncio.run(scenario())
+    lines = text.splitlines()
+    assert any(line.startswith('windbg_uploads_total{status="ok"}') for line in lines)
+    assert any(line.startswith("windbg_upload_bytes_total ") for line in lines)
+    assert any(line.startswith("windbg_session_spawn_seconds_count ") for line in lines)
+    assert 'windbg_sessions{state="idle"} 1' in lines
+    dump = os.path.basename(fake_dump_path)
+    assert any(line.startswith(f'windbg_cdb_resident_bytes{{dump="{dump}"') for line in lines)
+    assert any(line.startswith(f'windbg_cdb_cpu_seconds_total{{dump="{dump}"') for line in lines)
+    assert "windbg_output_store_bytes 0" in lines
@@ -0,0 +1,80 @@
+import os
+import struct
+
+import pytest
+
+from mcp_server_windbg.minidump import (
+    MinidumpError,
+    MinidumpFile,
+    format_exception_summary,
+    read_crash_information,
+    read_exception_summary,
+)
+
+DEMO_DUMP_PATH = os.path.join(os.path.dirname(__file__), 'dumps', 'DemoCrash1.exe.7088.dmp')
+
+
+def test_parse_synthetic_minidump(tmp_path, build_minidump):
+    """Test that exception, modules, threads, system and misc info are parsed"""
+    path = build_minidump(
+        tmp_path / "crash.dmp",
+        exception=(0x1b3c, 0xC0000005, 0x7ff6a0001234, (1, 0x10)),
+        modules=[(0x7ff6a0000000, 0x20000, "C:\\app\\DemoCrash1.exe"), (0x7ffb10000000, 0x1f0000, "C:\\Windows\\System32\\ntdll.dll")],
+        threads=[0x1b3c, 0x2000, 0x2004],
+        system_info=(9, 8, 10, 0, 19045),
+        process_id=0x1bb0,
+    )
+    with MinidumpFile(path) as dump:
+        assert dump.exception.code == 0xC0000005
+        assert dump.exception.name == "ACCESS_VIOLATION"
+        assert dump.exception.parameters == (1, 0x10)
+        assert [m.basename for m in dump.modules] == ["DemoCrash1.exe", "ntdll.dll"]
+        assert dump.modules[1].file_version == (10, 0, 19041, 1)
+        assert dump.thread_count == 3
+        assert [t.thread_id for t in dump.threads] == [0x1b3c, 0x2000, 0x2004]
+        assert dump.system_info.architecture == "x64"
+        assert dump.misc_info.process_id == 0x1bb0
+        assert dump.faulting_module.basename == "DemoCrash1.exe"
+        assert format_exception_summary(dump) == "ACCESS_VIOLATION (0xc0000005) in DemoCrash1.exe+0x1234"
+
+    crash_information = read_crash_information(path)
+    assert crash_information[0] == "Last event: 1bb0.1b3c: ACCESS_VIOLATION (0xc0000005) in DemoCrash1.exe+0x1234"
+    assert "Threads: 3, Modules: 2" in crash_information
+
+
+def test_minidump_without_exception(tmp_path, build_minidump):
+    """Test that a dump without an exception stream parses and has no summary"""
+    path = build_minidump(tmp_path / "live.dmp", threads=[1])
+    with MinidumpFile(path) as dump:
+        assert dump.exception is None
+        assert dump.modules == []
+        assert dump.system_info is None
+    assert read_exception_summary(path) is None
+    assert read_crash_information(path)[0] == "No exception record in dump"
+
+
+def test_invalid_minidump(tmp_path):
+    """Test that non-minidump and truncated files are rejected"""
+    not_a_dump = tmp_path / "text.dmp"
+    not_a_dump.write_bytes(b"version https://git-lfs.github.com/spec/v1\n")
+    with pytest.raises(MinidumpError):
+        MinidumpFile(str(not_a_dump))
+
+    truncated = tmp_path / "truncated.dmp"
+    truncated.write_bytes(struct.pack("<IIIIIIQ", 0x504D444D, 0xA793, 50, 32, 0, 0, 0))
+    with pytest.raises(MinidumpError):
+        MinidumpFile(str(truncated))
+
+    assert read_exception_summary(str(not_a_dump)) is None
+    assert read_crash_information(str(tmp_path / "missing.dmp")) is None
+
+
+def test_demo_crash_dump():
+    """Test parsing the bundled crash dump"""
+    with open(DEMO_DUMP_PATH, "rb") as f:
+        if f.read(4) != b"MDMP":
+            pytest.skip("Bundled dump is not available (Git LFS pointer)")
+    with MinidumpFile(DEMO_DUMP_PATH) as dump:
+        assert dump.exception is not None
+        assert dump.thread_count > 0
+        assert any(m.basename.lower().startswith("democrash1") for m in dump.modules)
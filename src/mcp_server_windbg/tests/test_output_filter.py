@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession
+from mcp_server_windbg.output_filter import OutputFilter
+from mcp_server_windbg.output_stream import output_sink
+
+MODULES = [
+    "start             end                 module name",
+    "00007ff6`1a2b0000 00007ff6`1a2f1000   MyApp      (deferred)",
+    "00007ffc`2b3c0000 00007ffc`2b5c8000   ntdll      (pdb symbols)",
+    "00007ffc`2a1e0000 00007ffc`2a29e000   KERNEL32   (deferred)",
+]
+
+
+def feed_chunks(output_filter, lines, size=2):
+    kept = []
+    for i in range(0, len(lines), size):
+        kept.extend(output_filter.feed(lines[i:i + size]))
+    kept.extend(output_filter.finish())
+    return kept
+
+
+def test_grep_invert_and_fields():
+    """Test that grep, invert and column selection combine per line"""
+    output_filter = OutputFilter(grep=r"deferred", fields=[3, -1])
+    assert feed_chunks(output_filter, MODULES) == ["MyApp (deferred)", "KERNEL32 (deferred)"]
+    assert output_filter.result() == ["MyApp (deferred)", "KERNEL32 (deferred)"]
+
+    output_filter = OutputFilter(grep="deferred", invert=True, fields=[3])
+    assert feed_chunks(output_filter, MODULES) == ["module", "ntdll"]
+    # Lines without the requested column are dropped
+    assert OutputFilter(fields=[5]).feed(["a b c d e", "a b"]) == ["e"]
+
+
+def test_head_stops_early_and_tail_waits_for_the_end():
+    """Test that head completes the filter as soon as it has its lines"""
+    lines = [f"line {i}" for i in range(100)]
+    head = OutputFilter(grep="5", head=2)
+    assert head.feed(lines[:20]) == ["line 5", "line 15"]
+    assert head.done
+    assert head.feed(lines[20:]) == []
+    assert "stopped reading early" in head.describe()
+
+    tail = OutputFilter(grep="5", tail=2)
+    assert tail.feed(lines) == [] and not tail.done
+    assert tail.finish() == ["line 85", "line 95"]
+    assert tail.truncated and tail.result() == ["line 85", "line 95"]
+    assert OutputFilter(head=0).done
+
+
+def test_max_bytes():
+    """Test that the byte limit keeps whole lines from the start, or from the end with tail"""
+    lines = ["aaaa", "bbbb", "cccc"]
+    output_filter = OutputFilter(max_bytes=10)
+    assert output_filter.feed(lines) == ["aaaa", "bbbb"]
+    assert output_filter.done and output_filter.truncated
+    tail = OutputFilter(tail=3, max_bytes=10)
+    tail.feed(lines)
+    assert tail.finish() == ["bbbb", "cccc"]
+
+
+def test_invalid_filters():
+    """Test that invalid parameters raise ValueError"""
+    with pytest.raises(ValueError, match="Invalid grep pattern"):
+        OutputFilter(grep="(")
+    with pytest.raises(ValueError):
+        OutputFilter(head=-1)
+    with pytest.raises(ValueError):
+        OutputFilter(fields=[0])
+    assert not OutputFilter().active and not OutputFilter(invert=True).active
+
+
+def test_abandoned_command_does_not_leak(fake_cdb_path, fake_dump_path):
+    """Test that output skipped after an early stop never reaches later commands"""
+    async def scenario():
+        async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=20) as session:
+            seen = []
+
+            async def first_chunk(lines):
+                seen.extend(lines)
+                return True
+
+            assert await session.send_command("lines 200000", on_output=first_chunk, collect=False) == []
+            streamed = []
+
+            async def record(lines):
+                streamed.extend(lines)
+
+            output = await session.send_command("trickle 3 0.01", on_output=record)
+            return seen, output, streamed
+
+    seen, output, streamed = asyncio.run(scenario())
+    assert 0 < len(seen) < 200000
+    assert output == streamed == ["0:000> line 0", "line 1", "line 2"]
+
+
+def test_run_windbg_cmd_filters_while_streaming(fake_cdb_path, fake_dump_path):
+    """Test that only filtered lines are streamed and returned"""
+    from mcp_server_windbg import server
+
+    chunks = []
+
+    async def sink(lines):
+        chunks.append(lines)
+
+    async def scenario():
+        session = await server.get_or_create_session(fake_dump_path, fake_cdb_path, timeout=20)
+        try:
+            with output_sink(sink):
+                head = await server.run_streaming_command(
+                    session, "lines 100000", OutputFilter(grep=r"7$", head=3)
+                )
+                tail = await server.run_streaming_command(
+                    session, "lines 100000", OutputFilter(grep=r"99$", tail=2, fields=[2])
+                )
+            unfiltered = await server.run_streaming_command(session, "lines 5")
+            return head, tail, unfiltered
+        finally:
+            await server.shutdown_sessions()
+
+    (head, message), (tail, _), (unfiltered, _) = asyncio.run(scenario())
+    assert message is None
+    assert head == ["line 7", "line 17", "line 27"]
+    assert tail == ["99899", "99999"]
+    assert unfiltered[1:] == ["line 1", "line 2", "line 3", "line 4"]
+    assert sum(chunks, []) == head + tail
+
+    params = server.RunWindbgCmdParams(dump_path=fake_dump_path, command="lm", grep="[")
+    with pytest.raises(server.McpError):
+        server.make_output_filter(params)
+    assert server.make_output_filter(
+        server.RunWindbgCmdParams(dump_path=fake_dump_path, command="lm")
+    ) is None
@@ -0,0 +1,62 @@
+from mcp_server_windbg.cdb_session import CDBSession, MarkerOutputSplitter
+
+
+def test_splitter_drops_marker_line():
+    """Test that output is split at the marker and the marker line is removed"""
+    splitter = MarkerOutputSplitter("utf-8")
+    results = splitter.feed(b"0:000> first  \r\nsecond\n0:000> COMMAND_COMPLETED_MARKER\nnext")
+    assert results == [("", ["0:000> first", "second"])]
+    assert splitter.feed(b" command\nCOMMAND_COMPLETED_MARKER\n") == [("", ["next command"])]
+
+
+def test_splitter_handles_chunk_boundaries():
+    """Markers, line ends and multi-byte characters may be split across reads"""
+    data = "héllo wörld\n0:000> COMMAND_COMPLETED_MARKER_ab12_0\n".encode("utf-8")
+    splitter = MarkerOutputSplitter("utf-8")
+    results = []
+    for i in range(len(data)):
+        results.extend(splitter.feed(data[i:i + 1]))
+    assert results == [("ab12_0", ["héllo wörld"])]
+    assert not splitter.buffer
+
+
+def test_splitter_multiple_markers_in_one_chunk():
+    """Test that several completed commands in one read are all returned"""
+    splitter = MarkerOutputSplitter("utf-8")
+    results = splitter.feed(b"a\nCOMMAND_COMPLETED_MARKER\nCOMMAND_COMPLETED_MARKER\nb\nc\nCOMMAND_COMPLETED_MARKER\n")
+    assert results == [("", ["a"]), ("", []), ("", ["b", "c"])]
+
+
+def test_splitter_take_partial():
+    """Test that complete lines of a running command are handed out once"""
+    splitter = MarkerOutputSplitter("utf-8")
+    assert splitter.feed(b"0:000> one\ntw") == []
+    assert splitter.take_partial() == ["0:000> one"]
+    assert splitter.take_partial() == []
+    assert splitter.feed(b"o\nthree\nCOMMAND_COMPLETED_MARK") == []
+    assert splitter.take_partial() == ["two", "three"]
+    # Lines already taken are not repeated in the result
+    assert splitter.feed(b"ER_x\nnext\n") == [("x", [])]
+    assert splitter.take_partial() == ["next"]
+
+
+def test_sync_session_large_output(fake_cdb_path, fake_dump_path):
+    """Test that the threaded reader returns large outputs intact"""
+    with CDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=20) as session:
+        output = session.send_command("lines 200000")
+        assert len(output) == 200000
+        assert output[0].endswith("line 0")
+        assert output[-1] == "line 199999"
+        assert any("Microsoft (R) Windows Debugger" in line for line in session.send_command("version"))
+
+
+def test_sync_session_batch(fake_cdb_path, fake_dump_path):
+    """Test that a batch returns one result per command, in order"""
+    with CDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=20) as session:
+        results = session.send_batch(["lines 3", "version", "lines 0", "lines 1"])
+        assert len(results) == 4
+        assert [line[-6:] for line in results[0]] == ["line 0", "line 1", "line 2"]
+        assert "Microsoft (R) Windows Debugger" in results[1][0]
+        assert results[2] == []
+        assert results[3][-1].endswith("line 0")
+        assert session.send_batch([]) == []
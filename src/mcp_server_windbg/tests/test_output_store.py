@@ -0,0 +1,84 @@
+import pytest
+
+from mcp_server_windbg.output_store import OutputStore, StoredOutput
+
+
+def lines_of(count, width=20):
+    return [f"{i:06d} " + "x" * width for i in range(count)]
+
+
+def test_stored_output_pages():
+    """Test that pages hold whole lines within the byte budget and cover the output once"""
+    lines = lines_of(100) + ["wörld ünïcode"]
+    output = StoredOutput("lm v", "a.dmp", lines)
+    assert output.line_count == 101
+    assert output.size == len("\n".join(lines).encode("utf-8")) + 1
+
+    collected, start = [], 0
+    while start < output.line_count:
+        text, end = output.page(start, max_bytes=100)
+        assert len(text.encode("utf-8")) < 100 and end > start
+        collected.extend(text.split("\n"))
+        start = end
+    assert collected == lines
+
+    # A line longer than the budget is still returned on its own
+    assert output.page(0, max_bytes=5) == (lines[0], 1)
+    assert output.page(101) == ("", 101)
+
+
+def test_store_first_page_and_cursor():
+    """Test paging through a large output with cursors"""
+    store = OutputStore()
+    assert store.first_page("k", "a.dmp", ["short"], max_bytes=1024) is None
+
+    lines = lines_of(1000)
+    page = store.first_page("lm v", "a.dmp", lines, max_bytes=4096)
+    collected = page.text.split("\n")
+    assert page.start_line == 0 and page.end_line == len(collected)
+    while page.next_cursor:
+        page = store.read(page.next_cursor, max_bytes=4096)
+        collected.extend(page.text.split("\n"))
+    assert collected == lines
+    assert page.end_line == 1000 and page.output.command == "lm v"
+
+    with pytest.raises(ValueError):
+        store.read("garbage")
+    with pytest.raises(KeyError):
+        store.read("0123456789abcdef:0")
+
+
+def test_store_evicts_least_recently_used():
+    """Test that the store stays within its size limit"""
+    store = OutputStore(max_size_mb=1)
+    big = lines_of(12000, width=30)  # about 450 KB each
+    first = store.first_page("a", "a.dmp", big, max_bytes=1024)
+    second = store.first_page("b", "a.dmp", big, max_bytes=1024)
+    store.read(first.next_cursor)
+    third = store.first_page("c", "a.dmp", big, max_bytes=1024)
+    assert store.stats()["bytes"] <= 1024 * 1024
+    store.read(first.next_cursor)
+    store.read(third.next_cursor)
+    with pytest.raises(KeyError):
+        store.read(second.next_cursor)
+
+
+def test_run_windbg_cmd_output_is_paged():
+    """Test the tool text for paged outputs and read_windbg_output"""
+    from mcp.shared.exceptions import McpError
+    from mcp_server_windbg import server
+
+    lines = lines_of(10000)
+    text = server.format_command_output("a.dmp", "lm v", lines)
+    assert len(text) < 70 * 1024
+    assert "Showing lines 1-" in text and "of 10000" in text
+    cursor = text.rsplit('cursor="', 1)[1].split('"')[0]
+
+    args = server.ReadWindbgOutputParams(cursor=cursor, max_bytes=1000)
+    page = server.read_output_page(args)
+    assert page.startswith("Command: lm v")
+    assert lines[len(text.split("```")[1].strip().split("\n"))] in page
+
+    with pytest.raises(McpError):
+        server.read_output_page(server.ReadWindbgOutputParams(cursor="missing:0"))
+    assert "Showing" not in server.format_command_output("a.dmp", "k", lines[:3])
@@ -0,0 +1,72 @@
+import asyncio
+from types import SimpleNamespace
+
+from mcp_server_windbg.output_stream import current_output_sink, output_sink, progress_output_sink
+
+
+class RecordingSession:
+    def __init__(self):
+        self.notifications = []
+
+    async def send_progress_notification(self, token, progress, total=None, message=None):
+        self.notifications.append((token, progress, message))
+
+
+def test_output_sink_is_scoped():
+    """Test that a sink is only visible inside its with-block and task"""
+    async def sink(lines):
+        pass
+
+    async def scenario():
+        assert current_output_sink() is None
+        with output_sink(sink):
+            assert current_output_sink() is sink
+            # Tasks started inside the block inherit the sink
+            assert await asyncio.create_task(asyncio.sleep(0, current_output_sink())) is sink
+        assert current_output_sink() is None
+
+    asyncio.run(scenario())
+
+
+def test_progress_output_sink():
+    """Test that chunks become progress notifications counting lines"""
+    session = RecordingSession()
+    context = SimpleNamespace(meta=SimpleNamespace(progressToken="tok"), session=session)
+    sink = progress_output_sink(context)
+
+    async def scenario():
+        await sink(["a", "b"])
+        await sink(["c"])
+
+    asyncio.run(scenario())
+    assert session.notifications == [("tok", 2, "a\nb"), ("tok", 3, "c")]
+    assert progress_output_sink(SimpleNamespace(meta=None, session=session)) is None
+    assert progress_output_sink(SimpleNamespace(meta=SimpleNamespace(progressToken=None))) is None
+
+
+def test_run_windbg_cmd_streams_and_returns_partial_output(fake_cdb_path, fake_dump_path):
+    """Test the run_windbg_cmd path: chunks go to the sink, timeouts keep output"""
+    from mcp_server_windbg import server
+
+    chunks = []
+
+    async def sink(lines):
+        chunks.append(lines)
+
+    async def scenario():
+        session = await server.get_or_create_session(fake_dump_path, fake_cdb_path, timeout=0.4)
+        try:
+            with output_sink(sink):
+                complete = await server.run_streaming_command(session, "trickle 3 0.02")
+                partial = await server.run_streaming_command(session, "trickle 20 0.1")
+            return complete, partial
+        finally:
+            await server.shutdown_sessions()
+
+    (output, message), (partial, timeout_message) = asyncio.run(scenario())
+    assert message is None and len(output) == 3
+    assert timeout_message.startswith("Command timed out after 0.4 seconds")
+    assert 2 <= len(partial) < 20
+    assert sum(chunks, []) == output + partial
+    text = server.format_command_output(fake_dump_path, "trickle 20 0.1", partial, timeout_message)
+    assert text.endswith(f"Output is incomplete. {timeout_message}")
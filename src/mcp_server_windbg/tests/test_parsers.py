@@ -0,0 +1,176 @@
+import asyncio
+import json
+import sys
+
+import pytest
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession
+from mcp_server_windbg.parsers import (
+    AnalysisEntry, LastEvent, Module, StackFrame, Thread, parse_output, parser_for
+)
+from mcp_server_windbg.result_cache import CachedSession
+
+LM = """\
+0:000> start             end                 module name
+00007ff6`a0000000 00007ff6`a0027000   DemoCrash1 C (private pdb symbols)  C:\\src\\DemoCrash1.pdb
+00007ffb`19e60000 00007ffb`19f1d000   KERNEL32   (deferred)
+00007ffb`1a2a0000 00007ffb`1a498000   ntdll      (pdb symbols)          c:\\symbols\\ntdll.pdb\\ntdll.pdb
+
+Unloaded modules:
+00007ffb`10000000 00007ffb`10010000   old.dll
+""".splitlines()
+
+THREADS = """\
+#  0  Id: 1b90.1c2c Suspend: 0 Teb: 000000c4`5e6f2000 Unfrozen
+.  1  Id: 1b90.2a08 Suspend: 1 Teb: 000000c4`5e6f4000 Frozen "Worker"
+   2  Id: 1b90.0d4c Suspend: 1 Teb: 000000c4`5e6f6000 Unfrozen
+""".splitlines()
+
+KN = """\
+ # Child-SP          RetAddr               Call Site
+00 000000c4`5e8ff6e0 00007ff6`a0001299     DemoCrash1!Widget::Crash+0x1a [C:\\src\\widget.cpp @ 42]
+01 (Inline Function) --------`--------     DemoCrash1!Widget::Run+0x5
+02 000000c4`5e8ff720 00000000`00000000     0x0
+""".splitlines()
+
+LASTEVENT = """\
+Last event: 1b90.1c2c: Access violation - code c0000005 (first/second chance not available)
+  debugger time: Tue Oct 14 09:12:01.123 2025 (UTC + 2:00)
+""".splitlines()
+
+ANALYZE = """\
+*******************************************************************************
+*                        Exception Analysis                                   *
+*******************************************************************************
+
+KEY_VALUES_STRING: 1
+
+    Key  : Analysis.CPU.mSec
+    Value: 421
+
+EXCEPTION_RECORD:  (.exr -1)
+ExceptionAddress: 00007ff6a000121a (DemoCrash1!Widget::Crash+0x000000000000001a)
+   ExceptionCode: c0000005 (Access violation)
+
+STACK_TEXT:
+000000c4`5e8ff6e0 00007ff6`a0001299     : 00000000`00000001 00000000`00000000 : DemoCrash1!Widget::Crash+0x1a
+000000c4`5e8ff720 00007ff6`a00012f0     : 00000000`00000000 00000000`00000000 : DemoCrash1!main+0x30
+
+FAILURE_BUCKET_ID:  NULL_POINTER_READ_c0000005_DemoCrash1.exe!Widget::Crash
+""".splitlines()
+
+
+def test_module_parser():
+    """Test that lm lines become modules, including the unloaded section"""
+    modules = list(parser_for("lm").parse(LM))
+    assert [module.name for module in modules] == ["DemoCrash1", "KERNEL32", "ntdll", "old.dll"]
+    assert modules[0] == Module(
+        0x7FF6A0000000, 0x7FF6A0027000, "DemoCrash1", "private pdb symbols", "C:\\src\\DemoCrash1.pdb"
+    )
+    assert modules[1].symbols == "deferred" and modules[1].symbol_file is None
+    assert modules[3].unloaded and not modules[2].unloaded
+    assert modules[0].to_dict()["start"] == "0x7ff6a0000000"
+
+
+def test_thread_parser():
+    """Test that ~ lines become threads with their markers"""
+    threads = list(parser_for("~").parse(THREADS))
+    assert threads[1] == Thread(1, 0x1B90, 0x2A08, 1, 0xC45E6F4000, frozen=True, current=True, name="Worker")
+    assert threads[0].event and not threads[0].current
+    assert [thread.number for thread in threads] == [0, 1, 2]
+
+
+def test_stack_parser():
+    """Test that kn frames keep numbers, inline frames and source lines"""
+    frames = list(parser_for("kn 3").parse(KN))
+    assert frames[0] == StackFrame(
+        "DemoCrash1!Widget::Crash+0x1a", number=0, child_sp=0xC45E8FF6E0, return_address=0x7FF6A0001299,
+        module="DemoCrash1", function="Widget::Crash", offset=0x1A, source_file="C:\\src\\widget.cpp",
+        source_line=42,
+    )
+    assert frames[1].child_sp is None and frames[1].function == "Widget::Run"
+    assert frames[2].call_site == "0x0" and frames[2].module is None
+
+
+def test_lastevent_and_analyze_parsers():
+    """Test the last event and the key/value entries of !analyze -v"""
+    assert list(parser_for(".lastevent").parse(LASTEVENT)) == [LastEvent(
+        "Access violation", 0x1B90, 0x1C2C, 0xC0000005, "first/second chance not available",
+        "Tue Oct 14 09:12:01.123 2025 (UTC + 2:00)",
+    )]
+
+    entries = {entry.key: entry for entry in parser_for("!analyze -v").parse(ANALYZE)}
+    assert list(entries) == ["KEY_VALUES_STRING", "EXCEPTION_RECORD", "STACK_TEXT", "FAILURE_BUCKET_ID"]
+    assert entries["EXCEPTION_RECORD"].value.splitlines()[2].strip() == "ExceptionCode: c0000005 (Access violation)"
+    assert [frame.function for frame in entries["STACK_TEXT"].frames] == ["Widget::Crash", "main"]
+    assert entries["FAILURE_BUCKET_ID"] == AnalysisEntry(
+        "FAILURE_BUCKET_ID", "NULL_POINTER_READ_c0000005_DemoCrash1.exe!Widget::Crash"
+    )
+
+
+def test_parsers_stream_chunks():
+    """Test that feeding arbitrary chunks gives the same records as a single pass"""
+    for command, lines in (("lm", LM), ("~", THREADS), ("kn", KN), (".lastevent", LASTEVENT), ("!analyze -v", ANALYZE)):
+        expected = list(parser_for(command).parse(lines))
+        parser = parser_for(command)
+        records = []
+        for start in range(0, len(lines), 3):
+            records += parser.feed(lines[start:start + 3])
+        records += parser.finish()
+        assert records == expected, command
+
+
+def test_parser_registry_and_compact_records():
+    """Test which commands have parsers and that records have no per-instance dict"""
+    for command in ("lm", "lm m nt*", "lmo", "~", "k", "kb 20", "kn", "~*kb", "~* kn 50", ".lastevent", "!analyze -v"):
+        assert parser_for(command) is not None, command
+    for command in ("lmv", "lm v m ntdll", "kc", "~*e kb", "dt _PEB", "r"):
+        assert parser_for(command) is None, command
+    module = next(parser_for("lm").parse(LM))
+    assert not hasattr(module, "__dict__")
+    assert sys.getsizeof(module) < 120
+    assert json.loads(json.dumps(parse_output("~", THREADS)))["kind"] == "threads"
+
+
+def test_structured_command_result(tmp_path, fake_cdb_path, fake_dump_path):
+    """Test that run_windbg_cmd's structured mode parses streamed and cached output alike"""
+    from mcp_server_windbg.server import run_structured_command
+    from mcp_server_windbg.result_cache import ResultCache
+
+    with open(fake_dump_path + ".stack", "w") as f:
+        f.write("\n".join(KN) + "\n")
+
+    async def scenario():
+        async def start():
+            return await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+        cache = ResultCache(str(tmp_path / "cache"))
+        session = CachedSession(fake_dump_path, start, cache=cache)
+        try:
+            results = [
+                json.loads(await run_structured_command(session, "kb", parser_for("kb")))
+                for _ in range(2)
+            ]
+        finally:
+            await session.shutdown()
+            cache.close()
+        assert cache.hits == 1
+        return results
+
+    streamed, cached = asyncio.run(scenario())
+    assert streamed == cached
+    assert streamed["kind"] == "frames" and "incomplete" not in streamed
+    assert [frame["function"] for frame in streamed["records"]] == ["Widget::Crash", "Widget::Run", None]
+    assert streamed["records"][0]["return_address"] == "0x7ff6a0001299"
+
+
+def test_structured_rejects_unsupported_requests():
+    """Test that structured output needs a parser and cannot be filtered"""
+    from mcp.shared.exceptions import McpError
+    from mcp_server_windbg.server import RunWindbgCmdParams, make_output_parser
+
+    assert make_output_parser(RunWindbgCmdParams(dump_path="x.dmp", command="lm")) is None
+    assert make_output_parser(RunWindbgCmdParams(dump_path="x.dmp", command="lm", structured=True)) is not None
+    with pytest.raises(McpError):
+        make_output_parser(RunWindbgCmdParams(dump_path="x.dmp", command="dt _PEB", structured=True))
+    with pytest.raises(McpError):
+        make_output_parser(RunWindbgCmdParams(dump_path="x.dmp", command="lm", structured=True, head=5))
@@ -0,0 +1,245 @@
+import asyncio
+import os
+
+import pytest
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession, CDBTimeoutError
+from mcp_server_windbg.command_classifier import INITIAL_CONTEXT
+from mcp_server_windbg.result_cache import CachedSession, ResultCache
+
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    """Test that stored results come back intact and hits/misses are counted"""
+    cache = ResultCache(str(tmp_path), max_size_mb=1)
+    key = cache.make_key("hash", INITIAL_CONTEXT, "lm")
+    assert cache.get(key) is None
+    cache.put(key, ["start    end", "", "module"])
+    cache.put(cache.make_key("hash", INITIAL_CONTEXT, "~"), [])
+    assert cache.get(key) == ["start    end", "", "module"]
+    assert cache.get(cache.make_key("hash", INITIAL_CONTEXT, "~")) == []
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (2, 1, 2)
+    cache.close()
+
+    # Results survive reopening the cache
+    reopened = ResultCache(str(tmp_path), max_size_mb=1)
+    assert reopened.get(key) == ["start    end", "", "module"]
+
+
+def test_cache_lru_eviction(tmp_path):
+    """Test that the least recently used results are evicted when over the size limit"""
+    cache = ResultCache(str(tmp_path), max_size_mb=1)
+    # Random data does not compress, so each entry takes ~400 KB of the 1 MB budget
+    for n in range(3):
+        cache.put(f"key{n}", [os.urandom(100).hex() for _ in range(4000)])
+        if n == 1:
+            assert cache.get("key0") is not None
+    assert cache.get("key0") is not None
+    assert cache.get("key1") is None
+    assert cache.get("key2") is not None
+    assert cache.stats()["evictions"] >= 1
+    assert cache.stats()["size_bytes"] <= cache.max_bytes
+
+
+def test_cache_stats_do_not_wait_for_writes(tmp_path):
+    """Test that stats() is answered while a write holds the lock and counts entries correctly"""
+    cache = ResultCache(str(tmp_path), max_size_mb=1)
+    for n in range(3):
+        cache.put(f"key{n}", [os.urandom(100).hex() for _ in range(4000)])
+    cache.put("key2", ["replaced"])
+    count = cache._conn.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+    with cache._lock:
+        stats = cache.stats()
+    assert stats["entries"] == count == 2 and stats["evictions"] == 1
+    cache.close()
+    assert ResultCache(str(tmp_path), max_size_mb=1).stats()["entries"] == 2
+
+
+def test_cached_session_skips_cdb_on_reopen(tmp_path, fake_cdb_path, fake_dump_path):
+    """A reopened dump is answered from the cache without starting cdb"""
+    cache = ResultCache(str(tmp_path / "cache"))
+    started = []
+
+    async def start():
+        session = await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+        started.append(session)
+        return session
+
+    async def scenario():
+        first = CachedSession(fake_dump_path, start, cache)
+        try:
+            expected = await first.send_batch(["lines 3", "version", "~1s", "lines 2"])
+        finally:
+            await first.shutdown()
+
+        second = CachedSession(fake_dump_path, start, cache)
+        assert await second.send_batch(["lines 3", "version"]) == expected[:2]
+        assert second.session is None
+
+        # After a thread switch the context differs, so cdb has to run
+        try:
+            assert await second.send_batch(["~1s", "lines 2"]) == expected[2:]
+            assert second.session is not None
+        finally:
+            await second.shutdown()
+
+    asyncio.run(scenario())
+    assert len(started) == 2
+
+
+def test_identical_concurrent_commands_run_once(tmp_path, fake_cdb_path, fake_dump_path):
+    """Test that a burst of identical commands shares one execution"""
+    from mcp_server_windbg import metrics
+
+    collapsed = metrics.COMMANDS_COLLAPSED.value(metrics.verb_label("sleep 0.3"))
+    executed = metrics.COMMAND_SECONDS.count(metrics.verb_label("sleep 0.3"))
+
+    async def scenario():
+        session = CachedSession(
+            fake_dump_path,
+            lambda: AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10),
+            cache=None
+        )
+        try:
+            await session.send_command("version")
+            chunks = []
+
+            async def record(lines):
+                chunks.append(lines)
+
+            start = asyncio.get_running_loop().time()
+            outputs = await asyncio.gather(
+                *(session.send_command("sleep 0.3") for _ in range(7)),
+                session.send_command("sleep 0.3", on_output=record),
+                session.send_batch(["version", "sleep 0.3"]),
+            )
+            elapsed = asyncio.get_running_loop().time() - start
+            # A different context is a different command
+            await session.send_command("~1s")
+            other = session.send_command("sleep 0.3")
+            return outputs, chunks, elapsed, await other
+        finally:
+            await session.shutdown()
+
+    outputs, chunks, elapsed, other = asyncio.run(scenario())
+    slept = outputs[0]
+    assert len(slept) == 1 and slept[0].endswith("slept")
+    assert all(output == slept for output in outputs[1:8])
+    assert outputs[8][1] == slept
+    assert chunks == [slept]
+    assert elapsed < 0.9
+    assert other[0].endswith("slept")
+    assert metrics.COMMAND_SECONDS.count(metrics.verb_label("sleep 0.3")) == executed + 2
+    assert metrics.COMMANDS_COLLAPSED.value(metrics.verb_label("sleep 0.3")) == collapsed + 8
+
+
+def test_followers_rerun_when_the_leader_stops_early(tmp_path, fake_cdb_path, fake_dump_path):
+    """Test that output cut short by the leader's own reader is not shared"""
+    async def scenario():
+        session = CachedSession(
+            fake_dump_path,
+            lambda: AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10),
+            cache=None
+        )
+        try:
+            async def first_chunk(lines):
+                return True
+
+            return await asyncio.gather(
+                session.send_command("trickle 5 0.05", on_output=first_chunk),
+                session.send_command("trickle 5 0.05"),
+            )
+        finally:
+            await session.shutdown()
+
+    stopped, complete = asyncio.run(scenario())
+    assert len(stopped) < 5
+    assert [line[-6:] for line in complete] == [f"line {i}" for i in range(5)]
+
+
+def test_batch_timeout_keeps_cached_and_completed_results(tmp_path, fake_cdb_path, fake_dump_path):
+    """A batch that times out returns cached and completed outputs up to the command that timed out"""
+    from mcp_server_windbg.server import run_batch
+
+    async def start():
+        return await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=1)
+
+    async def scenario():
+        cache = ResultCache(str(tmp_path / "cache"))
+        session = CachedSession(fake_dump_path, start, cache)
+        try:
+            cached = await session.send_command("lines 1")
+            outputs, timeout_message = await run_batch(session, ["lines 1", "lines 2", "sleep 30", "version"])
+            assert outputs[0] == cached
+            assert [line[-6:] for line in outputs[1]] == ["line 0", "line 1"]
+            assert outputs[2] == [] and len(outputs) == 3
+            assert "sleep 30" in timeout_message
+        finally:
+            await session.shutdown()
+            cache.close()
+
+    asyncio.run(scenario())
+
+
+def test_cache_io_runs_off_the_event_loop(tmp_path, fake_cdb_path, fake_dump_path):
+    """Cache lookups and stores run in worker threads, one call per batch"""
+    import threading
+
+    cache = ResultCache(str(tmp_path / "cache"))
+    calls = []
+    for name in ("get_many", "put_many"):
+        method = getattr(cache, name)
+
+        def record(arg, name=name, method=method):
+            calls.append((name, threading.current_thread() is threading.main_thread(), len(arg)))
+            return method(arg)
+        setattr(cache, name, record)
+
+    async def start():
+        return await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+
+    async def scenario():
+        session = CachedSession(fake_dump_path, start, cache)
+        try:
+            first = await session.send_batch(["lines 2", "version", "lines 1"])
+            assert await session.send_batch(["lines 2", "version", "lines 1"]) == first
+        finally:
+            await session.shutdown()
+
+    asyncio.run(scenario())
+    cache.close()
+    assert calls == [("get_many", False, 3), ("put_many", False, 3), ("get_many", False, 3)]
+    assert (cache.hits, cache.misses, cache.stores) == (3, 3, 3)
+
+
+def test_cached_session_reads_the_tracked_context(tmp_path, fake_cdb_path, fake_dump_path):
+    """The cache keys use the context the cdb session tracks, also after a timeout and a restart"""
+    async def start():
+        return await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+
+    async def scenario():
+        cache = ResultCache(str(tmp_path / "cache"))
+        session = CachedSession(fake_dump_path, start, cache)
+        try:
+            await session.send_batch(["~2s", "lines 1"])
+            assert session.context == session.session.context
+            assert session.context[1] == "2"
+
+            # An interrupted pure command leaves the context known
+            with pytest.raises(CDBTimeoutError):
+                await session.send_command("sleep 30", timeout=0.3)
+            assert session.context == session.session.context
+            hits = cache.hits
+            await session.send_command("lines 1")
+            assert cache.hits == hits + 1
+
+            # Once cdb is stopped, the context is the one the replay restores
+            await session.shutdown()
+            assert session.context[1] == "2"
+            await session.send_command("lines 1")
+            assert session.session is None and cache.hits == hits + 2
+        finally:
+            await session.shutdown()
+            cache.close()
+
+    asyncio.run(scenario())
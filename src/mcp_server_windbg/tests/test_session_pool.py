@@ -0,0 +1,221 @@
+import asyncio
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession
+from mcp_server_windbg.parsers import parser_for
+from mcp_server_windbg.result_cache import CachedSession
+from mcp_server_windbg.session_pool import SessionPool
+
+
+def add_session(pool, key, fake_cdb_path, fake_dump_path):
+    async def start():
+        return await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+    session = CachedSession(fake_dump_path, pool.track_starts(key, start))
+    pool.add(key, session)
+    return session
+
+
+def test_pool_lru_eviction_and_reopen(fake_cdb_path, fake_dump_path):
+    """Starting a session beyond the limit stops the least recently used one"""
+    async def scenario():
+        pool = SessionPool(max_sessions=2)
+        try:
+            sessions = [add_session(pool, f"dump{n}", fake_cdb_path, fake_dump_path) for n in range(3)]
+            for n, session in enumerate(sessions):
+                pool.get(f"dump{n}")
+                await session.send_command("version")
+            assert pool.live_count() == 2
+            assert not sessions[0].is_live
+            assert pool.stats()["lru_evictions"] == 1
+
+            # The evicted dump stays open and restarts cdb on demand
+            pool.get("dump0")
+            assert await sessions[0].send_command("lines 1")
+            stats = pool.stats()
+            assert (stats["live_sessions"], stats["spawns"], stats["reopens"]) == (2, 4, 1)
+            assert not sessions[1].is_live
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
+
+
+def test_pool_bounds_concurrent_starts(fake_cdb_path, fake_dump_path):
+    """Dumps opened at the same time count their starting cdb towards max_sessions"""
+    async def scenario():
+        pool = SessionPool(max_sessions=2)
+        most_live = 0
+
+        async def watch():
+            nonlocal most_live
+            while True:
+                most_live = max(most_live, pool.live_count())
+                await asyncio.sleep(0.005)
+        try:
+            sessions = [add_session(pool, f"dump{n}", fake_cdb_path, fake_dump_path) for n in range(5)]
+            watcher = asyncio.create_task(watch())
+            outputs = await asyncio.gather(*(session.send_command("lines 1") for session in sessions))
+            watcher.cancel()
+            assert all(output[-1].endswith("line 0") for output in outputs)
+            assert most_live <= 2 and pool.live_count() <= 2
+            assert pool.stats()["spawns"] == 5 and pool.stats()["lru_evictions"] == 3
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
+
+
+def test_pool_restores_context_after_eviction(fake_cdb_path, fake_dump_path):
+    """Context-changing commands are replayed when cdb is restarted"""
+    async def scenario():
+        pool = SessionPool(max_sessions=1)
+        try:
+            first = add_session(pool, "first", fake_cdb_path, fake_dump_path)
+            second = add_session(pool, "second", fake_cdb_path, fake_dump_path)
+            await first.send_command("~2s")
+            await second.send_command("version")
+            assert not first.is_live
+            output = await first.send_command("lines 1")
+            assert output[0].startswith("0:002>")
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
+
+
+def test_pool_replays_only_the_context_left_at_eviction(fake_cdb_path, fake_dump_path):
+    """A context left again before eviction is not replayed, nor are earlier switches"""
+    from mcp_server_windbg.command_classifier import INITIAL_CONTEXT
+
+    async def scenario():
+        pool = SessionPool(max_sessions=1)
+        try:
+            first = add_session(pool, "first", fake_cdb_path, fake_dump_path)
+            second = add_session(pool, "second", fake_cdb_path, fake_dump_path)
+            await first.send_batch([".lastevent", ".ecxr", "kb", ".cxr"])
+            await second.send_command("version")
+            assert not first.is_live and first.context == INITIAL_CONTEXT
+            await first.send_command("lines 1")
+            assert first.session.context == INITIAL_CONTEXT
+
+            await first.send_batch(["~1s", ".frame 2", ".reload /f", "~2s", "~3s", ".ecxr", ".frame 1"])
+            stopped = first.context
+            await second.send_command("version")
+            assert first._replay == ["~1s", ".frame 2", ".reload /f", "~3s", ".ecxr", ".frame 1"]
+            assert first.context == stopped
+            output = await first.send_command("lines 1")
+            assert output[0].startswith("0:003>") and first.session.context == stopped
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
+
+
+def test_pool_reaps_idle_and_oversized_sessions(fake_cdb_path, fake_dump_path):
+    """The reaper stops idle processes and recycles processes over the memory limit"""
+    async def scenario():
+        pool = SessionPool(max_sessions=4, idle_timeout=0.2, max_session_memory_mb=1)
+        try:
+            idle = add_session(pool, "idle", fake_cdb_path, fake_dump_path)
+            await idle.send_command("version")
+            await asyncio.sleep(0.3)
+            recent = add_session(pool, "recent", fake_cdb_path, fake_dump_path)
+            await recent.send_command("version")
+            await pool.reap()
+            assert not idle.is_live and not recent.is_live
+            stats = pool.stats()
+            assert (stats["idle_reaps"], stats["memory_recycles"]) == (1, 1)
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
+
+
+def add_replicated_session(pool, key, fake_cdb_path, fake_dump_path):
+    async def start():
+        return await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+    session = CachedSession(fake_dump_path, pool.track_starts(key, start), replicas=pool.replica_set(start))
+    pool.add(key, session)
+    return session
+
+
+async def warm_replicas(session, count):
+    """Keep the session's cdb busy until count replicas have been started"""
+    busy = asyncio.create_task(session.send_command("sleep 0.2"))
+    while len(session.replicas) < count:
+        session.replicas.grow()
+        await asyncio.sleep(0.05)
+    await busy
+
+
+def test_replicas_run_read_only_commands_in_parallel(fake_cdb_path, fake_dump_path):
+    """Read-only commands arriving while cdb is busy run on replicas, which count towards max_sessions"""
+    async def scenario():
+        pool = SessionPool(max_sessions=3, max_replicas=4, replica_idle_timeout=0.2)
+        try:
+            session = add_replicated_session(pool, "hot", fake_cdb_path, fake_dump_path)
+            await session.send_command("version")
+            await warm_replicas(session, 2)
+            assert pool.process_count() == 3
+            session.replicas.grow()
+            assert len(session.replicas) == 2
+
+            started = asyncio.get_running_loop().time()
+            outputs = await asyncio.gather(*(session.send_command(f"sleep 0.{n}5") for n in range(4, 7)))
+            elapsed = asyncio.get_running_loop().time() - started
+            assert all(output[-1].endswith("slept") for output in outputs)
+            assert elapsed < 1.2
+            assert session.replicas.commands >= 2
+            assert pool.stats()["replicas"] == 2
+
+            await asyncio.sleep(0.3)
+            await pool.reap()
+            assert len(session.replicas) == 0 and session.is_live
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
+
+
+def test_replicas_keep_context_dependent_commands_on_session(fake_cdb_path, fake_dump_path):
+    """After a thread switch only context-free commands may go to a replica"""
+    async def scenario():
+        pool = SessionPool(max_sessions=4, max_replicas=1)
+        try:
+            session = add_replicated_session(pool, "hot", fake_cdb_path, fake_dump_path)
+            await session.send_command("version")
+            await warm_replicas(session, 1)
+            await session.send_command("~1s")
+
+            busy = asyncio.create_task(session.send_command("sleep 0.3"))
+            await asyncio.sleep(0.05)
+            dependent, free = await asyncio.gather(session.send_command("lines 1"), session.send_command("version"))
+            await busy
+            assert dependent[0].startswith("0:001>")
+            assert free[0].startswith("0:000>")
+
+            # A queued thread switch keeps everything on the session's cdb
+            busy = asyncio.create_task(session.send_command("sleep 0.3"))
+            await asyncio.sleep(0.05)
+            switch = asyncio.create_task(session.send_command("~2s"))
+            await asyncio.sleep(0)
+            output = await session.send_command("version")
+            await asyncio.gather(busy, switch)
+            assert output[0].startswith("0:002>")
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
+
+
+def test_replicas_do_not_answer_thread_list_after_switch(fake_cdb_path, fake_dump_path):
+    """`~` marks the current thread, so it stays on the session's cdb after a switch"""
+    async def scenario():
+        pool = SessionPool(max_sessions=4, max_replicas=1)
+        try:
+            session = add_replicated_session(pool, "hot", fake_cdb_path, fake_dump_path)
+            await session.send_command("version")
+            await warm_replicas(session, 1)
+            await session.send_command("~3s")
+
+            busy = asyncio.create_task(session.send_command("sleep 0.3"))
+            await asyncio.sleep(0.05)
+            output = await session.send_command("~")
+            await busy
+            current = [thread.number for thread in parser_for("~").parse(output) if thread.current]
+            assert current == [3]
+        finally:
+            await pool.close()
+    asyncio.run(scenario())
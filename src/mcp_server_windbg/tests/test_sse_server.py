@@ -0,0 +1,312 @@
+import asyncio
+import json
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from mcp.types import TextContent
+
+from mcp_server_windbg.output_stream import current_output_sink
+from mcp_server_windbg.sse_server import SSEClient, SSEServer, encode_event
+
+
+class StubServer:
+    """Tool handler that sleeps for arguments["sleep"] and records concurrency"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+
+    async def call_tool_handler(self, name, arguments):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(arguments.get("sleep", 0))
+            for chunk in arguments.get("chunks", []):
+                await current_output_sink()([chunk])
+            return [TextContent(type="text", text=f"{name}:{arguments.get('command')}")]
+        finally:
+            self.running -= 1
+
+
+async def next_event(stream):
+    while True:
+        line = await asyncio.wait_for(stream.content.readline(), 5)
+        if line.startswith(b"data: "):
+            return json.loads(line[len(b"data: "):])
+
+
+async def with_client(stub, workers, scenario):
+    app = web.Application()
+    sse = SSEServer(app, stub, workers=workers)
+    async with TestClient(TestServer(app)) as client:
+        try:
+            await scenario(client)
+        finally:
+            await sse.close()
+
+
+async def connect(client):
+    stream = await client.get("/events")
+    event = await next_event(stream)
+    assert event["type"] == "connection"
+    return stream, event["client_id"]
+
+
+def call(request_id, command, sleep=0, client_id=None):
+    request = {
+        "jsonrpc": "2.0",
+        "method": "call_tool",
+        "params": {"name": "run_windbg_cmd", "arguments": {"command": command, "sleep": sleep}},
+        "id": request_id,
+    }
+    if client_id is not None:
+        request["client_id"] = client_id
+    return request
+
+
+def test_encode_event():
+    """Test the SSE wire format"""
+    assert encode_event({"a": 1}) == b'data: {"a": 1}\n\n'
+
+
+def test_responses_go_only_to_the_requesting_client():
+    """Test that a reply is delivered to its client and not to the others"""
+    async def scenario(client):
+        stream_a, id_a = await connect(client)
+        stream_b, id_b = await connect(client)
+
+        response = await client.post("/request", json=call(1, "from-a", client_id=id_a))
+        assert (await response.json())["status"] == "request_accepted"
+        response = await client.post("/request", json=call(2, "from-b"), headers={"X-Client-Id": id_b})
+        assert response.status == 200
+
+        event = await next_event(stream_a)
+        assert (event["id"], event["result"]["content"][0]["text"]) == (1, "run_windbg_cmd:from-a")
+        event = await next_event(stream_b)
+        assert (event["id"], event["result"]["content"][0]["text"]) == (2, "run_windbg_cmd:from-b")
+
+        response = await client.post("/request", json=call(3, "x", client_id="no-such-client"))
+        assert response.status == 404
+
+    asyncio.run(with_client(StubServer(), 2, scenario))
+
+
+def test_output_chunks_are_sent_to_the_requesting_client():
+    """Test that streamed output arrives as chunk events before the response"""
+    async def scenario(client):
+        stream, client_id = await connect(client)
+        request = call(4, "kb", client_id=client_id)
+        request["params"]["arguments"]["chunks"] = ["frame 0", "frame 1"]
+        await client.post("/request", json=request)
+        events = [await next_event(stream) for _ in range(3)]
+        assert [e.get("method") for e in events] == ["chunk", "chunk", None]
+        assert [e["params"] for e in events[:2]] == [
+            {"id": 4, "output": "frame 0"}, {"id": 4, "output": "frame 1"}]
+        assert events[2]["id"] == 4
+
+    asyncio.run(with_client(StubServer(), 2, scenario))
+
+
+def test_requests_without_client_id_are_broadcast():
+    """Test the fallback for clients that do not send a client_id"""
+    async def scenario(client):
+        stream_a, _ = await connect(client)
+        stream_b, _ = await connect(client)
+        await client.post("/request", json=call(5, "legacy"))
+        assert (await next_event(stream_a))["id"] == 5
+        assert (await next_event(stream_b))["id"] == 5
+
+    asyncio.run(with_client(StubServer(), 1, scenario))
+
+
+def test_worker_pool_runs_requests_concurrently():
+    """Test that a quick request is answered while slow ones occupy other workers"""
+    stub = StubServer()
+
+    async def scenario(client):
+        stream, client_id = await connect(client)
+        await client.post("/request", json=call("slow1", "slow", sleep=0.5, client_id=client_id))
+        await client.post("/request", json=call("slow2", "slow", sleep=0.5, client_id=client_id))
+        await client.post("/request", json=call("quick", "quick", client_id=client_id))
+        ids = [(await next_event(stream))["id"] for _ in range(3)]
+        assert ids[0] == "quick"
+        assert sorted(ids[1:]) == ["slow1", "slow2"]
+
+    asyncio.run(with_client(stub, 3, scenario))
+    assert stub.max_running == 3
+
+
+class GatedResponse:
+    """Stream response whose writes block until the gate is opened"""
+
+    def __init__(self):
+        self.gate = asyncio.Event()
+        self.written = []
+
+    async def write(self, data):
+        await self.gate.wait()
+        self.written.append(data)
+
+    async def write_eof(self):
+        pass
+
+
+class FakeRequest:
+    def __init__(self):
+        self.transport = self
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+def test_overflow_policies():
+    """Test drop, coalesce and disconnect when a client's queue is full"""
+    async def scenario():
+        results = {}
+        for policy in ("drop", "coalesce", "disconnect"):
+            response, request = GatedResponse(), FakeRequest()
+            client = SSEClient("c", request, response, max_queue=2, overflow=policy, disconnect_after=None)
+            accepted = [client.enqueue(b"%d" % n) for n in range(4)]
+            assert not client.enqueue(b"hb", heartbeat=True)
+            response.gate.set()
+            await asyncio.sleep(0.05)
+            results[policy] = (accepted, b"".join(response.written), client.stats(), request.aborted)
+            await client.close()
+        return results
+
+    results = asyncio.run(scenario())
+    accepted, written, stats, aborted = results["drop"]
+    assert accepted == [True, True, False, False]
+    assert (written, stats["dropped"], stats["heartbeats_skipped"]) == (b"01", 2, 1)
+    accepted, written, stats, aborted = results["coalesce"]
+    assert accepted == [True] * 4
+    assert (written, stats["coalesced"], stats["sent"]) == (b"0123", 2, 4)
+    accepted, written, stats, aborted = results["disconnect"]
+    assert accepted == [True, True, False, False]
+    assert aborted and written == b""
+
+
+def test_stalled_client_queue_stays_bounded_in_bytes():
+    """Test that coalescing into a stalled client's queue stops at the byte limit"""
+    async def scenario():
+        request, response = FakeRequest(), GatedResponse()
+        client = SSEClient("c", request, response, max_queue=2, disconnect_after=None, max_queue_bytes=4096)
+        accepted = 0
+        for _ in range(1000):
+            if not client.enqueue(b"x" * 100):
+                break
+            accepted += 1
+            assert client.queued_bytes <= 4096
+        return accepted, client.disconnect_reason, request.aborted, client.queued_bytes
+
+    accepted, reason, aborted, queued = asyncio.run(scenario())
+    assert accepted == 40
+    assert (reason, aborted, queued) == ("queue_full", True, 0)
+
+
+def test_coalesced_events_keep_their_own_age():
+    """Test that events merged while the head is written are not aged by the head's enqueue time"""
+    class SteppedResponse(GatedResponse):
+        def __init__(self):
+            super().__init__()
+            self.permits = asyncio.Semaphore(0)
+
+        async def write(self, data):
+            await self.permits.acquire()
+            self.written.append(data)
+
+    async def scenario():
+        response = SteppedResponse()
+        client = SSEClient("c", FakeRequest(), response, max_queue=1, disconnect_after=0.2)
+        assert client.enqueue(b"first")
+        await asyncio.sleep(0.15)
+        # Merged into the slot the writer is blocked on
+        assert client.enqueue(b"second")
+        response.permits.release()
+        while not response.written:
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.1)
+        # The head is now "second", queued 0.1 s ago, so the client is not lagging
+        assert client.enqueue(b"third")
+        assert not client.closed.is_set()
+        return client.stats()["lag_seconds"]
+
+    assert asyncio.run(scenario()) < 0.2
+
+
+def test_lagging_client_is_disconnected():
+    """Test that a client whose oldest queued event is too old gets dropped"""
+    async def scenario():
+        request = FakeRequest()
+        client = SSEClient("c", request, GatedResponse(), max_queue=100, disconnect_after=0.05)
+        assert client.enqueue(b"first")
+        await asyncio.sleep(0.1)
+        assert not client.enqueue(b"second")
+        assert client.closed.is_set() and client.disconnect_reason == "lagging"
+        return request.aborted
+
+    assert asyncio.run(scenario())
+
+
+def test_slow_client_does_not_delay_fast_client():
+    """Load test: a client that never reads must not hold up broadcasts to others"""
+    events = 200
+    blob = "x" * 32 * 1024
+
+    async def run():
+        app = web.Application()
+        sse = SSEServer(app, StubServer(), max_queue=16, overflow="coalesce")
+        async with TestClient(TestServer(app)) as client:
+            try:
+                slow = await client.get("/events")  # never read after this
+                fast, fast_id = await connect(client)
+                start = asyncio.get_running_loop().time()
+                for n in range(events):
+                    await sse.broadcast_event({"n": n, "blob": blob})
+                received = [(await next_event(fast))["n"] for _ in range(events)]
+                elapsed = asyncio.get_running_loop().time() - start
+                stats = sse.stats()
+                slow.close()
+            finally:
+                await sse.close(timeout=0.5)
+        return received, elapsed, stats, fast_id
+
+    received, elapsed, stats, fast_id = asyncio.run(run())
+    assert received == list(range(events))
+    assert elapsed < 5
+    slow_stats = [c for client_id, c in stats["clients"].items() if client_id != fast_id][0]
+    # The slow client's backlog stays bounded; the excess is coalesced
+    assert 0 < slow_stats["queue_depth"] <= 16
+    assert slow_stats["coalesced"] > 0
+
+
+def test_discarded_events_counter_survives_disconnects():
+    """Test that windbg_sse_events_discarded_total keeps the counts of clients that left"""
+    def discarded(sse):
+        family = next(f for f in sse.collect_metrics() if f.name == "windbg_sse_events_discarded_total")
+        return dict((labels["policy"], value) for labels, value in family.samples)
+
+    async def scenario(client, sse):
+        stream, client_id = await connect(client)
+        sse.clients[client_id].dropped = 3
+        sse.clients[client_id].coalesced = 5
+        assert discarded(sse) == {"drop": 3, "coalesce": 5}
+        stream.close()
+        for _ in range(100):
+            if client_id not in sse.clients:
+                break
+            await asyncio.sleep(0.01)
+        assert client_id not in sse.clients
+        assert discarded(sse) == {"drop": 3, "coalesce": 5}
+
+    async def run():
+        app = web.Application()
+        sse = SSEServer(app, StubServer())
+        async with TestClient(TestServer(app)) as client:
+            try:
+                await scenario(client, sse)
+            finally:
+                await sse.close()
+
+    asyncio.run(run())
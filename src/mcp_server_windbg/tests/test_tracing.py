@@ -0,0 +1,107 @@
+import asyncio
+import time
+
+import pytest
+
+from mcp_server_windbg import tracing
+from mcp_server_windbg.cdb_session import AsyncCDBSession
+
+
+@pytest.fixture
+def trace_path(tmp_path):
+    path = str(tmp_path / "trace.json")
+    yield path
+    tracing.configure_tracing(None)
+
+
+def spans(events):
+    return [event for event in events if event["ph"] == "X"]
+
+
+def test_disabled_tracing_is_a_no_op(trace_path):
+    """Test that spans cost nothing and write nothing when tracing is off"""
+    tracing.configure_tracing(None)
+    assert not tracing.tracing_enabled()
+    assert tracing.span("call_tool") is tracing.span("other")
+    with tracing.span("call_tool") as current:
+        current.set(ignored=True)
+
+
+def test_nested_spans_share_the_request_row(trace_path):
+    """Test that nested spans join their request and concurrent requests get their own row"""
+    tracing.configure_tracing(trace_path)
+
+    @tracing.traced("inner")
+    async def inner():
+        await asyncio.sleep(0.01)
+
+    async def request(tool):
+        with tracing.span("call_tool", tool=tool):
+            await inner()
+            await asyncio.to_thread(tracing.traced("in_thread")(time.sleep), 0.01)
+
+    async def scenario():
+        await asyncio.gather(request("a"), request("b"))
+
+    asyncio.run(scenario())
+    with pytest.raises(RuntimeError):
+        with tracing.span("failing"):
+            raise RuntimeError("boom")
+    tracing.configure_tracing(None)
+
+    with open(trace_path, encoding="utf-8") as f:
+        assert f.readline() == "[\n"
+    events = tracing.read_trace(trace_path)
+    roots = {event["args"]["tool"]: event for event in spans(events) if event["name"] == "call_tool"}
+    assert set(roots) == {"a", "b"} and roots["a"]["tid"] != roots["b"]["tid"]
+    for root in roots.values():
+        children = [event for event in spans(events) if event["tid"] == root["tid"] and event is not root]
+        assert sorted(event["name"] for event in children) == ["in_thread", "inner"]
+        for child in children:
+            assert root["ts"] <= child["ts"] and child["ts"] + child["dur"] <= root["ts"] + root["dur"] + 1
+    names = [event["args"]["name"] for event in events if event["ph"] == "M"]
+    assert any(name.endswith("call_tool a") for name in names)
+    failing = [event for event in spans(events) if event["name"] == "failing"]
+    assert failing[0]["args"] == {"error": "RuntimeError"}
+
+
+def test_cdb_session_spans(trace_path, fake_cdb_path, fake_dump_path):
+    """Test that cdb start-up and each command appear as spans of the request"""
+    tracing.configure_tracing(trace_path)
+
+    async def scenario():
+        with tracing.span("call_tool", tool="run_windbg_cmd"):
+            async with AsyncCDBSession(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=20) as session:
+                await session.send_command("lines 10")
+                await session.send_batch(["version", "kb"])
+
+    asyncio.run(scenario())
+    tracing.configure_tracing(None)
+
+    events = spans(tracing.read_trace(trace_path))
+    assert len({event["tid"] for event in events}) == 1
+    names = [event["name"] for event in events]
+    for name in ("cdb_start", "wait_for_prompt", "send_command", "send_batch", "call_tool"):
+        assert name in names
+    commands = [event["args"]["command"] for event in events if event["name"] == "send_command"]
+    assert "lines 10" in commands
+
+
+def test_profiler_reports_stacks(trace_path):
+    """Test that a profiled request gets a cpu_profile event with its busy stacks"""
+    tracing.configure_tracing(trace_path, profile=True, profile_interval=0.001)
+
+    def busy():
+        deadline = time.perf_counter() + 0.2
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+
+    with tracing.span("call_tool", tool="busy"):
+        busy()
+    tracing.configure_tracing(None)
+
+    profiles = [event for event in tracing.read_trace(trace_path) if event["name"] == "cpu_profile"]
+    assert len(profiles) == 1
+    profile = profiles[0]["args"]
+    assert profile["samples"] > 0
+    assert any("test_tracing.py:busy" in stack for stack in profile["stacks"])
@@ -0,0 +1,93 @@
+import io
+import json
+import os
+
+from mcp_server_windbg.cli import triage_main
+from mcp_server_windbg.triage import TriageManifest, find_dumps, run_triage
+
+
+def make_dumps(directory, count):
+    paths = []
+    for n in range(count):
+        path = directory / f"crash{n}.dmp"
+        path.write_bytes(b"MDMP" + bytes([n]))
+        paths.append(str(path))
+    (directory / "notes.txt").write_text("not a dump")
+    return paths
+
+
+def test_find_dumps(tmp_path):
+    """Test that only *.*dmp files are found, recursing on request"""
+    dumps = make_dumps(tmp_path, 2)
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "app.mdmp").write_bytes(b"MDMP")
+    assert find_dumps(str(tmp_path)) == dumps
+    assert find_dumps(str(tmp_path), recursive=True) == sorted(dumps + [str(tmp_path / "sub" / "app.mdmp")])
+
+
+def test_run_triage_incremental(tmp_path, fake_cdb_path):
+    """Test parallel triage output and that unchanged dumps are skipped on re-runs"""
+    dump_dir = tmp_path / "dumps"
+    dump_dir.mkdir()
+    dumps = make_dumps(dump_dir, 3)
+    manifest_path = str(tmp_path / "manifest.json")
+
+    output = io.StringIO()
+    summary = run_triage(
+        dumps, ["version", "~1s"], output, manifest=TriageManifest(manifest_path), jobs=2, cdb_path=fake_cdb_path
+    )
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert (summary["processed"], summary["skipped"], summary["failed"]) == (3, 0, 0)
+    assert summary["dumps_per_minute"] > 0
+    assert sorted(r["dump_path"] for r in records) == [os.path.abspath(d) for d in dumps]
+    for record in records:
+        assert record["error"] is None
+        assert [entry["command"] for entry in record["commands"]] == ["version", "~1s"]
+        assert "Microsoft (R) Windows Debugger" in record["commands"][0]["output"]
+        assert record["size"] == 5
+
+    # Only the modified dump is triaged again
+    with open(dumps[1], "ab") as f:
+        f.write(b"more")
+    output = io.StringIO()
+    summary = run_triage(dumps, ["version"], output, manifest=TriageManifest(manifest_path), jobs=2, cdb_path=fake_cdb_path)
+    assert (summary["processed"], summary["skipped"]) == (1, 2)
+    assert json.loads(output.getvalue())["dump_path"] == os.path.abspath(dumps[1])
+
+
+def test_repeated_profile_commands_keep_each_output(tmp_path, fake_cdb_path):
+    """Test that a command repeated in a profile keeps the output of every run"""
+    dumps = make_dumps(tmp_path, 1)
+    output = io.StringIO()
+    run_triage(dumps, ["lines 1", "~2s", "lines 1"], output, cdb_path=fake_cdb_path)
+    commands = json.loads(output.getvalue())["commands"]
+    assert [entry["command"] for entry in commands] == ["lines 1", "~2s", "lines 1"]
+    assert commands[0]["output"].startswith("0:000>") and commands[2]["output"].startswith("0:002>")
+
+
+def test_manifest_is_saved_periodically_and_at_the_end(tmp_path):
+    """Test that the manifest is not rewritten for every dump but nothing is lost"""
+    dumps = make_dumps(tmp_path, 5)
+    manifest_path = str(tmp_path / "manifest.json")
+    manifest = TriageManifest(manifest_path, save_every=2, save_interval=3600)
+    for dump in dumps:
+        manifest.mark_done(dump, os.stat(dump))
+    assert len(TriageManifest(manifest_path).entries) == 4
+    manifest.flush()
+    assert len(TriageManifest(manifest_path).entries) == 5
+
+
+def test_triage_cli_records_failures(tmp_path, capsys):
+    """Test the triage subcommand writes JSONL and does not mark failed dumps as done"""
+    make_dumps(tmp_path, 2)
+    output_path = tmp_path / "triage.jsonl"
+    exit_code = triage_main([
+        str(tmp_path), "--jobs", "2", "--output", str(output_path),
+        "--cdb-path", str(tmp_path / "missing-cdb.exe"),
+    ])
+    assert exit_code == 1
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert len(records) == 2
+    assert all(r["error"] for r in records)
+    assert TriageManifest(str(tmp_path / ".mcp-windbg-triage.json")).entries == {}
+    assert "2 failed" in capsys.readouterr().err
@@ -0,0 +1,83 @@
+import asyncio
+
+from mcp_server_windbg.cdb_session import AsyncCDBSession
+from mcp_server_windbg.parsers import parser_for
+from mcp_server_windbg.result_cache import CachedSession, ResultCache
+from mcp_server_windbg.unique_stacks import StackGrouper, format_unique_stacks
+
+HEADER = " # Child-SP          RetAddr               : Args to Child                                                           : Call Site"
+WAIT = [
+    "00 000000c4`5e8ff5a8 00007ffb`1a2b3c4d     : 00000000`00000000 00000000`00000000 : ntdll!NtWaitForSingleObject+0x14",
+    "01 000000c4`5e8ff5b0 00007ffb`19e71234     : 00000000`00000000 00000000`00000000 : KERNELBASE!WaitForSingleObjectEx+0x8e",
+    "02 000000c4`5e8ff650 00007ff6`a0001500     : 00000000`00000000 00000000`00000000 : DemoCrash1!Worker::Run+0x40",
+]
+CRASH = [
+    "00 000000c4`5e8ff6e0 00007ff6`a0001299     : 00000000`00000001 00000000`00000000 : DemoCrash1!Widget::Crash+0x1a",
+    "01 000000c4`5e8ff720 00007ff6`a00012f0     : 00000000`00000000 00000000`00000000 : DemoCrash1!main+0x30",
+]
+
+
+def thread_stacks_output(count):
+    """~*kb output: thread 1 crashed, every other thread waits in the same place"""
+    lines = []
+    for number in range(count):
+        marker = "#" if number == 1 else "." if number == 0 else " "
+        lines.append("")
+        lines.append(f"{marker}{number:3d}  Id: 1b90.{0x1000 + number:x} Suspend: 1 Teb: 000000c4`5e6f2000 Unfrozen")
+        lines.append(HEADER)
+        lines.extend(CRASH if number == 1 else WAIT)
+    return lines
+
+
+def test_thread_stacks_parser_and_grouping():
+    """Test that ~*kb output is split per thread, in chunks too, and grouped by identical stack"""
+    lines = ["0:000> "] + thread_stacks_output(20)
+    stacks = list(parser_for("~*kb 30").parse(lines))
+    assert [stack.thread.number for stack in stacks] == list(range(20))
+    # "  10  Id: ..." is a thread line, not frame 0x10
+    assert [frame.function for frame in stacks[10].frames] == ["NtWaitForSingleObject", "WaitForSingleObjectEx", "Worker::Run"]
+    assert stacks[1].thread.event and stacks[0].thread.current
+    assert stacks[1].to_dict()["thread"]["thread_id"] == "0x1001"
+
+    parser, grouper = parser_for("~*kb"), StackGrouper()
+    for start in range(0, len(lines), 7):
+        for stack in parser.feed(lines[start:start + 7]):
+            grouper.add(stack)
+    for stack in parser.finish():
+        grouper.add(stack)
+    groups = grouper.groups()
+    assert grouper.thread_count == 20
+    assert [group.count for group in groups] == [19, 1]
+    assert groups[1].stack == stacks[1]
+
+    summary = format_unique_stacks("~*kb", grouper, max_threads_listed=3)
+    assert summary.splitlines()[0] == "2 unique stack(s) across 20 thread(s) (~*kb)"
+    assert "1. 19 thread(s): .0 (1000), 2 (1002), 3 (1003) and 16 more" in summary
+    assert "2. 1 thread(s): #1 (1001)\n  DemoCrash1!Widget::Crash+0x1a\n  DemoCrash1!main+0x30" in summary
+
+
+def test_find_unique_stacks(tmp_path, fake_cdb_path, fake_dump_path):
+    """Test that the tool takes all stacks from one ~*kb, streamed or cached"""
+    from mcp_server_windbg.server import UniqueWindbgStacksParams, find_unique_stacks
+
+    with open(fake_dump_path + ".threads", "w") as f:
+        f.write("\n".join(thread_stacks_output(500)) + "\n")
+
+    async def scenario():
+        async def start():
+            return await AsyncCDBSession.create(dump_path=fake_dump_path, cdb_path=fake_cdb_path, timeout=10)
+        cache = ResultCache(str(tmp_path / "cache"))
+        session = CachedSession(fake_dump_path, start, cache=cache)
+        args = UniqueWindbgStacksParams(dump_path=fake_dump_path)
+        try:
+            results = [await find_unique_stacks(session, args) for _ in range(2)]
+        finally:
+            await session.shutdown()
+            cache.close()
+        assert cache.misses == 1 and cache.hits == 1
+        return results
+
+    streamed, cached = asyncio.run(scenario())
+    assert streamed == cached
+    assert streamed.startswith("2 unique stack(s) across 500 thread(s) (~*kb 30)")
+    assert "1. 499 thread(s):" in streamed and "and 491 more" in streamed
@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import websockets
+from mcp.types import TextContent, Tool
+
+from mcp_server_windbg.output_stream import current_output_sink
+from mcp_server_windbg.websocket_server import websocket_handler
+
+
+class StubServer:
+    """Tool handlers that record execution order; 'sleep' waits before answering"""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.order = []
+
+    async def list_tools_handler(self):
+        return [Tool(name="run_windbg_cmd", description="", inputSchema={"type": "object"})]
+
+    async def call_tool_handler(self, name, arguments):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(arguments.get("sleep", 0))
+            for chunk in arguments.get("chunks", []):
+                await current_output_sink()([chunk])
+            self.order.append((arguments.get("dump_path"), arguments["command"]))
+            return [TextContent(type="text", text=arguments["command"])]
+        finally:
+            self.running -= 1
+
+
+async def with_server(stub, max_concurrent, scenario):
+    async def handler(connection):
+        await websocket_handler(connection, server_instance=stub, max_concurrent=max_concurrent)
+
+    async with websockets.serve(handler, "127.0.0.1", 0) as server:
+        port = next(iter(server.sockets)).getsockname()[1]
+        async with websockets.connect(f"ws://127.0.0.1:{port}") as client:
+            await scenario(client)
+
+
+def call(request_id, dump_path, command, sleep=0):
+    return json.dumps({
+        "id": request_id,
+        "type": "call_tool",
+        "name": "run_windbg_cmd",
+        "arguments": {"dump_path": dump_path, "command": command, "sleep": sleep},
+    })
+
+
+def test_quick_request_overtakes_slow_call():
+    """Test that list_tools is answered while a slow call is running, with ids"""
+    async def scenario(client):
+        await client.send(call(1, "a.dmp", "slow", sleep=0.5))
+        await client.send(json.dumps({"id": 2, "type": "list_tools"}))
+        first = json.loads(await client.recv())
+        second = json.loads(await client.recv())
+        assert (first["id"], first["type"]) == (2, "tools")
+        assert (second["id"], second["result"][0]["text"]) == (1, "slow")
+
+    asyncio.run(with_server(StubServer(), 8, scenario))
+
+
+def test_per_dump_ordering_and_concurrency_limit():
+    """Test that commands on one dump stay in order while different dumps overlap"""
+    stub = StubServer()
+
+    async def scenario(client):
+        await client.send(call("a1", "a.dmp", "first", sleep=0.2))
+        await client.send(call("a2", "a.dmp", "second"))
+        for n in range(4):
+            await client.send(call(f"b{n}", f"b{n}.dmp", "other", sleep=0.1))
+        responses = [json.loads(await client.recv()) for _ in range(6)]
+        assert {r["id"] for r in responses} == {"a1", "a2", "b0", "b1", "b2", "b3"}
+
+    asyncio.run(with_server(stub, 3, scenario))
+    a_commands = [command for dump, command in stub.order if dump == "a.dmp"]
+    assert a_commands == ["first", "second"]
+    assert 1 < stub.max_running <= 3
+
+
+def test_invalid_message_gets_error_response():
+    """Test that malformed messages produce an error without closing the connection"""
+    async def scenario(client):
+        await client.send("not json")
+        assert json.loads(await client.recv())["type"] == "error"
+        await client.send(json.dumps({"id": 7, "type": "bogus"}))
+        response = json.loads(await client.recv())
+        assert (response["id"], response["type"]) == (7, "error")
+
+    asyncio.run(with_server(StubServer(), 8, scenario))
+
+
+def test_output_chunks_are_sent_before_the_result():
+    """Test that streamed output arrives as chunk messages tagged with the request id"""
+    async def scenario(client):
+        await client.send(json.dumps({
+            "id": 9,
+            "type": "call_tool",
+            "name": "run_windbg_cmd",
+            "arguments": {"dump_path": "a.dmp", "command": "kb", "chunks": ["frame 0", "frame 1"]},
+        }))
+        messages = [json.loads(await client.recv()) for _ in range(3)]
+        assert [(m["type"], m["id"]) for m in messages] == [("chunk", 9), ("chunk", 9), ("result", 9)]
+        assert [m["output"] for m in messages[:2]] == ["frame 0", "frame 1"]
+
+    asyncio.run(with_server(StubServer(), 8, scenario))
@@ -0,0 +1,318 @@
+"""
+Opt-in per-request tracing with spans written to a trace file.
+
+Spans are timed sections of a request (tool call, session lookup, cdb
+start-up, each cdb command, response serialization). A span opened while no
+other span is active starts a new request; nested spans belong to it through
+a context variable, so concurrent requests on one event loop stay apart and
+spans in threads started with asyncio.to_thread join their request.
+
+The trace file is written one event per line in the Chrome trace event
+format (JSON array format, the closing bracket being optional), so it opens
+directly in chrome://tracing or https://ui.perfetto.dev and each line after
+the first is one event followed by a comma. Each request is shown as its own
+row.
+
+With profiling enabled, a sampling profiler records the Python stacks of all
+threads every few milliseconds while a request is active. Each request then
+gets a "cpu_profile" event with the folded stacks seen during it (flame graph
+input). Idle waits (event loop select, thread waits, blocking pipe reads) are
+left out. With concurrent requests, a sample counts for every request active
+at that moment.
+
+When tracing is off, span() returns a shared no-op context manager.
+"""
+
+import atexit
+import collections
+import contextlib
+import functools
+import inspect
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Counter, Deque, Dict, List, Optional, Tuple, TypeVar
+
+# Seconds between two profiler samples
+DEFAULT_PROFILE_INTERVAL = 0.005
+
+# Samples kept for requests still running; older ones are dropped
+MAX_PROFILE_SAMPLES = 200_000
+
+# Innermost functions of threads that are waiting rather than running
+IDLE_FUNCTIONS = frozenset({"select", "poll", "wait", "_worker", "_read_output", "accept", "sleep"})
+
+# Stack frames kept per sample, innermost first
+MAX_STACK_DEPTH = 64
+
+# Folded stacks reported per request
+MAX_PROFILE_STACKS = 200
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class SamplingProfiler:
+    """Background thread sampling all thread stacks while requests are active"""
+
+    def __init__(self, interval: float = DEFAULT_PROFILE_INTERVAL):
+        self.interval = interval
+        # (time, folded stacks of the threads running at that time)
+        self._samples: Deque[Tuple[int, Tuple[str, ...]]] = collections.deque(maxlen=MAX_PROFILE_SAMPLES)
+        self._active = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+
+    def request_started(self) -> int:
+        """Note a request start; returns the start time to pass to request_finished()"""
+        with self._lock:
+            self._active += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-profiler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return time.perf_counter_ns()
+
+    def request_finished(self, started: int) -> Tuple[int, Counter[str]]:
+        """
+        Note a request end.
+
+        Returns:
+            The number of samples taken since started and the count of each
+            folded stack among them
+        """
+        stacks: Counter[str] = collections.Counter()
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._wakeup.clear()
+            samples = list(self._samples)
+            if self._active == 0:
+                self._samples.clear()
+        total = 0
+        for when, running in samples:
+            if when >= started:
+                total += 1
+                stacks.update(running)
+        return total, stacks
+
+    def stop(self):
+        self._stopped = True
+        self._wakeup.set()
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stopped:
+            self._wakeup.wait()
+            now = time.perf_counter_ns()
+            stacks = (fold_stack(frame) for thread_id, frame in sys._current_frames().items() if thread_id != own)
+            running = tuple(stack for stack in stacks if stack)
+            with self._lock:
+                if self._active:
+                    self._samples.append((now, running))
+            time.sleep(self.interval)
+
+
+def fold_stack(frame) -> str:
+    """A thread's stack as "outer;...;inner" function names, or "" if the thread is idle"""
+    if frame.f_code.co_name in IDLE_FUNCTIONS:
+        return ""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class Tracer:
+    """Writes the spans of all requests to one trace file"""
+
+    def __init__(self, path: str, profile: bool = False, profile_interval: float = DEFAULT_PROFILE_INTERVAL):
+        """
+        Args:
+            path: Trace file; events are appended to an existing file
+            profile: Whether to sample stacks during each request
+            profile_interval: Seconds between two profiler samples
+        """
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, "a", encoding="utf-8")
+        if new_file:
+            self._file.write("[\n")
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+        self.pid = os.getpid()
+        self.profiler = SamplingProfiler(profile_interval) if profile else None
+        # Wall-clock origin for event timestamps, advanced with the monotonic clock
+        self._origin_us = time.time_ns() / 1000
+        self._origin_ns = time.perf_counter_ns()
+
+    def timestamp(self, perf_ns: int) -> float:
+        """Microsecond timestamp of a perf_counter_ns() value"""
+        return self._origin_us + (perf_ns - self._origin_ns) / 1000
+
+    def next_request_id(self) -> int:
+        return next(self._request_ids)
+
+    def write(self, event: Dict[str, Any], flush: bool = False):
+        line = json.dumps(event, default=str, separators=(",", ":")) + ",\n"
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(line)
+            if flush:
+                self._file.flush()
+
+    def close(self):
+        if self.profiler is not None:
+            self.profiler.stop()
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "args", "tid", "root", "start", "token", "profile_start")
+
+    def __init__(self, tracer: Tracer, name: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        parent = _current_span.get()
+        self.root = parent is None
+        if self.root:
+            self.tid = self.tracer.next_request_id()
+            self.tracer.write({
+                "name": "thread_name", "ph": "M", "pid": self.tracer.pid, "tid": self.tid,
+                "args": {"name": f"#{self.tid} {self.name}" + (f" {self.args['tool']}" if "tool" in self.args else "")},
+            })
+            self.profile_start = self.tracer.profiler.request_started() if self.tracer.profiler else 0
+        else:
+            self.tid = parent.tid
+        self.token = _current_span.set(self)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end = time.perf_counter_ns()
+        _current_span.reset(self.token)
+        tracer = self.tracer
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        event = {
+            "name": self.name, "cat": "windbg", "ph": "X",
+            "ts": tracer.timestamp(self.start), "dur": (end - self.start) / 1000,
+            "pid": tracer.pid, "tid": self.tid,
+        }
+        if self.args:
+            event["args"] = self.args
+        tracer.write(event, flush=self.root and tracer.profiler is None)
+        if self.root and tracer.profiler is not None:
+            total, stacks = tracer.profiler.request_finished(self.profile_start)
+            tracer.write({
+                "name": "cpu_profile", "cat": "windbg", "ph": "i", "s": "t",
+                "ts": tracer.timestamp(end), "pid": tracer.pid, "tid": self.tid,
+                "args": {
+                    "samples": total,
+                    "interval_ms": tracer.profiler.interval * 1000,
+                    "stacks": dict(stacks.most_common(MAX_PROFILE_STACKS)),
+                },
+            }, flush=True)
+
+    def set(self, **args):
+        """Add arguments known only once the span is running"""
+        self.args.update(args)
+
+
+class _NullSpan(contextlib.AbstractContextManager):
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+_current_span: ContextVar[Optional[_Span]] = ContextVar("trace_span", default=None)
+
+_tracer: Optional[Tracer] = None
+
+
+def configure_tracing(
+    trace_file: Optional[str],
+    profile: bool = False,
+    profile_interval: float = DEFAULT_PROFILE_INTERVAL
+) -> Optional[Tracer]:
+    """
+    Start (or stop, with trace_file None) writing spans to a trace file.
+
+    Args:
+        trace_file: Trace file path
+        profile: Whether to run the sampling profiler during each request
+        profile_interval: Seconds between two profiler samples
+    """
+    global _tracer
+    if _tracer is not None:
+        _tracer.close()
+        atexit.unregister(_tracer.close)
+    _tracer = Tracer(trace_file, profile, profile_interval) if trace_file else None
+    if _tracer is not None:
+        atexit.register(_tracer.close)
+    return _tracer
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, **args: Any) -> ContextManager:
+    """
+    Time the with-block as a span of the current request.
+
+    Args:
+        name: Span name
+        **args: Arguments shown with the span (e.g. the command)
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, args)
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Decorator running each call of a function or coroutine function in a span"""
+    def decorate(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                tracer = _tracer
+                if tracer is None:
+                    return await func(*args, **kwargs)
+                with _Span(tracer, name, {}):
+                    return await func(*args, **kwargs)
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return func(*args, **kwargs)
+            with _Span(tracer, name, {}):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+def read_trace(path: str) -> List[Dict[str, Any]]:
+    """Parse the events of a trace file"""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line.rstrip().rstrip(",")) for line in f if line.strip() not in ("", "[", "]")]
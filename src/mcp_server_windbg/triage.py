@@ -0,0 +1,258 @@
+"""
+Batch triage of a directory of crash dumps.
+
+Each dump is opened in its own cdb process by one of a bounded pool of
+worker threads, an analysis profile (a fixed list of commands) is run as a
+single batch, and one JSON record per dump is written as soon as it is
+done. A manifest keyed by path, size and modification time records which
+dumps were triaged successfully so that re-running over the same directory
+only processes new or changed files; it is saved periodically and at the
+end of the run.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, List, Optional, TextIO
+
+from .cdb_session import CDBSession, CDBTimeoutError
+from .dump_index import is_dump_file
+from .minidump import read_exception_summary
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_PROFILES: Dict[str, List[str]] = {
+    "quick": [".lastevent", "kb"],
+    "standard": [".lastevent", "!analyze -v", "kb", "lm"],
+    "full": [".lastevent", "!analyze -v", "~*kb", "lm", "!peb"],
+}
+DEFAULT_PROFILE = "standard"
+MANIFEST_NAME = ".mcp-windbg-triage.json"
+# The manifest is rewritten after this many newly triaged dumps or seconds, whichever comes first
+MANIFEST_SAVE_EVERY = 100
+MANIFEST_SAVE_INTERVAL = 30.0
+
+
+def find_dumps(directory: str, recursive: bool = False) -> List[str]:
+    """
+    Find crash dump files (*.*dmp, matching list_windbg_dumps) in a directory.
+
+    Returns:
+        Sorted list of dump file paths
+    """
+    dumps = []
+    pending = [directory]
+    while pending:
+        with os.scandir(pending.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive:
+                        pending.append(entry.path)
+                elif is_dump_file(entry.name) and entry.is_file():
+                    dumps.append(entry.path)
+    dumps.sort()
+    return dumps
+
+
+class TriageManifest:
+    """JSON file recording the size and mtime of every dump triaged successfully"""
+
+    def __init__(
+        self,
+        path: str,
+        save_every: int = MANIFEST_SAVE_EVERY,
+        save_interval: float = MANIFEST_SAVE_INTERVAL
+    ):
+        """
+        Load the manifest if it exists.
+
+        Args:
+            path: Path of the manifest file
+            save_every: Number of unsaved entries after which mark_done() saves
+            save_interval: Seconds after which mark_done() saves unsaved entries
+        """
+        self.path = path
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self.entries: Dict[str, Dict[str, int]] = {}
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+        self._lock = threading.Lock()
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable triage manifest {path}: {e}")
+
+    @staticmethod
+    def _fingerprint(stat: os.stat_result) -> Dict[str, int]:
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+    def is_done(self, dump_path: str, stat: os.stat_result) -> bool:
+        """Whether this exact version of the dump has been triaged"""
+        return self.entries.get(os.path.abspath(dump_path)) == self._fingerprint(stat)
+
+    def mark_done(self, dump_path: str, stat: os.stat_result):
+        """
+        Record a successful triage. The manifest is saved once save_every
+        entries or save_interval seconds have accumulated; call flush() at
+        the end to save the rest.
+        """
+        with self._lock:
+            self.entries[os.path.abspath(dump_path)] = self._fingerprint(stat)
+            self._unsaved += 1
+            if self._unsaved >= self.save_every or time.monotonic() - self._saved_at >= self.save_interval:
+                self._save()
+
+    def flush(self):
+        """Save the manifest if it has unsaved entries"""
+        with self._lock:
+            if self._unsaved:
+                self._save()
+
+    def save(self):
+        """Write the manifest atomically"""
+        with self._lock:
+            self._save()
+
+    def _save(self):
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+        self._unsaved = 0
+        self._saved_at = time.monotonic()
+
+
+def triage_dump(
+    dump_path: str,
+    commands: List[str],
+    cdb_path: Optional[str] = None,
+    symbols_path: Optional[str] = None,
+    timeout: int = 30
+) -> Dict[str, Any]:
+    """
+    Run an analysis profile against one dump in a fresh cdb process.
+
+    Returns:
+        JSON-serialisable triage record. Failures are reported in its
+        "error" field rather than raised.
+    """
+    started = time.monotonic()
+    record: Dict[str, Any] = {
+        "dump_path": os.path.abspath(dump_path),
+        "exception": read_exception_summary(dump_path),
+        "commands": [],
+        "error": None,
+    }
+    try:
+        with CDBSession(
+            dump_path=dump_path,
+            cdb_path=cdb_path,
+            symbols_path=symbols_path,
+            timeout=timeout
+        ) as session:
+            outputs = session.send_batch(commands)
+        record["commands"] = [
+            {"command": command, "output": "\n".join(output)} for command, output in zip(commands, outputs)
+        ]
+    except CDBTimeoutError as e:
+        # Keep the commands that completed before the timeout
+        record["commands"] = [
+            {"command": command, "output": "\n".join(output)} for command, output in zip(commands, e.partial_results)
+        ]
+        record["error"] = f"{type(e).__name__}: {e}"
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.monotonic() - started, 3)
+    return record
+
+
+def run_triage(
+    dumps: Iterable[str],
+    commands: List[str],
+    output: TextIO,
+    manifest: Optional[TriageManifest] = None,
+    jobs: int = 4,
+    cdb_path: Optional[str] = None,
+    symbols_path: Optional[str] = None,
+    timeout: int = 30
+) -> Dict[str, Any]:
+    """
+    Triage dumps in parallel, writing one JSON line per dump to output as each finishes.
+
+    Args:
+        dumps: Dump file paths
+        commands: Analysis profile to run against each dump
+        output: Text stream receiving the JSONL records
+        manifest: Manifest used to skip unchanged dumps; None triages everything
+        jobs: Number of concurrent cdb processes
+        cdb_path: Custom path to cdb.exe
+        symbols_path: Custom symbols path
+        timeout: Timeout of each command in seconds
+
+    Returns:
+        Summary with processed/skipped/failed counts, elapsed time and dumps per minute
+    """
+    pending = []
+    skipped = 0
+    for dump_path in dumps:
+        try:
+            stat = os.stat(dump_path)
+        except OSError as e:
+            logger.warning(f"Skipping {dump_path}: {e}")
+            continue
+        if manifest is not None and manifest.is_done(dump_path, stat):
+            skipped += 1
+        else:
+            pending.append((dump_path, stat))
+
+    started = time.monotonic()
+    processed = failed = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs), thread_name_prefix="triage") as executor:
+            futures = {
+                executor.submit(triage_dump, dump_path, commands, cdb_path, symbols_path, timeout): (dump_path, stat)
+                for dump_path, stat in pending
+            }
+            for future in as_completed(futures):
+                dump_path, stat = futures[future]
+                record = future.result()
+                record["size"] = stat.st_size
+                record["mtime"] = stat.st_mtime
+                output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                output.flush()
+                processed += 1
+                if record["error"] is None:
+                    if manifest is not None:
+                        manifest.mark_done(dump_path, stat)
+                else:
+                    failed += 1
+                    logger.warning(f"Triage failed for {dump_path}: {record['error']}")
+    finally:
+        # Save what was triaged, also when the run is interrupted
+        if manifest is not None:
+            manifest.flush()
+
+    elapsed = time.monotonic() - started
+    return {
+        "processed": processed,
+        "skipped": skipped,
+        "failed": failed,
+        "seconds": round(elapsed, 3),
+        "dumps_per_minute": round(processed * 60 / elapsed, 2) if processed and elapsed > 0 else 0.0,
+    }
+
+
+def format_summary(summary: Dict[str, Any]) -> str:
+    """Human-readable triage summary line"""
+    return (
+        f"Triaged {summary['processed']} dump(s) ({summary['failed']} failed, "
+        f"{summary['skipped']} unchanged skipped) in {summary['seconds']:.1f}s: "
+        f"{summary['dumps_per_minute']:.1f} dumps/min"
+    )
@@ -0,0 +1,90 @@
+"""
+Grouping of identical thread stacks, like the `!uniqstack` extension.
+
+The stacks of all threads come from a single `~*kb`. Threads whose stacks
+have the same call sites, frame by frame, fall into one group; a dump with
+hundreds of worker threads parked in the same wait usually reduces to a
+handful of groups. Groups are built incrementally as each thread's stack is
+parsed, and only the first stack of a group is kept.
+"""
+
+from typing import Dict, List, Tuple
+
+from .parsers import Thread, ThreadStack
+
+DEFAULT_STACK_DEPTH = 30
+DEFAULT_MAX_THREADS_LISTED = 8
+
+
+class StackGroup:
+    """Threads sharing one stack; `stack` is the stack of the first thread seen"""
+
+    __slots__ = ("stack", "threads")
+
+    def __init__(self, stack: ThreadStack):
+        self.stack = stack
+        self.threads = [stack.thread]
+
+    @property
+    def count(self) -> int:
+        return len(self.threads)
+
+
+class StackGrouper:
+    """Collects thread stacks into groups of identical stacks"""
+
+    def __init__(self):
+        self._groups: Dict[Tuple[str, ...], StackGroup] = {}
+        self.thread_count = 0
+
+    def add(self, stack: ThreadStack):
+        """Add the stack of one thread"""
+        self.thread_count += 1
+        key = tuple(frame.call_site for frame in stack.frames)
+        group = self._groups.get(key)
+        if group is None:
+            self._groups[key] = StackGroup(stack)
+        else:
+            group.threads.append(stack.thread)
+
+    def groups(self) -> List[StackGroup]:
+        """Groups, largest first; ties in order of their first thread"""
+        return sorted(self._groups.values(), key=lambda group: -group.count)
+
+
+def _format_thread(thread: Thread) -> str:
+    marker = "#" if thread.event else "." if thread.current else ""
+    return f"{marker}{thread.number} ({thread.thread_id:x})"
+
+
+def format_unique_stacks(
+    command: str,
+    grouper: StackGrouper,
+    max_threads_listed: int = DEFAULT_MAX_THREADS_LISTED,
+) -> str:
+    """
+    Text summary of the unique stacks.
+
+    Args:
+        command: The command the stacks came from
+        grouper: The grouped stacks
+        max_threads_listed: Representative threads listed per group
+
+    Returns:
+        One section per group with its thread count, the first threads
+        (number and thread id; `.` marks the current thread, `#` the event
+        thread) and the call sites of the stack
+    """
+    groups = grouper.groups()
+    lines = [f"{len(groups)} unique stack(s) across {grouper.thread_count} thread(s) ({command})"]
+    for i, group in enumerate(groups):
+        listed = ", ".join(_format_thread(thread) for thread in group.threads[:max_threads_listed])
+        if group.count > max_threads_listed:
+            listed += f" and {group.count - max_threads_listed} more"
+        lines.append("")
+        lines.append(f"{i+1}. {group.count} thread(s): {listed}")
+        if group.stack.frames:
+            lines.extend(f"  {frame.call_site}" for frame in group.stack.frames)
+        else:
+            lines.append("  (no frames)")
+    return "\n".join(lines)
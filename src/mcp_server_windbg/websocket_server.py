@@ -1,55 +1,188 @@
 import asyncio
 import json
+import os
 import traceback
 import websockets
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from mcp.types import TextContent
 
-async def websocket_handler(websocket, path, server_instance):
-    """Handle WebSocket connections and process MCP messages."""
-    async for message in websocket:
+from . import metrics
+from .output_stream import output_sink
+from .tracing import span
+
+# Requests from one connection that may be in flight at the same time
+DEFAULT_MAX_CONCURRENT_REQUESTS = 8
+
+_TRANSPORT = ("websocket",)
+_INBOUND = ("websocket", "in")
+_OUTBOUND = ("websocket", "out")
+
+
+class _DumpOrdering:
+    """FIFO locks keyed by dump path, removed again when nobody holds or waits for them."""
+
+    def __init__(self):
+        self._locks: Dict[str, List[Any]] = {}
+
+    def acquire_order(self, dump_path: Optional[str]):
+        # Must be called in arrival order; the returned lock preserves it
+        if not dump_path:
+            return None
+        key = os.path.normcase(os.path.abspath(dump_path))
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        return key
+
+    def lock(self, key: str) -> asyncio.Lock:
+        return self._locks[key][0]
+
+    def release_order(self, key: Optional[str]):
+        if key is None:
+            return
+        entry = self._locks[key]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[key]
+
+
+async def send_message(websocket, message: Dict[str, Any], send_lock: asyncio.Lock):
+    data = json.dumps(message)
+    try:
+        async with send_lock:
+            await websocket.send(data)
+    except websockets.ConnectionClosed:
+        return
+    metrics.TRANSPORT_MESSAGES.inc(labels=_OUTBOUND)
+    metrics.TRANSPORT_BYTES.inc(len(data), _OUTBOUND)
+
+
+async def handle_message(websocket, message: str, server_instance, send_lock: asyncio.Lock, ordering: _DumpOrdering, order_key: Optional[str]):
+    """Process one MCP message and send its response tagged with the request id.
+
+    While a command runs, its output is sent ahead as "chunk" messages
+    carrying the same id.
+    """
+    request_id = None
+
+    async def send_chunk(lines: List[str]):
+        await send_message(websocket, {"type": "chunk", "id": request_id, "output": "\n".join(lines)}, send_lock)
+
+    with span("websocket_request"):
         try:
             request = json.loads(message)
-            # 处理MCP请求
-            if request.get("type") == "list_tools":
-                tools = await server_instance.list_tools_handler()
-                await websocket.send(json.dumps({
-                    "type": "tools", 
-                    "tools": [tool.model_dump() for tool in tools]
-                }))
-            elif request.get("type") == "call_tool":
-                name = request.get("name")
-                arguments = request.get("arguments", {})
-                result = await server_instance.call_tool_handler(name, arguments)
-                await websocket.send(json.dumps({
-                    "type": "result", 
-                    "result": [content.model_dump() for content in result]
-                }))
-            else:
-                await websocket.send(json.dumps({
-                    "type": "error", 
-                    "error": f"Unknown request type: {request.get('type')}"
-                }))
+            request_id = request.get("id")
+            with output_sink(send_chunk):
+                if order_key is not None:
+                    # Commands for the same dump run in the order they were received
+                    async with ordering.lock(order_key):
+                        response = await dispatch_request(request, server_instance)
+                else:
+                    response = await dispatch_request(request, server_instance)
         except Exception as e:
-            await websocket.send(json.dumps({
-                "type": "error", 
+            response = {
+                "type": "error",
                 "error": str(e),
                 "traceback": traceback.format_exc()
-            }))
+            }
+        finally:
+            ordering.release_order(order_key)
+
+        if request_id is not None:
+            response["id"] = request_id
+        with span("send_response"):
+            await send_message(websocket, response, send_lock)
+
+
+async def dispatch_request(request: Dict[str, Any], server_instance) -> Dict[str, Any]:
+    """Run an MCP request and build the response message."""
+    # 处理MCP请求
+    if request.get("type") == "list_tools":
+        tools = await server_instance.list_tools_handler()
+        return {
+            "type": "tools",
+            "tools": [tool.model_dump() for tool in tools]
+        }
+    elif request.get("type") == "call_tool":
+        name = request.get("name")
+        arguments = request.get("arguments", {})
+        result = await server_instance.call_tool_handler(name, arguments)
+        with span("serialize"):
+            return {
+                "type": "result",
+                "result": [content.model_dump() for content in result]
+            }
+    else:
+        return {
+            "type": "error",
+            "error": f"Unknown request type: {request.get('type')}"
+        }
+
+
+def _dump_path_of(message: str) -> Optional[str]:
+    try:
+        request = json.loads(message)
+        arguments = request.get("arguments") or {}
+        return arguments.get("dump_path") if request.get("type") == "call_tool" else None
+    except (ValueError, AttributeError):
+        return None
+
+
+async def websocket_handler(websocket, path=None, server_instance=None, max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS):
+    """Handle WebSocket connections and process MCP messages.
+
+    Every message runs as its own task, so a quick request is not held up by
+    a slow one. At most max_concurrent requests per connection are in flight;
+    further messages are not read until one finishes. Requests for the same
+    dump are executed in the order they arrived. Responses carry the "id" of
+    the request they answer.
+    """
+    semaphore = asyncio.Semaphore(max(1, max_concurrent))
+    send_lock = asyncio.Lock()
+    ordering = _DumpOrdering()
+    tasks = set()
+
+    def finished(task):
+        tasks.discard(task)
+        semaphore.release()
+        metrics.TRANSPORT_IN_FLIGHT.dec(labels=_TRANSPORT)
+
+    metrics.TRANSPORT_CONNECTIONS.inc(labels=_TRANSPORT)
+    try:
+        async for message in websocket:
+            metrics.TRANSPORT_MESSAGES.inc(labels=_INBOUND)
+            metrics.TRANSPORT_BYTES.inc(len(message), _INBOUND)
+            await semaphore.acquire()
+            metrics.TRANSPORT_IN_FLIGHT.inc(labels=_TRANSPORT)
+            order_key = ordering.acquire_order(_dump_path_of(message))
+            task = asyncio.create_task(
+                handle_message(websocket, message, server_instance, send_lock, ordering, order_key)
+            )
+            tasks.add(task)
+            task.add_done_callback(finished)
+    except websockets.ConnectionClosed:
+        pass
+    finally:
+        # Let in-flight commands finish rather than cancelling them halfway
+        # through a cdb command; their responses are dropped
+        if tasks:
+            await asyncio.gather(*list(tasks), return_exceptions=True)
+        metrics.TRANSPORT_CONNECTIONS.dec(labels=_TRANSPORT)
 
 async def start_websocket_server(
     server_instance,
-    host: str = "0.0.0.0", 
-    port: int = 8765
+    host: str = "0.0.0.0",
+    port: int = 8765,
+    max_concurrent: int = DEFAULT_MAX_CONCURRENT_REQUESTS
 ):
     """Start the WebSocket server.
-    
+
     Args:
         server_instance: The MCP server instance
         host: Host to bind the server to
         port: Port to bind the server to
+        max_concurrent: Maximum number of in-flight requests per connection
     """
-    handler = lambda ws, path: websocket_handler(ws, path, server_instance)
+    handler = lambda ws, path=None: websocket_handler(ws, path, server_instance, max_concurrent)
     server = await websockets.serve(handler, host, port)
     print(f"WebSocket server started at ws://{host}:{port}")
-    await server.wait_closed()
\ No newline at end of file
+    await server.wait_closed()